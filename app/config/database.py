@@ -1,22 +1,186 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
 from app.config.settings import settings
+from contextvars import ContextVar
+from typing import Optional
 import logging
+import threading
+import time
 
 # Cliente MongoDB para operaciones síncronas
 mongo_client: MongoClient = None
 database = None
 
-# Cliente MongoDB para operaciones asíncronas 
+# Cliente MongoDB para operaciones asíncronas
 async_mongo_client: AsyncIOMotorClient = None
 async_database = None
 
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Listener CMAP de PyMongo que lleva contadores del pool de conexiones:
+    conexiones abiertas, en uso (checked-out) y tiempo de espera en la cola
+    para obtener una conexión.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # El check-out ocurre en el hilo que ejecuta la operación
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.open_connections = 0
+            self.checked_out = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.wait_time_total_ms = 0.0
+            self.wait_time_max_ms = 0.0
+            self.pool_clears = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "available": max(0, self.open_connections - self.checked_out),
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "wait_time_avg_ms": round(self.wait_time_total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_time_max_ms": round(self.wait_time_max_ms, 3),
+                "pool_clears": self.pool_clears,
+            }
+
+    def _wait_finished(self):
+        inicio = getattr(self._local, "checkout_started", None)
+        self._local.checkout_started = None
+        return (time.perf_counter() - inicio) * 1000 if inicio is not None else 0.0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections = max(0, self.open_connections - 1)
+
+    def connection_check_out_started(self, event):
+        self._local.checkout_started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._wait_finished()
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        espera_ms = self._wait_finished()
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            self.wait_time_total_ms += espera_ms
+            self.wait_time_max_ms = max(self.wait_time_max_ms, espera_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+
+# Duraciones (segundos) de los comandos de la petición HTTP en curso; la fija el
+# middleware de métricas. Motor ejecuta cada operación en un hilo del executor
+# copiando el contexto, así que el listener ve la lista de la petición que la lanzó.
+request_mongo_commands: ContextVar[Optional[list]] = ContextVar("request_mongo_commands", default=None)
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """
+    Listener de comandos de PyMongo: totales, fallos y tiempo acumulado por
+    comando (find, insert, aggregate...) y, si hay una petición HTTP en curso,
+    la duración de cada comando para atribuirla a su ruta.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # nombre del comando -> [total, fallidos, segundos]
+            self.commands = {}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                nombre: {"total": total, "failed": fallidos, "seconds": segundos}
+                for nombre, (total, fallidos, segundos) in self.commands.items()
+            }
+
+    def _finished(self, event, fallido: int):
+        segundos = event.duration_micros / 1_000_000
+        peticion = request_mongo_commands.get()
+        if peticion is not None:
+            peticion.append(segundos)
+        with self._lock:
+            contador = self.commands.get(event.command_name)
+            if contador is None:
+                contador = self.commands[event.command_name] = [0, 0, 0.0]
+            contador[0] += 1
+            contador[1] += fallido
+            contador[2] += segundos
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._finished(event, 0)
+
+    def failed(self, event):
+        self._finished(event, 1)
+
+
+# Monitores únicos del proceso (compartidos por los clientes síncrono y asíncrono)
+pool_monitor = PoolMonitor()
+command_monitor = CommandMonitor()
+
+
+def get_client_options() -> dict:
+    """Opciones del pool de conexiones tomadas de Settings"""
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "event_listeners": [pool_monitor, command_monitor],
+    }
+    if settings.MONGO_WAIT_QUEUE_TIMEOUT_MS:
+        options["waitQueueTimeoutMS"] = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if settings.MONGO_COMPRESSORS:
+        options["compressors"] = settings.MONGO_COMPRESSORS
+    return options
+
+
 def init_sync_database():
     """Inicializar la base de datos síncrona"""
     global mongo_client, database
-    
+
     try:
-        mongo_client = MongoClient(settings.MONGODB_URL)
+        mongo_client = MongoClient(settings.MONGODB_URL, **get_client_options())
         database = mongo_client[settings.DATABASE_NAME]
         # Verificar conexión
         mongo_client.admin.command('ping')
@@ -28,34 +192,29 @@ def init_sync_database():
 
 async def connect_to_mongo():
     """Conectar a MongoDB"""
-    global mongo_client, database, async_mongo_client, async_database
-    
     try:
-        # Cliente síncrono (si no existe)
-        if not mongo_client:
-            mongo_client = MongoClient(settings.MONGODB_URL)
-            database = mongo_client[settings.DATABASE_NAME]
-        
-        # Cliente asíncrono
-        async_mongo_client = AsyncIOMotorClient(settings.MONGODB_URL)
-        async_database = async_mongo_client[settings.DATABASE_NAME]
-        
+        # La aplicación sólo usa el cliente asíncrono; el síncrono se crea
+        # bajo demanda para scripts que llamen a get_database()
+        client = get_mongo_client()
+
         # Verificar conexión
-        await async_mongo_client.admin.command('ping')
+        await client.admin.command('ping')
         logging.info("Conectado exitosamente a MongoDB")
-        
+
     except Exception as e:
         logging.error(f"Error al conectar a MongoDB: {e}")
         raise
 
 async def close_mongo_connection():
     """Cerrar conexión a MongoDB"""
-    global mongo_client, async_mongo_client
-    
+    global mongo_client, database, async_mongo_client, async_database
+
     if mongo_client:
         mongo_client.close()
+        mongo_client, database = None, None
     if async_mongo_client:
         async_mongo_client.close()
+        async_mongo_client, async_database = None, None
     logging.info("Conexión a MongoDB cerrada")
 
 def get_database():
@@ -64,6 +223,30 @@ def get_database():
         init_sync_database()
     return database
 
+def get_mongo_client() -> AsyncIOMotorClient:
+    """
+    Registro del cliente asíncrono del proceso: todos los controladores y rutas
+    comparten este cliente y por lo tanto un único pool de conexiones.
+    """
+    global async_mongo_client, async_database
+
+    if async_mongo_client is None:
+        # Motor no abre conexiones hasta la primera operación, por lo que es
+        # seguro crear el cliente antes de que arranque el event loop
+        async_mongo_client = AsyncIOMotorClient(settings.MONGODB_URL, **get_client_options())
+        async_database = async_mongo_client[settings.DATABASE_NAME]
+    return async_mongo_client
+
 def get_async_database():
-    """Obtener instancia de la base de datos asíncrona"""
-    return async_database
\ No newline at end of file
+    """Obtener instancia de la base de datos asíncrona (se crea bajo demanda)"""
+    if async_database is None:
+        get_mongo_client()
+    return async_database
+
+def get_pool_stats() -> dict:
+    """Estadísticas del pool de conexiones y su configuración"""
+    return {
+        **pool_monitor.stats(),
+        "max_pool_size": settings.MONGO_MAX_POOL_SIZE,
+        "min_pool_size": settings.MONGO_MIN_POOL_SIZE,
+    }
@@ -7,11 +7,65 @@ class Settings(BaseSettings):
     MONGODB_URL: str = "mongodb://localhost:27017"
     DATABASE_NAME: str = "sistema_solicitudes_pagos"
     
+    # Pool de conexiones MongoDB (compartido por todo el proceso)
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 300000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 0  # 0 = esperar indefinidamente
+    MONGO_COMPRESSORS: str = ""  # p.ej. "zstd,snappy,zlib" (zstd/snappy requieren paquetes extra)
+    
     # JWT
     SECRET_KEY: str = "tu-clave-secreta-muy-segura-aqui-cambiar-en-produccion"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Contraseñas: costo de bcrypt y pool dedicado (operaciones en curso + cola antes de responder 503)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    
+    # Subida de archivos (adjuntos y comprobantes)
+    UPLOAD_MAX_FILE_BYTES: int = 25 * 1024 * 1024
+    UPLOAD_MAX_REQUEST_BYTES: int = 100 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    
+    # Caché del usuario autenticado por token (0 en cualquiera de los dos la desactiva)
+    USER_CACHE_MAX_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 60
+    
+    # Índice BM25 del chat: cada cuántos segundos revisar si cambió README/docs/templates
+    KNOWLEDGE_INDEX_CHECK_SECONDS: float = 5.0
+    
+    # Búsqueda del chat: "bm25" o "semantic" (vectores LSA en archivo mapeado en memoria, requiere NumPy)
+    KNOWLEDGE_SEARCH_MODE: str = "bm25"
+    KNOWLEDGE_VECTOR_DIR: str = "data/knowledge_index"
+    KNOWLEDGE_VECTOR_DIMS: int = 128
+    KNOWLEDGE_VECTOR_DTYPE: str = "float32"  # "int8" = 4x menos memoria
+    
+    # Caché LRU de respuestas del chat (pregunta normalizada -> respuesta; 0 la desactiva)
+    CHAT_ANSWER_CACHE_SIZE: int = 1024
+    
+    # Backend del chat: "mock" (FAQ/documentación) o "http" (servidor local compatible con /v1/chat/completions)
+    CHAT_BACKEND: str = "mock"
+    CHAT_BACKEND_URL: str = "http://127.0.0.1:8081/v1/chat/completions"
+    CHAT_BACKEND_MODEL: str = "local"
+    # Respuestas en streaming: simultáneas por usuario (0 = sin límite) y tiempos máximos
+    CHAT_STREAM_MAX_PER_USER: int = 2
+    CHAT_STREAM_FIRST_TOKEN_TIMEOUT_SECONDS: float = 15.0
+    CHAT_STREAM_TIMEOUT_SECONDS: float = 60.0
+    
+    # Resultados precalculados de Spark (spark_mongo_analytics.py, exportación Parquet) para
+    # las gráficas de usuarios del admin; se usan mientras tengan menos de estas horas (0 = nunca)
+    # y sólo si se calcularon sobre DATABASE_NAME (campo "source" del manifiesto _SUCCESS)
+    ANALYTICS_RESULTS_DIR: str = "spark_analysis_results"
+    ANALYTICS_RESULTS_MAX_AGE_HOURS: float = 24.0
+    
+    # Métricas por ruta en /metrics (formato Prometheus); además del JWT de un admin,
+    # acepta "Authorization: Bearer <METRICS_TOKEN>" para el scraper (vacío = sólo admin)
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: str = ""
+    
     # Aplicación
     DEBUG: bool = True
     
@@ -3,13 +3,13 @@ Controlador para el Dashboard del Aprobador
 Gestiona solicitudes pendientes, aprobaciones y rechazos
 """
 from fastapi import HTTPException, status
-from pymongo import MongoClient
-from bson import ObjectId
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Dict, Optional
-import os
-from dotenv import load_dotenv
 
+from app.config.database import get_async_database
+from app.models.solicitud_db import SolicitudDB, rango_fechas
+from app.models.user_db import UserDB
+from app.models.solicitud_stats_db import ESTADOS_PENDIENTES, agrupado, por_mes, suma_estados
 from app.models.solicitud import (
     SolicitudEstandar,
     SolicitudAprobacion,
@@ -17,27 +17,46 @@ from app.models.solicitud import (
     EstadoSolicitud
 )
 
-load_dotenv()
-
-# Configuración de MongoDB
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-DATABASE_NAME = os.getenv("DATABASE_NAME", "sistema_solicitudes_pagos")  # 🔧 CORREGIDO: Usar la BD correcta
-
 class AprobadorController:
     """Controlador para operaciones del aprobador"""
     
-    def __init__(self):
-        self.mongo_client = MongoClient(MONGO_URI)
-        self.db = self.mongo_client[DATABASE_NAME]
-        self.solicitudes_collection = self.db["solicitudes_estandar"]
-        self.users_collection = self.db["users"]
+    def __init__(self, db=None):
+        # Repositorios asíncronos sobre el cliente Motor compartido (registro en app.config.database)
+        db = db if db is not None else get_async_database()
+        self.solicitudes = SolicitudDB(db)
+        self.users = UserDB(db)
         
         print(f"🔧 AprobadorController inicializado")
-        print(f"   MongoDB URI: {MONGO_URI}")
-        print(f"   Database Name: {DATABASE_NAME}")
+        print(f"   Database Name: {db.name}")
         print(f"   Colección: solicitudes_estandar")
+
+    async def _cargar_solicitantes(self, solicitudes: List[Dict]) -> Dict[str, Dict]:
+        """
+        Obtener en una sola consulta ($in sobre el índice único de email) los
+        solicitantes de un listado, en lugar de un find_one por solicitud.
+        """
+        emails = [s.get("solicitante_email") for s in solicitudes]
+        return await self.users.find_users_by_emails(
+            emails,
+            {"email": 1, "first_name": 1, "last_name": 1, "department": 1}
+        )
+
+    @staticmethod
+    def _info_solicitante(solicitante_email: Optional[str], solicitante: Optional[Dict]) -> Dict:
+        """Bloque "solicitante" de la respuesta a partir del usuario precargado"""
+        if solicitante:
+            first_name = solicitante.get('first_name', '')
+            last_name = solicitante.get('last_name', '')
+            nombre_completo = f"{first_name} {last_name}".strip() or "N/A"
+        else:
+            nombre_completo = "N/A"
+        return {
+            "email": solicitante_email or "N/A",
+            "nombre": nombre_completo,
+            "department": solicitante.get("department", "N/A") if solicitante else "N/A"
+        }
     
-    def get_solicitudes_pendientes(
+    async def get_solicitudes_pendientes(
         self, 
         aprobador_email: str,
         filtro_departamento: Optional[str] = None,
@@ -77,40 +96,24 @@ class AprobadorController:
             print(f"🔍 DEBUG - Query final: {query}")
             
             # Obtener solicitudes ordenadas por fecha de creación (más recientes primero)
-            solicitudes = list(
-                self.solicitudes_collection.find(query)
-                .sort("fecha_creacion", -1)
-                .limit(limite)
+            solicitudes = await self.solicitudes.find(
+                query,
+                sort=[("fecha_creacion", -1)],
+                limit=limite
             )
             
             print(f"🔍 DEBUG - Solicitudes encontradas en DB: {len(solicitudes)}")
             
+            # Información de los solicitantes: una sola consulta para todo el listado
+            solicitantes = await self._cargar_solicitantes(solicitudes)
+            
             # Convertir ObjectId a string y formatear datos
             result = []
-            for i, solicitud in enumerate(solicitudes, 1):
-                print(f"  📄 Procesando solicitud {i}/{len(solicitudes)}: {str(solicitud['_id'])}")
             for i, solicitud in enumerate(solicitudes, 1):
                 print(f"  📄 Procesando solicitud {i}/{len(solicitudes)}: {str(solicitud['_id'])}")
                 
                 try:
-                    # Obtener información del solicitante
                     solicitante_email = solicitud.get("solicitante_email")
-                    print(f"     Email solicitante: {solicitante_email}")
-                    
-                    solicitante = None
-                    if solicitante_email:
-                        solicitante = self.users_collection.find_one(
-                            {"email": solicitante_email}
-                        )
-                        print(f"     Solicitante encontrado: {solicitante is not None}")
-                    
-                    # Construir nombre del solicitante de forma segura
-                    if solicitante:
-                        first_name = solicitante.get('first_name', '')
-                        last_name = solicitante.get('last_name', '')
-                        nombre_completo = f"{first_name} {last_name}".strip() or "N/A"
-                    else:
-                        nombre_completo = "N/A"
                     
                     # Función auxiliar para convertir fechas a string
                     def fecha_a_string(fecha):
@@ -141,11 +144,9 @@ class AprobadorController:
                         "archivos_adjuntos": solicitud.get("archivos_adjuntos", []),
                         
                         # Información del solicitante
-                        "solicitante": {
-                            "email": solicitante_email or "N/A",
-                            "nombre": nombre_completo,
-                            "department": solicitante.get("department", "N/A") if solicitante else "N/A"
-                        }
+                        "solicitante": self._info_solicitante(
+                            solicitante_email, solicitantes.get(solicitante_email)
+                        )
                     }
                     
                     result.append(solicitud_dict)
@@ -169,7 +170,7 @@ class AprobadorController:
                 detail=f"Error al obtener solicitudes pendientes: {str(e)}"
             )
     
-    def aprobar_solicitud(self, aprobacion: SolicitudAprobacion) -> Dict:
+    async def aprobar_solicitud(self, aprobacion: SolicitudAprobacion) -> Dict:
         """
         Aprobar una solicitud
         
@@ -181,9 +182,7 @@ class AprobadorController:
         """
         try:
             # Validar que la solicitud existe y está en estado correcto
-            solicitud = self.solicitudes_collection.find_one({
-                "_id": ObjectId(aprobacion.solicitud_id)
-            })
+            solicitud = await self.solicitudes.find_by_id(aprobacion.solicitud_id)
             
             if not solicitud:
                 raise HTTPException(
@@ -202,9 +201,7 @@ class AprobadorController:
                 )
             
             # Validar que el aprobador tiene permisos
-            aprobador = self.users_collection.find_one({
-                "email": aprobacion.aprobador_email
-            })
+            aprobador = await self.users.find_user_by_email(aprobacion.aprobador_email)
             
             if not aprobador or aprobador.get("role") != "aprobador":
                 raise HTTPException(
@@ -221,12 +218,9 @@ class AprobadorController:
                 "fecha_actualizacion": datetime.utcnow()
             }
             
-            result = self.solicitudes_collection.update_one(
-                {"_id": ObjectId(aprobacion.solicitud_id)},
-                {"$set": update_data}
-            )
+            modificadas = await self.solicitudes.update_fields(aprobacion.solicitud_id, update_data)
             
-            if result.modified_count == 0:
+            if modificadas == 0:
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail="No se pudo actualizar la solicitud"
@@ -246,7 +240,7 @@ class AprobadorController:
                 detail=f"Error al aprobar solicitud: {str(e)}"
             )
     
-    def rechazar_solicitud(self, rechazo: SolicitudRechazo) -> Dict:
+    async def rechazar_solicitud(self, rechazo: SolicitudRechazo) -> Dict:
         """
         Rechazar una solicitud (requiere comentarios obligatorios)
         
@@ -258,9 +252,7 @@ class AprobadorController:
         """
         try:
             # Validar que la solicitud existe y está en estado correcto
-            solicitud = self.solicitudes_collection.find_one({
-                "_id": ObjectId(rechazo.solicitud_id)
-            })
+            solicitud = await self.solicitudes.find_by_id(rechazo.solicitud_id)
             
             if not solicitud:
                 raise HTTPException(
@@ -279,9 +271,7 @@ class AprobadorController:
                 )
             
             # Validar que el aprobador tiene permisos
-            aprobador = self.users_collection.find_one({
-                "email": rechazo.aprobador_email
-            })
+            aprobador = await self.users.find_user_by_email(rechazo.aprobador_email)
             
             if not aprobador or aprobador.get("role") != "aprobador":
                 raise HTTPException(
@@ -305,12 +295,9 @@ class AprobadorController:
                 "fecha_actualizacion": datetime.utcnow()
             }
             
-            result = self.solicitudes_collection.update_one(
-                {"_id": ObjectId(rechazo.solicitud_id)},
-                {"$set": update_data}
-            )
+            modificadas = await self.solicitudes.update_fields(rechazo.solicitud_id, update_data)
             
-            if result.modified_count == 0:
+            if modificadas == 0:
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail="No se pudo actualizar la solicitud"
@@ -330,7 +317,7 @@ class AprobadorController:
                 detail=f"Error al rechazar solicitud: {str(e)}"
             )
     
-    def get_estadisticas_aprobador(self, aprobador_email: str) -> Dict:
+    async def get_estadisticas_aprobador(self, aprobador_email: str) -> Dict:
         """
         Obtener estadísticas del dashboard del aprobador
         
@@ -341,50 +328,15 @@ class AprobadorController:
             Diccionario con estadísticas
         """
         try:
-            # Total de solicitudes pendientes
-            pendientes = self.solicitudes_collection.count_documents({
-                "estado": {
-                    "$in": [
-                        EstadoSolicitud.ENVIADA.value,
-                        EstadoSolicitud.EN_REVISION.value
-                    ]
-                }
-            })
-            
-            # Total aprobadas por este aprobador
-            aprobadas = self.solicitudes_collection.count_documents({
-                "aprobador_email": aprobador_email,
-                "estado": EstadoSolicitud.APROBADA.value
-            })
+            # Contadores materializados: global (pendientes) y del aprobador (procesadas)
+            stats = await self.solicitudes.stats.obtener_varios(["global", f"aprobador:{aprobador_email}"])
+            stats_global = stats["global"]
+            stats_aprobador = stats[f"aprobador:{aprobador_email}"]
             
-            # Total rechazadas por este aprobador
-            rechazadas = self.solicitudes_collection.count_documents({
-                "aprobador_email": aprobador_email,
-                "estado": EstadoSolicitud.RECHAZADA.value
-            })
-            
-            # Monto total de solicitudes pendientes
-            pipeline_monto_pendiente = [
-                {
-                    "$match": {
-                        "estado": {
-                            "$in": [
-                                EstadoSolicitud.ENVIADA.value,
-                                EstadoSolicitud.EN_REVISION.value
-                            ]
-                        }
-                    }
-                },
-                {
-                    "$group": {
-                        "_id": None,
-                        "total": {"$sum": "$monto"}
-                    }
-                }
-            ]
-            
-            resultado_monto = list(self.solicitudes_collection.aggregate(pipeline_monto_pendiente))
-            monto_pendiente = resultado_monto[0]["total"] if resultado_monto else 0
+            pendientes = int(suma_estados(stats_global, ESTADOS_PENDIENTES))
+            aprobadas = int(suma_estados(stats_aprobador, [EstadoSolicitud.APROBADA.value]))
+            rechazadas = int(suma_estados(stats_aprobador, [EstadoSolicitud.RECHAZADA.value]))
+            monto_pendiente = suma_estados(stats_global, ESTADOS_PENDIENTES, "monto")
             
             return {
                 "pendientes": pendientes,
@@ -400,68 +352,55 @@ class AprobadorController:
                 detail=f"Error al obtener estadísticas: {str(e)}"
             )
 
-    def get_estadisticas_aprobador_detalle(self, aprobador_email: str) -> Dict:
+    async def get_estadisticas_aprobador_detalle(
+        self,
+        aprobador_email: str,
+        desde: Optional[date] = None,
+        hasta: Optional[date] = None
+    ) -> Dict:
         """
         Obtener estadísticas detalladas para el dashboard del aprobador.
 
         Devuelve agrupaciones por estado, tipo de pago y por mes (basado en fecha_aprobacion / fecha_rechazo / fecha_creacion),
-        así como un resumen numérico.
+        así como un resumen numérico. Sin ventana se leen los contadores
+        materializados; con `desde`/`hasta` (fecha_creacion) se calcula todo en
+        una sola pasada con $facet.
         """
         try:
-            # Agrupar por estado (conteo y monto total por estado)
-            pipeline_by_state = [
-                {"$group": {"_id": "$estado", "count": {"$sum": 1}, "total_monto": {"$sum": {"$ifNull": ["$monto", 0]}}}},
-                {"$sort": {"count": -1}}
-            ]
-
-            by_state = list(self.solicitudes_collection.aggregate(pipeline_by_state))
+            if desde or hasta:
+                by_state, by_type, by_month, pendientes, monto_pendiente, procesadas = \
+                    await self._estadisticas_detalle_ventana(aprobador_email, desde, hasta)
+                aprobadas = procesadas.get("aprobada", {}).get("count", 0)
+                rechazadas = procesadas.get("rechazada", {}).get("count", 0)
+                monto_procesado = sum(item.get("monto", 0) for item in procesadas.values())
+            else:
+                # Contadores materializados: global (agrupaciones y pendientes) y del aprobador
+                stats = await self.solicitudes.stats.obtener_varios(["global", f"aprobador:{aprobador_email}"])
+                stats_global = stats["global"]
+                stats_aprobador = stats[f"aprobador:{aprobador_email}"]
 
-            # Agrupar por tipo de pago
-            pipeline_by_type = [
-                {"$group": {"_id": {"$ifNull": ["$tipo_pago", "Otros"]}, "count": {"$sum": 1}}},
-                {"$sort": {"count": -1}}
-            ]
-            by_type = list(self.solicitudes_collection.aggregate(pipeline_by_type))
-
-            # Agrupar por mes (usar fecha_aprobacion, fecha_rechazo o fecha_creacion)
-            pipeline_by_month = [
-                {"$project": {"fecha": {"$ifNull": ["$fecha_aprobacion", {"$ifNull": ["$fecha_rechazo", "$fecha_creacion"]}]}, "monto": {"$ifNull": ["$monto", 0]}}},
-                {"$match": {"fecha": {"$ne": None}}},
-                {"$group": {"_id": {"year": {"$year": "$fecha"}, "month": {"$month": "$fecha"}}, "count": {"$sum": 1}, "total_monto": {"$sum": "$monto"}}},
-                {"$sort": {"_id.year": 1, "_id.month": 1}}
-            ]
-            by_month = list(self.solicitudes_collection.aggregate(pipeline_by_month))
-
-            # Resumen numérico (reusar lógica existente)
-            pendientes = self.solicitudes_collection.count_documents({
-                "estado": {"$in": ["enviada", "en_revision"]}
-            })
-
-            aprobadas = self.solicitudes_collection.count_documents({
-                "aprobador_email": aprobador_email,
-                "estado": "aprobada"
-            })
+                # Agrupar por estado (conteo y monto total por estado)
+                by_state = agrupado(stats_global, "estado", con_monto=True)
 
-            rechazadas = self.solicitudes_collection.count_documents({
-                "aprobador_email": aprobador_email,
-                "estado": "rechazada"
-            })
+                # Agrupar por tipo de pago (sin tipo se reporta como "Otros")
+                conteo_tipos = {}
+                for item in agrupado(stats_global, "tipo_pago"):
+                    tipo = item["_id"] if item["_id"] is not None else "Otros"
+                    conteo_tipos[tipo] = conteo_tipos.get(tipo, 0) + item["count"]
+                by_type = sorted(
+                    ({"_id": tipo, "count": count} for tipo, count in conteo_tipos.items()),
+                    key=lambda item: item["count"], reverse=True
+                )
 
-            # Monto pendiente
-            pipeline_monto_pendiente = [
-                {"$match": {"estado": {"$in": ["enviada", "en_revision"]}}},
-                {"$group": {"_id": None, "total": {"$sum": {"$ifNull": ["$monto", 0]}}}}
-            ]
-            resultado_monto = list(self.solicitudes_collection.aggregate(pipeline_monto_pendiente))
-            monto_pendiente = resultado_monto[0]["total"] if resultado_monto else 0
+                # Agrupar por mes (fecha_aprobacion, fecha_rechazo o fecha_creacion)
+                by_month = por_mes(stats_global, "mes_decision", con_monto=True)
 
-            # Monto procesado por este aprobador
-            pipeline_monto_procesado = [
-                {"$match": {"aprobador_email": aprobador_email, "estado": {"$in": ["aprobada", "rechazada"]}}},
-                {"$group": {"_id": None, "total": {"$sum": {"$ifNull": ["$monto", 0]}}}}
-            ]
-            resultado_monto_proc = list(self.solicitudes_collection.aggregate(pipeline_monto_procesado))
-            monto_procesado = resultado_monto_proc[0]["total"] if resultado_monto_proc else 0
+                # Resumen numérico
+                pendientes = suma_estados(stats_global, ESTADOS_PENDIENTES)
+                aprobadas = suma_estados(stats_aprobador, ["aprobada"])
+                rechazadas = suma_estados(stats_aprobador, ["rechazada"])
+                monto_pendiente = suma_estados(stats_global, ESTADOS_PENDIENTES, "monto")
+                monto_procesado = suma_estados(stats_aprobador, ["aprobada", "rechazada"], "monto")
 
             summary = {
                 "pendientes": int(pendientes),
@@ -486,7 +425,48 @@ class AprobadorController:
                 detail=f"Error al obtener estadísticas detalladas: {str(e)}"
             )
     
-    def get_historial_aprobador(
+    async def _estadisticas_detalle_ventana(self, aprobador_email: str, desde, hasta):
+        """Agrupaciones y resumen de una ventana de fecha_creacion en una sola pasada ($facet)"""
+        monto = {"$ifNull": ["$monto", 0]}
+        resultado = await self.solicitudes.facet(
+            {"fecha_creacion": rango_fechas(desde, hasta)},
+            {
+                "by_state": [
+                    {"$group": {"_id": "$estado", "count": {"$sum": 1}, "total_monto": {"$sum": monto}}},
+                    {"$sort": {"count": -1}}
+                ],
+                "by_type": [
+                    {"$group": {"_id": {"$ifNull": ["$tipo_pago", "Otros"]}, "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1}}
+                ],
+                "by_month": [
+                    {"$project": {"fecha": {"$ifNull": ["$fecha_aprobacion", {"$ifNull": ["$fecha_rechazo", "$fecha_creacion"]}]}, "monto": monto}},
+                    {"$match": {"fecha": {"$ne": None}}},
+                    {"$group": {"_id": {"year": {"$year": "$fecha"}, "month": {"$month": "$fecha"}}, "count": {"$sum": 1}, "total_monto": {"$sum": "$monto"}}},
+                    {"$sort": {"_id.year": 1, "_id.month": 1}}
+                ],
+                "pendientes": [
+                    {"$match": {"estado": {"$in": list(ESTADOS_PENDIENTES)}}},
+                    {"$group": {"_id": None, "count": {"$sum": 1}, "monto": {"$sum": monto}}}
+                ],
+                "procesadas": [
+                    {"$match": {"aprobador_email": aprobador_email, "estado": {"$in": ["aprobada", "rechazada"]}}},
+                    {"$group": {"_id": "$estado", "count": {"$sum": 1}, "monto": {"$sum": monto}}}
+                ]
+            }
+        )
+        pendientes = resultado["pendientes"][0] if resultado["pendientes"] else {"count": 0, "monto": 0}
+        procesadas = {item["_id"]: item for item in resultado["procesadas"]}
+        return (
+            resultado["by_state"],
+            resultado["by_type"],
+            resultado["by_month"],
+            pendientes["count"],
+            pendientes["monto"],
+            procesadas
+        )
+
+    async def get_historial_aprobador(
         self,
         aprobador_email: str,
         filtro_estado: Optional[str] = None,
@@ -533,32 +513,24 @@ class AprobadorController:
             print(f"🔎 Query: {query}")
             
             # Buscar solicitudes ordenadas por fecha de aprobación (más recientes primero)
-            solicitudes = list(
-                self.solicitudes_collection
-                .find(query)
-                .sort("fecha_aprobacion", -1)
-                .limit(limite)
+            solicitudes = await self.solicitudes.find(
+                query,
+                sort=[("fecha_aprobacion", -1)],
+                limit=limite
             )
             
             print(f"📊 Solicitudes encontradas en historial: {len(solicitudes)}")
             
+            # Información de los solicitantes: una sola consulta para todo el historial
+            solicitantes = await self._cargar_solicitantes(solicitudes)
+            
             resultado = []
             
             for solicitud in solicitudes:
                 try:
                     print(f"   📄 Procesando solicitud ID: {solicitud.get('_id')}")
                     
-                    # Obtener información del solicitante
                     solicitante_email = solicitud.get("solicitante_email", "N/A")
-                    solicitante = None
-                    if solicitante_email != "N/A":
-                        solicitante = self.users_collection.find_one({"email": solicitante_email})
-                    
-                    # Construir nombre del solicitante
-                    if solicitante:
-                        nombre_completo = f"{solicitante.get('first_name', '')} {solicitante.get('last_name', '')}".strip() or "N/A"
-                    else:
-                        nombre_completo = "N/A"
                     
                     # Función auxiliar para convertir fechas a string
                     def fecha_a_string(fecha):
@@ -603,11 +575,9 @@ class AprobadorController:
                         "comprobantes_pago": solicitud.get("comprobantes_pago", []),
                         
                         # Información del solicitante
-                        "solicitante": {
-                            "email": solicitante_email,
-                            "nombre": nombre_completo,
-                            "department": solicitante.get("department", "N/A") if solicitante else "N/A"
-                        }
+                        "solicitante": self._info_solicitante(
+                            solicitante_email, solicitantes.get(solicitante_email)
+                        )
                     }
                     
                     resultado.append(solicitud_dict)
@@ -626,8 +596,3 @@ class AprobadorController:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al obtener historial: {str(e)}"
             )
-    
-    def __del__(self):
-        """Cerrar conexión al destruir el objeto"""
-        if hasattr(self, 'mongo_client'):
-            self.mongo_client.close()
@@ -1,15 +1,93 @@
+import asyncio
+import time
+
+import anyio
 from fastapi import Request
+from starlette.concurrency import run_in_threadpool
 from app.utils.llm_client import generate_answer
-from app.config.database import get_database
+from app.utils.chat_backends import ChatBackendError, get_backend
+from app.utils.chat_stream import ChatStreamLimiter, ChatStreamMetrics, sse_event
+from app.config.database import get_async_database
+from app.config.settings import settings
+from app.models.ticket_db import TicketDB
 from bson import ObjectId
 
 
 class ChatController:
+    def __init__(self, db=None):
+        self.tickets = TicketDB(db if db is not None else get_async_database())
+        self.backend = get_backend()
+        self.stream_limiter = ChatStreamLimiter(settings.CHAT_STREAM_MAX_PER_USER)
+        self.stream_metrics = ChatStreamMetrics()
+
     async def handle_message(self, message: str, user: dict | None = None):
-        # Use the mock LLM client for now
-        resp = generate_answer(message, user)
+        # Use the mock LLM client for now; doc search may rescan or rebuild the
+        # knowledge index, so keep it off the event loop (same as MockBackend)
+        resp = await run_in_threadpool(generate_answer, message, user)
         return resp
 
+    async def stream_message(self, message: str, user: dict | None, slot):
+        """
+        Server-sent events for one answer: `meta` (resolved/source), one `token`
+        per text delta, then `done` with the timings, or `error`.
+        The first token must arrive within CHAT_STREAM_FIRST_TOKEN_TIMEOUT_SECONDS
+        and the whole answer within CHAT_STREAM_TIMEOUT_SECONDS. If the client
+        disconnects, the generator is cancelled and the backend stream closed.
+        `slot` (from stream_limiter) is released when the stream ends.
+        """
+        metrics = self.stream_metrics
+        metrics.started += 1
+        started = time.perf_counter()
+        first_token_deadline = started + settings.CHAT_STREAM_FIRST_TOKEN_TIMEOUT_SECONDS
+        deadline = started + settings.CHAT_STREAM_TIMEOUT_SECONDS
+        first_token_at = None
+        count = 0
+        tokens = None
+        try:
+            reply = await asyncio.wait_for(self.backend.reply(message, user),
+                                           min(first_token_deadline, deadline) - started)
+            yield sse_event('meta', {**reply.meta, 'backend': self.backend.name})
+            tokens = reply.tokens
+            while True:
+                limit = deadline if first_token_at is not None else min(first_token_deadline, deadline)
+                timeout = limit - time.perf_counter()
+                if timeout <= 0:
+                    raise asyncio.TimeoutError
+                try:
+                    token = await asyncio.wait_for(anext(tokens), timeout)
+                except StopAsyncIteration:
+                    break
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    metrics.record_first_token(first_token_at - started)
+                count += 1
+                yield sse_event('token', {'text': token})
+
+            generation = (time.perf_counter() - first_token_at) if first_token_at else 0.0
+            metrics.record_generation(count, generation)
+            metrics.completed += 1
+            yield sse_event('done', {
+                'tokens': count,
+                'ttft_ms': round((first_token_at - started) * 1000, 2) if first_token_at else None,
+                'tokens_per_second': round(count / generation, 2) if generation > 0 else None,
+            })
+        except asyncio.TimeoutError:
+            metrics.timed_out += 1
+            yield sse_event('error', {'detail': 'El asistente tardó demasiado en responder.', 'timeout': True})
+        except ChatBackendError as e:
+            metrics.errors += 1
+            print(f"⚠️ Error del backend de chat ({self.backend.name}): {e}")
+            yield sse_event('error', {'detail': 'El asistente no está disponible en este momento.'})
+        except (asyncio.CancelledError, GeneratorExit):
+            # client went away: stop generating
+            metrics.cancelled += 1
+            raise
+        finally:
+            if tokens is not None:
+                with anyio.CancelScope(shield=True):
+                    await tokens.aclose()
+            slot.release()
+
     async def adapt_snippet(self, snippet: str, user: dict | None = None):
         # very simple adapt: prepend contextual sentence
         name = None
@@ -21,16 +99,13 @@ class ChatController:
 
     async def escalate(self, original_message: str, user: dict | None = None):
         # Create a ticket in MongoDB 'tickets' collection
-        db = get_database()
-        tickets = db.tickets
         ticket = {
             'message': original_message,
             'user': user or {},
             'status': 'open',
             'created_at': __import__('datetime').datetime.utcnow()
         }
-        res = tickets.insert_one(ticket)
-        ticket_id = str(res.inserted_id)
+        ticket_id = await self.tickets.create_ticket(ticket)
         admin_email = 'admin@institucion.edu.mx'
         return {'ticket_id': ticket_id, 'admin_email': admin_email}
 
@@ -2,30 +2,32 @@
 Controller para las operaciones del rol Pagador
 """
 from datetime import datetime, timedelta
-from bson import ObjectId
-from pymongo import MongoClient
-import os
 from typing import Optional, List
 
+from app.config.database import get_async_database
+from app.models.solicitud_db import SolicitudDB
+from app.models.user_db import UserDB
+from app.models.solicitud_stats_db import contador, suma_estados
 from app.models.solicitud import SolicitudPago
 
 
 class PagadorController:
-    def __init__(self, database_name: str = None):
+    def __init__(self, database_name: str = None, db=None):
         """
         Inicializar controlador del Pagador
         """
-        mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
-        self.client = MongoClient(mongo_uri)
+        # Base de datos del cliente compartido (registro en app.config.database)
+        db = db if db is not None else get_async_database()
         
-        # Usar el nombre de base de datos proporcionado o el de la variable de entorno
-        db_name = database_name or os.getenv("DATABASE_NAME", "sistema_solicitudes_pagos")
-        self.db = self.client[db_name]
+        # Usar el nombre de base de datos proporcionado o el de la configuración
+        if database_name:
+            db = db.client[database_name]
         
-        self.solicitudes_collection = self.db["solicitudes_estandar"]
-        self.users_collection = self.db["users"]
+        # Repositorios asíncronos sobre el cliente Motor compartido
+        self.solicitudes = SolicitudDB(db)
+        self.users = UserDB(db)
     
-    def get_solicitudes_aprobadas(
+    async def get_solicitudes_aprobadas(
         self,
         pagador_email: str,
         filtro_departamento: Optional[str] = None,
@@ -61,8 +63,7 @@ class PagadorController:
             print(f"🔎 Query MongoDB: {query}")
             
             # Buscar solicitudes
-            solicitudes_cursor = self.solicitudes_collection.find(query).sort("fecha_aprobacion", -1)
-            solicitudes = list(solicitudes_cursor)
+            solicitudes = await self.solicitudes.find(query, sort=[("fecha_aprobacion", -1)])
             
             print(f"📊 Total solicitudes encontradas: {len(solicitudes)}")
             
@@ -165,7 +166,7 @@ class PagadorController:
         
         return fecha_actual
     
-    def marcar_como_pagada(self, pago: SolicitudPago) -> dict:
+    async def marcar_como_pagada(self, pago: SolicitudPago) -> dict:
         """
         Marcar una solicitud como pagada
         
@@ -181,9 +182,7 @@ class PagadorController:
         
         try:
             # Validar que existe la solicitud
-            solicitud = self.solicitudes_collection.find_one({
-                "_id": ObjectId(pago.solicitud_id)
-            })
+            solicitud = await self.solicitudes.find_by_id(pago.solicitud_id)
             
             if not solicitud:
                 print(f"❌ Solicitud no encontrada")
@@ -218,21 +217,16 @@ class PagadorController:
             print(f"📝 Datos a actualizar: {update_data}")
             
             # Actualizar en MongoDB
-            result = self.solicitudes_collection.update_one(
-                {"_id": ObjectId(pago.solicitud_id)},
-                {"$set": update_data}
-            )
+            modificadas = await self.solicitudes.update_fields(pago.solicitud_id, update_data)
             
-            if result.modified_count == 0:
+            if modificadas == 0:
                 print(f"⚠️ No se modificó ningún documento")
                 raise ValueError("No se pudo actualizar la solicitud")
             
             print(f"✅ Solicitud marcada como pagada exitosamente")
             
             # Obtener solicitud actualizada
-            solicitud_actualizada = self.solicitudes_collection.find_one({
-                "_id": ObjectId(pago.solicitud_id)
-            })
+            solicitud_actualizada = await self.solicitudes.find_by_id(pago.solicitud_id)
             
             # Convertir fechas a string para JSON
             if solicitud_actualizada:
@@ -260,7 +254,7 @@ class PagadorController:
             traceback.print_exc()
             raise
     
-    def subir_comprobantes_pago(
+    async def subir_comprobantes_pago(
         self,
         solicitud_id: str,
         comprobantes: List[dict],
@@ -284,9 +278,7 @@ class PagadorController:
         
         try:
             # Validar que existe la solicitud
-            solicitud = self.solicitudes_collection.find_one({
-                "_id": ObjectId(solicitud_id)
-            })
+            solicitud = await self.solicitudes.find_by_id(solicitud_id)
             
             if not solicitud:
                 raise ValueError("Solicitud no encontrada")
@@ -296,21 +288,18 @@ class PagadorController:
                 raise ValueError("La solicitud debe estar marcada como pagada para subir comprobantes")
             
             # Agregar comprobantes al array existente
-            comprobantes_actuales = solicitud.get("comprobantes_pago", [])
+            comprobantes_actuales = solicitud.get("comprobantes_pago") or []
             comprobantes_actuales.extend(comprobantes)
             
-            # Actualizar en MongoDB
-            result = self.solicitudes_collection.update_one(
-                {"_id": ObjectId(solicitud_id)},
-                {
-                    "$set": {
-                        "comprobantes_pago": comprobantes_actuales,
-                        "updated_at": datetime.now()
-                    }
-                }
+            # Actualizar en MongoDB ($push atómico en lugar de reescribir el arreglo)
+            modificadas = await self.solicitudes.push_archivos(
+                solicitud_id,
+                "comprobantes_pago",
+                comprobantes,
+                {"updated_at": datetime.now()}
             )
             
-            if result.modified_count == 0:
+            if modificadas == 0:
                 raise ValueError("No se pudo actualizar los comprobantes")
             
             print(f"✅ {len(comprobantes)} comprobantes subidos exitosamente")
@@ -327,7 +316,7 @@ class PagadorController:
             traceback.print_exc()
             raise
     
-    def get_estadisticas_pagador(self, pagador_email: str) -> dict:
+    async def get_estadisticas_pagador(self, pagador_email: str) -> dict:
         """
         Obtener estadísticas para el dashboard del pagador
         
@@ -338,53 +327,27 @@ class PagadorController:
             Diccionario con estadísticas
         """
         try:
-            # Solicitudes aprobadas (pendientes de pago)
-            aprobadas = self.solicitudes_collection.count_documents({"estado": "aprobada"})
+            # Contadores materializados globales (un solo documento)
+            stats = await self.solicitudes.stats.obtener("global")
             
-            # Solicitudes pagadas
-            pagadas = self.solicitudes_collection.count_documents({"estado": "pagada"})
+            # Solicitudes aprobadas (pendientes de pago) y pagadas
+            aprobadas = suma_estados(stats, ["aprobada"])
+            pagadas = suma_estados(stats, ["pagada"])
             
-            # Solicitudes pagadas este mes
-            primer_dia_mes = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            pagadas_mes = self.solicitudes_collection.count_documents({
-                "estado": "pagada",
-                "fecha_pago": {"$gte": primer_dia_mes}
-            })
-            
-            # Monto total pagado este mes
-            pipeline = [
-                {
-                    "$match": {
-                        "estado": "pagada",
-                        "fecha_pago": {"$gte": primer_dia_mes}
-                    }
-                },
-                {
-                    "$group": {
-                        "_id": None,
-                        "total": {"$sum": "$monto_total"}
-                    }
-                }
-            ]
+            # Solicitudes pagadas este mes y su monto
+            mes_actual = datetime.now().strftime("%Y-%m")
+            pagadas_mes = contador(stats, "mes_pago", mes_actual)
+            monto_pagado_mes = contador(stats, "mes_pago", mes_actual, "monto")
             
-            result = list(self.solicitudes_collection.aggregate(pipeline))
-            monto_pagado_mes = result[0]["total"] if result else 0
-            
-            # Solicitudes con comprobantes pendientes
-            comprobantes_pendientes = self.solicitudes_collection.count_documents({
-                "estado": "pagada",
-                "$or": [
-                    {"comprobantes_pago": {"$exists": False}},
-                    {"comprobantes_pago": {"$size": 0}}
-                ]
-            })
+            # Solicitudes pagadas sin comprobantes
+            comprobantes_pendientes = stats.get("comprobantes_pendientes", 0)
             
             estadisticas = {
-                "pendientes_pago": aprobadas,
-                "pagadas_total": pagadas,
-                "pagadas_mes": pagadas_mes,
-                "monto_pagado_mes": float(monto_pagado_mes),
-                "comprobantes_pendientes": comprobantes_pendientes
+                "pendientes_pago": int(aprobadas),
+                "pagadas_total": int(pagadas),
+                "pagadas_mes": int(pagadas_mes),
+                "monto_pagado_mes": round(float(monto_pagado_mes), 2),
+                "comprobantes_pendientes": int(comprobantes_pendientes)
             }
             
             print(f"📊 Estadísticas pagador: {estadisticas}")
@@ -395,7 +358,7 @@ class PagadorController:
             print(f"❌ ERROR en get_estadisticas_pagador: {str(e)}")
             raise
     
-    def get_historial_pagador(
+    async def get_historial_pagador(
         self,
         pagador_email: str,
         filtro_estado: Optional[str] = None,
@@ -437,8 +400,7 @@ class PagadorController:
             print(f"🔎 Query: {query}")
             
             # Obtener solicitudes ordenadas por fecha de pago (más reciente primero)
-            cursor = self.solicitudes_collection.find(query).sort("fecha_pago", -1)
-            solicitudes = list(cursor)
+            solicitudes = await self.solicitudes.find(query, sort=[("fecha_pago", -1)])
             
             print(f"📊 Total de solicitudes en historial: {len(solicitudes)}")
             
@@ -473,7 +435,7 @@ class PagadorController:
             print(f"❌ ERROR en get_historial_pagador: {str(e)}")
             raise
     
-    def get_solicitudes_pendientes_comprobante(
+    async def get_solicitudes_pendientes_comprobante(
         self,
         pagador_email: str,
         filtro_departamento: Optional[str] = None,
@@ -518,8 +480,7 @@ class PagadorController:
             print(f"🔎 Query: {query}")
             
             # Obtener solicitudes ordenadas por fecha de pago
-            cursor = self.solicitudes_collection.find(query).sort("fecha_pago", -1)
-            solicitudes = list(cursor)
+            solicitudes = await self.solicitudes.find(query, sort=[("fecha_pago", -1)])
             
             print(f"📊 Total de solicitudes pendientes de comprobante: {len(solicitudes)}")
             
@@ -562,7 +523,7 @@ class PagadorController:
             print(f"❌ ERROR en get_solicitudes_pendientes_comprobante: {str(e)}")
             raise
     
-    def get_solicitudes_con_comprobantes(
+    async def get_solicitudes_con_comprobantes(
         self,
         pagador_email: str,
         filtro_departamento: Optional[str] = None,
@@ -603,8 +564,7 @@ class PagadorController:
             print(f"🔎 Query: {query}")
             
             # Obtener solicitudes ordenadas por fecha de subida de comprobante
-            cursor = self.solicitudes_collection.find(query).sort("fecha_pago", -1)
-            solicitudes = list(cursor)
+            solicitudes = await self.solicitudes.find(query, sort=[("fecha_pago", -1)])
             
             print(f"📊 Total de solicitudes con comprobantes: {len(solicitudes)}")
             
@@ -1,57 +1,65 @@
 from typing import List, Optional
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status
-from pymongo.collection import Collection
-from pymongo import ASCENDING, DESCENDING
 from bson import ObjectId
-import bcrypt
 from jose import JWTError, jwt
 
 from app.models.user import (
     UserCreate, UserUpdate, UserResponse, UserInDB, 
     UserLogin, Token, UserListResponse, UserRole, UserStatus
 )
-from app.config.database import get_database
+from app.config.database import get_async_database
 from app.config.settings import settings
+from app.models.user_db import UserDB
+from app.utils.pagination import decode_cursor, keyset_filter, combine_filters, next_cursor
+from app.utils.user_cache import UserPrincipalCache
+from app.utils.password_hasher import PasswordHasher, PasswordHasherBusy
+from app.utils.analytics_results import analytics_results
 
 class UserController:
-    def __init__(self):
-        self.db = get_database()
-        self.collection: Collection = self.db.users
-        
-        # Crear índices
-        self.collection.create_index([("email", ASCENDING)], unique=True)
-        self.collection.create_index([("created_at", DESCENDING)])
-
-    # Utilidades de contraseña
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verificar contraseña usando bcrypt directamente"""
+    def __init__(self, db=None):
+        # Repositorio asíncrono (Motor): ninguna consulta bloquea el event loop
+        self.users = UserDB(db if db is not None else get_async_database())
+        # Usuario autenticado por token: evita ir a MongoDB en cada petición protegida
+        self.principal_cache = UserPrincipalCache(
+            max_size=settings.USER_CACHE_MAX_SIZE,
+            ttl_seconds=settings.USER_CACHE_TTL_SECONDS
+        )
+        self.password_hasher = PasswordHasher(
+            workers=settings.PASSWORD_HASH_WORKERS,
+            max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+            rounds=settings.BCRYPT_ROUNDS
+        )
+
+    async def ensure_indexes(self):
+        """Crear índices de la colección de usuarios"""
+        await self.users.ensure_indexes()
+
+    # Utilidades de contraseña (bcrypt corre en el pool acotado, nunca en el event loop)
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """Verificar contraseña con bcrypt"""
         try:
-            # Asegurar que la contraseña esté en el formato correcto
-            password_bytes = plain_password.encode('utf-8')
-            hash_bytes = hashed_password.encode('utf-8')
-            
-            # Verificar con bcrypt
-            return bcrypt.checkpw(password_bytes, hash_bytes)
-        except Exception as e:
-            print(f"Error verificando contraseña: {e}")
-            return False
+            return await self.password_hasher.verify(plain_password, hashed_password)
+        except PasswordHasherBusy:
+            raise self._password_hasher_busy()
 
-    def get_password_hash(self, password: str) -> str:
-        """Crear hash de contraseña usando bcrypt directamente"""
+    async def get_password_hash(self, password: str) -> str:
+        """Crear hash de contraseña con bcrypt (costo BCRYPT_ROUNDS)"""
         try:
-            # Validar longitud de contraseña
-            if len(password) > 72:
-                password = password[:72]
-            
-            # Crear hash
-            password_bytes = password.encode('utf-8')
-            salt = bcrypt.gensalt()
-            hashed = bcrypt.hashpw(password_bytes, salt)
-            return hashed.decode('utf-8')
+            return await self.password_hasher.hash(password)
+        except PasswordHasherBusy:
+            raise self._password_hasher_busy()
         except Exception as e:
             raise ValueError(f"Error al hashear contraseña: {e}")
 
+    @staticmethod
+    def _password_hasher_busy() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado procesando contraseñas, intenta de nuevo en unos segundos",
+            headers={"Retry-After": "1"}
+        )
+
     # Utilidades JWT
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None):
         """Crear token de acceso"""
@@ -65,23 +73,45 @@ class UserController:
         encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
         return encoded_jwt
 
-    def verify_token(self, token: str) -> Optional[str]:
-        """Verificar token JWT y devolver email"""
+    def decode_token(self, token: str) -> Optional[dict]:
+        """Verificar token JWT y devolver su payload (None si es inválido o no tiene sub)"""
         try:
             payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-            email: str = payload.get("sub")
-            if email is None:
+            if payload.get("sub") is None:
                 return None
-            return email
+            return payload
         except JWTError:
             return None
 
+    def verify_token(self, token: str) -> Optional[str]:
+        """Verificar token JWT y devolver email"""
+        payload = self.decode_token(token)
+        return payload["sub"] if payload else None
+
+    async def get_user_principal(self, payload: dict) -> Optional[UserResponse]:
+        """
+        Usuario autenticado para un token ya verificado. Se resuelve desde la
+        caché (clave sub + exp) y sólo va a MongoDB en un fallo de caché.
+        """
+        email, exp = payload["sub"], payload.get("exp")
+        user = self.principal_cache.get(email, exp)
+        if user is not None:
+            return user
+
+        user_in_db = await self.get_user_by_email(email)
+        if user_in_db is None:
+            return None
+        # Sin hashed_password: la caché sólo guarda los datos públicos del usuario
+        user = UserResponse(**user_in_db.dict(exclude={"hashed_password"}))
+        self.principal_cache.set(email, exp, user)
+        return user
+
     # CRUD Operations
     async def create_user(self, user_data: UserCreate) -> UserResponse:
         """Crear un nuevo usuario"""
         try:
             # Verificar si el email ya existe
-            existing_user = self.collection.find_one({"email": user_data.email})
+            existing_user = await self.users.find_user_by_email(user_data.email)
             if existing_user:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -89,7 +119,7 @@ class UserController:
                 )
 
             # Crear hash de la contraseña
-            hashed_password = self.get_password_hash(user_data.password)
+            hashed_password = await self.get_password_hash(user_data.password)
             
             # Preparar datos del usuario
             user_dict = user_data.dict(exclude={"password"})
@@ -101,10 +131,10 @@ class UserController:
             })
 
             # Insertar en base de datos
-            result = self.collection.insert_one(user_dict)
+            user_id = await self.users.create_user(user_dict)
             
             # Obtener el usuario creado
-            created_user = self.collection.find_one({"_id": result.inserted_id})
+            created_user = await self.users.find_user_by_id(user_id)
             return UserResponse(**created_user)
 
         except Exception as e:
@@ -124,7 +154,7 @@ class UserController:
                     detail="ID de usuario inválido"
                 )
 
-            user = self.collection.find_one({"_id": ObjectId(user_id)})
+            user = await self.users.find_user_by_id(user_id)
             if not user:
                 return None
             
@@ -141,7 +171,7 @@ class UserController:
     async def get_user_by_email(self, email: str) -> Optional[UserInDB]:
         """Obtener usuario por email (incluye contraseña para autenticación)"""
         try:
-            user = self.collection.find_one({"email": email})
+            user = await self.users.find_user_by_email(email)
             if not user:
                 return None
             
@@ -159,9 +189,17 @@ class UserController:
         limit: int = 10, 
         search: Optional[str] = None,
         role: Optional[UserRole] = None,
-        status: Optional[UserStatus] = None
+        status: Optional[UserStatus] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = True
     ) -> UserListResponse:
-        """Obtener lista de usuarios con paginación y filtros"""
+        """
+        Obtener lista de usuarios con paginación y filtros.
+
+        Con `cursor` se pagina por keyset sobre (created_at, _id) y `page` se
+        ignora. Con include_total=False se omite el count_documents (sin
+        filtros se devuelve el total estimado de la colección).
+        """
         try:
             # Construir filtros
             filter_query = {}
@@ -180,30 +218,50 @@ class UserController:
             if status:
                 filter_query["status"] = status
 
-            # Calcular skip
+            # Calcular skip (o filtro de keyset si llega un cursor)
             skip = (page - 1) * limit
+            query = filter_query
+            if cursor:
+                try:
+                    value, last_id = decode_cursor(cursor)
+                except ValueError as e:
+                    # `status` es el filtro de estado en esta función, no el módulo
+                    raise HTTPException(status_code=400, detail=str(e))
+                query = combine_filters(filter_query, keyset_filter("created_at", value, last_id))
+                skip = 0
 
             # Obtener total de documentos
-            total = self.collection.count_documents(filter_query)
+            total_estimated = False
+            if include_total:
+                total = await self.users.count(filter_query)
+            elif not filter_query:
+                total = await self.users.estimated_count()
+                total_estimated = True
+            else:
+                total = None
 
             # Obtener usuarios
-            cursor = self.collection.find(filter_query).sort("created_at", DESCENDING).skip(skip).limit(limit)
-            users = [UserResponse(**user) for user in cursor]
+            docs = await self.users.list_users(query, skip=skip, limit=limit)
+            users = [UserResponse(**user) for user in docs]
 
             # Calcular total de páginas
-            total_pages = (total + limit - 1) // limit
+            total_pages = (total + limit - 1) // limit if total is not None else None
 
             return UserListResponse(
                 users=users,
                 total=total,
                 page=page,
                 limit=limit,
-                total_pages=total_pages
+                total_pages=total_pages,
+                total_estimated=total_estimated,
+                next_cursor=next_cursor(docs, "created_at", limit)
             )
 
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                status_code=500,
                 detail=f"Error al obtener usuarios: {str(e)}"
             )
 
@@ -220,7 +278,7 @@ class UserController:
             update_data = {}
             for field, value in user_data.dict(exclude_unset=True).items():
                 if field == "password" and value:
-                    update_data["hashed_password"] = self.get_password_hash(value)
+                    update_data["hashed_password"] = await self.get_password_hash(value)
                 elif value is not None:
                     update_data[field] = value
 
@@ -234,27 +292,22 @@ class UserController:
 
             # Verificar si el email ya existe (si se está actualizando)
             if "email" in update_data:
-                existing_user = self.collection.find_one({
-                    "email": update_data["email"],
-                    "_id": {"$ne": ObjectId(user_id)}
-                })
-                if existing_user:
+                if await self.users.email_in_use(update_data["email"], exclude_id=user_id):
                     raise HTTPException(
                         status_code=status.HTTP_400_BAD_REQUEST,
                         detail="El email ya está registrado por otro usuario"
                     )
 
             # Actualizar usuario
-            result = self.collection.update_one(
-                {"_id": ObjectId(user_id)},
-                {"$set": update_data}
-            )
+            matched = await self.users.update_user(user_id, update_data)
+            # Estado, rol o email pueden haber cambiado: descartar el usuario en caché
+            self.principal_cache.invalidate_user(user_id)
 
-            if result.matched_count == 0:
+            if matched == 0:
                 return None
 
             # Obtener usuario actualizado
-            updated_user = self.collection.find_one({"_id": ObjectId(user_id)})
+            updated_user = await self.users.find_user_by_id(user_id)
             return UserResponse(**updated_user)
 
         except Exception as e:
@@ -274,10 +327,13 @@ class UserController:
                     detail="ID de usuario inválido"
                 )
 
-            result = self.collection.delete_one({"_id": ObjectId(user_id)})
-            return result.deleted_count > 0
+            deleted = await self.users.delete_user(user_id)
+            self.principal_cache.invalidate_user(user_id)
+            return deleted > 0
 
         except Exception as e:
+            if isinstance(e, HTTPException):
+                raise e
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al eliminar usuario: {str(e)}"
@@ -290,17 +346,24 @@ class UserController:
             if not user:
                 return None
             
-            if not self.verify_password(password, user.hashed_password):
+            if not await self.verify_password(password, user.hashed_password):
                 return None
             
+            # Si cambió BCRYPT_ROUNDS, regenerar el hash ahora que tenemos la contraseña en claro
+            if self.password_hasher.needs_rehash(user.hashed_password):
+                try:
+                    nuevo_hash = await self.password_hasher.hash(password)
+                    await self.users.update_user(user.id, {"hashed_password": nuevo_hash})
+                except PasswordHasherBusy:
+                    pass  # Se reintentará en el próximo login
+            
             # Actualizar último login
-            self.collection.update_one(
-                {"_id": user.id},
-                {"$set": {"last_login": datetime.utcnow()}}
-            )
+            await self.users.touch_last_login(user.id, datetime.utcnow())
             
             return user
 
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -347,7 +410,7 @@ class UserController:
         """Renovar token para un usuario existente"""
         try:
             # Buscar usuario
-            user = self.collection.find_one({"email": email})
+            user = await self.users.find_user_by_email(email)
             if not user:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -387,12 +450,18 @@ class UserController:
     async def get_role_distribution(self):
         """Distribución de usuarios por rol"""
         try:
+            # Resultado precalculado por Spark, si hay una exportación reciente
+            precomputed = await analytics_results.fetch("role_distribution")
+            if precomputed is not None:
+                rows = sorted(precomputed, key=lambda r: r["count"], reverse=True)
+                return [{"role": r.get('role') or 'unknown', "count": r["count"]} for r in rows]
+
             pipeline = [
                 {"$group": {"_id": "$role", "count": {"$sum": 1}}},
                 {"$project": {"role": "$_id", "count": 1, "_id": 0}},
                 {"$sort": {"count": -1}}
             ]
-            result = list(self.collection.aggregate(pipeline))
+            result = await self.users.aggregate(pipeline)
             return [{"role": r.get('role') or 'unknown', "count": r.get('count', 0)} for r in result]
         except Exception as e:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -408,6 +477,16 @@ class UserController:
             else:
                 fmt = "%Y-%m"
 
+            # Sin rango de fechas: se agrupan las altas por día precalculadas por Spark
+            precomputed = await analytics_results.fetch("daily_registrations") if not (start or end) else None
+            if precomputed is not None:
+                counts = {}
+                for r in precomputed:
+                    key = r["date"].strftime(fmt)
+                    counts[key] = counts.get(key, 0) + r["count"]
+                labels = sorted(counts)
+                return {"labels": labels, "data": [counts[k] for k in labels]}
+
             match = {}
             if start or end:
                 match['created_at'] = {}
@@ -426,7 +505,7 @@ class UserController:
                 {"$sort": {"_id": 1}}
             ])
 
-            result = list(self.collection.aggregate(pipeline))
+            result = await self.users.aggregate(pipeline)
             # Convertir a etiquetas y datos
             labels = [r['_id'] for r in result]
             data = [r['count'] for r in result]
@@ -448,7 +527,7 @@ class UserController:
                 {"$addFields": {"daysSince": {"$floor": {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$last_login", epoch]}]}, 1000*60*60*24]}}}},
                 {"$bucket": {"groupBy": "$daysSince", "boundaries": [0,7,30,90,100000], "default": ">=", "output": {"count": {"$sum": 1}}}}
             ]
-            agg = list(self.collection.aggregate(pipeline))
+            agg = await self.users.aggregate(pipeline)
             # Map results to known labels
             mapping = {0: 0, 7: 0, 30: 0, 90: 0, '>=': 0}
             for item in agg:
@@ -481,13 +560,21 @@ class UserController:
     async def get_departments_top(self, top: int = 10):
         """Top N departamentos por número de usuarios"""
         try:
+            precomputed = await analytics_results.fetch("department_distribution")
+            if precomputed is not None:
+                rows = sorted(precomputed, key=lambda r: r["count"], reverse=True)[:top]
+                return {
+                    "labels": [r.get('department') or 'Sin departamento' for r in rows],
+                    "data": [r["count"] for r in rows]
+                }
+
             pipeline = [
                 {"$group": {"_id": "$department", "count": {"$sum": 1}}},
                 {"$sort": {"count": -1}},
                 {"$limit": top},
                 {"$project": {"department": "$_id", "count": 1, "_id": 0}}
             ]
-            res = list(self.collection.aggregate(pipeline))
+            res = await self.users.aggregate(pipeline)
             labels = [r.get('department') or 'Sin departamento' for r in res]
             data = [r.get('count',0) for r in res]
             return {"labels": labels, "data": data}
@@ -27,15 +27,15 @@ async def get_current_user(
     Raises:
         HTTPException: Si el token es inválido o el usuario no existe
     """
-    email = user_controller.verify_token(credentials.credentials)
-    if email is None:
+    payload = user_controller.decode_token(credentials.credentials)
+    if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido o expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = await user_controller.get_user_by_email(email)
+    user = await user_controller.get_user_principal(payload)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -77,11 +77,11 @@ async def get_optional_current_user(request: Request) -> dict | None:
         return None
 
     # If credentials present, verify token
-    email = user_controller.verify_token(credentials.credentials)
-    if email is None:
+    payload = user_controller.decode_token(credentials.credentials)
+    if payload is None:
         return None
 
-    user = await user_controller.get_user_by_email(email)
+    user = await user_controller.get_user_principal(payload)
     if user is None:
         return None
 
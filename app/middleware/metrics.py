@@ -0,0 +1,229 @@
+"""
+Middleware de métricas por ruta y exposición en formato de texto de Prometheus.
+
+Es un middleware ASGI puro (sin BaseHTTPMiddleware) para que el costo por
+petición sea de unos microsegundos: dos lecturas del reloj, una ContextVar y
+unos contadores. Todo se actualiza desde el event loop, por lo que el registro
+no necesita lock; cada worker de uvicorn expone sólo sus propias métricas.
+"""
+from bisect import bisect_left
+import time
+
+from app.config.database import command_monitor, get_pool_stats, request_mongo_commands
+
+# Límites (le) de los histogramas
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Etiqueta de las peticiones que no coinciden con ninguna ruta (404): usar la
+# URL cruda permitiría que cualquier cliente creara series sin límite
+UNMATCHED_ROUTE = "unmatched"
+# Igual con los métodos: los no estándar se agrupan en "other"
+KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+
+class Histogram:
+    """Histograma acumulativo con límites fijos (semántica le de Prometheus)"""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RouteSeries:
+    """Métricas de un par (método, plantilla de ruta)"""
+
+    __slots__ = ("statuses", "latency", "size", "mongo", "mongo_commands")
+
+    def __init__(self):
+        self.statuses = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.mongo = Histogram(MONGO_BUCKETS)
+        self.mongo_commands = 0
+
+
+class HTTPMetrics:
+    """Registro de métricas HTTP del proceso"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.series = {}
+        self.in_flight = {}
+        self.started_at = time.time()
+
+    def observe(self, method: str, route: str, status: int, seconds: float,
+                size: int, mongo: list | None):
+        serie = self.series.get((method, route))
+        if serie is None:
+            serie = self.series[(method, route)] = RouteSeries()
+        serie.statuses[status] = serie.statuses.get(status, 0) + 1
+        serie.latency.observe(seconds)
+        serie.size.observe(size)
+        if mongo:
+            serie.mongo.observe(sum(mongo))
+            serie.mongo_commands += len(mongo)
+        else:
+            serie.mongo.observe(0.0)
+
+    def render(self) -> str:
+        """Todas las métricas (HTTP, comandos y pool de MongoDB) en formato de texto 0.0.4"""
+        lineas = []
+        series = sorted(self.series.items())
+
+        _header(lineas, "http_requests_total", "counter", "Peticiones HTTP atendidas por ruta y código de estado.")
+        for (method, route), serie in series:
+            for status, total in sorted(serie.statuses.items()):
+                lineas.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {total}")
+
+        _header(lineas, "http_request_duration_seconds", "histogram", "Latencia de las peticiones HTTP.")
+        for (method, route), serie in series:
+            _histogram(lineas, "http_request_duration_seconds", serie.latency, method=method, route=route)
+
+        _header(lineas, "http_response_size_bytes", "histogram", "Tamaño del cuerpo de las respuestas HTTP.")
+        for (method, route), serie in series:
+            _histogram(lineas, "http_response_size_bytes", serie.size, method=method, route=route)
+
+        _header(lineas, "http_request_mongo_seconds", "histogram",
+                "Tiempo en comandos de MongoDB por petición HTTP (suma de las duraciones de sus comandos).")
+        for (method, route), serie in series:
+            _histogram(lineas, "http_request_mongo_seconds", serie.mongo, method=method, route=route)
+
+        _header(lineas, "http_request_mongo_commands_total", "counter", "Comandos de MongoDB emitidos por las peticiones HTTP.")
+        for (method, route), serie in series:
+            lineas.append(f"http_request_mongo_commands_total{_labels(method=method, route=route)} {serie.mongo_commands}")
+
+        _header(lineas, "http_requests_in_progress", "gauge", "Peticiones HTTP en curso.")
+        for method, total in sorted(self.in_flight.items()):
+            lineas.append(f"http_requests_in_progress{_labels(method=method)} {total}")
+
+        comandos = sorted(command_monitor.stats().items())
+        _header(lineas, "mongo_commands_total", "counter", "Comandos de MongoDB completados.")
+        for nombre, datos in comandos:
+            lineas.append(f"mongo_commands_total{_labels(command=nombre)} {datos['total']}")
+        _header(lineas, "mongo_command_failures_total", "counter", "Comandos de MongoDB que terminaron en error.")
+        for nombre, datos in comandos:
+            lineas.append(f"mongo_command_failures_total{_labels(command=nombre)} {datos['failed']}")
+        _header(lineas, "mongo_command_duration_seconds_total", "counter", "Tiempo acumulado en comandos de MongoDB.")
+        for nombre, datos in comandos:
+            lineas.append(f"mongo_command_duration_seconds_total{_labels(command=nombre)} {_number(datos['seconds'])}")
+
+        pool = get_pool_stats()
+        for nombre, tipo, ayuda, valor in (
+            ("mongo_pool_connections", "gauge", "Conexiones abiertas del pool de MongoDB.", pool["open_connections"]),
+            ("mongo_pool_connections_in_use", "gauge", "Conexiones del pool en uso.", pool["checked_out"]),
+            ("mongo_pool_max_size", "gauge", "Tamaño máximo del pool.", pool["max_pool_size"]),
+            ("mongo_pool_checkouts_total", "counter", "Conexiones obtenidas del pool.", pool["checkouts"]),
+            ("mongo_pool_checkout_failures_total", "counter", "Esperas de conexión que fallaron.", pool["checkout_failures"]),
+            ("mongo_pool_wait_seconds_max", "gauge", "Espera máxima para obtener una conexión.", pool["wait_time_max_ms"] / 1000),
+        ):
+            _header(lineas, nombre, tipo, ayuda)
+            lineas.append(f"{nombre} {_number(valor)}")
+
+        _header(lineas, "http_metrics_start_time_seconds", "gauge", "Inicio del registro de métricas (epoch).")
+        lineas.append(f"http_metrics_start_time_seconds {_number(self.started_at)}")
+        return "\n".join(lineas) + "\n"
+
+
+def _header(lineas: list, nombre: str, tipo: str, ayuda: str):
+    lineas.append(f"# HELP {nombre} {ayuda}")
+    lineas.append(f"# TYPE {nombre} {tipo}")
+
+
+def _escape(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{clave}="{_escape(valor)}"' for clave, valor in labels.items()) + "}"
+
+
+def _number(valor: float) -> str:
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _histogram(lineas: list, nombre: str, histograma: Histogram, **labels):
+    acumulado = 0
+    base = ",".join(f'{clave}="{_escape(valor)}"' for clave, valor in labels.items())
+    for limite, cuenta in zip(histograma.bounds, histograma.counts):
+        acumulado += cuenta
+        lineas.append(f'{nombre}_bucket{{{base},le="{_number(float(limite))}"}} {acumulado}')
+    lineas.append(f'{nombre}_bucket{{{base},le="+Inf"}} {histograma.count}')
+    lineas.append(f"{nombre}_sum{{{base}}} {_number(histograma.sum)}")
+    lineas.append(f"{nombre}_count{{{base}}} {histograma.count}")
+
+
+def route_label(scope: dict, root_path: str) -> str:
+    """
+    Plantilla de la ruta que atendió la petición (p. ej. /api/solicitudes/{solicitud_id}),
+    leída del scope que el router ya modificó. Los montajes de archivos estáticos
+    se agrupan en <prefijo>/{path}.
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "endpoint" in scope:
+        montaje = scope.get("root_path", "")[len(root_path):]
+        if montaje:
+            return montaje + "/{path}"
+        # Rutas de Starlette sin parámetros (/docs, /openapi.json)
+        return scope["path"]
+    return UNMATCHED_ROUTE
+
+
+# Registro único del proceso
+http_metrics = HTTPMetrics()
+
+
+class MetricsMiddleware:
+    """
+    Cuenta peticiones por método, ruta y estado; mide latencia, tamaño de la
+    respuesta, peticiones en curso y el tiempo en MongoDB de cada petición.
+    """
+
+    def __init__(self, app, registry: HTTPMetrics = None):
+        self.app = app
+        self.registry = registry or http_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        method = scope["method"]
+        if method not in KNOWN_METHODS:
+            method = "other"
+        root_path = scope.get("root_path", "")
+        estado = [500, 0]  # código de estado, bytes del cuerpo
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.body":
+                estado[1] += len(message.get("body", b""))
+            elif message["type"] == "http.response.start":
+                estado[0] = message["status"]
+            await send(message)
+
+        mongo = []
+        token = request_mongo_commands.set(mongo)
+        registry.in_flight[method] = registry.in_flight.get(method, 0) + 1
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duracion = time.perf_counter() - inicio
+            registry.in_flight[method] -= 1
+            request_mongo_commands.reset(token)
+            registry.observe(method, route_label(scope, root_path), estado[0], duracion, estado[1], mongo)
@@ -0,0 +1,116 @@
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from bson import ObjectId
+
+from app.models.solicitud_stats_db import SolicitudStatsDB
+
+def rango_fechas(desde: Optional[date] = None, hasta: Optional[date] = None) -> dict:
+    """Condición de rango para un campo de fecha; `hasta` incluye el día completo."""
+    rango = {}
+    if desde:
+        rango["$gte"] = datetime.combine(desde, time.min)
+    if hasta:
+        rango["$lt"] = datetime.combine(hasta + timedelta(days=1), time.min)
+    return rango
+
+
+class SolicitudDB:
+    def __init__(self, db):
+        self.db = db
+        self.collection = db["solicitudes_estandar"]
+        # Contadores materializados: toda escritura pasa por aquí y los mantiene al día
+        self.stats = SolicitudStatsDB(db)
+
+    async def ensure_indexes(self):
+        """Crea los índices usados por los listados de solicitudes."""
+        await self.collection.create_index([("solicitante_email", ASCENDING)])
+        # Ventana de fechas de las estadísticas del solicitante
+        await self.collection.create_index([("solicitante_email", ASCENDING), ("fecha_creacion", DESCENDING)])
+        # Paginación por cursor: (fecha_creacion, _id) con y sin filtros de igualdad
+        await self.collection.create_index([("fecha_creacion", DESCENDING), ("_id", DESCENDING)])
+        await self.collection.create_index([("estado", ASCENDING), ("fecha_creacion", DESCENDING), ("_id", DESCENDING)])
+        await self.collection.create_index([("departamento", ASCENDING), ("fecha_creacion", DESCENDING), ("_id", DESCENDING)])
+
+    async def find_by_id(self, solicitud_id, projection=None):
+        """Busca una solicitud por su ID."""
+        return await self.collection.find_one({"_id": ObjectId(solicitud_id)}, projection)
+
+    async def find(self, query, sort=None, skip=0, limit=0):
+        """Devuelve la lista de solicitudes que cumplen la consulta."""
+        cursor = self.collection.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=limit or None)
+
+    async def count(self, query=None):
+        """Cuenta las solicitudes que cumplen la consulta."""
+        return await self.collection.count_documents(query or {})
+
+    async def estimated_count(self):
+        """Total aproximado de la colección (metadatos, sin recorrerla)."""
+        return await self.collection.estimated_document_count()
+
+    async def aggregate(self, pipeline):
+        """Ejecuta un pipeline de agregación y devuelve la lista de resultados."""
+        return await self.collection.aggregate(pipeline).to_list(length=None)
+
+    async def facet(self, query, facets):
+        """
+        Ejecuta varias agrupaciones sobre el mismo $match en una sola pasada
+        ($facet). Devuelve {nombre_faceta: resultados}.
+        """
+        pipeline = [{"$match": query}] if query else []
+        pipeline.append({"$facet": facets})
+        result = await self.aggregate(pipeline)
+        return result[0] if result else {nombre: [] for nombre in facets}
+
+    async def insert(self, solicitud_data):
+        """Inserta una solicitud y devuelve su ObjectId."""
+        result = await self.collection.insert_one(solicitud_data)
+        await self.stats.aplicar(None, {**solicitud_data, "_id": result.inserted_id})
+        return result.inserted_id
+
+    async def update_fields(self, solicitud_id, update_data):
+        """Aplica un $set sobre la solicitud. Devuelve cuántos documentos cambiaron."""
+        # La imagen previa (atómica con el $set) permite calcular el delta de estadísticas
+        antes = await self.collection.find_one_and_update(
+            {"_id": ObjectId(solicitud_id)},
+            {"$set": update_data},
+            return_document=ReturnDocument.BEFORE
+        )
+        if antes is None:
+            return 0
+        despues = {**antes, **update_data}
+        await self.stats.aplicar(antes, despues)
+        return int(any(antes.get(k) != v for k, v in update_data.items()))
+
+    async def push_archivos(self, solicitud_id, campo, archivos, update_data):
+        """Agrega archivos al arreglo `campo` y actualiza los campos indicados."""
+        antes = await self.collection.find_one_and_update(
+            {"_id": ObjectId(solicitud_id)},
+            {"$push": {campo: {"$each": archivos}}, "$set": update_data},
+            return_document=ReturnDocument.BEFORE
+        )
+        if antes is None:
+            return 0
+        despues = {**antes, **update_data, campo: (antes.get(campo) or []) + list(archivos)}
+        await self.stats.aplicar(antes, despues)
+        return 1 if archivos or any(antes.get(k) != v for k, v in update_data.items()) else 0
+
+    async def delete(self, solicitud_id):
+        """Elimina una solicitud por su ID."""
+        antes = await self.collection.find_one_and_delete({"_id": ObjectId(solicitud_id)})
+        if antes is None:
+            return 0
+        await self.stats.aplicar(antes, None)
+        return 1
+
+    async def list_collection_names(self):
+        """Lista las colecciones de la base de datos (diagnóstico)."""
+        return await self.db.list_collection_names()
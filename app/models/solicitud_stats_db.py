@@ -0,0 +1,349 @@
+"""
+Estadísticas materializadas de solicitudes (colección `solicitud_stats`).
+
+Cada documento acumula contadores para un ámbito:
+    "global", "solicitante:<email>", "aprobador:<email>", "pagador:<email>"
+
+y dentro de él, por dimensión:
+    estado.<estado>.{count, monto}
+    tipo_pago.<tipo>.count
+    departamento.<depto>.{count, monto}
+    mes_creacion.<AAAA-MM>.count              (fecha_creacion)
+    mes_decision.<AAAA-MM>.{count, monto}     (fecha_aprobacion / fecha_rechazo / fecha_creacion)
+    mes_pago.<AAAA-MM>.{count, monto}         (solo solicitudes pagadas, por fecha_pago)
+    comprobantes_pendientes                   (pagadas sin comprobantes)
+
+SolicitudDB llama a `aplicar(antes, despues)` en cada alta, cambio y baja; la
+diferencia de contribuciones se aplica con $inc, así que los dashboards leen
+uno o dos documentos en lugar de recorrer `solicitudes_estandar`.
+`reconstruir()` recalcula todo desde cero (backfill o corrección de deriva);
+se ejecuta explícitamente con scripts/rebuild_solicitud_stats.py, nunca al
+arrancar la aplicación.
+
+Los contadores sólo son confiables después de una reconstrucción: antes, los
+$inc de las solicitudes existentes parten de cero. `reconstruir()` deja el
+documento marca `_construida` junto con los contadores; mientras no exista,
+`obtener()` / `obtener_varios()` calculan los mismos documentos en vivo
+recorriendo `solicitudes_estandar`.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import unquote
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+STATS_COLLECTION = "solicitud_stats"
+# Candado de reconstrucción: un documento con vencimiento, por si el proceso muere
+LOCK_COLLECTION = "solicitud_stats_lock"
+LOCK_ID = "reconstruir"
+# Documento de solicitud_stats que indica que los contadores salen de reconstruir()
+MARCA_CONSTRUIDA = "_construida"
+ESTADOS_PENDIENTES = ("enviada", "en_revision")
+ROLES_AMBITO = ("solicitante", "aprobador", "pagador")
+# Campos que lee contribucion(); de comprobantes_pago basta saber si hay alguno
+PROYECCION_CONTRIBUCION = {
+    **{campo: 1 for campo in (
+        "estado", "monto", "tipo_pago", "departamento", "fecha_creacion",
+        "fecha_aprobacion", "fecha_rechazo", "fecha_pago",
+    )},
+    **{f"{rol}_email": 1 for rol in ROLES_AMBITO},
+    "comprobantes_pago": {"$slice": 1},
+}
+
+# Claves especiales: el escape de _clave nunca produce "%N" ni "%E"
+_CLAVE_NULA = "%N"
+_CLAVE_VACIA = "%E"
+
+
+def _valor(v):
+    """Valor almacenable (los Enum se guardan por su valor)"""
+    return v.value if isinstance(v, Enum) else v
+
+
+def _clave(v) -> str:
+    """Nombre de campo seguro para MongoDB a partir de un valor arbitrario"""
+    v = _valor(v)
+    if v is None:
+        return _CLAVE_NULA
+    v = str(v)
+    if v == "":
+        return _CLAVE_VACIA
+    return v.replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+
+def _desde_clave(k: str):
+    if k == _CLAVE_NULA:
+        return None
+    if k == _CLAVE_VACIA:
+        return ""
+    return unquote(k)
+
+
+def _mes(fecha) -> Optional[str]:
+    return f"{fecha.year:04d}-{fecha.month:02d}" if isinstance(fecha, datetime) else None
+
+
+def _monto(doc) -> float:
+    monto = doc.get("monto")
+    return float(monto) if isinstance(monto, (int, float)) and not isinstance(monto, bool) else 0.0
+
+
+def ambitos(doc: dict) -> List[str]:
+    """Documentos de estadísticas a los que contribuye una solicitud"""
+    result = ["global"]
+    for rol in ROLES_AMBITO:
+        email = doc.get(f"{rol}_email")
+        if email:
+            result.append(f"{rol}:{email}")
+    return result
+
+
+def contribucion(doc: Optional[dict]) -> Dict[str, Dict[str, float]]:
+    """Contadores que aporta una solicitud: {ámbito: {ruta: incremento}}"""
+    if not doc:
+        return {}
+
+    estado = _valor(doc.get("estado"))
+    monto = _monto(doc)
+    campos: Dict[str, float] = defaultdict(float)
+
+    campos[f"estado.{_clave(estado)}.count"] += 1
+    campos[f"estado.{_clave(estado)}.monto"] += monto
+    campos[f"tipo_pago.{_clave(doc.get('tipo_pago'))}.count"] += 1
+    campos[f"departamento.{_clave(doc.get('departamento'))}.count"] += 1
+    campos[f"departamento.{_clave(doc.get('departamento'))}.monto"] += monto
+
+    mes_creacion = _mes(doc.get("fecha_creacion"))
+    if mes_creacion:
+        campos[f"mes_creacion.{mes_creacion}.count"] += 1
+
+    fecha_decision = doc.get("fecha_aprobacion") or doc.get("fecha_rechazo") or doc.get("fecha_creacion")
+    mes_decision = _mes(fecha_decision)
+    if mes_decision:
+        campos[f"mes_decision.{mes_decision}.count"] += 1
+        campos[f"mes_decision.{mes_decision}.monto"] += monto
+
+    if estado == "pagada":
+        mes_pago = _mes(doc.get("fecha_pago"))
+        if mes_pago:
+            campos[f"mes_pago.{mes_pago}.count"] += 1
+            campos[f"mes_pago.{mes_pago}.monto"] += monto
+        if not doc.get("comprobantes_pago"):
+            campos["comprobantes_pendientes"] += 1
+
+    return {ambito: dict(campos) for ambito in ambitos(doc)}
+
+
+def _documento(ambito: str, campos: Dict[str, float]) -> dict:
+    """Documento completo de un ámbito a partir de sus rutas con puntos"""
+    doc = {"_id": ambito}
+    for ruta, valor in campos.items():
+        destino = doc
+        *padres, hoja = ruta.split(".")
+        for parte in padres:
+            destino = destino.setdefault(parte, {})
+        destino[hoja] = valor
+    return doc
+
+
+class ReconstruccionEnCurso(Exception):
+    """Otra reconstrucción de solicitud_stats tiene el candado"""
+
+
+def diferencia(antes: Optional[dict], despues: Optional[dict]) -> Dict[str, Dict[str, float]]:
+    """Incrementos que llevan los contadores del estado `antes` al estado `despues`"""
+    result: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for ambito, campos in contribucion(despues).items():
+        for ruta, valor in campos.items():
+            result[ambito][ruta] += valor
+    for ambito, campos in contribucion(antes).items():
+        for ruta, valor in campos.items():
+            result[ambito][ruta] -= valor
+    return {
+        ambito: {ruta: valor for ruta, valor in campos.items() if valor}
+        for ambito, campos in result.items()
+        if any(campos.values())
+    }
+
+
+class SolicitudStatsDB:
+    def __init__(self, db):
+        self.db = db
+        self.collection = db[STATS_COLLECTION]
+
+    async def aplicar(self, antes: Optional[dict], despues: Optional[dict]):
+        """Aplicar a los contadores el cambio de una solicitud (alta: antes=None; baja: despues=None)"""
+        operaciones = [
+            UpdateOne({"_id": ambito}, {"$inc": campos}, upsert=True)
+            for ambito, campos in diferencia(antes, despues).items()
+        ]
+        if operaciones:
+            await self.collection.bulk_write(operaciones, ordered=False)
+
+    async def obtener(self, ambito: str) -> dict:
+        """Documento de contadores de un ámbito ({} si aún no tiene datos)"""
+        return (await self.obtener_varios([ambito]))[ambito]
+
+    async def obtener_varios(self, ambitos_: Iterable[str]) -> Dict[str, dict]:
+        """
+        Varios ámbitos en una sola consulta (la marca se lee en la misma). Sin
+        la marca de reconstruir() se calculan en vivo.
+        """
+        ambitos_ = list(ambitos_)
+        docs = await self.collection.find({"_id": {"$in": ambitos_ + [MARCA_CONSTRUIDA]}}).to_list(length=None)
+        encontrados = {doc["_id"]: doc for doc in docs}
+        if MARCA_CONSTRUIDA not in encontrados:
+            return await self.calcular_en_vivo(ambitos_)
+        return {ambito: encontrados.get(ambito, {}) for ambito in ambitos_}
+
+    async def calcular_en_vivo(self, ambitos_: Iterable[str]) -> Dict[str, dict]:
+        """
+        Los documentos de contadores de `ambitos_` calculados recorriendo
+        `solicitudes_estandar` (con contribucion(), igual que reconstruir()).
+        Con "global" es un recorrido completo; sólo se usa hasta la primera
+        reconstrucción.
+        """
+        ambitos_ = list(ambitos_)
+        if "global" in ambitos_:
+            filtro = {}
+        else:
+            filtro = {"$or": [
+                {f"{rol}_email": email}
+                for rol, _, email in (ambito.partition(":") for ambito in ambitos_)
+                if rol in ROLES_AMBITO
+            ]}
+            if not filtro["$or"]:
+                return {ambito: {} for ambito in ambitos_}
+
+        acumulado: Dict[str, Dict[str, float]] = {ambito: defaultdict(float) for ambito in ambitos_}
+        async for doc in self.db["solicitudes_estandar"].find(filtro, PROYECCION_CONTRIBUCION):
+            for ambito, campos in contribucion(doc).items():
+                if ambito in acumulado:
+                    for ruta, valor in campos.items():
+                        acumulado[ambito][ruta] += valor
+        return {ambito: _documento(ambito, campos) if campos else {} for ambito, campos in acumulado.items()}
+
+    async def reconstruir(self, batch_size: int = 1000, lock_minutes: float = 60) -> int:
+        """
+        Recalcular todos los contadores recorriendo `solicitudes_estandar`.
+        Se construyen en una colección temporal propia de esta ejecución que luego
+        reemplaza a la actual, de modo que los dashboards nunca leen un estado a
+        medio calcular. Un documento candado en `solicitud_stats_lock` impide dos
+        reconstrucciones simultáneas (ReconstruccionEnCurso); vence a los
+        `lock_minutes` por si el proceso que lo tomó murió.
+
+        Los cambios que la aplicación hace mientras dura el recorrido pueden
+        perderse (los $inc sobre la colección que se reemplaza) o quedar
+        contados a medias: ejecútalo con la aplicación detenida o en una ventana
+        sin escrituras, o vuelve a ejecutarlo después.
+
+        Al final queda el documento marca `_construida` (fecha y total): desde
+        ese momento los dashboards leen los contadores en lugar de calcularlos
+        en vivo.
+
+        Devuelve el número de solicitudes procesadas.
+        """
+        candado = await self._tomar_candado(lock_minutes)
+        temporal = self.db[f"{STATS_COLLECTION}_rebuild_{ObjectId()}"]
+        try:
+            acumulado: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+            total = 0
+            cursor = self.db["solicitudes_estandar"].find({}, batch_size=batch_size)
+            async for doc in cursor:
+                total += 1
+                for ambito, campos in contribucion(doc).items():
+                    for ruta, valor in campos.items():
+                        acumulado[ambito][ruta] += valor
+
+            documentos = [_documento(ambito, campos) for ambito, campos in acumulado.items()]
+            documentos.append({"_id": MARCA_CONSTRUIDA, "fecha": datetime.utcnow(), "solicitudes": total})
+            for i in range(0, len(documentos), batch_size):
+                await temporal.insert_many(documentos[i:i + batch_size], ordered=False)
+
+            # La marca llega junto con los contadores, en el mismo rename
+            await temporal.rename(STATS_COLLECTION, dropTarget=True)
+            return total
+        finally:
+            await temporal.drop()
+            await self.db[LOCK_COLLECTION].delete_one({"_id": LOCK_ID, "token": candado})
+
+    async def _tomar_candado(self, lock_minutes: float) -> ObjectId:
+        locks = self.db[LOCK_COLLECTION]
+        ahora = datetime.utcnow()
+        token = ObjectId()
+        documento = {"_id": LOCK_ID, "token": token, "expira": ahora + timedelta(minutes=lock_minutes)}
+        try:
+            await locks.insert_one(documento)
+            return token
+        except DuplicateKeyError:
+            pass
+        # Candado vencido: se reemplaza sólo si sigue vencido (otro proceso pudo tomarlo ya)
+        resultado = await locks.replace_one({"_id": LOCK_ID, "expira": {"$lt": ahora}}, documento)
+        if resultado.modified_count:
+            return token
+        raise ReconstruccionEnCurso("Ya hay una reconstrucción de solicitud_stats en curso")
+
+    async def construida(self) -> bool:
+        """Los contadores salen de una reconstrucción (existe la marca)"""
+        return await self.collection.find_one({"_id": MARCA_CONSTRUIDA}, {"_id": 1}) is not None
+
+    async def necesita_reconstruccion(self) -> bool:
+        """
+        Falta la marca de reconstruir() y hay solicitudes (p. ej. al desplegar
+        sobre una base existente o tras restaurar). Sin solicitudes no hay nada
+        que recorrer: se reconstruye aquí mismo (vacía) para dejar la marca.
+        """
+        if await self.construida():
+            return False
+        if await self.db["solicitudes_estandar"].find_one({}, {"_id": 1}) is not None:
+            return True
+        try:
+            await self.reconstruir()
+        except ReconstruccionEnCurso:
+            pass
+        return False
+
+
+# Lectura de los contadores en el formato que devolvían las agregaciones
+
+def contador(doc: dict, dimension: str, valor, campo: str = "count") -> float:
+    return doc.get(dimension, {}).get(_clave(valor), {}).get(campo, 0)
+
+
+def suma_estados(doc: dict, estados: Iterable[str], campo: str = "count") -> float:
+    return sum(contador(doc, "estado", estado, campo) for estado in estados)
+
+
+def agrupado(doc: dict, dimension: str, con_monto: bool = False) -> List[dict]:
+    """Lista [{_id, count[, total_monto]}] ordenada por count descendente"""
+    result = []
+    for clave, valores in doc.get(dimension, {}).items():
+        count = int(valores.get("count", 0))
+        if count <= 0:
+            continue
+        item = {"_id": _desde_clave(clave), "count": count}
+        if con_monto:
+            item["total_monto"] = round(valores.get("monto", 0), 2)
+        result.append(item)
+    result.sort(key=lambda item: item["count"], reverse=True)
+    return result
+
+
+def por_mes(doc: dict, dimension: str, con_monto: bool = False) -> List[dict]:
+    """Lista [{_id: {year, month}, count[, total_monto]}] en orden cronológico"""
+    result = []
+    for clave in sorted(doc.get(dimension, {})):
+        valores = doc[dimension][clave]
+        count = int(valores.get("count", 0))
+        if count <= 0:
+            continue
+        year, month = clave.split("-")
+        item = {"_id": {"year": int(year), "month": int(month)}, "count": count}
+        if con_monto:
+            item["total_monto"] = round(valores.get("monto", 0), 2)
+        result.append(item)
+    return result
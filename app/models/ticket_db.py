@@ -0,0 +1,8 @@
+class TicketDB:
+    def __init__(self, db):
+        self.collection = db["tickets"]
+
+    async def create_ticket(self, ticket_data):
+        """Crea un ticket de soporte y devuelve su ID."""
+        result = await self.collection.insert_one(ticket_data)
+        return str(result.inserted_id)
@@ -103,7 +103,9 @@ class TokenData(BaseModel):
 # Esquema para respuesta de lista de usuarios con paginación
 class UserListResponse(BaseModel):
     users: List[UserResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     limit: int
-    total_pages: int
\ No newline at end of file
+    total_pages: Optional[int] = None
+    total_estimated: bool = False
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -1,29 +1,82 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING
 from bson import ObjectId
 
 class UserDB:
     def __init__(self, db):
         self.collection = db["users"]
 
+    async def ensure_indexes(self):
+        """Crea los índices usados por las consultas de usuarios."""
+        await self.collection.create_index([("email", ASCENDING)], unique=True)
+        # Paginación por cursor: (created_at, _id), también con filtro de rol/estado
+        await self.collection.create_index([("created_at", DESCENDING), ("_id", DESCENDING)])
+        await self.collection.create_index([("role", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)])
+        await self.collection.create_index([("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)])
+        # Refresco incremental del snapshot de análisis (spark/users_snapshot.py)
+        await self.collection.create_index([("updated_at", ASCENDING)])
+
     async def count_documents(self):
         """Cuenta el número total de usuarios activos en la colección."""
         return await self.collection.count_documents({"status": "active"})
 
+    async def count(self, filter_query=None):
+        """Cuenta los usuarios que cumplen un filtro."""
+        return await self.collection.count_documents(filter_query or {})
+
     async def find_user_by_email(self, email):
         """Busca un usuario por su correo electrónico."""
         return await self.collection.find_one({"email": email})
 
+    async def find_user_by_id(self, user_id):
+        """Busca un usuario por su ID."""
+        return await self.collection.find_one({"_id": ObjectId(user_id)})
+
+    async def find_users_by_emails(self, emails, projection=None):
+        """Busca varios usuarios en una sola consulta. Devuelve {email: usuario}."""
+        emails = list({e for e in emails if e})
+        if not emails:
+            return {}
+        docs = await self.collection.find({"email": {"$in": emails}}, projection).to_list(length=None)
+        return {doc["email"]: doc for doc in docs}
+
+    async def email_in_use(self, email, exclude_id=None):
+        """Indica si el email pertenece a otro usuario distinto de exclude_id."""
+        query = {"email": email}
+        if exclude_id:
+            query["_id"] = {"$ne": ObjectId(exclude_id)}
+        return await self.collection.find_one(query, {"_id": 1}) is not None
+
+    async def list_users(self, filter_query, skip=0, limit=10):
+        """Lista usuarios ordenados por fecha de creación (más recientes primero)."""
+        cursor = self.collection.find(filter_query).sort([("created_at", DESCENDING), ("_id", DESCENDING)])
+        if skip:
+            cursor = cursor.skip(skip)
+        return await cursor.limit(limit).to_list(length=limit)
+
+    async def estimated_count(self):
+        """Total aproximado de la colección (metadatos, sin recorrerla)."""
+        return await self.collection.estimated_document_count()
+
+    async def aggregate(self, pipeline):
+        """Ejecuta un pipeline de agregación y devuelve la lista de resultados."""
+        return await self.collection.aggregate(pipeline).to_list(length=None)
+
     async def create_user(self, user_data):
         """Crea un nuevo usuario en la base de datos."""
         result = await self.collection.insert_one(user_data)
         return str(result.inserted_id)
 
     async def update_user(self, user_id, update_data):
-        """Actualiza un usuario existente."""
+        """Actualiza un usuario existente. Devuelve cuántos documentos coincidieron."""
         result = await self.collection.update_one({"_id": ObjectId(user_id)}, {"$set": update_data})
-        return result.modified_count
+        return result.matched_count
+
+    async def touch_last_login(self, user_id, when):
+        """Registra la fecha del último login."""
+        await self.collection.update_one({"_id": ObjectId(user_id)}, {"$set": {"last_login": when}})
 
     async def delete_user(self, user_id):
         """Elimina un usuario por su ID."""
         result = await self.collection.delete_one({"_id": ObjectId(user_id)})
-        return result.deleted_count
\ No newline at end of file
+        return result.deleted_count
@@ -6,7 +6,7 @@ from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.requests import Request
 from typing import Optional
 import json
-from datetime import datetime
+from datetime import date, datetime
 from bson import ObjectId
 
 from app.controllers.aprobador_controller import AprobadorController
@@ -63,7 +63,7 @@ async def get_solicitudes_pendientes(
     Requiere rol: aprobador
     """
     try:
-        solicitudes = aprobador_controller.get_solicitudes_pendientes(
+        solicitudes = await aprobador_controller.get_solicitudes_pendientes(
             aprobador_email=current_user["email"],
             filtro_departamento=filtro_departamento,
             filtro_tipo_pago=filtro_tipo_pago,
@@ -109,7 +109,7 @@ async def get_estadisticas(
     Requiere rol: aprobador
     """
     try:
-        estadisticas = aprobador_controller.get_estadisticas_aprobador(
+        estadisticas = await aprobador_controller.get_estadisticas_aprobador(
             aprobador_email=current_user["email"]
         )
         
@@ -131,16 +131,21 @@ async def get_estadisticas(
 
 @router.get("/api/estadisticas/detalle")
 async def get_estadisticas_detalle(
+    desde: Optional[date] = Query(None, alias="from", description="Fecha de creación inicial (inclusive)"),
+    hasta: Optional[date] = Query(None, alias="to", description="Fecha de creación final (inclusive)"),
     current_user: dict = Depends(require_any_role("aprobador", "admin"))
 ):
     """
     Obtener estadísticas agregadas y detalladas para el dashboard del aprobador.
     Devuelve agrupaciones por estado, tipo y mes, además de un resumen.
+    Con `from`/`to` se limita a las solicitudes creadas en esa ventana.
     Requiere rol: aprobador
     """
     try:
-        estadisticas = aprobador_controller.get_estadisticas_aprobador_detalle(
-            aprobador_email=current_user["email"]
+        estadisticas = await aprobador_controller.get_estadisticas_aprobador_detalle(
+            aprobador_email=current_user["email"],
+            desde=desde,
+            hasta=hasta
         )
 
         return JSONResponse(
@@ -184,7 +189,7 @@ async def get_historial(
         print(f"   Usuario: {current_user['email']}")
         print(f"   Filtros: estado={filtro_estado}, depto={filtro_departamento}, tipo={filtro_tipo_pago}")
         
-        solicitudes = aprobador_controller.get_historial_aprobador(
+        solicitudes = await aprobador_controller.get_historial_aprobador(
             aprobador_email=current_user["email"],
             filtro_estado=filtro_estado,
             filtro_departamento=filtro_departamento,
@@ -233,7 +238,7 @@ async def aprobar_solicitud(
         # Asegurar que el email del aprobador sea el del usuario actual
         aprobacion.aprobador_email = current_user["email"]
         
-        resultado = aprobador_controller.aprobar_solicitud(aprobacion)
+        resultado = await aprobador_controller.aprobar_solicitud(aprobacion)
         
         return JSONResponse(
             status_code=status.HTTP_200_OK,
@@ -266,7 +271,7 @@ async def rechazar_solicitud(
         # Asegurar que el email del aprobador sea el del usuario actual
         rechazo.aprobador_email = current_user["email"]
         
-        resultado = aprobador_controller.rechazar_solicitud(rechazo)
+        resultado = await aprobador_controller.rechazar_solicitud(rechazo)
         
         return JSONResponse(
             status_code=status.HTTP_200_OK,
@@ -294,15 +299,8 @@ async def get_solicitud_detalle(
     try:
         print(f"🔍 Obteniendo detalles de solicitud: {solicitud_id}")
         
-        # Usar el controlador existente para obtener la solicitud
-        from pymongo import MongoClient
-        import os
-        
-        # Usar la misma configuración que el controlador
-        mongo_client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))
-        db = mongo_client[os.getenv("DATABASE_NAME", "sistema_solicitudes_pagos")]  # 🔧 BD correcta
-        
-        solicitud = db["solicitudes_estandar"].find_one({"_id": ObjectId(solicitud_id)})
+        # Usar los repositorios del controlador (cliente Motor compartido)
+        solicitud = await aprobador_controller.solicitudes.find_by_id(solicitud_id)
         
         if not solicitud:
             print(f"❌ Solicitud no encontrada: {solicitud_id}")
@@ -317,7 +315,7 @@ async def get_solicitud_detalle(
         solicitante_email = solicitud.get("solicitante_email")
         solicitante = None
         if solicitante_email:
-            solicitante = db["users"].find_one({"email": solicitante_email})
+            solicitante = await aprobador_controller.users.find_user_by_email(solicitante_email)
         
         # Construir respuesta con toda la información
         def fecha_a_string(fecha):
@@ -362,8 +360,6 @@ async def get_solicitud_detalle(
         
         print(f"✅ Detalles construidos correctamente")
         
-        mongo_client.close()
-        
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content=json.loads(json_content)
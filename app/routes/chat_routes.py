@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Request, Depends
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from starlette.background import BackgroundTask
 
 from app.models.chat import ChatRequest, ChatResponse
 from app.controllers.chat_controller import chat_controller
@@ -32,6 +33,26 @@ async def post_message(payload: ChatRequest, current_user: dict | None = Depends
     })
 
 
+@router.post('/api/chat/stream', summary='Respuesta del chat en streaming (SSE)')
+async def post_message_stream(payload: ChatRequest, request: Request, current_user: dict | None = Depends(get_optional_current_user)):
+    """
+    Misma respuesta que /api/chat/message, enviada como server-sent events
+    (`meta`, `token`..., `done` o `error`) para mostrar el texto mientras se genera.
+    """
+    key = current_user.get('email') if current_user else f"anon:{request.client.host if request.client else ''}"
+    slot = chat_controller.stream_limiter.acquire(key)
+    if slot is None:
+        chat_controller.stream_metrics.rejected += 1
+        raise HTTPException(status_code=429, detail="Ya tienes respuestas en curso; espera a que terminen")
+    return StreamingResponse(
+        chat_controller.stream_message(payload.message, current_user, slot),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        # also frees the slot if the client leaves before the stream starts
+        background=BackgroundTask(slot.release),
+    )
+
+
 @router.post('/api/chat/adapt', response_model=AdaptResponse)
 async def post_adapt(payload: AdaptRequest, current_user: dict | None = Depends(get_optional_current_user)):
     resp = await chat_controller.adapt_snippet(payload.snippet, current_user)
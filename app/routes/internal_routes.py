@@ -0,0 +1,95 @@
+"""
+Rutas internas de diagnóstico (solo administradores)
+"""
+from fastapi import APIRouter, Depends
+
+from app.config.database import get_pool_stats
+from app.controllers.chat_controller import chat_controller
+from app.controllers.user_controller import user_controller
+from app.middleware.auth_middleware import require_admin
+from app.utils.analytics_results import analytics_results
+from app.utils.knowledge import knowledge_index
+from app.utils.llm_client import answer_cache, intent_engine
+from app.utils.vector_index import vector_index
+
+router = APIRouter(prefix="/internal", tags=["Interno"])
+
+
+@router.get("/pool-stats", summary="Estadísticas del pool de conexiones MongoDB")
+async def pool_stats(current_user: dict = Depends(require_admin)):
+    """
+    Conexiones abiertas, en uso y disponibles del pool compartido, además del
+    tiempo de espera (promedio y máximo) para obtener una conexión.
+    """
+    return {"success": True, "pool": get_pool_stats()}
+
+
+@router.get("/auth-cache-stats", summary="Estadísticas de la caché de usuarios autenticados")
+async def auth_cache_stats(current_user: dict = Depends(require_admin)):
+    """
+    Aciertos, fallos, desalojos e invalidaciones de la caché que resuelve el
+    usuario de cada token sin consultar MongoDB.
+    """
+    return {"success": True, "cache": user_controller.principal_cache.stats()}
+
+
+@router.get("/password-hasher-stats", summary="Estadísticas del pool de contraseñas (bcrypt)")
+async def password_hasher_stats(current_user: dict = Depends(require_admin)):
+    """
+    Operaciones bcrypt en curso y en cola, completadas y rechazadas (503) por
+    saturación del pool, junto con su configuración.
+    """
+    return {"success": True, "password_hasher": user_controller.password_hasher.stats()}
+
+
+@router.get("/knowledge-index-stats", summary="Estadísticas del índice de conocimiento del chat")
+async def knowledge_index_stats(current_user: dict = Depends(require_admin)):
+    """
+    Archivos, oraciones y términos del índice BM25 que usa el chat, cuántas
+    veces se ha reconstruido y cuánto tardó la última construcción; también
+    el estado del índice semántico (vectores mapeados en memoria).
+    """
+    return {
+        "success": True,
+        "knowledge_index": knowledge_index.stats(),
+        "vector_index": vector_index.stats()
+    }
+
+
+@router.get("/chat-cache-stats", summary="Estadísticas del motor de intenciones y caché del chat")
+async def chat_cache_stats(current_user: dict = Depends(require_admin)):
+    """
+    Tamaño del autómata de FAQ/intenciones y aciertos, fallos, desalojos y
+    tasa de aciertos de la caché de respuestas del chat.
+    """
+    return {
+        "success": True,
+        "intent_engine": intent_engine.stats(),
+        "answer_cache": answer_cache.stats()
+    }
+
+
+@router.get("/chat-stream-stats", summary="Métricas de las respuestas del chat en streaming")
+async def chat_stream_stats(current_user: dict = Depends(require_admin)):
+    """
+    Backend activo, streams en curso y contadores (completados, cancelados por
+    desconexión, por tiempo agotado, rechazados por límite por usuario, errores),
+    tiempo hasta el primer token (p50/p95) y tokens por segundo (p50/p5) de los
+    últimos 1000 streams.
+    """
+    return {
+        "success": True,
+        "backend": chat_controller.backend.name,
+        "active_streams": chat_controller.stream_limiter.active(),
+        "metrics": chat_controller.stream_metrics.stats()
+    }
+
+
+@router.get("/analytics-results", summary="Estado de los resultados precalculados de Spark")
+async def analytics_results_stats(current_user: dict = Depends(require_admin)):
+    """
+    Exportación Parquet de Spark que usan las gráficas de usuarios: fecha y
+    antigüedad, datasets con filas y archivos, y cuántas consultas se
+    respondieron con ella (hits) o con la agregación en MongoDB (misses).
+    """
+    return {"success": True, "analytics_results": analytics_results.stats()}
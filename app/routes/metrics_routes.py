@@ -0,0 +1,44 @@
+"""
+Ruta de métricas para Prometheus (administradores o scraper con token)
+"""
+import hmac
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import PlainTextResponse
+
+from app.config.settings import settings
+from app.middleware.auth_middleware import get_current_user, require_admin, security
+from app.middleware.metrics import http_metrics
+
+router = APIRouter(tags=["Interno"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+async def require_metrics_access(request: Request) -> None:
+    """
+    Permite el acceso con METRICS_TOKEN (Authorization: Bearer <token>) o con
+    el JWT de un administrador activo
+    """
+    if settings.METRICS_TOKEN:
+        esperado = f"Bearer {settings.METRICS_TOKEN}".encode()
+        recibido = request.headers.get("authorization", "").encode()
+        if hmac.compare_digest(recibido, esperado):
+            return
+    credentials = await security(request)
+    await require_admin(await get_current_user(credentials))
+
+
+@router.get(
+    "/metrics",
+    summary="Métricas por ruta en formato Prometheus",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_metrics_access)]
+)
+async def metrics():
+    """
+    Peticiones por ruta y código de estado, histogramas de latencia, tamaño de
+    respuesta y tiempo en MongoDB por petición, peticiones en curso, comandos de
+    MongoDB y estado del pool.
+    """
+    return PlainTextResponse(http_metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,7 +1,7 @@
 """
 Rutas para el dashboard del Pagador
 """
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request
 from fastapi.responses import JSONResponse, HTMLResponse
 from fastapi.templating import Jinja2Templates
 from typing import Optional, List
@@ -12,17 +12,17 @@ from bson import ObjectId
 from app.middleware.auth_middleware import require_role, require_any_role
 from app.controllers.pagador_controller import pagador_controller
 from app.models.solicitud import SolicitudPago, SolicitudComprobantesPago
+from app.config.database import get_async_database
+from app.utils.uploads import nombre_seguro, verificar_content_length
+from app.utils.blob_store import BlobStore, ruta_comprobante, url_archivo
+from app.utils.zip_stream import respuesta_zip
 import os
-import shutil
 
 
 # Configurar router y templates
 router = APIRouter(prefix="/pagador", tags=["pagador"])
 templates = Jinja2Templates(directory="templates")
 
-# Configurar directorio para archivos
-UPLOAD_DIR = os.path.join("static", "uploads", "comprobantes")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
 # Encoder personalizado para JSON
@@ -78,7 +78,7 @@ async def get_solicitudes_aprobadas(
         print(f"\n🔍 GET /api/solicitudes-aprobadas - Usuario: {current_user['email']}")
         print(f"📌 Filtros: departamento={filtro_departamento}, tipo_pago={filtro_tipo_pago}")
         
-        resultado = pagador_controller.get_solicitudes_aprobadas(
+        resultado = await pagador_controller.get_solicitudes_aprobadas(
             pagador_email=current_user["email"],
             filtro_departamento=filtro_departamento,
             filtro_tipo_pago=filtro_tipo_pago
@@ -115,7 +115,7 @@ async def get_estadisticas(
     Requiere rol: pagador
     """
     try:
-        estadisticas = pagador_controller.get_estadisticas_pagador(
+        estadisticas = await pagador_controller.get_estadisticas_pagador(
             pagador_email=current_user["email"]
         )
         
@@ -151,7 +151,7 @@ async def get_historial_pagador(
     Requiere rol: pagador
     """
     try:
-        resultado = pagador_controller.get_historial_pagador(
+        resultado = await pagador_controller.get_historial_pagador(
             pagador_email=current_user["email"],
             filtro_estado=filtro_estado,
             filtro_departamento=filtro_departamento,
@@ -191,7 +191,7 @@ async def get_pendientes_comprobante(
     Requiere rol: pagador
     """
     try:
-        resultado = pagador_controller.get_solicitudes_pendientes_comprobante(
+        resultado = await pagador_controller.get_solicitudes_pendientes_comprobante(
             pagador_email=current_user["email"],
             filtro_departamento=filtro_departamento,
             filtro_tipo_pago=filtro_tipo_pago
@@ -230,7 +230,7 @@ async def get_con_comprobantes(
     Requiere rol: pagador
     """
     try:
-        resultado = pagador_controller.get_solicitudes_con_comprobantes(
+        resultado = await pagador_controller.get_solicitudes_con_comprobantes(
             pagador_email=current_user["email"],
             filtro_departamento=filtro_departamento,
             filtro_tipo_pago=filtro_tipo_pago
@@ -273,7 +273,7 @@ async def marcar_solicitud_pagada(
         # Asegurar que el email del pagador sea el del usuario actual
         pago.pagador_email = current_user["email"]
         
-        resultado = pagador_controller.marcar_como_pagada(pago)
+        resultado = await pagador_controller.marcar_como_pagada(pago)
         
         # Serializar con el encoder personalizado
         json_content = json.dumps(resultado, cls=DateTimeEncoder, ensure_ascii=False)
@@ -301,20 +301,24 @@ async def marcar_solicitud_pagada(
 
 @router.post("/api/subir-comprobantes")
 async def subir_comprobantes(
+    request: Request,
     solicitud_id: str = Form(...),
     archivos: List[UploadFile] = File(...),
     current_user: dict = Depends(require_any_role("pagador", "admin"))
 ):
     """
-    Subir comprobantes de pago (sin límite de archivos ni tamaño)
+    Subir comprobantes de pago
     
     Requiere rol: pagador
     
     Form data:
     - solicitud_id: ID de la solicitud
-    - archivos: Array de archivos (sin límite)
+    - archivos: Array de archivos (límites UPLOAD_MAX_FILE_BYTES por archivo
+      y UPLOAD_MAX_REQUEST_BYTES por petición)
     """
     try:
+        verificar_content_length(request)
+        
         print(f"\n📎 Subiendo comprobantes para solicitud: {solicitud_id}")
         print(f"📊 Total archivos recibidos: {len(archivos)}")
         
@@ -324,47 +328,32 @@ async def subir_comprobantes(
                 detail="Debe proporcionar al menos un archivo"
             )
         
-        # Crear directorio específico para esta solicitud
-        solicitud_dir = os.path.join(UPLOAD_DIR, solicitud_id)
-        os.makedirs(solicitud_dir, exist_ok=True)
+        # Guardar en el almacén compartido con los adjuntos (contenido idéntico
+        # se almacena una sola vez); si uno falla no se guarda ninguno
+        blobs = BlobStore(get_async_database())
+        guardados = await blobs.guardar(archivos)
         
         comprobantes_info = []
         
-        for archivo in archivos:
-            try:
-                # Generar nombre único para el archivo
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-                nombre_archivo = f"{timestamp}_{archivo.filename}"
-                ruta_archivo = os.path.join(solicitud_dir, nombre_archivo)
-                
-                print(f"💾 Guardando: {nombre_archivo}")
-                
-                # Guardar archivo
-                with open(ruta_archivo, "wb") as buffer:
-                    shutil.copyfileobj(archivo.file, buffer)
-                
-                # Obtener tamaño del archivo
-                tamaño = os.path.getsize(ruta_archivo)
-                
-                # Ruta relativa para almacenar en BD
-                ruta_relativa = f"/static/uploads/comprobantes/{solicitud_id}/{nombre_archivo}"
-                
-                comprobante_info = {
-                    "nombre": archivo.filename,
-                    "nombre_guardado": nombre_archivo,
-                    "ruta": ruta_relativa,
-                    "tamaño": tamaño,
-                    "tipo": archivo.content_type,
-                    "fecha_subida": datetime.now().isoformat(),
-                    "subido_por": current_user["email"]
-                }
-                
-                comprobantes_info.append(comprobante_info)
-                print(f"✅ Archivo guardado: {nombre_archivo} ({tamaño} bytes)")
-                
-            except Exception as e:
-                print(f"❌ Error guardando archivo {archivo.filename}: {str(e)}")
-                continue
+        for archivo, guardado in zip(archivos, guardados):
+            nombre_archivo = guardado["nombre"]
+            
+            # URL de descarga autorizada para almacenar en BD
+            ruta_relativa = url_archivo(solicitud_id, nombre_archivo)
+            
+            comprobante_info = {
+                "nombre": archivo.filename,
+                "nombre_guardado": nombre_archivo,
+                "ruta": ruta_relativa,
+                "tamaño": guardado["tamaño"],
+                "sha256": guardado["sha256"],
+                "tipo": archivo.content_type,
+                "fecha_subida": datetime.now().isoformat(),
+                "subido_por": current_user["email"]
+            }
+            
+            comprobantes_info.append(comprobante_info)
+            print(f"✅ Archivo guardado: {nombre_archivo} ({guardado['tamaño']} bytes)")
         
         if not comprobantes_info:
             raise HTTPException(
@@ -373,11 +362,16 @@ async def subir_comprobantes(
             )
         
         # Registrar comprobantes en la base de datos
-        resultado = pagador_controller.subir_comprobantes_pago(
-            solicitud_id=solicitud_id,
-            comprobantes=comprobantes_info,
-            pagador_email=current_user["email"]
-        )
+        try:
+            resultado = await pagador_controller.subir_comprobantes_pago(
+                solicitud_id=solicitud_id,
+                comprobantes=comprobantes_info,
+                pagador_email=current_user["email"]
+            )
+        except Exception:
+            # La solicitud no acepta los comprobantes: soltar las referencias
+            await blobs.liberar(g["sha256"] for g in guardados)
+            raise
         
         print(f"✅ {len(comprobantes_info)} comprobantes subidos y registrados")
         
@@ -404,6 +398,38 @@ async def subir_comprobantes(
         )
 
 
+@router.get("/api/solicitud/{solicitud_id}/comprobantes.zip")
+async def descargar_comprobantes_zip(
+    solicitud_id: str,
+    current_user: dict = Depends(require_any_role("pagador", "admin"))
+):
+    """
+    Descargar todos los comprobantes de pago de una solicitud en un ZIP
+    generado al vuelo (sin archivo temporal; PDF e imágenes sin recomprimir)
+    
+    Requiere rol: pagador
+    """
+    if not ObjectId.is_valid(solicitud_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitud no encontrada")
+    
+    solicitud = await pagador_controller.solicitudes.find_by_id(
+        solicitud_id,
+        {"folio": 1, "comprobantes_pago": 1}
+    )
+    if not solicitud:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitud no encontrada")
+    
+    archivos = [
+        (ruta_comprobante(solicitud_id, c["nombre_guardado"]), nombre_seguro(c.get("nombre") or c["nombre_guardado"]))
+        for c in solicitud.get("comprobantes_pago") or []
+        if c.get("nombre_guardado")
+    ]
+    if not archivos:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="La solicitud no tiene comprobantes de pago")
+    
+    return respuesta_zip(archivos, f"solicitud_{solicitud.get('folio') or solicitud_id}_comprobantes.zip")
+
+
 @router.get("/api/solicitud/{solicitud_id}")
 async def get_solicitud_detalle(
     solicitud_id: str,
@@ -417,18 +443,8 @@ async def get_solicitud_detalle(
     try:
         print(f"\n🔍 GET /api/solicitud/{solicitud_id}")
         
-        from pymongo import MongoClient
-        import os
-        
-        # Conectar a MongoDB
-        mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
-        client = MongoClient(mongo_uri)
-        db_name = os.getenv("DATABASE_NAME", "sistema_solicitudes_pagos")
-        db = client[db_name]
-        
-        print(f"📊 Buscando solicitud en base de datos: {db_name}")
-        
-        solicitud = db["solicitudes_estandar"].find_one({"_id": ObjectId(solicitud_id)})
+        # Usar el repositorio del controlador (cliente Motor compartido)
+        solicitud = await pagador_controller.solicitudes.find_by_id(solicitud_id)
         
         if not solicitud:
             print(f"❌ Solicitud no encontrada: {solicitud_id}")
@@ -1,32 +1,48 @@
-from fastapi import APIRouter, HTTPException, Depends, File, UploadFile
+from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Query, Request
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 import os
+import mimetypes
 from app.models.solicitud import SolicitudEstandarCreate, SolicitudEstandar, SolicitudEstandarUpdate, EstadoSolicitud
-from app.config.database import get_database
-from app.routes.user_routes import get_current_user
+from app.config.database import get_async_database
+from app.models.solicitud_db import SolicitudDB, rango_fechas
+from app.models.solicitud_stats_db import agrupado, por_mes
+from app.routes.user_routes import get_current_user, get_current_user_or_cookie
 from app.models.user import UserResponse
+from app.utils.uploads import nombre_seguro, verificar_content_length
+from app.utils.blob_store import BlobStore, BLOB_DIR, COMPROBANTES_DIR, NOMBRE_BLOB, ruta_adjunto, ruta_comprobante
+from app.utils.descargas import ArchivoResponse
+from app.utils.zip_stream import respuesta_zip
+from app.utils.pagination import decode_cursor, keyset_filter, keyset_sort, combine_filters, next_cursor
 from bson import ObjectId
 import json
 
 router = APIRouter(tags=["Solicitudes"])
 
-# Directorio para archivos subidos
-UPLOAD_DIR = "uploads/solicitudes"
+# Directorio para archivos subidos (almacén direccionado por contenido)
+UPLOAD_DIR = BLOB_DIR
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+def get_solicitud_db() -> SolicitudDB:
+    """Dependency: repositorio asíncrono de solicitudes"""
+    return SolicitudDB(get_async_database())
+
+def get_blob_store() -> BlobStore:
+    """Dependency: almacén de archivos adjuntos"""
+    return BlobStore(get_async_database())
+
 @router.get("/test", summary="Probar conexión a base de datos")
-async def test_database(db = Depends(get_database)):
+async def test_database(solicitudes: SolicitudDB = Depends(get_solicitud_db)):
     """
     Endpoint de prueba para verificar la conexión a la base de datos
     """
     try:
         # Verificar conexión
-        collections = db.list_collection_names()
+        collections = await solicitudes.list_collection_names()
         return {
             "message": "Conexión exitosa",
             "collections": collections,
-            "database_name": db.name
+            "database_name": solicitudes.db.name
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error de conexión: {str(e)}")
@@ -35,7 +51,7 @@ async def test_database(db = Depends(get_database)):
 async def crear_solicitud_estandar(
     solicitud: SolicitudEstandarCreate,
     current_user: UserResponse = Depends(get_current_user),
-    db = Depends(get_database)
+    solicitudes: SolicitudDB = Depends(get_solicitud_db)
 ):
     """
     Crear una nueva solicitud estándar
@@ -73,11 +89,10 @@ async def crear_solicitud_estandar(
         }
         
         # Insertar en la base de datos
-        collection = db["solicitudes_estandar"]
-        result = collection.insert_one(solicitud_data)
+        inserted_id = await solicitudes.insert(solicitud_data)
         
         # Obtener la solicitud creada
-        solicitud_creada = collection.find_one({"_id": result.inserted_id})
+        solicitud_creada = await solicitudes.find_by_id(inserted_id)
         solicitud_creada["id"] = str(solicitud_creada["_id"])
         del solicitud_creada["_id"]
         
@@ -94,7 +109,7 @@ async def crear_solicitud_estandar(
 async def guardar_borrador_estandar(
     solicitud: SolicitudEstandarCreate,
     current_user: UserResponse = Depends(get_current_user),
-    db = Depends(get_database)
+    solicitudes: SolicitudDB = Depends(get_solicitud_db)
 ):
     """
     Guardar una solicitud estándar como borrador
@@ -129,12 +144,11 @@ async def guardar_borrador_estandar(
         }
         
         # Insertar en la base de datos
-        collection = db["solicitudes_estandar"]
-        result = collection.insert_one(solicitud_data)
+        inserted_id = await solicitudes.insert(solicitud_data)
         
         return {
             "message": "Borrador guardado exitosamente",
-            "solicitud_id": str(result.inserted_id)
+            "solicitud_id": str(inserted_id)
         }
         
     except Exception as e:
@@ -143,27 +157,25 @@ async def guardar_borrador_estandar(
 @router.get("/mis-solicitudes", summary="Obtener solicitudes del usuario actual")
 async def obtener_mis_solicitudes(
     current_user: UserResponse = Depends(get_current_user),
-    db = Depends(get_database)
+    solicitudes: SolicitudDB = Depends(get_solicitud_db)
 ):
     """
     Obtener todas las solicitudes del usuario actual
     """
     try:
-        collection = db["solicitudes_estandar"]
-
         # Si el usuario es admin, retornar todas las solicitudes; si no, solo las del solicitante
         if current_user.role == "admin":
-            solicitudes = list(collection.find({}))
+            resultado = await solicitudes.find({})
         else:
             # Buscar solicitudes del usuario
-            solicitudes = list(collection.find({"solicitante_email": current_user.email}))
+            resultado = await solicitudes.find({"solicitante_email": current_user.email})
         
         # Convertir ObjectId a string
-        for solicitud in solicitudes:
+        for solicitud in resultado:
             solicitud["id"] = str(solicitud["_id"])
             del solicitud["_id"]
         
-        return {"solicitudes": solicitudes}
+        return {"solicitudes": resultado}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener solicitudes: {str(e)}")
@@ -171,35 +183,15 @@ async def obtener_mis_solicitudes(
 @router.get("/estadisticas", summary="Obtener estadísticas de solicitudes del usuario")
 async def obtener_estadisticas(
     current_user: UserResponse = Depends(get_current_user),
-    db = Depends(get_database)
+    solicitudes: SolicitudDB = Depends(get_solicitud_db)
 ):
     """
     Obtener estadísticas de solicitudes del usuario actual
     """
     try:
-        collection = db["solicitudes_estandar"]
-
-        # Contar solicitudes por estado
-        if current_user.role == "admin":
-            # Admins ven estadísticas globales
-            pipeline = [
-                {"$group": {
-                    "_id": "$estado",
-                    "count": {"$sum": 1},
-                    "total_monto": {"$sum": "$monto"}
-                }}
-            ]
-        else:
-            pipeline = [
-                {"$match": {"solicitante_email": current_user.email}},
-                {"$group": {
-                    "_id": "$estado",
-                    "count": {"$sum": 1},
-                    "total_monto": {"$sum": "$monto"}
-                }}
-            ]
-        
-        resultados = list(collection.aggregate(pipeline))
+        # Contadores materializados: admins ven los globales, el resto los propios
+        ambito = "global" if current_user.role == "admin" else f"solicitante:{current_user.email}"
+        resultados = agrupado(await solicitudes.stats.obtener(ambito), "estado", con_monto=True)
         
         # Organizar estadísticas
         estadisticas = {
@@ -236,87 +228,94 @@ async def obtener_estadisticas(
 
 @router.get("/estadisticas/detalle", summary="Obtener estadísticas detalladas de solicitudes (agrupadas)")
 async def obtener_estadisticas_detalle(
+    desde: Optional[date] = Query(None, alias="from", description="Fecha de creación inicial (inclusive)"),
+    hasta: Optional[date] = Query(None, alias="to", description="Fecha de creación final (inclusive)"),
     current_user: UserResponse = Depends(get_current_user),
-    db = Depends(get_database)
+    solicitudes: SolicitudDB = Depends(get_solicitud_db)
 ):
     """
     Devuelve agregaciones útiles para paneles: conteo y monto por estado,
     conteo por tipo de pago y conteo por mes (fecha_creacion). Accesible para
     administradores como vista global; los solicitantes ven solo sus propias solicitudes.
+    Con `from`/`to` se limita a las solicitudes creadas en esa ventana.
     """
     try:
-        collection = db["solicitudes_estandar"]
-
-        match_stage = {}
-        if current_user.role != "admin":
-            match_stage = {"$match": {"solicitante_email": current_user.email}}
+        if desde or hasta:
+            return await _estadisticas_detalle_ventana(solicitudes, current_user, desde, hasta)
 
-        # Group by estado
-        pipeline_estado = []
-        if match_stage:
-            pipeline_estado.append(match_stage)
-        pipeline_estado.extend([
-            {"$group": {"_id": "$estado", "count": {"$sum": 1}, "total_monto": {"$sum": {"$ifNull": ["$monto", 0]}}}},
-            {"$sort": {"count": -1}}
-        ])
-        by_state = list(collection.aggregate(pipeline_estado))
-
-        # Group by tipo_pago
-        pipeline_tipo = []
-        if match_stage:
-            pipeline_tipo.append(match_stage)
-        pipeline_tipo.extend([
-            {"$group": {"_id": "$tipo_pago", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ])
-        by_type = list(collection.aggregate(pipeline_tipo))
-
-        # Group by month (fecha_creacion)
-        pipeline_month = []
-        if match_stage:
-            pipeline_month.append(match_stage)
-        pipeline_month.extend([
-            {"$project": {"year": {"$year": "$fecha_creacion"}, "month": {"$month": "$fecha_creacion"}}},
-            {"$group": {"_id": {"year": "$year", "month": "$month"}, "count": {"$sum": 1}}},
-            {"$sort": {"_id.year": 1, "_id.month": 1}}
-        ])
-        by_month = list(collection.aggregate(pipeline_month))
+        # Sin ventana: un solo documento de contadores materializados (global o del solicitante)
+        ambito = "global" if current_user.role == "admin" else f"solicitante:{current_user.email}"
+        stats = await solicitudes.stats.obtener(ambito)
 
-        # Summary totals (reuse simple aggregation)
-        summary_pipeline = []
-        if match_stage:
-            summary_pipeline.append(match_stage)
-        summary_pipeline.append({"$group": {"_id": None, "total": {"$sum": 1}, "monto_total": {"$sum": {"$ifNull": ["$monto", 0]}}}})
-        summary_res = list(collection.aggregate(summary_pipeline))
-        summary = summary_res[0] if summary_res else {"total": 0, "monto_total": 0}
+        by_state = agrupado(stats, "estado", con_monto=True)
+        by_type = agrupado(stats, "tipo_pago")
+        by_month = por_mes(stats, "mes_creacion")
 
         return {
             "by_state": by_state,
             "by_type": by_type,
             "by_month": by_month,
-            "summary": {"total": summary.get("total", 0), "monto_total": summary.get("monto_total", 0)}
+            "summary": {
+                "total": sum(item["count"] for item in by_state),
+                "monto_total": round(sum(item["total_monto"] for item in by_state), 2)
+            }
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener estadísticas detalladas: {str(e)}")
 
+
+async def _estadisticas_detalle_ventana(solicitudes: SolicitudDB, current_user: UserResponse, desde, hasta):
+    """Estadísticas detalladas de una ventana de fechas en una sola pasada ($facet)"""
+    # El rango sobre fecha_creacion usa los índices (fecha_creacion, _id) y (solicitante_email, fecha_creacion)
+    query = {"fecha_creacion": rango_fechas(desde, hasta)}
+    if current_user.role != "admin":
+        query["solicitante_email"] = current_user.email
+
+    resultado = await solicitudes.facet(query, {
+        "by_state": [
+            {"$group": {"_id": "$estado", "count": {"$sum": 1}, "total_monto": {"$sum": {"$ifNull": ["$monto", 0]}}}},
+            {"$sort": {"count": -1}}
+        ],
+        "by_type": [
+            {"$group": {"_id": "$tipo_pago", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}}
+        ],
+        "by_month": [
+            {"$group": {"_id": {"year": {"$year": "$fecha_creacion"}, "month": {"$month": "$fecha_creacion"}}, "count": {"$sum": 1}}},
+            {"$sort": {"_id.year": 1, "_id.month": 1}}
+        ],
+        "summary": [
+            {"$group": {"_id": None, "total": {"$sum": 1}, "monto_total": {"$sum": {"$ifNull": ["$monto", 0]}}}}
+        ]
+    })
+    summary = resultado["summary"][0] if resultado["summary"] else {"total": 0, "monto_total": 0}
+
+    return {
+        "by_state": resultado["by_state"],
+        "by_type": resultado["by_type"],
+        "by_month": resultado["by_month"],
+        "summary": {"total": summary.get("total", 0), "monto_total": summary.get("monto_total", 0)}
+    }
+
 @router.post("/upload-files/{solicitud_id}", summary="Subir archivos a una solicitud")
 async def subir_archivos(
     solicitud_id: str,
+    request: Request,
     files: List[UploadFile] = File(...),
     current_user: UserResponse = Depends(get_current_user),
-    db = Depends(get_database)
+    solicitudes: SolicitudDB = Depends(get_solicitud_db),
+    blobs: BlobStore = Depends(get_blob_store)
 ):
     """
     Subir archivos adjuntos a una solicitud
+    (límites UPLOAD_MAX_FILE_BYTES por archivo y UPLOAD_MAX_REQUEST_BYTES por petición)
     """
     try:
-        collection = db["solicitudes_estandar"]
-        
+        verificar_content_length(request)
+
         # Verificar que la solicitud existe
-        solicitud = collection.find_one({
-            "_id": ObjectId(solicitud_id)
-        })
+        solicitud = await solicitudes.find_by_id(solicitud_id)
         
         if not solicitud:
             raise HTTPException(status_code=404, detail="Solicitud no encontrada")
@@ -325,44 +324,42 @@ async def subir_archivos(
         if solicitud.get("solicitante_email") != current_user.email and current_user.role != "admin":
             raise HTTPException(status_code=403, detail="No tienes permisos para subir archivos a esta solicitud")
         
-        # Procesar archivos
+        # Guardar archivos (contenido idéntico se almacena una sola vez)
+        guardados = await blobs.guardar(files)
+
         archivos_guardados = []
-        for file in files:
-            # Generar nombre único
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{timestamp}_{file.filename}"
-            filepath = os.path.join(UPLOAD_DIR, filename)
-            
-            # Guardar archivo
-            with open(filepath, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-            
+        for file, guardado in zip(files, guardados):
             # Información del archivo
             archivo_info = {
                 "nombre_archivo": file.filename,
                 "tipo_archivo": file.content_type,
-                "tamaño": len(content),
-                "ruta_archivo": filename,  # Solo el nombre del archivo, no la ruta completa
+                "tamaño": guardado["tamaño"],
+                "sha256": guardado["sha256"],
+                "ruta_archivo": guardado["nombre"],  # Nombre del blob (<sha256><ext>), no la ruta completa
                 "fecha_subida": datetime.utcnow()
             }
             
             archivos_guardados.append(archivo_info)
         
         # Actualizar solicitud con archivos
-        collection.update_one(
-            {"_id": ObjectId(solicitud_id)},
-            {
-                "$push": {"archivos_adjuntos": {"$each": archivos_guardados}},
-                "$set": {"fecha_actualizacion": datetime.utcnow()}
-            }
-        )
+        try:
+            await solicitudes.push_archivos(
+                solicitud_id,
+                "archivos_adjuntos",
+                archivos_guardados,
+                {"fecha_actualizacion": datetime.utcnow()}
+            )
+        except Exception:
+            await blobs.liberar(g["sha256"] for g in guardados)
+            raise
         
         return {
             "message": f"{len(archivos_guardados)} archivos subidos exitosamente",
             "archivos": archivos_guardados
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al subir archivos: {str(e)}")
 
@@ -370,16 +367,14 @@ async def subir_archivos(
 async def obtener_solicitud_por_id(
     solicitud_id: str,
     current_user: UserResponse = Depends(get_current_user),
-    db = Depends(get_database)
+    solicitudes: SolicitudDB = Depends(get_solicitud_db)
 ):
     """
     Obtener una solicitud estándar específica por ID
     """
     try:
-        collection = db["solicitudes_estandar"]
-        
         # Buscar la solicitud
-        solicitud = collection.find_one({"_id": ObjectId(solicitud_id)})
+        solicitud = await solicitudes.find_by_id(solicitud_id)
         
         if not solicitud:
             raise HTTPException(status_code=404, detail="Solicitud no encontrada")
@@ -400,22 +395,111 @@ async def obtener_solicitud_por_id(
             raise e
         raise HTTPException(status_code=500, detail=f"Error al obtener solicitud: {str(e)}")
 
+@router.get("/estandar/{solicitud_id}/archivos.zip", summary="Descargar todos los archivos adjuntos en un ZIP")
+async def descargar_archivos_zip(
+    solicitud_id: str,
+    current_user: UserResponse = Depends(get_current_user_or_cookie),
+    solicitudes: SolicitudDB = Depends(get_solicitud_db)
+):
+    """
+    Descargar los `archivos_adjuntos` de una solicitud en un solo ZIP.
+
+    El ZIP se genera al vuelo mientras se envía (sin archivo temporal); los
+    PDF e imágenes se guardan sin recomprimir. Mismos permisos que ver la
+    solicitud.
+    """
+    if not ObjectId.is_valid(solicitud_id):
+        raise HTTPException(status_code=404, detail="Solicitud no encontrada")
+
+    solicitud = await solicitudes.find_by_id(solicitud_id, {"solicitante_email": 1, "folio": 1, "archivos_adjuntos": 1})
+    if not solicitud:
+        raise HTTPException(status_code=404, detail="Solicitud no encontrada")
+
+    if (current_user.role not in ["admin", "aprobador", "pagador"] and
+        solicitud.get("solicitante_email") != current_user.email):
+        raise HTTPException(status_code=403, detail="No tienes permisos para ver esta solicitud")
+
+    archivos = [
+        (ruta_adjunto(a["ruta_archivo"]), nombre_seguro(a.get("nombre_archivo") or a["ruta_archivo"]))
+        for a in solicitud.get("archivos_adjuntos") or []
+        if a.get("ruta_archivo")
+    ]
+    if not archivos:
+        raise HTTPException(status_code=404, detail="La solicitud no tiene archivos adjuntos")
+
+    return respuesta_zip(archivos, f"solicitud_{solicitud.get('folio') or solicitud_id}_adjuntos.zip")
+
+@router.api_route("/estandar/{solicitud_id}/archivos/{nombre}", methods=["GET", "HEAD"], summary="Descargar archivo adjunto o comprobante de pago")
+async def descargar_archivo(
+    solicitud_id: str,
+    nombre: str,
+    descargar: bool = Query(False, description="Content-Disposition: attachment en lugar de inline (sólo PDF e imágenes se sirven inline)"),
+    current_user: UserResponse = Depends(get_current_user_or_cookie),
+    solicitudes: SolicitudDB = Depends(get_solicitud_db)
+):
+    """
+    Descargar un archivo de `archivos_adjuntos` o `comprobantes_pago`.
+
+    `nombre` es `ruta_archivo` (adjuntos) o `nombre_guardado` (comprobantes).
+    Mismos permisos que ver la solicitud. Acepta el token Bearer o la cookie
+    de sesión, así que sirve directo en <a>, <img> e <iframe>. Soporta Range,
+    ETag / If-None-Match y Last-Modified / If-Modified-Since. Sólo PDF e
+    imágenes se sirven inline; el resto siempre como descarga (ver
+    app.utils.descargas).
+    """
+    if not ObjectId.is_valid(solicitud_id):
+        raise HTTPException(status_code=404, detail="Solicitud no encontrada")
+
+    solicitud = await solicitudes.find_by_id(
+        solicitud_id,
+        {"solicitante_email": 1, "archivos_adjuntos": 1, "comprobantes_pago": 1}
+    )
+    if not solicitud:
+        raise HTTPException(status_code=404, detail="Solicitud no encontrada")
+
+    if (current_user.role not in ["admin", "aprobador", "pagador"] and
+        solicitud.get("solicitante_email") != current_user.email):
+        raise HTTPException(status_code=403, detail="No tienes permisos para ver esta solicitud")
+
+    # Sólo se sirven archivos referenciados por la solicitud, nunca una ruta arbitraria
+    for archivo in solicitud.get("archivos_adjuntos") or []:
+        if archivo.get("ruta_archivo") == nombre:
+            ruta = ruta_adjunto(nombre)
+            nombre_original = archivo.get("nombre_archivo") or nombre
+            tipo = archivo.get("tipo_archivo")
+            break
+    else:
+        for archivo in solicitud.get("comprobantes_pago") or []:
+            if archivo.get("nombre_guardado") == nombre:
+                ruta = ruta_comprobante(solicitud_id, nombre)
+                nombre_original = archivo.get("nombre") or nombre
+                tipo = archivo.get("tipo")
+                break
+        else:
+            raise HTTPException(status_code=404, detail="Archivo no encontrado")
+
+    return ArchivoResponse(
+        ruta,
+        nombre_original,
+        media_type=tipo or mimetypes.guess_type(nombre_original)[0],
+        sha256=archivo.get("sha256") if NOMBRE_BLOB.match(nombre) else None,
+        descargar=descargar
+    )
+
 @router.put("/estandar/{solicitud_id}", summary="Actualizar solicitud estándar")
 async def actualizar_solicitud_estandar(
     solicitud_id: str,
     solicitud_update: SolicitudEstandarUpdate,
     current_user: UserResponse = Depends(get_current_user),
-    db = Depends(get_database)
+    solicitudes: SolicitudDB = Depends(get_solicitud_db)
 ):
     """
     Actualizar una solicitud estándar existente
     Solo el creador puede actualizar si está en estado borrador o pendiente
     """
     try:
-        collection = db["solicitudes_estandar"]
-        
         # Buscar la solicitud
-        solicitud_existente = collection.find_one({"_id": ObjectId(solicitud_id)})
+        solicitud_existente = await solicitudes.find_by_id(solicitud_id)
         
         if not solicitud_existente:
             raise HTTPException(status_code=404, detail="Solicitud no encontrada")
@@ -439,16 +523,13 @@ async def actualizar_solicitud_estandar(
         update_data["fecha_actualizacion"] = datetime.utcnow()
         
         # Realizar actualización
-        result = collection.update_one(
-            {"_id": ObjectId(solicitud_id)},
-            {"$set": update_data}
-        )
+        modificadas = await solicitudes.update_fields(solicitud_id, update_data)
         
-        if result.modified_count == 0:
+        if modificadas == 0:
             raise HTTPException(status_code=400, detail="No se realizaron cambios")
         
         # Obtener solicitud actualizada
-        solicitud_actualizada = collection.find_one({"_id": ObjectId(solicitud_id)})
+        solicitud_actualizada = await solicitudes.find_by_id(solicitud_id)
         solicitud_actualizada["id"] = str(solicitud_actualizada["_id"])
         del solicitud_actualizada["_id"]
         
@@ -466,17 +547,16 @@ async def actualizar_solicitud_estandar(
 async def eliminar_solicitud_estandar(
     solicitud_id: str,
     current_user: UserResponse = Depends(get_current_user),
-    db = Depends(get_database)
+    solicitudes: SolicitudDB = Depends(get_solicitud_db),
+    blobs: BlobStore = Depends(get_blob_store)
 ):
     """
     Eliminar una solicitud estándar
     Solo el creador puede eliminar si está en estado borrador
     """
     try:
-        collection = db["solicitudes_estandar"]
-        
         # Buscar la solicitud
-        solicitud = collection.find_one({"_id": ObjectId(solicitud_id)})
+        solicitud = await solicitudes.find_by_id(solicitud_id)
         
         if not solicitud:
             raise HTTPException(status_code=404, detail="Solicitud no encontrada")
@@ -490,24 +570,22 @@ async def eliminar_solicitud_estandar(
         if estado_actual != "borrador":
             raise HTTPException(status_code=400, detail="Solo se pueden eliminar solicitudes en estado borrador")
         
-        # Eliminar archivos asociados si existen
-        archivos = solicitud.get("archivos_adjuntos", [])
-        for archivo in archivos:
-            ruta_archivo = archivo.get("ruta_archivo")
-            if ruta_archivo:
-                archivo_path = os.path.join(UPLOAD_DIR, ruta_archivo)
-                if os.path.exists(archivo_path):
-                    try:
-                        os.remove(archivo_path)
-                    except Exception as e:
-                        print(f"Error eliminando archivo {archivo_path}: {e}")
-        
         # Eliminar solicitud de la base de datos
-        result = collection.delete_one({"_id": ObjectId(solicitud_id)})
+        eliminadas = await solicitudes.delete(solicitud_id)
         
-        if result.deleted_count == 0:
+        if eliminadas == 0:
             raise HTTPException(status_code=400, detail="No se pudo eliminar la solicitud")
         
+        # Liberar archivos asociados: sólo se borran los que nadie más referencia
+        try:
+            await blobs.liberar_archivos(solicitud.get("archivos_adjuntos", []), directorio_legado=UPLOAD_DIR)
+            await blobs.liberar_archivos(
+                solicitud.get("comprobantes_pago", []),
+                directorio_legado=os.path.join(COMPROBANTES_DIR, solicitud_id)
+            )
+        except Exception as e:
+            print(f"Error liberando archivos de la solicitud {solicitud_id}: {e}")
+        
         return {"message": "Solicitud eliminada exitosamente"}
         
     except Exception as e:
@@ -521,20 +599,26 @@ async def obtener_todas_solicitudes(
     departamento: Optional[str] = None,
     limit: int = 50,
     skip: int = 0,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     current_user: UserResponse = Depends(get_current_user),
-    db = Depends(get_database)
+    solicitudes: SolicitudDB = Depends(get_solicitud_db)
 ):
     """
     Obtener todas las solicitudes con filtros opcionales
     Solo para usuarios con rol admin, aprobador o pagador
+
+    Paginación:
+    - cursor: valor opaco `next_cursor` de la página anterior (keyset sobre
+      fecha_creacion + _id). Si se envía, `skip` se ignora.
+    - include_total=false: omite el count_documents; sin filtros devuelve el
+      total estimado de la colección (`total_estimado: true`)
     """
     try:
         # Verificar permisos
         if current_user.role not in ["admin", "aprobador", "pagador"]:
             raise HTTPException(status_code=403, detail="No tienes permisos para ver todas las solicitudes")
         
-        collection = db["solicitudes_estandar"]
-        
         # Construir filtros
         filtros = {}
         if estado:
@@ -542,23 +626,42 @@ async def obtener_todas_solicitudes(
         if departamento:
             filtros["departamento"] = departamento
         
+        # Filtro del cursor (keyset) en lugar de skip
+        consulta = filtros
+        if cursor:
+            try:
+                valor, ultimo_id = decode_cursor(cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            consulta = combine_filters(filtros, keyset_filter("fecha_creacion", valor, ultimo_id))
+            skip = 0
+        
         # Obtener solicitudes con paginación
-        cursor = collection.find(filtros).sort("fecha_creacion", -1).skip(skip).limit(limit)
-        solicitudes = list(cursor)
+        pagina = await solicitudes.find(consulta, sort=keyset_sort("fecha_creacion"), skip=skip, limit=limit)
+        siguiente = next_cursor(pagina, "fecha_creacion", limit)
         
         # Convertir ObjectId a string
-        for solicitud in solicitudes:
+        for solicitud in pagina:
             solicitud["id"] = str(solicitud["_id"])
             del solicitud["_id"]
         
         # Obtener total para paginación
-        total = collection.count_documents(filtros)
+        total_estimado = False
+        if include_total:
+            total = await solicitudes.count(filtros)
+        elif not filtros:
+            total = await solicitudes.estimated_count()
+            total_estimado = True
+        else:
+            total = None
         
         return {
-            "solicitudes": solicitudes,
+            "solicitudes": pagina,
             "total": total,
+            "total_estimado": total_estimado,
             "skip": skip,
-            "limit": limit
+            "limit": limit,
+            "next_cursor": siguiente
         }
         
     except Exception as e:
@@ -572,17 +675,15 @@ async def cambiar_estado_solicitud(
     nuevo_estado: EstadoSolicitud,
     comentarios: Optional[str] = None,
     current_user: UserResponse = Depends(get_current_user),
-    db = Depends(get_database)
+    solicitudes: SolicitudDB = Depends(get_solicitud_db)
 ):
     """
     Cambiar el estado de una solicitud estándar
     Solo usuarios con permisos específicos pueden cambiar estados
     """
     try:
-        collection = db["solicitudes_estandar"]
-        
         # Buscar la solicitud
-        solicitud = collection.find_one({"_id": ObjectId(solicitud_id)})
+        solicitud = await solicitudes.find_by_id(solicitud_id)
         
         if not solicitud:
             raise HTTPException(status_code=404, detail="Solicitud no encontrada")
@@ -631,12 +732,9 @@ async def cambiar_estado_solicitud(
             update_data["comentarios_" + current_user.role] = comentarios
         
         # Realizar actualización
-        result = collection.update_one(
-            {"_id": ObjectId(solicitud_id)},
-            {"$set": update_data}
-        )
+        modificadas = await solicitudes.update_fields(solicitud_id, update_data)
         
-        if result.modified_count == 0:
+        if modificadas == 0:
             raise HTTPException(status_code=400, detail="No se pudo actualizar el estado")
         
         return {
@@ -14,26 +14,43 @@ router = APIRouter()
 
 # Configurar seguridad
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 # Dependency para obtener usuario actual
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> UserResponse:
     """Obtener usuario actual desde el token"""
-    email = user_controller.verify_token(credentials.credentials)
-    if email is None:
+    payload = user_controller.decode_token(credentials.credentials)
+    if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = await user_controller.get_user_by_email(email)
+    user = await user_controller.get_user_principal(payload)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuario no encontrado"
         )
     
-    return UserResponse(**user.dict())
+    return user
+
+# Dependency para enlaces del navegador (<a>, <img>, <iframe>): no pueden
+# enviar Authorization, así que también se acepta la cookie access_token
+async def get_current_user_or_cookie(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> UserResponse:
+    """Obtener usuario actual desde el token Bearer o la cookie de sesión"""
+    token = credentials.credentials if credentials else request.cookies.get("access_token")
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="No autenticado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
 
 # Dependency para verificar si es admin
 async def get_current_admin_user(current_user: UserResponse = Depends(get_current_user)) -> UserResponse:
@@ -142,13 +159,15 @@ async def get_users(
     search: Optional[str] = Query(None, description="Buscar por nombre, apellido, email o departamento"),
     role: Optional[UserRole] = Query(None, description="Filtrar por rol"),
     status: Optional[UserStatus] = Query(None, description="Filtrar por estado"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (next_cursor de la respuesta anterior)"),
+    include_total: bool = Query(True, description="Calcular el total exacto (más costoso en colecciones grandes)"),
     current_admin: UserResponse = Depends(get_current_admin_user)
 ):
     """
     Obtener lista de usuarios con paginación y filtros.
     Solo los administradores pueden listar usuarios.
     """
-    return await user_controller.get_users(page, limit, search, role, status)
+    return await user_controller.get_users(page, limit, search, role, status, cursor, include_total)
 
 @router.get("/stats", summary="Obtener estadísticas básicas de usuarios")
 async def get_user_stats(current_user: UserResponse = Depends(get_current_user)):
@@ -158,7 +177,7 @@ async def get_user_stats(current_user: UserResponse = Depends(get_current_user))
     """
     try:
         # Obtener total de usuarios
-        total_users = user_controller.collection.count_documents({})
+        total_users = await user_controller.users.count()
         
         # Crear respuesta con estadísticas básicas
         stats = {
@@ -0,0 +1,127 @@
+"""
+Precomputed user analytics exported by spark/spark_mongo_analytics.py.
+
+The Spark export writes one Parquet dataset per result under
+`ANALYTICS_RESULTS_DIR` and, once every dataset is complete, a JSON manifest
+in `_SUCCESS` (see spark/analysis_results.py). The admin dashboards read the
+role, department and daily-registration results from there instead of
+running a $group over the whole users collection on every request.
+
+Results are used only while the manifest is newer than
+`ANALYTICS_RESULTS_MAX_AGE_HOURS` (0 disables them) and its `source` names
+the application's own database (`DATABASE_NAME`) and the users collection;
+an export computed from another database, or one without a source, is
+ignored. Each dataset is read once per export and kept in memory; `fetch()`
+does that read in the threadpool so request handlers never block the event
+loop on Parquet I/O. PyArrow is optional: without it, or without a matching
+fresh export, `rows()` returns None and callers run the live aggregation.
+"""
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # dashboards keep using live MongoDB aggregations
+    pq = None
+
+from app.config.settings import settings
+
+MANIFEST_FILE = "_SUCCESS"
+SOURCE_COLLECTION = "users"
+
+
+class AnalyticsResults:
+    def __init__(self, directory: str, max_age_hours: float, database: str,
+                 collection: str = SOURCE_COLLECTION):
+        self.directory = directory
+        self.max_age_hours = max_age_hours
+        self.database = database
+        self.collection = collection
+        self._lock = threading.Lock()
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._manifest_mtime: Optional[float] = None
+        self._rows: Dict[str, List[Dict[str, Any]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def available(self) -> bool:
+        return pq is not None and self.max_age_hours > 0
+
+    def _load_manifest(self) -> Optional[Dict[str, Any]]:
+        """Current manifest; re-read (and the dataset cache dropped) when _SUCCESS changes"""
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            self._manifest, self._manifest_mtime, self._rows = None, None, {}
+            return None
+        if mtime != self._manifest_mtime:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except ValueError:  # empty _SUCCESS written by Spark itself: not our export
+                manifest = None
+            self._manifest = manifest if isinstance(manifest, dict) and manifest.get("datasets") else None
+            self._manifest_mtime = mtime
+            self._rows = {}
+        return self._manifest
+
+    def _same_source(self, manifest: Dict[str, Any]) -> bool:
+        source = manifest.get("source") or {}
+        return source.get("database") == self.database and source.get("collection") == self.collection
+
+    def _age_hours(self, manifest: Dict[str, Any]) -> float:
+        generated_at = datetime.fromisoformat(manifest["generated_at"])
+        return (datetime.now(timezone.utc) - generated_at).total_seconds() / 3600
+
+    def rows(self, name: str) -> Optional[List[Dict[str, Any]]]:
+        """Rows of a precomputed dataset, or None when it must be computed live"""
+        if not self.available():
+            return None
+        with self._lock:
+            manifest = self._load_manifest()
+            entry = manifest["datasets"].get(name) if manifest else None
+            if (entry is None or not self._same_source(manifest)
+                    or self._age_hours(manifest) > self.max_age_hours):
+                self.misses += 1
+                return None
+            if name not in self._rows:
+                table = pq.read_table(os.path.join(self.directory, entry["path"]))
+                self._rows[name] = table.to_pylist()
+            self.hits += 1
+            return self._rows[name]
+
+    async def fetch(self, name: str) -> Optional[List[Dict[str, Any]]]:
+        """rows() from async code: the manifest check and Parquet read run in the threadpool"""
+        if not self.available():
+            return None
+        return await run_in_threadpool(self.rows, name)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            manifest = self._load_manifest() if pq is not None else None
+            return {
+                "enabled": self.available(),
+                "directory": self.directory,
+                "max_age_hours": self.max_age_hours,
+                "source": manifest.get("source") if manifest else None,
+                "source_matches": self._same_source(manifest) if manifest else None,
+                "generated_at": manifest["generated_at"] if manifest else None,
+                "age_hours": round(self._age_hours(manifest), 2) if manifest else None,
+                "datasets": {
+                    name: {"rows": entry["rows"], "files": entry["files"], "loaded": name in self._rows}
+                    for name, entry in (manifest or {}).get("datasets", {}).items()
+                },
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+analytics_results = AnalyticsResults(
+    settings.ANALYTICS_RESULTS_DIR, settings.ANALYTICS_RESULTS_MAX_AGE_HOURS, settings.DATABASE_NAME
+)
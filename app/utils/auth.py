@@ -8,15 +8,15 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     """
     Obtener usuario actual desde el token JWT
     """
-    email = user_controller.verify_token(credentials.credentials)
-    if email is None:
+    payload = user_controller.decode_token(credentials.credentials)
+    if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido o expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = await user_controller.get_user_by_email(email)
+    user = await user_controller.get_user_principal(payload)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,180 @@
+"""
+Almacén de archivos direccionado por contenido (adjuntos y comprobantes).
+
+Cada archivo se guarda una sola vez con el nombre `<sha256><ext>` en
+BLOB_DIR, sin importar cuántas solicitudes o comprobantes lo referencien. La
+colección `archivos_blob` lleva el conteo de referencias:
+
+    {_id: sha256, nombre: "<sha256>.pdf", tamaño, refs, fecha_creacion}
+
+`guardar` suma una referencia por archivo subido y `liberar` la resta; el
+archivo físico se elimina sólo cuando ya nadie lo referencia.
+
+Altas y bajas se coordinan a través del propio documento (vale entre workers):
+quien deja `refs` en 0 lo marca `borrando` antes de eliminar el archivo y
+después borra el documento; mientras tanto un alta del mismo contenido no
+puede sumar su referencia y reintenta, así que nunca queda un blob con
+referencias y sin archivo en disco.
+
+BLOB_DIR (`uploads/solicitudes`) no está montado como estático: los archivos
+sólo se sirven por la ruta autorizada de la solicitud (`url_archivo`), que
+verifica permisos; los comprobantes guardan esa URL en `ruta`.
+"""
+import asyncio
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+from urllib.parse import quote
+
+from fastapi import UploadFile
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from starlette.concurrency import run_in_threadpool
+
+from app.utils.uploads import descartar, nombre_seguro, recibir_archivos
+
+BLOB_DIR = os.path.join("uploads", "solicitudes")
+BLOB_COLLECTION = "archivos_blob"
+
+# Comprobantes subidos antes del almacén: static/uploads/comprobantes/<solicitud_id>/
+COMPROBANTES_DIR = os.path.join("static", "uploads", "comprobantes")
+
+NOMBRE_BLOB = re.compile(r"^[0-9a-f]{64}(\.[^/\\]*)?$")
+
+# Un alta que encuentra el blob en baja reintenta; si la marca `borrando` tiene
+# más de este tiempo, el proceso que la puso murió y el alta toma su lugar
+REINTENTO_SEGUNDOS = 0.05
+BORRADO_VENCIDO = timedelta(seconds=60)
+
+
+def url_archivo(solicitud_id: str, nombre: str) -> str:
+    """URL de descarga autorizada de un adjunto (`ruta_archivo`) o comprobante (`nombre_guardado`)"""
+    return f"/api/solicitudes/estandar/{solicitud_id}/archivos/{quote(nombre, safe='')}"
+
+
+def ruta_adjunto(nombre: str) -> str:
+    """Ruta en disco de un adjunto (`ruta_archivo`): blob o nombre anterior, mismo directorio"""
+    return os.path.join(BLOB_DIR, nombre_seguro(nombre))
+
+
+def ruta_comprobante(solicitud_id: str, nombre: str) -> str:
+    """Ruta en disco de un comprobante (`nombre_guardado`)"""
+    if NOMBRE_BLOB.match(nombre):
+        return os.path.join(BLOB_DIR, nombre)
+    return os.path.join(COMPROBANTES_DIR, nombre_seguro(solicitud_id), nombre_seguro(nombre))
+
+
+def extension(filename: Optional[str]) -> str:
+    """Extensión en minúsculas del nombre original ('' si no tiene)"""
+    return os.path.splitext(nombre_seguro(filename))[1].lower()[:16]
+
+
+class BlobStore:
+    def __init__(self, db, directorio: str = BLOB_DIR):
+        self.collection = db[BLOB_COLLECTION]
+        self.directorio = directorio
+
+    def ruta(self, nombre: str) -> str:
+        """Ruta en disco de un blob"""
+        return os.path.join(self.directorio, nombre)
+
+    async def guardar(self, archivos: List[UploadFile]) -> List[dict]:
+        """
+        Guardar los archivos de una petición (streaming + límites de app.utils.uploads).
+        Devuelve, en el mismo orden, {"nombre", "sha256", "tamaño", "nuevo"}.
+        """
+        recibidos = await recibir_archivos(archivos, self.directorio)
+        guardados = []
+        try:
+            for archivo, recibido in zip(archivos, recibidos):
+                guardados.append(await self._publicar(recibido, extension(archivo.filename)))
+            return guardados
+        except BaseException:
+            for recibido in recibidos[len(guardados):]:
+                descartar(recibido["temporal"])
+            await self.liberar(g["sha256"] for g in guardados)
+            raise
+
+    async def _publicar(self, recibido: dict, ext: str) -> dict:
+        sha256 = recibido["sha256"]
+        # Primero la referencia, después el archivo: mientras refs > 0 ninguna
+        # baja elimina el archivo
+        doc = await self._sumar_referencia(sha256, ext, recibido["tamaño"])
+        destino = self.ruta(doc["nombre"])
+        nuevo = not await run_in_threadpool(os.path.exists, destino)
+        if nuevo:
+            await run_in_threadpool(os.replace, recibido["temporal"], destino)
+        else:
+            # Contenido idéntico ya almacenado: basta con la referencia
+            await run_in_threadpool(descartar, recibido["temporal"])
+        return {"nombre": doc["nombre"], "sha256": sha256, "tamaño": recibido["tamaño"], "nuevo": nuevo}
+
+    async def _sumar_referencia(self, sha256: str, ext: str, tamaño: int) -> dict:
+        while True:
+            try:
+                return await self.collection.find_one_and_update(
+                    {"_id": sha256, "borrando": {"$exists": False}},
+                    {
+                        "$inc": {"refs": 1},
+                        "$setOnInsert": {
+                            "nombre": f"{sha256}{ext}",
+                            "tamaño": tamaño,
+                            "fecha_creacion": datetime.utcnow()
+                        }
+                    },
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                # El documento existe marcado `borrando`: esperar a que la baja termine
+                vencido = await self.collection.delete_one(
+                    {"_id": sha256, "borrando": {"$lt": datetime.utcnow() - BORRADO_VENCIDO}}
+                )
+                if not vencido.deleted_count:
+                    await asyncio.sleep(REINTENTO_SEGUNDOS)
+
+    async def liberar(self, hashes: Iterable[str]) -> List[str]:
+        """
+        Quitar una referencia por cada hash; elimina los blobs que quedan sin
+        referencias. Devuelve los hashes que sí estaban en el almacén.
+        """
+        conocidos = []
+        for sha256 in hashes:
+            if not sha256:
+                continue
+            doc = await self.collection.find_one_and_update(
+                {"_id": sha256, "refs": {"$gt": 0}},
+                {"$inc": {"refs": -1}},
+                return_document=ReturnDocument.AFTER
+            )
+            if doc is None:
+                continue
+            conocidos.append(sha256)
+            if doc["refs"] > 0:
+                continue
+            # Sólo quien marca el documento (y sólo si nadie volvió a referenciarlo) borra el archivo
+            marcado = await self.collection.update_one(
+                {"_id": sha256, "refs": {"$lte": 0}, "borrando": {"$exists": False}},
+                {"$set": {"borrando": datetime.utcnow()}}
+            )
+            if marcado.modified_count:
+                await run_in_threadpool(descartar, self.ruta(doc["nombre"]))
+                await self.collection.delete_one({"_id": sha256, "borrando": {"$exists": True}})
+        return conocidos
+
+    async def liberar_archivos(self, archivos: Iterable[dict], directorio_legado: Optional[str] = None):
+        """
+        Liberar los archivos de una solicitud (adjuntos o comprobantes). Los que
+        no están en el almacén (subidos antes de la migración) se borran de
+        `directorio_legado` como antes.
+        """
+        archivos = list(archivos)
+        conocidos = set(await self.liberar(a.get("sha256") for a in archivos))
+        for archivo in archivos:
+            if archivo.get("sha256") in conocidos or not directorio_legado:
+                continue
+            nombre = archivo.get("ruta_archivo") or archivo.get("nombre_guardado")
+            # Nunca borrar por nombre un blob: puede estar referenciado por otra solicitud
+            if nombre and not NOMBRE_BLOB.match(nombre):
+                await run_in_threadpool(descartar, os.path.join(directorio_legado, nombre_seguro(nombre)))
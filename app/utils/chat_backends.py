@@ -0,0 +1,200 @@
+"""
+Pluggable answer backends for the chat.
+
+A backend turns a message into a ChatReply: the metadata the widget needs
+(resolved/source/admin_email) plus an async iterator of text deltas, so the
+streaming endpoint can forward the first tokens as soon as they exist.
+
+- MockBackend: the FAQ/intents/docs responder in llm_client, split into words.
+- LocalHTTPBackend: a local model server speaking the OpenAI-compatible
+  `/v1/chat/completions` streaming protocol (llama.cpp server, vLLM, Ollama or
+  scripts/local_llm_server.py). It uses asyncio streams, so there is no extra
+  dependency and cancelling the consumer closes the socket, which stops the
+  generation on the server.
+
+New providers subclass ChatBackend and register in BACKENDS.
+"""
+import asyncio
+import json
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Type
+from urllib.parse import urlsplit
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config.settings import settings
+from app.utils.knowledge import search_docs
+from app.utils.llm_client import generate_answer
+
+SYSTEM_PROMPT = (
+    "Eres el asistente del Sistema de Solicitudes de Pago. Responde en español, "
+    "de forma breve, usando solo el contexto de la documentación cuando sea relevante."
+)
+
+
+class ChatBackendError(Exception):
+    """The backend could not produce an answer (unreachable, bad response)"""
+
+
+@dataclass
+class ChatReply:
+    tokens: AsyncIterator[str]
+    meta: Dict = field(default_factory=dict)
+
+
+class ChatBackend(ABC):
+    name = "base"
+
+    @abstractmethod
+    async def reply(self, message: str, user: Optional[dict] = None) -> ChatReply:
+        """Start answering `message`; errors while streaming raise ChatBackendError"""
+
+
+def split_tokens(text: str) -> List[str]:
+    """Words with their trailing whitespace, so joining the deltas gives back text"""
+    return re.findall(r'\s*\S+\s*', text) or ([text] if text else [])
+
+
+async def _iterate(tokens: List[str]) -> AsyncIterator[str]:
+    for token in tokens:
+        yield token
+        await asyncio.sleep(0)
+
+
+class MockBackend(ChatBackend):
+    name = "mock"
+
+    async def reply(self, message: str, user: Optional[dict] = None) -> ChatReply:
+        # doc search may touch the disk (index refresh): keep it off the event loop
+        resp = await run_in_threadpool(generate_answer, message, user)
+        meta = {k: resp.get(k) for k in ("resolved", "source", "admin_email")}
+        return ChatReply(tokens=_iterate(split_tokens(resp.get("answer") or "")), meta=meta)
+
+
+class LocalHTTPBackend(ChatBackend):
+    name = "http"
+
+    def __init__(self, url: str, model: str, context_snippets: int = 3):
+        parts = urlsplit(url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError(f"CHAT_BACKEND_URL debe ser http://host:puerto/ruta: {url!r}")
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = parts.path or "/v1/chat/completions"
+        self.model = model
+        self.context_snippets = context_snippets
+
+    def build_messages(self, message: str) -> List[dict]:
+        try:
+            hits = search_docs(message, top_k=self.context_snippets)
+        except Exception:
+            hits = []
+        system = SYSTEM_PROMPT
+        if hits:
+            system += "\n\nContexto:\n" + "\n".join(f"- {snippet}" for _, snippet, _ in hits)
+        return [{"role": "system", "content": system}, {"role": "user", "content": message}]
+
+    async def reply(self, message: str, user: Optional[dict] = None) -> ChatReply:
+        messages = await run_in_threadpool(self.build_messages, message)
+        body = json.dumps({"model": self.model, "messages": messages, "stream": True}).encode("utf-8")
+        return ChatReply(tokens=self._stream(body), meta={"resolved": True, "source": "llm", "admin_email": None})
+
+    async def _stream(self, body: bytes) -> AsyncIterator[str]:
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError as exc:
+            raise ChatBackendError(f"No se pudo conectar con {self.url}: {exc}") from exc
+        try:
+            writer.write(
+                f"POST {self.path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                "Content-Type: application/json\r\nAccept: text/event-stream\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+
+            status_line = await reader.readline()
+            status = status_line.split(b" ", 2)
+            if len(status) < 2 or status[1] != b"200":
+                raise ChatBackendError(f"{self.url} respondió {status_line.decode('latin-1').strip()!r}")
+            chunked = False
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.strip().lower() == "transfer-encoding" and "chunked" in value.lower():
+                    chunked = True
+
+            async for event in _sse_data(_body_lines(reader, chunked)):
+                if event == "[DONE]":
+                    return
+                try:
+                    choice = json.loads(event)["choices"][0]
+                except (ValueError, KeyError, IndexError) as exc:
+                    raise ChatBackendError(f"Respuesta inválida de {self.url}: {event[:200]!r}") from exc
+                delta = (choice.get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+                if choice.get("finish_reason"):
+                    return
+        except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+            # connection reset / truncated body / malformed chunk mid-stream
+            raise ChatBackendError(f"Error leyendo la respuesta de {self.url}: {exc!r}") from exc
+        finally:
+            # synchronous close: also runs when the consumer is cancelled
+            writer.close()
+
+
+async def _body_lines(reader: asyncio.StreamReader, chunked: bool) -> AsyncIterator[bytes]:
+    """Lines of an HTTP/1.1 body, de-chunking if needed"""
+    if not chunked:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            yield line
+    pending = b""
+    while True:
+        size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+        if size == 0:
+            break
+        pending += await reader.readexactly(size)
+        await reader.readline()  # CRLF after each chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line + b"\n"
+    if pending:
+        yield pending
+
+
+async def _sse_data(lines: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """`data:` payloads of a server-sent event stream"""
+    data: List[str] = []
+    async for raw in lines:
+        line = raw.decode("utf-8").rstrip("\r\n")
+        if not line:
+            if data:
+                yield "\n".join(data)
+                data = []
+        elif line.startswith("data:"):
+            data.append(line[5:].lstrip(" "))
+    if data:
+        yield "\n".join(data)
+
+
+BACKENDS: Dict[str, Type[ChatBackend]] = {
+    MockBackend.name: MockBackend,
+    LocalHTTPBackend.name: LocalHTTPBackend,
+}
+
+
+def get_backend(name: Optional[str] = None) -> ChatBackend:
+    name = name or settings.CHAT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"CHAT_BACKEND desconocido: {name!r} (opciones: {', '.join(BACKENDS)})")
+    if name == LocalHTTPBackend.name:
+        return LocalHTTPBackend(settings.CHAT_BACKEND_URL, settings.CHAT_BACKEND_MODEL)
+    return BACKENDS[name]()
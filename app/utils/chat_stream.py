@@ -0,0 +1,96 @@
+"""
+Limits and metrics for streamed chat answers.
+
+ChatStreamLimiter caps how many answers one user (or one anonymous client)
+can have streaming at the same time. ChatStreamMetrics keeps counters and a
+rolling window of time-to-first-token and tokens/sec samples.
+"""
+import json
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+def sse_event(event: str, data: dict) -> bytes:
+    """One server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+class StreamSlot:
+    """A held concurrency slot; release() is idempotent"""
+
+    def __init__(self, limiter: "ChatStreamLimiter", key: str):
+        self.limiter = limiter
+        self.key = key
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.limiter._release(self.key)
+
+
+class ChatStreamLimiter:
+    def __init__(self, max_per_user: int):
+        self.max_per_user = max_per_user
+        self._active: Dict[str, int] = {}
+
+    def acquire(self, key: str) -> Optional[StreamSlot]:
+        """A slot for key, or None if it already has max_per_user streams (0 = no limit)"""
+        current = self._active.get(key, 0)
+        if self.max_per_user > 0 and current >= self.max_per_user:
+            return None
+        self._active[key] = current + 1
+        return StreamSlot(self, key)
+
+    def _release(self, key: str):
+        current = self._active.get(key, 0) - 1
+        if current > 0:
+            self._active[key] = current
+        else:
+            self._active.pop(key, None)
+
+    def active(self) -> int:
+        return sum(self._active.values())
+
+
+def _percentile(samples, q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 2)
+
+
+class ChatStreamMetrics:
+    def __init__(self, window: int = 1000):
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.timed_out = 0
+        self.rejected = 0
+        self.errors = 0
+        self.tokens = 0
+        self.ttft_ms: Deque[float] = deque(maxlen=window)
+        self.tokens_per_second: Deque[float] = deque(maxlen=window)
+
+    def record_first_token(self, ttft_seconds: float):
+        self.ttft_ms.append(ttft_seconds * 1000)
+
+    def record_generation(self, tokens: int, seconds: float):
+        self.tokens += tokens
+        if tokens > 1 and seconds > 0:
+            self.tokens_per_second.append(tokens / seconds)
+
+    def stats(self) -> dict:
+        return {
+            "started": self.started,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "timed_out": self.timed_out,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "tokens": self.tokens,
+            "ttft_ms_p50": _percentile(self.ttft_ms, 0.5),
+            "ttft_ms_p95": _percentile(self.ttft_ms, 0.95),
+            "tokens_per_second_p50": _percentile(self.tokens_per_second, 0.5),
+            "tokens_per_second_p5": _percentile(self.tokens_per_second, 0.05),
+        }
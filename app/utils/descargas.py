@@ -0,0 +1,247 @@
+"""
+Respuesta de descarga de archivos con Range, ETag y Last-Modified.
+
+Starlette 0.27 no atiende `Range` ni las peticiones condicionales en
+FileResponse (sólo StaticFiles responde 304). ArchivoResponse:
+
+- responde 304 si `If-None-Match` / `If-Modified-Since` coinciden;
+- atiende un rango `bytes=` (206 / 416), respetando `If-Range`;
+- envía el archivo sin copiarlo a buffers de Python cuando el servidor ASGI
+  ofrece la extensión `http.response.zerocopy` (sendfile sobre el descriptor)
+  o `http.response.pathsend` (archivo completo por ruta). En otro caso se
+  lee por bloques en el threadpool, nunca el archivo completo en memoria.
+
+Los blobs del almacén (app.utils.blob_store) usan su SHA-256 como ETag
+fuerte; los archivos anteriores, uno débil a partir de tamaño y mtime.
+
+El tipo de contenido viene del cliente que subió el archivo, así que no es
+confiable: sólo PDF e imágenes rasterizadas (TIPOS_EN_LINEA) se sirven
+inline con su tipo; cualquier otro (text/html, SVG, inválido...) se fuerza a
+`attachment` como application/octet-stream. Siempre se envía
+`X-Content-Type-Options: nosniff`.
+"""
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+CHUNK_SIZE = 256 * 1024
+
+# Tipos que el navegador puede mostrar inline sin ejecutar script en el origen de la aplicación
+TIPOS_EN_LINEA = frozenset({"application/pdf", "image/png", "image/jpeg", "image/gif", "image/webp"})
+TIPO_GENERICO = "application/octet-stream"
+_TIPO_VALIDO = re.compile(r"^[a-z0-9][a-z0-9!#$&^_.+-]*/[a-z0-9][a-z0-9!#$&^_.+-]*$")
+
+
+def tipo_en_linea(media_type: Optional[str]) -> Optional[str]:
+    """El tipo normalizado (sin parámetros) si está en TIPOS_EN_LINEA; si no, None"""
+    if not isinstance(media_type, str):
+        return None
+    tipo = media_type.split(";", 1)[0].strip().lower()
+    if not _TIPO_VALIDO.match(tipo) or tipo not in TIPOS_EN_LINEA:
+        return None
+    return tipo
+
+
+def etag_para(st: os.stat_result, sha256: Optional[str] = None) -> str:
+    if sha256:
+        return f'"{sha256}"'
+    return f'W/"{st.st_size:x}-{int(st.st_mtime):x}"'
+
+
+def _coincide_etag(encabezado: str, etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110 13.1.2)"""
+    if encabezado.strip() == "*":
+        return True
+    propio = etag[2:] if etag.startswith("W/") else etag
+    for candidato in encabezado.split(","):
+        candidato = candidato.strip()
+        if (candidato[2:] if candidato.startswith("W/") else candidato) == propio:
+            return True
+    return False
+
+
+def _no_modificado_desde(encabezado: str, mtime: float) -> bool:
+    try:
+        return int(mtime) <= parsedate_to_datetime(encabezado).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def parsear_rango(encabezado: str, tamaño: int) -> Optional[Tuple[int, int]]:
+    """
+    Rango único `bytes=inicio-fin` como (inicio, fin) inclusivo.
+
+    Devuelve None si el encabezado no es un rango simple válido (se responde el
+    archivo completo, lo que RFC 9110 permite) y lanza ValueError si el rango
+    no es satisfacible (416).
+    """
+    unidad, _, especificacion = encabezado.partition("=")
+    if unidad.strip().lower() != "bytes" or "," in especificacion:
+        return None
+    inicio, guion, fin = especificacion.strip().partition("-")
+    inicio, fin = inicio.strip(), fin.strip()
+    if not guion or not (inicio or fin).isdigit() or (inicio and fin and not fin.isdigit()):
+        return None
+    if inicio == "":
+        # Sufijo: los últimos N bytes
+        sufijo = int(fin)
+        if sufijo == 0:
+            raise ValueError("Rango vacío")
+        return max(0, tamaño - sufijo), tamaño - 1
+    inicio = int(inicio)
+    if inicio >= tamaño:
+        raise ValueError("Rango fuera del archivo")
+    fin = int(fin) if fin else tamaño - 1
+    if inicio > fin:
+        return None
+    return inicio, min(fin, tamaño - 1)
+
+
+def content_disposition(nombre: str, descargar: bool) -> str:
+    tipo = "attachment" if descargar else "inline"
+    ascii_seguro = nombre.encode("ascii", "ignore").decode().replace('"', "") or "archivo"
+    return f"{tipo}; filename=\"{ascii_seguro}\"; filename*=utf-8''{quote(nombre)}"
+
+
+class ArchivoResponse(Response):
+    def __init__(
+        self,
+        ruta: str,
+        nombre: str,
+        media_type: Optional[str] = None,
+        sha256: Optional[str] = None,
+        descargar: bool = False,
+        cache_control: str = "private, max-age=0, must-revalidate",
+        background: Optional[BackgroundTask] = None,
+    ):
+        self.ruta = ruta
+        self.nombre = nombre
+        self.sha256 = sha256
+        self.status_code = 200
+        tipo = tipo_en_linea(media_type)
+        self.media_type = tipo or TIPO_GENERICO
+        self.background = background
+        self._disposition = content_disposition(nombre, descargar or tipo is None)
+        self._cache_control = cache_control
+        self.init_headers({})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            st = await anyio.to_thread.run_sync(os.stat, self.ruta)
+        except FileNotFoundError:
+            await Response("Archivo no encontrado", status_code=404)(scope, receive, send)
+            return
+        if not stat.S_ISREG(st.st_mode):
+            await Response("Archivo no encontrado", status_code=404)(scope, receive, send)
+            return
+
+        peticion = Headers(scope=scope)
+        etag = etag_para(st, self.sha256)
+        ultima_modificacion = formatdate(st.st_mtime, usegmt=True)
+        comunes = {
+            "etag": etag,
+            "last-modified": ultima_modificacion,
+            "cache-control": self._cache_control,
+            "accept-ranges": "bytes",
+            "x-content-type-options": "nosniff",
+        }
+
+        # Peticiones condicionales: If-None-Match tiene prioridad sobre If-Modified-Since
+        if_none_match = peticion.get("if-none-match")
+        if if_none_match is not None:
+            no_modificado = _coincide_etag(if_none_match, etag)
+        else:
+            no_modificado = _no_modificado_desde(peticion.get("if-modified-since"), st.st_mtime)
+        if no_modificado and scope["method"] in ("GET", "HEAD"):
+            await self._enviar_encabezados(send, 304, comunes)
+            return
+
+        tamaño = st.st_size
+        inicio, fin = 0, tamaño - 1
+        estado = 200
+        rango = peticion.get("range")
+        if rango and tamaño > 0 and self._if_range_valido(peticion.get("if-range"), etag, ultima_modificacion):
+            try:
+                seleccion = parsear_rango(rango, tamaño)
+            except ValueError:
+                await self._enviar_encabezados(send, 416, {**comunes, "content-range": f"bytes */{tamaño}"})
+                return
+            if seleccion is not None:
+                inicio, fin = seleccion
+                estado = 206
+                comunes["content-range"] = f"bytes {inicio}-{fin}/{tamaño}"
+
+        cantidad = max(0, fin - inicio + 1)
+        await self._enviar_encabezados(send, estado, {
+            **comunes,
+            "content-type": self.media_type,
+            "content-length": str(cantidad),
+            "content-disposition": self._disposition,
+        }, more_body=scope["method"] != "HEAD" and cantidad > 0)
+
+        if scope["method"] != "HEAD" and cantidad > 0:
+            await self._enviar_cuerpo(scope, send, inicio, cantidad, completo=(estado == 200))
+
+        if self.background is not None:
+            await self.background()
+
+    @staticmethod
+    def _if_range_valido(if_range: Optional[str], etag: str, ultima_modificacion: str) -> bool:
+        """Sin If-Range el rango aplica; con él, sólo si el validador no cambió"""
+        if if_range is None:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"'):
+            return if_range == etag  # comparación fuerte
+        return if_range == ultima_modificacion
+
+    @staticmethod
+    async def _enviar_encabezados(send: Send, estado: int, encabezados: dict, more_body: bool = False):
+        await send({
+            "type": "http.response.start",
+            "status": estado,
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in encabezados.items()],
+        })
+        if not more_body:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _enviar_cuerpo(self, scope: Scope, send: Send, inicio: int, cantidad: int, completo: bool):
+        extensiones = scope.get("extensions") or {}
+
+        if "http.response.zerocopy" in extensiones:
+            # El servidor hace sendfile() desde el descriptor: sin copias en Python
+            with open(self.ruta, "rb") as archivo:
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": archivo.fileno(),
+                    "offset": inicio,
+                    "count": cantidad,
+                    "more_body": False,
+                })
+            return
+
+        if completo and "http.response.pathsend" in extensiones:
+            await send({"type": "http.response.pathsend", "path": os.path.abspath(self.ruta)})
+            return
+
+        async with await anyio.open_file(self.ruta, mode="rb") as archivo:
+            await archivo.seek(inicio)
+            restante = cantidad
+            while restante > 0:
+                bloque = await archivo.read(min(CHUNK_SIZE, restante))
+                if not bloque:
+                    break
+                restante -= len(bloque)
+                await send({"type": "http.response.body", "body": bloque, "more_body": restante > 0})
+            if restante > 0:
+                # El archivo se truncó mientras se enviaba: cerrar el cuerpo igualmente
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,205 @@
+"""
+Compiled FAQ / intent matcher for the chat.
+
+The FAQ keys and every substring used by the role intents are normalized
+once and compiled into a single Aho–Corasick automaton, so one pass over the
+normalized message finds all of them: matching cost is O(message length +
+matches) no matter how many FAQ entries or intents are configured. Intents
+are data: a rule matches when any of its clauses matches, and a clause
+matches when every group in it has at least one of its phrases in the message.
+
+AnswerCache is the bounded LRU (normalized question -> answer) that sits in
+front of the whole answer path.
+"""
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Set
+
+
+class AhoCorasick:
+    """Multi-pattern substring automaton over str"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._link()
+
+    def _add(self, pattern: str):
+        if not pattern:
+            return
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(len(self.patterns))
+        self.patterns.append(pattern)
+
+    def _link(self):
+        # BFS: failure link = longest proper suffix that is also a prefix in the trie
+        # (depth-1 states keep the root as their failure link)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt].extend(self._out[self._fail[nxt]])
+
+    def matches(self, text: str) -> Set[int]:
+        """Ids (index in self.patterns) of every pattern found in text"""
+        found: Set[int] = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class IntentEngine:
+    """
+    faq: {question: answer} (dict order = priority for substring matches)
+    intents: [{"name", "roles": [...] or None, "when": [[[phrase, ...], ...], ...],
+               "answer", "source"}]
+    normalize: the text normalizer applied to keys, phrases and messages
+    """
+
+    def __init__(self, faq: Dict[str, str], intents: Sequence[dict], normalize):
+        self.normalize = normalize
+        self.faq_exact: Dict[str, str] = {}
+        self.intents = list(intents)
+
+        phrases: Dict[str, int] = {}
+
+        def phrase_id(text: str) -> int:
+            key = normalize(text)
+            if key not in phrases:
+                phrases[key] = len(phrases)
+            return phrases[key]
+
+        # FAQ: exact match by normalized key, substring match by priority
+        self._faq_by_phrase: Dict[int, int] = {}
+        self._faq_answers: List[str] = []
+        for priority, (question, answer) in enumerate(faq.items()):
+            key = normalize(question)
+            self.faq_exact.setdefault(key, answer)
+            self._faq_answers.append(answer)
+            self._faq_by_phrase.setdefault(phrase_id(question), priority)
+
+        # Intents: clauses as lists of phrase-id groups, indexed by phrase for candidate lookup
+        self._compiled: List[List[List[Set[int]]]] = []
+        self._intents_by_phrase: Dict[int, Set[int]] = {}
+        for i, intent in enumerate(self.intents):
+            clauses = []
+            for clause in intent["when"]:
+                groups = [{phrase_id(p) for p in group} for group in clause]
+                clauses.append(groups)
+                for group in groups:
+                    for pid in group:
+                        self._intents_by_phrase.setdefault(pid, set()).add(i)
+            self._compiled.append(clauses)
+
+        self.automaton = AhoCorasick(sorted(phrases, key=phrases.get))
+
+    def match(self, normalized: str) -> Set[int]:
+        return self.automaton.matches(normalized)
+
+    def answer_faq(self, normalized: str, matched: Optional[Set[int]] = None) -> Optional[str]:
+        exact = self.faq_exact.get(normalized)
+        if exact is not None:
+            return exact
+        matched = self.match(normalized) if matched is None else matched
+        priorities = [self._faq_by_phrase[pid] for pid in matched if pid in self._faq_by_phrase]
+        return self._faq_answers[min(priorities)] if priorities else None
+
+    def match_intent(self, normalized: str, role: Optional[str],
+                     matched: Optional[Set[int]] = None) -> Optional[dict]:
+        """First intent (in declaration order) for this role whose conditions hold"""
+        matched = self.match(normalized) if matched is None else matched
+        candidates = set()
+        for pid in matched:
+            candidates.update(self._intents_by_phrase.get(pid, ()))
+        for i in sorted(candidates):
+            intent = self.intents[i]
+            if intent.get("roles") and role not in intent["roles"]:
+                continue
+            if any(all(group & matched for group in clause) for clause in self._compiled[i]):
+                return intent
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "faq_entries": len(self._faq_answers),
+            "intents": len(self.intents),
+            "patterns": len(self.automaton.patterns),
+            "automaton_states": len(self.automaton._goto),
+        }
+
+
+class AnswerCache:
+    """
+    Bounded LRU of answers with hit/miss counters. generate_answer runs on
+    threadpool threads, so every access to the OrderedDict holds the lock.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[dict]:
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry)
+
+    def set(self, key: Hashable, value: dict):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = dict(value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -1,6 +1,33 @@
+import heapq
+import math
 import os
 import re
-from typing import List, Tuple
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from app.config.settings import settings
+
+
+# Sources scanned for answers: (path relative to cwd, extensions or None for a single file)
+SOURCES = [
+    ('README.md', None),
+    ('docs', ['.md', '.txt']),
+    ('templates', ['.html', '.md']),
+]
+
+# Sentences with fewer terms (code fragments in templates, headings) are not useful answers
+MIN_SENTENCE_TERMS = 3
+
+# Very common Spanish/English words: they match almost every sentence
+STOPWORDS = frozenset("""
+    a al algo ante como con cual cuando de del donde el ella en entre era es esa ese eso esta este esto
+    ha hay la las le les lo los mas me mi mis muy no nos o para pero por que quien se si sin sobre su sus
+    te tu un una uno y ya yo
+    and are for in is of on or the to with
+""".split())
 
 
 def read_files_under(path: str, exts: List[str] = None) -> List[Tuple[str, str]]:
@@ -29,6 +56,204 @@ def split_into_sentences(text: str) -> List[str]:
     return [p.strip() for p in parts if p.strip()]
 
 
+_HTML_CODE = re.compile(r'<(script|style)\b.*?</\1\s*>|<!--.*?-->', re.IGNORECASE | re.DOTALL)
+_HTML_TAG = re.compile(r'<[^>]+>|\{[{%].*?[%}]\}')
+
+
+def extract_text(path: str, content: str) -> str:
+    """Visible text of a template (no scripts, styles, tags or Jinja blocks); other files as-is."""
+    if not path.lower().endswith('.html'):
+        return content
+    content = _HTML_CODE.sub('\n', content)
+    return _HTML_TAG.sub('\n', content)
+
+
+def normalize_text(s: str) -> str:
+    if not s:
+        return ''
+    # lower
+    s = s.lower()
+    # remove accents
+    s = unicodedata.normalize('NFKD', s)
+    s = ''.join([c for c in s if not unicodedata.combining(c)])
+    # remove punctuation (Unicode-aware)
+    s = re.sub(r'[^\w\s]', ' ', s, flags=re.UNICODE)
+    # collapse spaces
+    s = re.sub(r'\s+', ' ', s).strip()
+    return s
+
+
+def stem(token: str) -> str:
+    # minimal plural folding so 'solicitudes'/'solicitud' and 'roles'/'rol' share a term
+    if len(token) > 3 and token.endswith('s'):
+        token = token[:-1]
+    if len(token) > 4 and token.endswith('e'):
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Accent-folded, stopword-free, plural-folded terms of a text."""
+    return [stem(t) for t in normalize_text(text).split() if len(t) > 1 and t not in STOPWORDS]
+
+
+def source_files(base: Optional[str] = None) -> List[str]:
+    """Paths of every file that feeds the knowledge index."""
+    base = base or os.getcwd()
+    files = []
+    for rel, exts in SOURCES:
+        path = os.path.join(base, rel)
+        if exts is None:
+            if os.path.isfile(path):
+                files.append(path)
+            continue
+        for root, _, names in os.walk(path):
+            for name in names:
+                if any(name.lower().endswith(e) for e in exts):
+                    files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+def sources_signature(files: List[str]) -> Tuple:
+    """(path, mtime, size) of every source: changes when a file is edited, added or removed."""
+    sig = []
+    for fp in files:
+        try:
+            st = os.stat(fp)
+        except OSError:
+            continue
+        sig.append((fp, st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+class KnowledgeIndex:
+    """
+    BM25 inverted index over the sentences of README.md, docs/ and templates/.
+
+    Built once (at startup or on first use) and rebuilt only when a source
+    file's mtime/size changes; the sources are re-checked at most every
+    `check_interval` seconds, so a query is a few dict lookups instead of a
+    full disk scan.
+    """
+
+    def __init__(self, base: Optional[str] = None, k1: float = 1.5, b: float = 0.75,
+                 check_interval: float = 5.0):
+        self.base = base
+        self.k1 = k1
+        self.b = b
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked_at = 0.0
+        # (snippets, lengths, postings, idf, avgdl), replaced as a whole on rebuild so a
+        # concurrent search never sees parts of two different builds:
+        #   snippets: sentence id -> (path, sentence)   lengths: sentence id -> number of terms
+        #   postings: term -> [(sentence id, tf)]       idf: term -> BM25 idf
+        self._state: Tuple[List[Tuple[str, str]], List[int], Dict[str, List[Tuple[int, int]]], Dict[str, float], float] = ([], [], {}, {}, 0.0)
+        self.build_seconds = 0.0
+        self.builds = 0
+
+    def build(self):
+        """(Re)build the index from the current source files."""
+        with self._lock:
+            started = time.perf_counter()
+            files = source_files(self.base)
+            signature = sources_signature(files)
+
+            snippets, lengths, postings = [], [], {}
+            for fp in files:
+                try:
+                    with open(fp, 'r', encoding='utf-8', errors='ignore') as fh:
+                        content = fh.read()
+                except OSError:
+                    continue
+                seen = set()
+                for sent in split_into_sentences(extract_text(fp, content)):
+                    terms = tokenize(sent)
+                    if len(terms) < MIN_SENTENCE_TERMS or sent in seen:
+                        continue
+                    seen.add(sent)
+                    sid = len(snippets)
+                    snippets.append((fp, sent))
+                    lengths.append(len(terms))
+                    for term, tf in Counter(terms).items():
+                        postings.setdefault(term, []).append((sid, tf))
+
+            n = len(snippets)
+            idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in postings.items()}
+            self._state = (snippets, lengths, postings, idf, (sum(lengths) / n) if n else 0.0)
+            self._signature = signature
+            self._checked_at = time.monotonic()
+            self.build_seconds = time.perf_counter() - started
+            self.builds += 1
+
+    @property
+    def signature(self) -> Optional[Tuple]:
+        return self._signature
+
+    def sentences(self) -> List[Tuple[str, str]]:
+        """(path, sentence) by sentence id for the current build."""
+        return self._state[0]
+
+    def ensure_fresh(self):
+        """Rebuild if never built or if a source changed (checked at most every check_interval)."""
+        now = time.monotonic()
+        if self._signature is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        if self._signature is None or sources_signature(source_files(self.base)) != self._signature:
+            self.build()
+
+    def search(self, query: str, top_k: int = 3) -> List[Tuple[str, str, float]]:
+        self.ensure_fresh()
+        snippets, lengths, postings, idf, avgdl = self._state
+        terms = set(tokenize(query))
+        if not terms or not snippets:
+            return []
+
+        k1, b = self.k1, self.b
+        scores: Dict[int, float] = {}
+        for term in terms:
+            term_postings = postings.get(term)
+            if not term_postings:
+                continue
+            term_idf = idf[term]
+            for sid, tf in term_postings:
+                norm = k1 * (1 - b + b * lengths[sid] / avgdl)
+                scores[sid] = scores.get(sid, 0.0) + term_idf * tf * (k1 + 1) / (tf + norm)
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(snippets[sid][0], snippets[sid][1], round(score, 4)) for sid, score in best]
+
+    def stats(self) -> dict:
+        snippets, _, postings, _, avgdl = self._state
+        return {
+            "files": len(self._signature or ()),
+            "sentences": len(snippets),
+            "terms": len(postings),
+            "avg_sentence_terms": round(avgdl, 2),
+            "builds": self.builds,
+            "last_build_ms": round(self.build_seconds * 1000, 2),
+        }
+
+
+knowledge_index = KnowledgeIndex(check_interval=settings.KNOWLEDGE_INDEX_CHECK_SECONDS)
+
+
+def search_docs(query: str, top_k: int = 3, mode: Optional[str] = None) -> List[Tuple[str, str, float]]:
+    """
+    Retriever over docs/, README.md and templates/.
+    mode 'bm25' (KnowledgeIndex) or 'semantic' (LSA vectors, see vector_index);
+    defaults to settings.KNOWLEDGE_SEARCH_MODE and falls back to BM25 without NumPy.
+    Returns list of (source_path, snippet, score) sorted by score desc.
+    """
+    if (mode or settings.KNOWLEDGE_SEARCH_MODE) == 'semantic':
+        from app.utils.vector_index import available, vector_index
+        if available():
+            return vector_index.search(query, top_k)
+    return knowledge_index.search(query, top_k)
+
+
 def score_text(query_tokens: List[str], text: str) -> int:
     text_l = text.lower()
     score = 0
@@ -38,10 +263,10 @@ def score_text(query_tokens: List[str], text: str) -> int:
     return score
 
 
-def search_docs(query: str, top_k: int = 3) -> List[Tuple[str, str, int]]:
+def search_docs_scan(query: str, top_k: int = 3) -> List[Tuple[str, str, int]]:
     """
-    Very simple retriever: tokenizes query, scans docs/ and README.md, scores sentences by token overlap.
-    Returns list of (source_path, snippet, score) sorted by score desc.
+    Previous retriever, kept for benchmarks: re-reads every source and scores
+    each sentence by substring overlap on every call.
     """
     q = query.lower()
     # tokenize words
@@ -3,10 +3,11 @@ Mock LLM client / FAQ responder.
 Replace with real provider integration (OpenAI, Azure, or local LLM) in production.
 """
 from typing import Optional
-import unicodedata
 import re
 import os
-from app.utils.knowledge import search_docs
+from app.config.settings import settings
+from app.utils.intent_engine import AnswerCache, IntentEngine
+from app.utils.knowledge import knowledge_index, search_docs, normalize_text
 
 
 FAQ = {
@@ -17,48 +18,77 @@ FAQ = {
     "cómo funciona el sistema": "Este sistema permite a los solicitantes crear y seguir solicitudes de pago, a los aprobadores revisar y aprobar, y a los pagadores marcar como pagadas y subir comprobantes. Usa el menú 'Solicitudes' para ver y crear solicitudes.",
 }
 
+# Role-specific intents, tried in order after FAQ and docs.
+# "when" is a list of alternatives; each alternative is a list of groups that must all
+# match, and a group matches when any of its phrases is a substring of the message.
+INTENTS = [
+    {
+        "name": "mis_solicitudes",
+        "roles": ["solicitante"],
+        "when": [[["mis solicitudes", "ver mis solicitudes", "mis solicitud"]]],
+        "answer": "Visita /requests para ver tus solicitudes. Puedes filtrar por estado (pendiente, aprobada, pagada).",
+        "source": "internal",
+    },
+    {
+        # If we had user's id we could provide direct status; offer instructions instead
+        "name": "estado_solicitud",
+        "roles": ["solicitante"],
+        "when": [[["estado"], ["solicitud"]]],
+        "answer": "Para ver el estado de una solicitud específica, abre la solicitud desde /requests y consulta la sección 'Estado'. También puedes usar el ID de solicitud en la búsqueda.",
+        "source": "internal",
+    },
+    {
+        # recognize different forms like 'crea', 'crear', 'como crear', etc.
+        "name": "crear_solicitud",
+        "roles": ["solicitante"],
+        "when": [[["crear", "crea", "como", "hacer"], ["solicitud"]], [["nueva solicitud"]]],
+        "answer": "Para crear una nueva solicitud, ve a 'Nueva Solicitud' o a /solicitud-estandar/nueva y completa los campos. Asegúrate de adjuntar documentos si son requeridos.",
+        "source": "internal",
+    },
+]
+
+# FAQ keys and intent phrases are normalized and compiled once, at import
+intent_engine = IntentEngine(FAQ, INTENTS, normalize_text)
+
+# normalized question (+ role, mode, index build) -> answer
+answer_cache = AnswerCache(settings.CHAT_ANSWER_CACHE_SIZE)
+
 
 def answer_faq(question: str) -> Optional[str]:
-    q = normalize_text(question)
-    # try exact normalized match
-    for k, v in FAQ.items():
-        if normalize_text(k) == q:
-            return v
-    # try substring match
-    for k, v in FAQ.items():
-        if normalize_text(k) in q:
-            return v
-    return None
-
-
-def normalize_text(s: str) -> str:
-    if not s:
-        return ''
-    # lower
-    s = s.lower()
-    # remove accents
-    s = unicodedata.normalize('NFKD', s)
-    s = ''.join([c for c in s if not unicodedata.combining(c)])
-    # remove punctuation (Unicode-aware)
-    s = re.sub(r'[^\w\s]', ' ', s, flags=re.UNICODE)
-    # collapse spaces
-    s = re.sub(r'\s+', ' ', s).strip()
-    return s
-
-
-def generate_answer(message: str, user: dict | None = None) -> dict:
+    return intent_engine.answer_faq(normalize_text(question))
+
+
+def generate_answer(message: str, user: dict | None = None, mode: Optional[str] = None) -> dict:
     """
     Very small heuristic responder:
     - If message matches known FAQ, return answer with resolved=True
     - Otherwise, return resolved=False and suggest escalation to admin
+    Answers are cached per normalized message; the key includes the knowledge
+    index build so an edited doc is not answered from a stale entry.
     """
-    ans = answer_faq(message)
+    q = normalize_text(message)
+    role = user.get('role') if user else None
+    knowledge_index.ensure_fresh()
+    key = (q, role, user.get('email') if role == 'admin' else None,
+           mode or settings.KNOWLEDGE_SEARCH_MODE, knowledge_index.builds)
+    cached = answer_cache.get(key)
+    if cached is not None:
+        return cached
+
+    resp = _compute_answer(message, q, role, user, mode)
+    answer_cache.set(key, resp)
+    return resp
+
+
+def _compute_answer(message: str, q: str, role: Optional[str], user: dict | None, mode: Optional[str]) -> dict:
+    matched = intent_engine.match(q)
+    ans = intent_engine.answer_faq(q, matched)
     if ans:
         return {"answer": ans, "resolved": True, "source": "faq"}
 
     # Try to find matching snippets in local docs/README/templates to answer basic questions
     try:
-        hits = search_docs(message, top_k=3)
+        hits = search_docs(message, top_k=3, mode=mode)
         if hits:
             # build a short, friendly summary from the best hit(s)
             best = hits[0]
@@ -84,33 +114,18 @@ def generate_answer(message: str, user: dict | None = None) -> dict:
         # if doc search fails for any reason, ignore and continue
         pass
 
-    # If user is a solicitante we can answer some role-specific intents
-    if user and user.get('role') == 'solicitante':
-        q = normalize_text(message)
-        if 'mis solicitudes' in q or 'ver mis solicitudes' in q or 'mis solicitud' in q:
-            return {
-                'answer': "Visita /requests para ver tus solicitudes. Puedes filtrar por estado (pendiente, aprobada, pagada).",
-                'resolved': True,
-                'source': 'internal',
-            }
-        if 'estado' in q and 'solicitud' in q:
-            # If we had user's id we could provide direct status; offer instructions instead
-            return {
-                'answer': "Para ver el estado de una solicitud específica, abre la solicitud desde /requests y consulta la sección 'Estado'. También puedes usar el ID de solicitud en la búsqueda.",
-                'resolved': True,
-                'source': 'internal',
-            }
-        # recognize different forms like 'crea', 'crear', 'como crear', etc.
-        if (('crear' in q or 'crea' in q or 'como' in q or 'hacer' in q) and 'solicitud' in q) or ('nueva solicitud' in q):
-            return {
-                'answer': "Para crear una nueva solicitud, ve a 'Nueva Solicitud' o a /solicitud-estandar/nueva y completa los campos. Asegúrate de adjuntar documentos si son requeridos.",
-                'resolved': True,
-                'source': 'internal',
-            }
+    # Role-specific intents (see INTENTS)
+    intent = intent_engine.match_intent(q, role, matched)
+    if intent:
+        return {
+            'answer': intent['answer'],
+            'resolved': True,
+            'source': intent.get('source', 'internal'),
+        }
 
     # not found: suggest contacting admin. If user provided, include admin email placeholder
     admin_email = None
-    if user and user.get("role") == "admin":
+    if role == "admin":
         admin_email = user.get("email")
     else:
         # fallback: global admin email (could be read from config)
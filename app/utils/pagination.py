@@ -0,0 +1,67 @@
+"""
+Paginación por cursor (keyset) sobre el par (campo de fecha, _id).
+
+El cursor es opaco para el cliente: base64 de la fecha y el _id del último
+documento de la página. La siguiente página se obtiene con un rango sobre el
+índice compuesto (campo, _id), así que el costo no crece con la profundidad
+como ocurre con skip().
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+
+def encode_cursor(value: datetime, _id: ObjectId) -> str:
+    """Codificar el cursor a partir del último documento de la página"""
+    payload = {"v": value.isoformat() if isinstance(value, datetime) else None, "i": str(_id)}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], ObjectId]:
+    """Decodificar un cursor; lanza ValueError si es inválido"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value = datetime.fromisoformat(payload["v"]) if payload.get("v") else None
+        return value, ObjectId(payload["i"])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError(f"Cursor inválido: {e}")
+
+
+def keyset_filter(field: str, value: Optional[datetime], _id: ObjectId) -> dict:
+    """Filtro para la página siguiente en orden descendente por (field, _id)"""
+    if value is None:
+        # Documentos sin fecha: quedan al final del orden descendente
+        return {field: None, "_id": {"$lt": _id}}
+    return {"$or": [
+        {field: {"$lt": value}},
+        {field: value, "_id": {"$lt": _id}},
+        {field: None},
+    ]}
+
+
+def keyset_sort(field: str) -> list:
+    """Orden descendente estable que corresponde a keyset_filter"""
+    return [(field, -1), ("_id", -1)]
+
+
+def combine_filters(base: dict, extra: Optional[dict]) -> dict:
+    """Combinar el filtro de la consulta con el del cursor"""
+    if not extra:
+        return base
+    if not base:
+        return extra
+    return {"$and": [base, extra]}
+
+
+def next_cursor(docs: list, field: str, limit: int) -> Optional[str]:
+    """Cursor de la siguiente página, o None si ya no hay más resultados"""
+    if len(docs) < limit or not docs:
+        return None
+    last = docs[-1]
+    return encode_cursor(last.get(field), last["_id"])
@@ -0,0 +1,90 @@
+"""
+Hash y verificación de contraseñas con bcrypt fuera del event loop.
+
+bcrypt tarda cientos de milisegundos por llamada (según el costo); ejecutado
+dentro de una ruta async bloquea a todo el worker. Aquí el trabajo corre en un
+pool de hilos dedicado y acotado (bcrypt libera el GIL mientras calcula). Si
+ya hay demasiadas operaciones en curso o en cola se rechaza de inmediato con
+PasswordHasherBusy, que el controlador traduce a un 503, en lugar de dejar que
+la cola crezca sin límite.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+
+class PasswordHasherBusy(Exception):
+    """El pool de contraseñas está saturado"""
+
+
+def _hash_password(password: str, rounds: int) -> str:
+    # bcrypt sólo considera los primeros 72 bytes
+    if len(password) > 72:
+        password = password[:72]
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def _check_password(password: str, hashed_password: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    except Exception as e:
+        print(f"Error verificando contraseña: {e}")
+        return False
+
+
+def hash_rounds(hashed_password: str) -> int:
+    """Costo con el que se generó un hash ($2b$<costo>$...); 0 si no se reconoce"""
+    try:
+        return int(hashed_password.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return 0
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = 4, max_queue: int = 32, rounds: int = 12):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        # Sólo se modifican desde el event loop, no requieren lock
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def _run(self, fn, *args):
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy("Demasiadas operaciones de contraseña en curso")
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        """Hash bcrypt con el costo configurado"""
+        return await self._run(_hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Comparar una contraseña con su hash"""
+        return await self._run(_check_password, password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """El hash se generó con un costo distinto al configurado"""
+        return hash_rounds(hashed_password) != self.rounds
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "rounds": self.rounds,
+            "in_flight": self.in_flight,
+            "queued": max(0, self.in_flight - self.workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,115 @@
+"""
+Guardado de archivos subidos (adjuntos de solicitudes y comprobantes de pago).
+
+El contenido se copia por bloques de tamaño fijo en un hilo del threadpool,
+nunca en el event loop y sin cargar el archivo completo en memoria. Mientras
+se copia se calcula el SHA-256 y se aplican los límites por archivo y por
+petición. Cada archivo se escribe primero en un temporal del directorio de
+destino; el almacén de archivos (app.utils.blob_store) lo publica con
+os.replace, así que nunca queda a la vista un archivo a medio escribir.
+"""
+import hashlib
+import os
+import tempfile
+from typing import List, Optional
+
+from fastapi import HTTPException, Request, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+from app.config.settings import settings
+
+
+class UploadTooLarge(Exception):
+    """El archivo o la petición superan el límite configurado"""
+
+
+def limite_excedido(detalle: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detalle)
+
+
+def verificar_content_length(request: Request):
+    """Rechazar antes de procesar si el Content-Length declarado ya excede el límite"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.UPLOAD_MAX_REQUEST_BYTES:
+        raise limite_excedido(
+            f"La petición excede el máximo de {settings.UPLOAD_MAX_REQUEST_BYTES} bytes"
+        )
+
+
+def nombre_seguro(filename: Optional[str]) -> str:
+    """Nombre del archivo sin componentes de ruta (evita escribir fuera del directorio)"""
+    nombre = os.path.basename((filename or "").replace("\\", "/")).strip()
+    return nombre or "archivo"
+
+
+def _copiar_por_bloques(origen, destino_dir: str, etiqueta: str,
+                        limite_archivo: int, disponible: int, chunk_size: int) -> dict:
+    """Copia síncrona a un temporal de `destino_dir` (se ejecuta en el threadpool)"""
+    sha256 = hashlib.sha256()
+    tamaño = 0
+    fd, temporal = tempfile.mkstemp(dir=destino_dir, prefix=".upload-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as salida:
+            origen.seek(0)
+            while True:
+                bloque = origen.read(chunk_size)
+                if not bloque:
+                    break
+                tamaño += len(bloque)
+                if tamaño > limite_archivo:
+                    raise UploadTooLarge(f"El archivo '{etiqueta}' excede el máximo de {limite_archivo} bytes")
+                if tamaño > disponible:
+                    raise UploadTooLarge(
+                        f"Los archivos exceden el máximo de {settings.UPLOAD_MAX_REQUEST_BYTES} bytes por petición"
+                    )
+                sha256.update(bloque)
+                salida.write(bloque)
+            salida.flush()
+            os.fsync(salida.fileno())
+        return {"temporal": temporal, "tamaño": tamaño, "sha256": sha256.hexdigest()}
+    except BaseException:
+        descartar(temporal)
+        raise
+
+
+def descartar(ruta: str):
+    """Eliminar un archivo si existe (temporales o archivos ya publicados)"""
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+async def recibir_archivos(archivos: List[UploadFile], destino_dir: str) -> List[dict]:
+    """
+    Copiar los archivos de una petición a temporales de `destino_dir`.
+
+    Devuelve, en el mismo orden, {"temporal", "tamaño", "sha256"}; quien llama
+    los publica con os.replace (mismo sistema de archivos, cambio atómico) o
+    los descarta. Lanza HTTPException 413 si se excede UPLOAD_MAX_FILE_BYTES o
+    UPLOAD_MAX_REQUEST_BYTES; en ese caso no queda ningún temporal.
+    """
+    os.makedirs(destino_dir, exist_ok=True)
+    disponible = settings.UPLOAD_MAX_REQUEST_BYTES
+    recibidos = []
+    try:
+        for archivo in archivos:
+            resultado = await run_in_threadpool(
+                _copiar_por_bloques,
+                archivo.file,
+                destino_dir,
+                archivo.filename or "archivo",
+                settings.UPLOAD_MAX_FILE_BYTES,
+                disponible,
+                settings.UPLOAD_CHUNK_SIZE
+            )
+            disponible -= resultado["tamaño"]
+            recibidos.append(resultado)
+        return recibidos
+    except BaseException as e:
+        # Todo o nada: no dejar temporales de una petición fallida
+        for recibido in recibidos:
+            descartar(recibido["temporal"])
+        if isinstance(e, UploadTooLarge):
+            raise limite_excedido(str(e))
+        raise
@@ -0,0 +1,112 @@
+"""
+Caché en proceso del usuario autenticado (TTL + LRU).
+
+Cada petición protegida decodifica el JWT y resuelve el usuario; con esta
+caché la resolución se hace una sola vez por token mientras la entrada siga
+vigente. La clave es (sub, exp) del token, y la entrada expira con el TTL
+configurado o con el propio token, lo que ocurra primero.
+
+Las escrituras sobre el usuario (update_user, cambio de estado o rol,
+delete_user) invalidan sus entradas. Cada worker tiene su propia caché, por
+lo que entre workers el TTL acota el tiempo que un cambio tarda en verse.
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+from app.models.user import UserResponse
+
+
+class UserPrincipalCache:
+    """Caché LRU acotada con expiración por entrada"""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 60):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # clave -> (expira_en, usuario); el orden refleja el uso más reciente
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, UserResponse]]" = OrderedDict()
+        # id de usuario -> claves, para invalidar aunque el email haya cambiado
+        self._by_user_id: Dict[str, Set[Tuple[str, Hashable]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def get(self, sub: str, exp: Hashable) -> Optional[UserResponse]:
+        """Usuario en caché para el token (sub, exp), o None"""
+        if not self.enabled:
+            return None
+        key = (sub, exp)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expira_en, user = entry
+        if expira_en <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return user
+
+    def set(self, sub: str, exp: Hashable, user: UserResponse):
+        """Guardar el usuario resuelto para el token (sub, exp)"""
+        if not self.enabled:
+            return
+        ttl = self.ttl_seconds
+        if isinstance(exp, (int, float)):
+            # No mantener la entrada más allá de la expiración del token
+            ttl = min(ttl, exp - time.time())
+            if ttl <= 0:
+                return
+        key = (sub, exp)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, user)
+        self._by_user_id.setdefault(str(user.id), set()).add(key)
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate_user(self, user_id: str):
+        """Eliminar todas las entradas de un usuario (tras modificarlo o borrarlo)"""
+        keys = self._by_user_id.pop(str(user_id), set())
+        for key in keys:
+            self._entries.pop(key, None)
+        if keys:
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._by_user_id.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = str(entry[1].id)
+        keys = self._by_user_id.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user_id[user_id]
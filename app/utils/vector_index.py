@@ -0,0 +1,306 @@
+"""
+Semantic (LSA) retrieval over the same sentences as the BM25 knowledge index.
+
+Sentences are turned into TF-IDF vectors and projected onto their top `dims`
+latent dimensions with a randomized truncated SVD (NumPy only, no network).
+The sentence matrix is written once to `<dir>/vectors-<build>.<dtype>` and
+opened with numpy.memmap, so every uvicorn worker maps the same file and the
+OS keeps a single copy of its pages. A query is folded into the same space
+and scored with one matrix–vector product (cosine, rows are L2-normalized).
+
+`dtype="int8"` stores the matrix quantized per row (scale = max|v| / 127):
+4x smaller, scored block by block so the float conversion never needs the
+whole matrix in memory.
+
+The files are rebuilt when the knowledge sources change (same signature as
+KnowledgeIndex). NumPy is optional: without it `available()` is False and
+callers fall back to BM25.
+"""
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # semantic mode is disabled, BM25 keeps working
+    np = None
+
+from app.config.settings import settings
+from app.utils.knowledge import KnowledgeIndex, knowledge_index, tokenize
+
+META_FILE = "meta.json"
+FORMAT_VERSION = 1
+INT8_BLOCK_ROWS = 8192
+
+
+def available() -> bool:
+    return np is not None
+
+
+def _csr(rows: List[Dict[int, float]], n_cols: int):
+    """Row dicts {col: value} -> CSR arrays (data, indices, indptr)"""
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(r) for r in rows])
+    indices = np.fromiter((c for r in rows for c in r), dtype=np.int64, count=int(indptr[-1]))
+    data = np.fromiter((v for r in rows for v in r.values()), dtype=np.float32, count=int(indptr[-1]))
+    return data, indices, indptr
+
+
+def _csr_matmul(data, indices, indptr, dense):
+    """X @ dense for CSR X (n x V) and dense (V x l)"""
+    n = len(indptr) - 1
+    out = np.zeros((n, dense.shape[1]), dtype=np.float32)
+    products = data[:, None] * dense[indices]
+    nonempty = np.diff(indptr) > 0
+    if products.shape[0]:
+        out[nonempty] = np.add.reduceat(products, indptr[:-1][nonempty], axis=0)
+    return out
+
+
+def _csr_rmatmul(data, indices, indptr, dense, n_cols):
+    """X.T @ dense for CSR X (n x V) and dense (n x l)"""
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    out = np.zeros((n_cols, dense.shape[1]), dtype=np.float32)
+    np.add.at(out, indices, data[:, None] * dense[rows])
+    return out
+
+
+def randomized_svd(data, indices, indptr, n_cols: int, k: int, oversample: int = 10,
+                   power_iterations: int = 3, seed: int = 42):
+    """Top-k right singular vectors (V x k) of a sparse matrix (Halko et al.)"""
+    rng = np.random.default_rng(seed)
+    l = min(k + oversample, n_cols)
+    q, _ = np.linalg.qr(_csr_matmul(data, indices, indptr, rng.standard_normal((n_cols, l)).astype(np.float32)))
+    for _ in range(power_iterations):
+        z, _ = np.linalg.qr(_csr_rmatmul(data, indices, indptr, q, n_cols))
+        q, _ = np.linalg.qr(_csr_matmul(data, indices, indptr, z))
+    b = _csr_rmatmul(data, indices, indptr, q, n_cols).T   # l x V
+    _, s, vt = np.linalg.svd(b, full_matrices=False)
+    return vt[:k].T.astype(np.float32), s[:k]
+
+
+def _normalize_rows(m):
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+def quantize_int8(vectors):
+    """Per-row symmetric int8 quantization -> (int8 matrix, float32 scales)"""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    q = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return q, scales.astype(np.float32)
+
+
+class VectorIndex:
+    def __init__(self, directory: str, dims: int = 128, dtype: str = "float32",
+                 knowledge: Optional[KnowledgeIndex] = None):
+        if dtype not in ("float32", "int8"):
+            raise ValueError("dtype debe ser 'float32' o 'int8'")
+        self.directory = directory
+        self.dims = dims
+        self.dtype = dtype
+        self.knowledge = knowledge or knowledge_index
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        # (meta, vocab, idf, projection, matrix, scales), replaced as a whole on reload
+        self._state = None
+        self.build_seconds = 0.0
+        self.builds = 0
+        self.loads = 0
+
+    # --- build -----------------------------------------------------------------
+
+    def build(self) -> dict:
+        """Compute the vectors from the current knowledge sentences and write the files"""
+        if not available():
+            raise RuntimeError("NumPy no está instalado: la búsqueda semántica no está disponible")
+        started = time.perf_counter()
+        self.knowledge.ensure_fresh()
+        snippets = self.knowledge.sentences()
+        signature = self.knowledge.signature
+
+        docs = [Counter(tokenize(sentence)) for _, sentence in snippets]
+        df = Counter(term for doc in docs for term in doc)
+        vocab = {term: i for i, term in enumerate(sorted(df))}
+        n = len(docs)
+        idf = np.zeros(len(vocab), dtype=np.float32)
+        for term, i in vocab.items():
+            idf[i] = math.log((1 + n) / (1 + df[term])) + 1.0
+
+        # Sublinear TF-IDF, L2-normalized per sentence
+        rows = []
+        for doc in docs:
+            row = {vocab[t]: (1.0 + math.log(tf)) * float(idf[vocab[t]]) for t, tf in doc.items()}
+            norm = math.sqrt(sum(v * v for v in row.values())) or 1.0
+            rows.append({c: v / norm for c, v in row.items()})
+
+        k = max(1, min(self.dims, n - 1, len(vocab) - 1)) if n > 1 and len(vocab) > 1 else 1
+        if n and vocab:
+            data, indices, indptr = _csr(rows, len(vocab))
+            projection, _ = randomized_svd(data, indices, indptr, len(vocab), k)
+            vectors = _normalize_rows(_csr_matmul(data, indices, indptr, projection))
+        else:
+            projection = np.zeros((len(vocab), k), dtype=np.float32)
+            vectors = np.zeros((0, k), dtype=np.float32)
+
+        self._write(snippets, signature, vocab, idf, projection, vectors)
+        self.build_seconds = time.perf_counter() - started
+        self.builds += 1
+        self.load()
+        return self.stats()
+
+    def _write(self, snippets, signature, vocab, idf, projection, vectors):
+        os.makedirs(self.directory, exist_ok=True)
+        build_id = uuid.uuid4().hex[:12]
+        matrix_file = f"vectors-{build_id}.{self.dtype}"
+        files = {"matrix": matrix_file, "projection": f"projection-{build_id}.npy", "idf": f"idf-{build_id}.npy"}
+
+        if self.dtype == "int8":
+            quantized, scales = quantize_int8(vectors)
+            quantized.tofile(os.path.join(self.directory, matrix_file))
+            files["scales"] = f"scales-{build_id}.npy"
+            np.save(os.path.join(self.directory, files["scales"]), scales)
+        else:
+            vectors.astype(np.float32).tofile(os.path.join(self.directory, matrix_file))
+        np.save(os.path.join(self.directory, files["projection"]), projection)
+        np.save(os.path.join(self.directory, files["idf"]), idf)
+
+        meta = {
+            "version": FORMAT_VERSION,
+            "build_id": build_id,
+            "dtype": self.dtype,
+            "rows": int(vectors.shape[0]),
+            "dims": int(vectors.shape[1]),
+            "files": files,
+            "signature": [list(s) for s in signature or ()],
+            "vocab": sorted(vocab, key=vocab.get),
+            "snippets": [list(s) for s in snippets],
+            "created_at": time.time(),
+        }
+        # meta.json last and atomically: readers only ever see a complete build
+        temporary = os.path.join(self.directory, f".{META_FILE}.{build_id}")
+        with open(temporary, "w", encoding="utf-8") as fh:
+            json.dump(meta, fh, ensure_ascii=False)
+        os.replace(temporary, os.path.join(self.directory, META_FILE))
+        self._remove_old_builds(build_id)
+
+    def _remove_old_builds(self, build_id: str):
+        for name in os.listdir(self.directory):
+            if name != META_FILE and build_id not in name and not name.startswith("."):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass  # still mapped by another worker (Windows): next build retries
+
+    # --- load / search ---------------------------------------------------------
+
+    def load(self) -> bool:
+        """Map the files from disk; False if missing, stale or in another dtype"""
+        if not available():
+            return False
+        path = os.path.join(self.directory, META_FILE)
+        try:
+            with open(path, encoding="utf-8") as fh:
+                meta = json.load(fh)
+            if meta.get("version") != FORMAT_VERSION or meta.get("dtype") != self.dtype:
+                return False
+            files = meta["files"]
+            matrix = np.memmap(
+                os.path.join(self.directory, files["matrix"]),
+                dtype=np.int8 if self.dtype == "int8" else np.float32,
+                mode="r",
+                shape=(meta["rows"], meta["dims"])
+            ) if meta["rows"] else np.zeros((0, meta["dims"]), dtype=np.float32)
+            projection = np.load(os.path.join(self.directory, files["projection"]))
+            idf = np.load(os.path.join(self.directory, files["idf"]))
+            scales = np.load(os.path.join(self.directory, files["scales"])) if "scales" in files else None
+        except (OSError, ValueError, KeyError):
+            return False
+        vocab = {term: i for i, term in enumerate(meta.pop("vocab"))}
+        with self._lock:
+            self._state = (meta, vocab, idf, projection, matrix, scales)
+            self.loads += 1
+        return True
+
+    def ensure_ready(self):
+        """Load the files, or rebuild them if missing or out of date with the sources"""
+        if not available():
+            return
+        self.knowledge.ensure_fresh()
+        current = [list(s) for s in self.knowledge.signature or ()]
+        if self._state is not None and self._state[0]["signature"] == current:
+            return
+        with self._build_lock:
+            # Another thread may have finished the same rebuild meanwhile
+            if self._state is not None and self._state[0]["signature"] == current:
+                return
+            if self.load() and self._state[0]["signature"] == current:
+                return
+            self.build()
+
+    def query_vector(self, query: str):
+        _, vocab, idf, projection, _, _ = self._state
+        counts = Counter(t for t in tokenize(query) if t in vocab)
+        if not counts:
+            return None
+        cols = np.fromiter((vocab[t] for t in counts), dtype=np.int64)
+        weights = np.fromiter(((1.0 + math.log(tf)) for tf in counts.values()), dtype=np.float32) * idf[cols]
+        vector = weights @ projection[cols]
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    def scores(self, vector):
+        """Cosine of every sentence against a folded query (one vectorized product)"""
+        _, _, _, _, matrix, scales = self._state
+        if scales is None:
+            return matrix @ vector
+        out = np.empty(matrix.shape[0], dtype=np.float32)
+        for start in range(0, matrix.shape[0], INT8_BLOCK_ROWS):
+            block = matrix[start:start + INT8_BLOCK_ROWS]
+            out[start:start + len(block)] = (block.astype(np.float32) @ vector) * scales[start:start + len(block)]
+        return out
+
+    def search(self, query: str, top_k: int = 3) -> List[Tuple[str, str, float]]:
+        self.ensure_ready()
+        meta = self._state[0]
+        vector = self.query_vector(query)
+        if vector is None or not meta["rows"]:
+            return []
+        scores = self.scores(vector)
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        snippets = meta["snippets"]
+        return [(snippets[i][0], snippets[i][1], round(float(scores[i]), 4)) for i in best if scores[i] > 0]
+
+    def stats(self) -> dict:
+        if self._state is None:
+            return {"available": available(), "loaded": False, "builds": self.builds}
+        meta, vocab, _, _, matrix, _ = self._state
+        return {
+            "available": True,
+            "loaded": True,
+            "dtype": meta["dtype"],
+            "rows": meta["rows"],
+            "dims": meta["dims"],
+            "terms": len(vocab),
+            "matrix_bytes": int(matrix.nbytes),
+            "build_id": meta["build_id"],
+            "builds": self.builds,
+            "loads": self.loads,
+            "last_build_ms": round(self.build_seconds * 1000, 2),
+        }
+
+
+vector_index = VectorIndex(
+    settings.KNOWLEDGE_VECTOR_DIR,
+    dims=settings.KNOWLEDGE_VECTOR_DIMS,
+    dtype=settings.KNOWLEDGE_VECTOR_DTYPE
+)
@@ -0,0 +1,125 @@
+"""
+ZIP generado al vuelo para descargar varios archivos en una sola respuesta.
+
+zipfile escribe sobre un destino no posicionable (sin seek) usando data
+descriptors, así que el ZIP se produce por bloques conforme se leen los
+archivos: no hay archivo temporal y en memoria sólo vive el bloque actual.
+Los formatos que ya vienen comprimidos (PDF, JPEG, PNG, Office...) se
+guardan con ZIP_STORED; comprimirlos otra vez gasta CPU sin reducir nada.
+
+`zip_en_streaming` es un generador síncrono: StreamingResponse lo itera en
+el threadpool, de modo que las lecturas de disco y el deflate no bloquean
+el event loop.
+"""
+import os
+import time
+import zipfile
+from typing import Iterable, Iterator, List, Tuple
+
+from starlette.responses import StreamingResponse
+
+from app.utils.descargas import content_disposition
+
+CHUNK_SIZE = 256 * 1024
+
+# Extensiones que ya están comprimidas: se guardan sin deflate
+YA_COMPRIMIDOS = {
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic",
+    ".zip", ".rar", ".7z", ".gz", ".mp4", ".mp3",
+    ".docx", ".xlsx", ".pptx", ".odt", ".ods",
+}
+
+
+class _Salida:
+    """Destino de zipfile que acumula lo escrito hasta que el generador lo entrega"""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+        self._posicion = 0
+
+    def write(self, datos) -> int:
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self) -> int:
+        return self._posicion
+
+    def flush(self):
+        pass
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def metodo_compresion(nombre: str) -> int:
+    return zipfile.ZIP_STORED if os.path.splitext(nombre)[1].lower() in YA_COMPRIMIDOS else zipfile.ZIP_DEFLATED
+
+
+def nombres_unicos(nombres: Iterable[str]) -> List[str]:
+    """Evitar entradas repetidas en el ZIP: 'a.pdf', 'a (2).pdf', ..."""
+    usados, resultado = set(), []
+    for nombre in nombres:
+        base, ext = os.path.splitext(nombre)
+        candidato, n = nombre, 1
+        while candidato.lower() in usados:
+            n += 1
+            candidato = f"{base} ({n}){ext}"
+        usados.add(candidato.lower())
+        resultado.append(candidato)
+    return resultado
+
+
+def zip_en_streaming(archivos: Iterable[Tuple[str, str]], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Generar un ZIP con `archivos` = [(ruta_en_disco, nombre_en_zip), ...].
+
+    Los archivos que ya no existen en disco se omiten (se registra en el log).
+    """
+    salida = _Salida()
+    with zipfile.ZipFile(salida, mode="w", allowZip64=True) as zip_salida:
+        for ruta, nombre in archivos:
+            try:
+                st = os.stat(ruta)
+                origen = open(ruta, "rb")
+            except OSError as e:
+                print(f"⚠️ Archivo omitido del ZIP {ruta}: {e}")
+                continue
+            with origen:
+                info = zipfile.ZipInfo(nombre, date_time=time.localtime(max(st.st_mtime, 315532800))[:6])
+                info.compress_type = metodo_compresion(nombre)
+                info.file_size = st.st_size
+                info.external_attr = 0o644 << 16
+                # file_size conocido: zipfile decide ZIP64 por adelantado
+                with zip_salida.open(info, mode="w") as destino:
+                    while True:
+                        bloque = origen.read(chunk_size)
+                        if not bloque:
+                            break
+                        destino.write(bloque)
+                        datos = salida.vaciar()
+                        if datos:
+                            yield datos
+            datos = salida.vaciar()
+            if datos:
+                yield datos
+    # Directorio central
+    datos = salida.vaciar()
+    if datos:
+        yield datos
+
+
+def respuesta_zip(archivos: List[Tuple[str, str]], nombre_zip: str) -> StreamingResponse:
+    """StreamingResponse del ZIP; sin Content-Length porque el tamaño final no se conoce"""
+    rutas = [ruta for ruta, _ in archivos]
+    nombres = nombres_unicos(nombre for _, nombre in archivos)
+    return StreamingResponse(
+        zip_en_streaming(zip(rutas, nombres)),
+        media_type="application/zip",
+        headers={
+            "content-disposition": content_disposition(nombre_zip, descargar=True),
+            "cache-control": "private, no-store",
+        }
+    )
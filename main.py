@@ -6,8 +6,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.routes import user_routes, web_routes, solicitud_routes
 from app.routes import aprobador, pagador
 from app.routes import chat_routes
-from app.config.database import connect_to_mongo, close_mongo_connection
+from app.routes import internal_routes, metrics_routes
+from app.middleware.metrics import MetricsMiddleware
+from app.config.database import connect_to_mongo, close_mongo_connection, get_async_database
+from app.controllers.user_controller import user_controller
+from app.models.solicitud_db import SolicitudDB
+from app.models.solicitud_stats_db import SolicitudStatsDB
+from app.utils.knowledge import knowledge_index
+from app.utils.vector_index import vector_index
+from app.config.settings import settings
+from starlette.concurrency import run_in_threadpool
 import smtplib
+import logging
 from fastapi.responses import HTMLResponse
 from app.utils.auth import get_current_user
 
@@ -15,9 +25,23 @@ from app.utils.auth import get_current_user
 async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
+    await user_controller.ensure_indexes()
+    await SolicitudDB(get_async_database()).ensure_indexes()
+    # El backfill de las estadísticas materializadas es explícito (no en cada worker)
+    if await SolicitudStatsDB(get_async_database()).necesita_reconstruccion():
+        logging.warning(
+            "solicitud_stats no está reconstruida: las estadísticas se calculan en vivo "
+            "hasta ejecutar scripts/rebuild_solicitud_stats.py"
+        )
+    # Índice del chat: se construye una vez, no en el primer mensaje
+    await run_in_threadpool(knowledge_index.build)
+    if settings.KNOWLEDGE_SEARCH_MODE == "semantic":
+        # Mapea los vectores del disco (o los reconstruye si cambió la documentación)
+        await run_in_threadpool(vector_index.ensure_ready)
     yield
     # Shutdown
     await close_mongo_connection()
+    user_controller.password_hasher.shutdown()
 
 # Crear instancia de FastAPI
 app = FastAPI(
@@ -38,9 +62,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas por ruta (se agrega al final para quedar por fuera de CORS y medirlo también)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Adjuntos y comprobantes no se montan como estáticos: sólo se sirven por la ruta
+# autorizada /api/solicitudes/estandar/{id}/archivos/{nombre}. Los comprobantes
+# anteriores al almacén siguen en static/uploads/, así que se excluyen del montaje
+@app.api_route("/static/uploads/{ruta:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def bloquear_uploads_estaticos(ruta: str):
+    raise HTTPException(status_code=404, detail="Not Found")
+
 # Montar archivos estáticos
 app.mount("/static", StaticFiles(directory="static"), name="static")
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
 # Configurar templates
 templates = Jinja2Templates(directory="templates")
@@ -57,6 +91,11 @@ app.include_router(pagador.router, tags=["Pagador"])
 app.include_router(web_routes.router, tags=["Web"])
 app.include_router(chat_routes.router, tags=["Chat"])
 
+# Rutas internas de diagnóstico
+app.include_router(internal_routes.router)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics_routes.router)
+
 # Ruta principal
 @app.get("/")
 async def read_root(request: Request):
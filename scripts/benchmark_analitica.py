@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Benchmark reproducible de las consultas de análisis: pandas, Spark y MongoDB.
+
+Mide las mismas cuatro consultas de performance_tests (spark_mongo_analytics.py
+y mongo_analytics_java8.py) en los tres motores, sobre datasets sintéticos
+fijos (100k / 1M / 5M usuarios, misma semilla = mismos datos):
+
+- filtro: usuarios activos de tres departamentos
+- agregacion: por departamento, rol y activo (conteo, logins, fechas)
+- join: usuarios ⋈ resumen de aprobadores de su departamento
+- top_departamento: 10 usuarios con más logins por departamento
+
+Cada consulta se ejecuta --calentamiento veces sin medir y --repeticiones
+veces medidas; se reportan p50, p95, mínimo y media, y el tamaño del
+resultado (debe coincidir entre motores). Los resultados se guardan en JSON
+(--salida) junto con la versión del código y del entorno.
+
+--comparar BASE.json marca como regresión cada consulta cuyo p50 empeore más
+de --tolerancia (y más de --umbral-ms) respecto a la base; el proceso
+termina con código 1 si hay regresiones.
+
+Uso:
+    python scripts/benchmark_analitica.py --tamanios 100k,1m --motores pandas,spark
+    python scripts/benchmark_analitica.py --salida base.json
+    python scripts/benchmark_analitica.py --comparar base.json --tolerancia 0.15
+    python scripts/benchmark_analitica.py --actual nuevo.json --comparar base.json   # sin ejecutar
+
+Los datasets se generan una vez en data/benchmarks/ (Parquet). El motor
+mongo usa MONGODB_URL (.env) y su propia base de datos, que se elimina al
+terminar salvo con --conservar. Spark y MongoDB se omiten si no están
+disponibles.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROYECTO)
+sys.path.append(os.path.join(PROYECTO, "spark"))
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from users_frame import table_to_frame, users_schema
+
+DIRECTORIO = os.path.join(PROYECTO, "data", "benchmarks")
+BENCH_DB = "benchmark_analitica"
+TAMANIOS = {"100k": 100_000, "1m": 1_000_000, "5m": 5_000_000}
+SEMILLA = 20251001
+LOTE = 50_000
+
+DEPARTAMENTOS = ["Rectoría", "Dirección Académica", "Dirección Administrativa",
+                 "Finanzas", "Recursos Humanos", "Sistemas y TI", "Mantenimiento",
+                 "Biblioteca", "Servicios Escolares", "Vinculación", "Investigación",
+                 "Desarrollo Académico", "Planeación", "Jurídico", "Comunicación",
+                 "Calidad", "Seguridad", "Compras", "Almacén", "Transporte"]
+ROLES = [("solicitante", 0.70), ("aprobador", 0.20), ("pagador", 0.08), ("admin", 0.02)]
+DOMINIOS = ["utvt.edu.mx", "gmail.com", "hotmail.com", "outlook.com"]
+NOMBRES = ["Ana", "Luis", "María", "José", "Carmen", "Jorge", "Laura", "Pedro", "Sofía", "Miguel",
+           "Elena", "Carlos", "Lucía", "Diego", "Paula", "Andrés"]
+APELLIDOS = ["García", "López", "Martínez", "Hernández", "González", "Pérez", "Sánchez", "Ramírez",
+             "Torres", "Flores", "Rivera", "Gómez"]
+UBICACIONES = ["Toluca", "Lerma", "Metepec", "Zinacantepec", "CDMX", "Tenango"]
+SALARIOS = ["A", "B", "C", "D", "E"]
+
+DEPARTAMENTOS_FILTRO = ["Sistemas y TI", "Finanzas", "Recursos Humanos"]
+CONSULTAS = ["filtro", "agregacion", "join", "top_departamento"]
+TOP = 10
+
+
+# --------------------------------------------------------------------------- datos
+
+def _categoria(rng, valores, n, pesos=None):
+    indices = rng.choice(len(valores), size=n, p=pesos).astype(np.int32)
+    return indices, pa.DictionaryArray.from_arrays(pa.array(indices, pa.int32()), pa.array(valores))
+
+
+def generar_dataset(n, semilla=SEMILLA):
+    """Usuarios sintéticos con el esquema de users_frame (mismos datos para la misma semilla)"""
+    rng = np.random.default_rng(semilla)
+    user_id = np.arange(1, n + 1, dtype=np.int32)
+    i_nombre, nombres = _categoria(rng, NOMBRES, n)
+    i_apellido, apellidos = _categoria(rng, APELLIDOS, n)
+    i_dominio = rng.integers(0, len(DOMINIOS), n)
+    _, departamentos = _categoria(rng, DEPARTAMENTOS, n)
+    _, roles = _categoria(rng, [r for r, _ in ROLES], n, [p for _, p in ROLES])
+
+    inicio = np.datetime64("2023-10-01T00:00:00", "ms")
+    dos_anios_ms = 2 * 365 * 24 * 3600 * 1000
+    creado = rng.integers(0, dos_anios_ms, n)
+    con_login = rng.random(n) < 0.7
+    ultimo = creado + (rng.random(n) * (dos_anios_ms - creado)).astype(np.int64)
+
+    nombres_min = [s.lower() for s in NOMBRES]
+    apellidos_min = [s.lower() for s in APELLIDOS]
+    columnas = {
+        "user_id": pa.array(user_id),
+        "email": pa.array([f"user{u}_{nombres_min[a]}.{apellidos_min[b]}@{DOMINIOS[d]}"
+                           for u, a, b, d in zip(user_id.tolist(), i_nombre.tolist(),
+                                                 i_apellido.tolist(), i_dominio.tolist())]),
+        "first_name": nombres,
+        "last_name": apellidos,
+        "department": departamentos,
+        "role": roles,
+        "phone": pa.array(np.char.add("722", rng.integers(1_000_000, 10_000_000, n).astype(str)).tolist()),
+        "is_active": pa.array(rng.random(n) < 0.75),
+        "created_at": pa.array(inicio + creado.astype("timedelta64[ms]")),
+        "last_login": pa.array(inicio + ultimo.astype("timedelta64[ms]"), mask=~con_login),
+        "login_count": pa.array(np.where(con_login, rng.integers(0, 101, n), 0).astype(np.int32)),
+        "position": _categoria(rng, [f"Puesto {k}" for k in range(1, 31)], n)[1],
+        "employee_id": pa.array([f"EMP{u:08d}" for u in user_id.tolist()]),
+        "salary_range": _categoria(rng, SALARIOS, n)[1],
+        "location": _categoria(rng, UBICACIONES, n)[1],
+    }
+    return pa.Table.from_pydict(columnas, schema=users_schema())
+
+
+def ruta_dataset(n, semilla):
+    return os.path.join(DIRECTORIO, f"usuarios_{n}_s{semilla}.parquet")
+
+
+def preparar_dataset(n, semilla):
+    """Parquet del dataset (se genera sólo la primera vez)"""
+    ruta = ruta_dataset(n, semilla)
+    if not os.path.exists(ruta):
+        print(f"🌱 Generando {n:,} usuarios sintéticos (semilla {semilla})...")
+        os.makedirs(DIRECTORIO, exist_ok=True)
+        pq.write_table(generar_dataset(n, semilla), ruta + ".tmp")
+        os.replace(ruta + ".tmp", ruta)
+    return ruta
+
+
+# ------------------------------------------------------------------------- motores
+
+class MotorPandas:
+    nombre = "pandas"
+
+    def __init__(self, ruta):
+        self.df = table_to_frame(pq.read_table(ruta))
+
+    def consultas(self):
+        df = self.df
+
+        def filtro():
+            return len(df[(df["is_active"] == True) & (df["department"].isin(DEPARTAMENTOS_FILTRO))])
+
+        def agregacion():
+            return len(df.groupby(["department", "role", "is_active"], observed=True).agg({
+                "user_id": "count",
+                "login_count": ["mean", "max", "min"],
+                "created_at": ["min", "max"],
+            }))
+
+        def join():
+            aprobadores = df[df["role"] == "aprobador"].groupby("department", observed=True).agg(
+                aprobadores=("user_id", "size"), logins_aprobadores=("login_count", "mean")
+            )
+            return len(df[["user_id", "department"]].merge(aprobadores, left_on="department", right_index=True))
+
+        def top_departamento():
+            ordenados = df.sort_values("login_count", ascending=False, kind="stable")
+            return len(ordenados.groupby("department", observed=True).head(TOP))
+
+        return {"filtro": filtro, "agregacion": agregacion, "join": join, "top_departamento": top_departamento}
+
+    def cerrar(self):
+        self.df = None
+
+
+class MotorSpark:
+    nombre = "spark"
+
+    def __init__(self, ruta):
+        from pyspark.sql import SparkSession
+        self.spark = SparkSession.builder \
+            .appName("EU-UTVT-Benchmark-Analitica") \
+            .master("local[*]") \
+            .config("spark.sql.adaptive.enabled", "true") \
+            .config("spark.sql.shuffle.partitions", "16") \
+            .config("spark.driver.memory", "4g") \
+            .getOrCreate()
+        self.spark.sparkContext.setLogLevel("WARN")
+        self.df = self.spark.read.parquet(ruta).cache()
+        self.df.count()
+
+    def consultas(self):
+        from pyspark.sql import Window
+        from pyspark.sql import functions as F
+        df = self.df
+
+        def filtro():
+            return df.filter(F.col("is_active") & F.col("department").isin(DEPARTAMENTOS_FILTRO)).count()
+
+        def agregacion():
+            return len(df.groupBy("department", "role", "is_active").agg(
+                F.count("*"), F.avg("login_count"), F.max("login_count"), F.min("login_count"),
+                F.min("created_at"), F.max("created_at")
+            ).collect())
+
+        def join():
+            aprobadores = df.filter(F.col("role") == "aprobador").groupBy("department").agg(
+                F.count("*").alias("aprobadores"), F.avg("login_count").alias("logins_aprobadores")
+            )
+            return df.select("user_id", "department").join(aprobadores, "department").count()
+
+        def top_departamento():
+            ventana = Window.partitionBy("department").orderBy(F.desc("login_count"))
+            return df.withColumn("rank", F.row_number().over(ventana)).filter(F.col("rank") <= TOP).count()
+
+        return {"filtro": filtro, "agregacion": agregacion, "join": join, "top_departamento": top_departamento}
+
+    def cerrar(self):
+        self.df.unpersist()
+        self.spark.stop()
+
+
+class MotorMongo:
+    nombre = "mongo"
+
+    def __init__(self, ruta, n, semilla, url):
+        from pymongo import MongoClient
+        self.cliente = MongoClient(url, serverSelectionTimeoutMS=3000)
+        self.cliente.admin.command("ping")
+        self.db = self.cliente[BENCH_DB]
+        self.coleccion = self.db[f"usuarios_{n}_s{semilla}"]
+        if self.coleccion.estimated_document_count() != n:
+            self._sembrar(ruta, n)
+
+    def _sembrar(self, ruta, n):
+        print(f"🌱 Cargando {n:,} usuarios en MongoDB ({BENCH_DB}.{self.coleccion.name})...")
+        self.coleccion.drop()
+        cargados = 0
+        for lote in pq.ParquetFile(ruta).iter_batches(batch_size=LOTE):
+            filas = lote.to_pylist()
+            for fila in filas:
+                fila["profile"] = {campo: fila.pop(campo) for campo in
+                                   ("position", "employee_id", "salary_range", "location")}
+            self.coleccion.insert_many(filas, ordered=False)
+            cargados += len(filas)
+            print(f"   {cargados:,}/{n:,}", end="\r")
+        print()
+        # Mismos índices que scripts/generate_massive_users.py
+        self.coleccion.create_index([("role", 1), ("department", 1)])
+        self.coleccion.create_index([("is_active", 1), ("role", 1)])
+        self.coleccion.create_index("created_at")
+        self.coleccion.create_index("last_login")
+
+    def consultas(self):
+        usuarios = self.coleccion
+        resumen = self.db[f"{usuarios.name}_aprobadores"]
+
+        def filtro():
+            return usuarios.count_documents({"is_active": True, "department": {"$in": DEPARTAMENTOS_FILTRO}})
+
+        def agregacion():
+            return len(list(usuarios.aggregate([
+                {"$group": {
+                    "_id": {"department": "$department", "role": "$role", "is_active": "$is_active"},
+                    "count": {"$sum": 1},
+                    "avg_logins": {"$avg": "$login_count"},
+                    "max_logins": {"$max": "$login_count"},
+                    "min_logins": {"$min": "$login_count"},
+                    "first": {"$min": "$created_at"},
+                    "last": {"$max": "$created_at"},
+                }}
+            ], allowDiskUse=True)))
+
+        def join():
+            usuarios.aggregate([
+                {"$match": {"role": "aprobador"}},
+                {"$group": {"_id": "$department", "aprobadores": {"$sum": 1},
+                            "logins_aprobadores": {"$avg": "$login_count"}}},
+                {"$out": resumen.name},
+            ])
+            resultado = list(usuarios.aggregate([
+                {"$project": {"_id": 0, "user_id": 1, "department": 1}},
+                {"$lookup": {"from": resumen.name, "localField": "department", "foreignField": "_id", "as": "a"}},
+                {"$unwind": "$a"},
+                {"$count": "n"},
+            ], allowDiskUse=True))
+            return resultado[0]["n"] if resultado else 0
+
+        def top_departamento():
+            # $topN requiere MongoDB 5.2+
+            grupos = usuarios.aggregate([
+                {"$group": {"_id": "$department", "top": {"$topN": {
+                    "n": TOP, "sortBy": {"login_count": -1}, "output": "$user_id"
+                }}}}
+            ], allowDiskUse=True)
+            return sum(len(g["top"]) for g in grupos)
+
+        return {"filtro": filtro, "agregacion": agregacion, "join": join, "top_departamento": top_departamento}
+
+    def cerrar(self):
+        self.cliente.close()
+
+
+# ------------------------------------------------------------------------ medición
+
+def percentil(valores, p):
+    """Percentil por rango más cercano (valores ya ordenados)"""
+    if not valores:
+        return 0.0
+    k = max(0, min(len(valores) - 1, int(round(p / 100.0 * len(valores))) - 1))
+    return valores[k]
+
+
+def medir(funcion, calentamiento, repeticiones):
+    """Tiempos en ms de `repeticiones` ejecuciones después de `calentamiento` sin medir"""
+    resultado = None
+    for _ in range(calentamiento):
+        resultado = funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    ordenados = sorted(tiempos)
+    return {
+        "tiempos_ms": [round(t, 3) for t in tiempos],
+        "p50_ms": round(statistics.median(ordenados), 3),
+        "p95_ms": round(percentil(ordenados, 95), 3),
+        "min_ms": round(ordenados[0], 3),
+        "media_ms": round(statistics.fmean(ordenados), 3),
+        "resultado": resultado,
+    }
+
+
+def entorno():
+    try:
+        commit = subprocess.run(["git", "-C", PROYECTO, "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    try:
+        import pyspark
+        version_spark = pyspark.__version__
+    except ImportError:
+        version_spark = None
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__,
+        "pyspark": version_spark,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def abrir_motor(nombre, ruta, n, args):
+    if nombre == "pandas":
+        return MotorPandas(ruta)
+    if nombre == "spark":
+        return MotorSpark(ruta)
+    if nombre == "mongo":
+        from app.config.settings import settings
+        return MotorMongo(ruta, n, args.semilla, settings.MONGODB_URL)
+    raise ValueError(f"Motor desconocido: {nombre}")
+
+
+def ejecutar(args):
+    resultados = []
+    motores_usados = set()
+    try:
+        for etiqueta in args.tamanios:
+            n = TAMANIOS[etiqueta]
+            ruta = preparar_dataset(n, args.semilla)
+            print(f"\n📊 Dataset {etiqueta} ({n:,} usuarios)")
+            for nombre in args.motores:
+                try:
+                    motor = abrir_motor(nombre, ruta, n, args)
+                except Exception as e:
+                    print(f"   ⚠️ {nombre}: no disponible ({type(e).__name__}: {str(e)[:80]}); se omite")
+                    continue
+                motores_usados.add(nombre)
+                try:
+                    consultas = motor.consultas()
+                    for consulta in args.consultas:
+                        medicion = medir(consultas[consulta], args.calentamiento, args.repeticiones)
+                        resultados.append({"dataset": etiqueta, "filas": n, "motor": nombre,
+                                           "consulta": consulta, **medicion})
+                        print(f"   {nombre:<7} {consulta:<17} p50 {medicion['p50_ms']:9.1f} ms | "
+                              f"p95 {medicion['p95_ms']:9.1f} ms | mín {medicion['min_ms']:9.1f} ms | "
+                              f"resultado {medicion['resultado']:,}")
+                finally:
+                    motor.cerrar()
+    finally:
+        if "mongo" in motores_usados and not args.conservar:
+            from pymongo import MongoClient
+            from app.config.settings import settings
+            with MongoClient(settings.MONGODB_URL) as cliente:
+                cliente.drop_database(BENCH_DB)
+
+    verificar_resultados(resultados)
+    return {
+        "entorno": entorno(),
+        "parametros": {"semilla": args.semilla, "calentamiento": args.calentamiento,
+                       "repeticiones": args.repeticiones, "tamanios": args.tamanios,
+                       "motores": args.motores, "consultas": args.consultas},
+        "resultados": resultados,
+    }
+
+
+def verificar_resultados(resultados):
+    """Todos los motores deben devolver el mismo tamaño de resultado para la misma consulta"""
+    por_consulta = {}
+    for r in resultados:
+        por_consulta.setdefault((r["dataset"], r["consulta"]), {})[r["motor"]] = r["resultado"]
+    for (dataset, consulta), valores in por_consulta.items():
+        if len(set(valores.values())) > 1:
+            print(f"⚠️ {dataset}/{consulta}: los motores no coinciden {valores}")
+
+
+# ----------------------------------------------------------------------- comparar
+
+def comparar(actual, base, tolerancia, umbral_ms):
+    """Lista de (clave, p50 base, p50 actual, cambio) y cuántas son regresiones"""
+    def por_clave(datos):
+        return {(r["dataset"], r["motor"], r["consulta"]): r for r in datos["resultados"]}
+
+    anteriores = por_clave(base)
+    regresiones = 0
+    print(f"\n📏 Comparación contra la base ({base['entorno'].get('commit')} del {base['entorno'].get('fecha')}), "
+          f"tolerancia {tolerancia:.0%}, umbral {umbral_ms} ms")
+    if base["entorno"].get("cpus") != actual["entorno"].get("cpus") or \
+            base["entorno"].get("plataforma") != actual["entorno"].get("plataforma"):
+        print("⚠️ La base se midió en otro entorno; las diferencias pueden no ser del código")
+
+    for clave, r in por_clave(actual).items():
+        anterior = anteriores.get(clave)
+        if anterior is None:
+            continue
+        antes, ahora = anterior["p50_ms"], r["p50_ms"]
+        cambio = (ahora - antes) / antes if antes else 0.0
+        if cambio > tolerancia and ahora - antes > umbral_ms:
+            estado = "🔴 REGRESIÓN"
+            regresiones += 1
+        elif cambio < -tolerancia and antes - ahora > umbral_ms:
+            estado = "🟢 mejora"
+        else:
+            estado = "   igual"
+        if anterior["resultado"] != r["resultado"]:
+            estado += f" ⚠️ resultado {anterior['resultado']:,} -> {r['resultado']:,}"
+        dataset, motor, consulta = clave
+        print(f"   {estado:<14} {dataset:<5} {motor:<7} {consulta:<17} "
+              f"{antes:9.1f} -> {ahora:9.1f} ms ({cambio:+.1%})")
+
+    if regresiones:
+        print(f"\n🔴 {regresiones} regresiones")
+    else:
+        print("\n✅ Sin regresiones")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de consultas de análisis: pandas, Spark y MongoDB")
+    parser.add_argument("--tamanios", default="100k", help=f"Datasets separados por coma ({', '.join(TAMANIOS)})")
+    parser.add_argument("--motores", default="pandas,spark,mongo")
+    parser.add_argument("--consultas", default=",".join(CONSULTAS))
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--calentamiento", type=int, default=1, help="Ejecuciones sin medir por consulta")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Ejecuciones medidas por consulta")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto data/benchmarks/analitica_<fecha>.json)")
+    parser.add_argument("--actual", help="Usar este JSON en lugar de ejecutar (para --comparar)")
+    parser.add_argument("--comparar", help="JSON base contra el que buscar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.10, help="Empeoramiento relativo del p50 tolerado")
+    parser.add_argument("--umbral-ms", type=float, default=5.0, help="Diferencias menores se ignoran")
+    parser.add_argument("--conservar", action="store_true", help="No borrar la base de MongoDB al terminar")
+    args = parser.parse_args()
+    args.tamanios = [t.strip().lower() for t in args.tamanios.split(",") if t.strip()]
+    args.motores = [m.strip().lower() for m in args.motores.split(",") if m.strip()]
+    args.consultas = [c.strip() for c in args.consultas.split(",") if c.strip()]
+    for t in args.tamanios:
+        if t not in TAMANIOS:
+            parser.error(f"tamaño desconocido: {t}")
+    for c in args.consultas:
+        if c not in CONSULTAS:
+            parser.error(f"consulta desconocida: {c}")
+
+    if args.actual:
+        with open(args.actual, encoding="utf-8") as f:
+            actual = json.load(f)
+    else:
+        actual = ejecutar(args)
+        salida = args.salida or os.path.join(DIRECTORIO, f"analitica_{datetime.now():%Y%m%d_%H%M%S}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+        with open(salida, "w", encoding="utf-8") as f:
+            json.dump(actual, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados guardados: {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        if comparar(actual, base, args.tolerancia, args.umbral_ms):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
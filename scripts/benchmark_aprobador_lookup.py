@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: listado de pendientes del aprobador con un find_one por solicitud
+(N+1, comportamiento anterior) vs una sola consulta $in de solicitantes
+(AprobadorController actual).
+
+Siembra 10k solicitudes en estado 'enviada' y mide el tiempo de
+get_solicitudes_pendientes para distintos valores de `limite`.
+
+Uso:
+    python scripts/benchmark_aprobador_lookup.py --limite 100 --repeticiones 20
+
+Requiere un mongod local (MONGODB_URL en .env). Usa su propia base de datos
+y la elimina al terminar.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+
+from app.config.settings import settings
+from app.controllers.aprobador_controller import AprobadorController
+from app.models.solicitud_db import SolicitudDB
+from app.models.user_db import UserDB
+
+BENCH_DB = "benchmark_aprobador_lookup"
+SEED_USERS = 2_000
+SEED_PENDIENTES = 10_000
+
+
+def sembrar_datos(db):
+    """Crear usuarios y solicitudes pendientes de prueba"""
+    print(f"🌱 Sembrando {SEED_USERS} usuarios y {SEED_PENDIENTES} solicitudes pendientes...")
+    db.users.drop()
+    db.solicitudes_estandar.drop()
+    db.users.insert_many([
+        {"email": f"user{i}@bench.mx", "first_name": f"Nombre{i}", "last_name": f"Apellido{i}",
+         "department": "Finanzas", "role": "solicitante", "status": "active"}
+        for i in range(SEED_USERS)
+    ])
+    ahora = datetime.utcnow()
+    db.solicitudes_estandar.insert_many([
+        {"solicitante_email": f"user{i % SEED_USERS}@bench.mx", "estado": "enviada",
+         "departamento": "Finanzas", "monto": float(i), "tipo_pago": "transferencia",
+         "fecha_creacion": ahora - timedelta(minutes=i)}
+        for i in range(SEED_PENDIENTES)
+    ])
+
+
+async def pendientes_n_mas_1(controller, limite):
+    """Reproducción del listado anterior: un find_one por solicitud"""
+    solicitudes = await controller.solicitudes.find(
+        {"estado": "enviada"}, sort=[("fecha_creacion", -1)], limit=limite
+    )
+    result = []
+    for solicitud in solicitudes:
+        solicitante = await controller.users.find_user_by_email(solicitud.get("solicitante_email"))
+        result.append((solicitud["_id"], solicitante))
+    return result
+
+
+async def medir(nombre, funcion, repeticiones):
+    """Ejecutar `funcion` varias veces y reportar la mediana en ms"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        # El controlador imprime trazas DEBUG por solicitud; no cuentan para la medición
+        with contextlib.redirect_stdout(io.StringIO()):
+            await funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    mediana = statistics.median(tiempos)
+    print(f"   {nombre:<32} mediana: {mediana:8.1f} ms | mín: {min(tiempos):8.1f} ms")
+    return mediana
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark N+1 vs consulta $in de solicitantes")
+    parser.add_argument("--limite", type=int, nargs="+", default=[20, 100, 500])
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    sync_client = MongoClient(settings.MONGODB_URL)
+    async_client = AsyncIOMotorClient(settings.MONGODB_URL)
+    try:
+        sembrar_datos(sync_client[BENCH_DB])
+        db = async_client[BENCH_DB]
+        await UserDB(db).ensure_indexes()
+        await SolicitudDB(db).ensure_indexes()
+        controller = AprobadorController(db=db)
+
+        for limite in args.limite:
+            print(f"\n📊 limite={limite}")
+            antes = await medir("ANTES - find_one por solicitud",
+                                lambda: pendientes_n_mas_1(controller, limite), args.repeticiones)
+            despues = await medir("DESPUÉS - una consulta $in",
+                                  lambda: controller.get_solicitudes_pendientes("bench@bench.mx", limite=limite),
+                                  args.repeticiones)
+            if despues > 0:
+                print(f"   🚀 Mejora: {antes / despues:.1f}x")
+    finally:
+        sync_client.drop_database(BENCH_DB)
+        sync_client.close()
+        async_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latencia p50/p95/p99 bajo carga concurrente con PyMongo síncrono
+dentro del event loop (comportamiento anterior) vs Motor asíncrono (actual).
+
+Cada "petición" simula lo que hace una ruta típica: un find_one por email y
+un listado de solicitudes. Una de cada N peticiones lanza además una consulta
+lenta (regex sin índice) para reproducir el bloqueo del worker.
+
+Uso:
+    python scripts/benchmark_async_db.py --requests 2000 --concurrency 100
+
+Requiere un mongod local (MONGODB_URL en .env). Usa su propia base de datos
+y la elimina al terminar.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient, ASCENDING
+
+from app.config.settings import settings
+
+BENCH_DB = "benchmark_async_db"
+SEED_USERS = 20_000
+SEED_SOLICITUDES = 20_000
+SLOW_EVERY = 50
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano (valores ya ordenados)"""
+    if not valores:
+        return 0.0
+    k = max(0, min(len(valores) - 1, int(round(p / 100.0 * len(valores))) - 1))
+    return valores[k]
+
+
+def sembrar_datos(db):
+    """Crear usuarios y solicitudes de prueba"""
+    print("🌱 Sembrando datos de prueba...")
+    db.users.drop()
+    db.solicitudes_estandar.drop()
+    db.users.insert_many([
+        {"email": f"user{i}@bench.mx", "first_name": f"Nombre{i}", "department": "Finanzas"}
+        for i in range(SEED_USERS)
+    ])
+    db.users.create_index([("email", ASCENDING)], unique=True)
+    db.solicitudes_estandar.insert_many([
+        {"solicitante_email": f"user{i % SEED_USERS}@bench.mx", "estado": "enviada", "monto": i}
+        for i in range(SEED_SOLICITUDES)
+    ])
+    db.solicitudes_estandar.create_index([("solicitante_email", ASCENDING)])
+
+
+async def peticion_sync(db, i):
+    """Ruta con PyMongo bloqueante (como antes del cambio)"""
+    email = f"user{i % SEED_USERS}@bench.mx"
+    db.users.find_one({"email": email})
+    list(db.solicitudes_estandar.find({"solicitante_email": email}).limit(20))
+    if i % SLOW_EVERY == 0:
+        db.users.count_documents({"first_name": {"$regex": "9$"}})
+
+
+async def peticion_async(db, i):
+    """Ruta con Motor (repositorios actuales)"""
+    email = f"user{i % SEED_USERS}@bench.mx"
+    await db.users.find_one({"email": email})
+    await db.solicitudes_estandar.find({"solicitante_email": email}).limit(20).to_list(length=20)
+    if i % SLOW_EVERY == 0:
+        await db.users.count_documents({"first_name": {"$regex": "9$"}})
+
+
+async def ejecutar(nombre, peticion, db, total, concurrencia):
+    """Lanzar `total` peticiones con `concurrencia` en vuelo y medir latencias"""
+    latencias = []
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def una(i):
+        # La latencia incluye la espera en cola: es lo que percibe el cliente
+        # cuando otra petición tiene bloqueado el event loop
+        inicio = time.perf_counter()
+        async with semaforo:
+            await peticion(db, i)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio_total = time.perf_counter()
+    await asyncio.gather(*(una(i) for i in range(total)))
+    duracion = time.perf_counter() - inicio_total
+
+    latencias.sort()
+    print(f"\n📊 {nombre}")
+    print(f"   Peticiones: {total} | Concurrencia: {concurrencia} | Throughput: {total / duracion:.0f} req/s")
+    print(f"   p50: {percentil(latencias, 50):.1f} ms | p95: {percentil(latencias, 95):.1f} ms | p99: {percentil(latencias, 99):.1f} ms")
+    return percentil(latencias, 99)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark PyMongo síncrono vs Motor")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    sync_client = MongoClient(settings.MONGODB_URL)
+    async_client = AsyncIOMotorClient(settings.MONGODB_URL)
+    try:
+        sembrar_datos(sync_client[BENCH_DB])
+
+        p99_antes = await ejecutar("ANTES - PyMongo en el event loop", peticion_sync,
+                                   sync_client[BENCH_DB], args.requests, args.concurrency)
+        p99_despues = await ejecutar("DESPUÉS - Motor (await real)", peticion_async,
+                                     async_client[BENCH_DB], args.requests, args.concurrency)
+
+        if p99_despues > 0:
+            print(f"\n🚀 Mejora p99: {p99_antes / p99_despues:.1f}x")
+    finally:
+        sync_client.drop_database(BENCH_DB)
+        sync_client.close()
+        async_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark: carga de usuarios de MongoDB a pandas.
+
+- ANTES: lista de diccionarios por usuario -> pd.DataFrame (columnas object)
+  y conversión de tipos después (load_users_data anterior)
+- DESPUÉS: users_frame.load_users_frame (lotes BSON crudos -> Arrow ->
+  categóricos / int32 / bool / datetime64, rangos de _id en paralelo)
+
+Cada método corre en un proceso aparte para medir su RSS máximo. Se reporta
+tiempo de carga, memoria del DataFrame (memory_usage(deep=True)) y RSS.
+
+Uso:
+    python scripts/benchmark_carga_usuarios.py --particiones 8 --procesos 4
+    python scripts/benchmark_carga_usuarios.py --sintetico 1000000
+
+--sintetico N no necesita MongoDB: genera N usuarios con la forma de
+generate_massive_users.py, los codifica en BSON una vez y los sirve desde
+memoria con la misma interfaz de cursor (sin particiones).
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROYECTO, "spark"))
+
+import bson
+import pandas as pd
+from pymongo import MongoClient
+
+from mongo_partitions import USER_PROJECTION, peak_rss_mb
+from users_frame import load_users_frame
+
+DEPARTAMENTOS = ["Sistemas y TI", "Finanzas", "Recursos Humanos", "Dirección General", "Contabilidad",
+                 "Compras", "Jurídico", "Mantenimiento", "Servicios Escolares", "Vinculación",
+                 "Biblioteca", "Posgrado", "Investigación", "Comunicación", "Planeación",
+                 "Calidad", "Idiomas", "Deportes", "Cultura", "Enfermería"]
+ROLES = ["solicitante", "aprobador", "pagador", "admin"]
+NOMBRES = ["Ana", "Luis", "María", "José", "Carmen", "Jorge", "Laura", "Pedro", "Sofía", "Miguel"]
+APELLIDOS = ["García", "López", "Martínez", "Hernández", "González", "Pérez", "Sánchez", "Ramírez"]
+UBICACIONES = ["Toluca", "Lerma", "Metepec", "Zinacantepec", "CDMX"]
+
+
+class ColeccionEnMemoria:
+    """Usuarios sintéticos ya codificados en BSON, con find/find_raw_batches"""
+
+    def __init__(self, total, semilla=7, lote=50000):
+        rnd = random.Random(semilla)
+        inicio = datetime(2023, 1, 1)
+        self.lotes = []
+        for desde in range(1, total + 1, lote):
+            docs = []
+            for user_id in range(desde, min(desde + lote, total + 1)):
+                nombre, apellido = rnd.choice(NOMBRES), rnd.choice(APELLIDOS)
+                docs.append(bson.encode({
+                    "user_id": user_id,
+                    "email": f"user{user_id}_{nombre.lower()}.{apellido.lower()}@utvt.edu.mx",
+                    "first_name": nombre, "last_name": apellido,
+                    "department": rnd.choice(DEPARTAMENTOS), "role": rnd.choice(ROLES),
+                    "phone": f"722{rnd.randint(1000000, 9999999)}",
+                    "is_active": rnd.random() < 0.8,
+                    "created_at": inicio + timedelta(minutes=user_id),
+                    "last_login": None if rnd.random() < 0.2 else inicio + timedelta(days=rnd.randint(0, 700)),
+                    "login_count": rnd.randint(0, 500),
+                    "profile": {"position": f"Puesto {rnd.randint(1, 30)}", "employee_id": f"EMP{user_id:08d}",
+                                "salary_range": rnd.choice(["A", "B", "C", "D"]), "location": rnd.choice(UBICACIONES)},
+                }))
+            self.lotes.append(b"".join(docs))
+
+    def find_raw_batches(self, filtro=None, proyeccion=None, batch_size=0, limit=0):
+        return iter(self.lotes)
+
+    def find(self, filtro=None, proyeccion=None):
+        return (doc for lote in self.lotes for doc in bson.decode_all(lote))
+
+
+def cargar_anterior(coleccion):
+    """load_users_data anterior: lista de diccionarios y conversión de tipos al final"""
+    data = []
+    for doc in coleccion.find({}, USER_PROJECTION):
+        profile = doc.get('profile', {})
+        data.append({
+            'user_id': doc.get('user_id'), 'email': doc.get('email'),
+            'first_name': doc.get('first_name'), 'last_name': doc.get('last_name'),
+            'department': doc.get('department'), 'role': doc.get('role'), 'phone': doc.get('phone'),
+            'is_active': doc.get('is_active'), 'created_at': doc.get('created_at'),
+            'last_login': doc.get('last_login'), 'login_count': doc.get('login_count', 0),
+            'position': profile.get('position'), 'employee_id': profile.get('employee_id'),
+            'salary_range': profile.get('salary_range'), 'location': profile.get('location')
+        })
+    df = pd.DataFrame(data)
+    df['created_at'] = pd.to_datetime(df['created_at'])
+    df['last_login'] = pd.to_datetime(df['last_login'])
+    df['is_active'] = df['is_active'].astype(bool)
+    df['login_count'] = pd.to_numeric(df['login_count'], errors='coerce').fillna(0)
+    return df
+
+
+def ejecutar(metodo, args, cola):
+    if args.sintetico:
+        coleccion = ColeccionEnMemoria(args.sintetico)
+        particiones = 1
+    else:
+        coleccion = MongoClient(args.uri)[args.db][args.coleccion]
+        particiones = args.particiones
+    base = peak_rss_mb() or 0
+    inicio = time.perf_counter()
+    if metodo == "ANTES":
+        df = cargar_anterior(coleccion)
+    else:
+        df = load_users_frame(coleccion, partitions=particiones, workers=args.procesos)
+    segundos = time.perf_counter() - inicio
+    cola.put({
+        "filas": len(df),
+        "segundos": segundos,
+        "df_mb": df.memory_usage(deep=True).sum() / (1024 * 1024),
+        "rss_mb": (peak_rss_mb() or 0) - base,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga de usuarios de MongoDB a pandas: antes vs columnar")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="eu_utvt_db")
+    parser.add_argument("--coleccion", default="users")
+    parser.add_argument("--particiones", type=int, default=8)
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos de conversión (por defecto uno por núcleo)")
+    parser.add_argument("--sintetico", type=int, default=0, help="Usuarios sintéticos en memoria (sin MongoDB)")
+    args = parser.parse_args()
+
+    origen = f"{args.sintetico:,} usuarios sintéticos" if args.sintetico else f"{args.uri}/{args.db}.{args.coleccion}"
+    print(f"📊 Carga de usuarios desde {origen}")
+
+    resultados = {}
+    for metodo in ("ANTES", "DESPUÉS"):
+        cola = multiprocessing.Queue()
+        proceso = multiprocessing.Process(target=ejecutar, args=(metodo, args, cola))
+        proceso.start()
+        resultados[metodo] = cola.get()
+        proceso.join()
+        r = resultados[metodo]
+        print(f"   {metodo:<8} {r['filas']:>10,} filas | {r['segundos']:7.2f} s "
+              f"({r['filas'] / r['segundos']:>9,.0f} filas/s) | DataFrame {r['df_mb']:8.1f} MB | RSS +{r['rss_mb']:8.1f} MB")
+
+    antes, despues = resultados["ANTES"], resultados["DESPUÉS"]
+    print(f"\n🚀 Mejora: {antes['segundos'] / despues['segundos']:.1f}x más rápido, "
+          f"{antes['df_mb'] / despues['df_mb']:.1f}x menos memoria del DataFrame, "
+          f"{antes['rss_mb'] / max(despues['rss_mb'], 1):.1f}x menos RSS máximo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark: coincidencia de FAQ del chat con muchas entradas.
+
+- ANTES: answer_faq anterior (normaliza cada clave de FAQ en cada llamada y
+  recorre el diccionario dos veces)
+- DESPUÉS: IntentEngine (claves normalizadas una vez, un autómata
+  Aho–Corasick recorre el mensaje una sola vez)
+
+También simula un flujo de preguntas repetidas (distribución de Zipf) para
+mostrar la tasa de aciertos de la caché LRU de respuestas.
+
+Uso:
+    python scripts/benchmark_chat_intents.py --entradas 500 --mensajes 2000
+
+No requiere MongoDB.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.intent_engine import AnswerCache, IntentEngine
+from app.utils.knowledge import normalize_text
+from app.utils.llm_client import FAQ
+
+PALABRAS = ("solicitud pago comprobante factura proveedor departamento aprobador pagador "
+            "estado monto cuenta banco transferencia reporte usuario rol contraseña archivo").split()
+
+
+def answer_faq_anterior(faq, question):
+    q = normalize_text(question)
+    for k, v in faq.items():
+        if normalize_text(k) == q:
+            return v
+    for k, v in faq.items():
+        if normalize_text(k) in q:
+            return v
+    return None
+
+
+def generar_faq(entradas, rnd):
+    faq = dict(FAQ)
+    while len(faq) < entradas:
+        pregunta = "¿" + " ".join(rnd.sample(PALABRAS, 3)) + f" {len(faq)}?"
+        faq[pregunta] = f"Respuesta {len(faq)}"
+    return faq
+
+
+def medir(funcion, mensajes):
+    tiempos = []
+    for mensaje in mensajes:
+        inicio = time.perf_counter()
+        funcion(mensaje)
+        tiempos.append((time.perf_counter() - inicio) * 1_000_000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coincidencia de FAQ y caché de respuestas del chat")
+    parser.add_argument("--entradas", type=int, default=500, help="Entradas de FAQ sintéticas")
+    parser.add_argument("--mensajes", type=int, default=2000)
+    parser.add_argument("--cache", type=int, default=256, help="Tamaño de la caché LRU")
+    parser.add_argument("--semilla", type=int, default=7)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.semilla)
+    faq = generar_faq(args.entradas, rnd)
+    preguntas = list(faq)
+    mensajes = []
+    for _ in range(args.mensajes):
+        if rnd.random() < 0.3:
+            mensajes.append("oye, " + rnd.choice(preguntas) + " gracias")
+        else:
+            mensajes.append(" ".join(rnd.choices(PALABRAS, k=rnd.randint(3, 12))))
+
+    inicio = time.perf_counter()
+    motor = IntentEngine(faq, [], normalize_text)
+    compilacion = (time.perf_counter() - inicio) * 1000
+    print(f"📚 FAQ: {len(faq)} entradas | autómata: {motor.stats()['automaton_states']:,} estados "
+          f"(compilado en {compilacion:.1f} ms)")
+
+    for mensaje in mensajes[:200]:
+        assert answer_faq_anterior(faq, mensaje) == motor.answer_faq(normalize_text(mensaje))
+
+    antes = medir(lambda m: answer_faq_anterior(faq, m), mensajes)
+    despues = medir(lambda m: motor.answer_faq(normalize_text(m)), mensajes)
+    print(f"\n📊 Latencia mediana por mensaje ({len(mensajes)} mensajes)")
+    print(f"   ANTES   {antes:10.1f} µs")
+    print(f"   DESPUÉS {despues:10.1f} µs")
+    print(f"   🚀 Mejora: {antes / despues:.0f}x")
+
+    # Flujo de preguntas repetidas: pocas preguntas muy frecuentes y una cola larga
+    cache = AnswerCache(args.cache)
+    pesos = [1 / (i + 1) for i in range(len(mensajes))]
+    for mensaje in rnd.choices(mensajes, weights=pesos, k=args.mensajes * 5):
+        clave = normalize_text(mensaje)
+        if cache.get(clave) is None:
+            cache.set(clave, {"answer": motor.answer_faq(clave)})
+    stats = cache.stats()
+    print(f"\n🗃️ Caché LRU ({args.cache} entradas): tasa de aciertos {stats['hit_rate']:.1%} "
+          f"| desalojos {stats['evictions']:,}")
+
+
+if __name__ == "__main__":
+    main()
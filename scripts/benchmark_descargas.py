@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Benchmark: descarga de adjuntos por el montaje público StaticFiles
+(`/uploads`, comportamiento anterior) vs ArchivoResponse (ruta autenticada
+/api/solicitudes/estandar/{id}/archivos/{nombre}, actual).
+
+Levanta un uvicorn en un proceso aparte con ambos caminos sobre los mismos
+archivos (PDFs sintéticos de varios MB) y lo carga con N hilos cliente
+(http.client, sin dependencias extra). Mide peticiones/s, MB/s y latencia
+para descargas completas, rangos de 1 MB (visor PDF) y revalidaciones con
+If-None-Match. La autorización contra MongoDB no se incluye: mide sólo el
+envío del archivo.
+
+Uso:
+    python scripts/benchmark_descargas.py --archivos 20 --tamano-mb 5 --peticiones 400 --concurrency 16
+
+No requiere MongoDB. uvicorn no implementa la extensión ASGI
+http.response.zerocopy, así que aquí se mide el envío por bloques; con un
+servidor que sí la ofrezca el cuerpo no pasa por Python.
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+
+from app.utils.descargas import ArchivoResponse
+
+MB = 1024 * 1024
+
+
+def crear_app(directorio):
+    app = FastAPI()
+    app.mount("/uploads", StaticFiles(directory=directorio), name="uploads")
+
+    @app.get("/descargas/{nombre}")
+    async def descargar(nombre: str):
+        return ArchivoResponse(os.path.join(directorio, os.path.basename(nombre)), nombre, media_type="application/pdf")
+
+    return app
+
+
+def servidor(directorio, puerto):
+    uvicorn.run(crear_app(directorio), host="127.0.0.1", port=puerto, log_level="warning", access_log=False)
+
+
+def esperar_servidor(puerto, timeout=15):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        try:
+            conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=1)
+            conexion.request("GET", "/docs")
+            conexion.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("El servidor no arrancó")
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else 0.0
+
+
+def medir(nombre, puerto, rutas, encabezados, peticiones, concurrencia):
+    """Lanzar `peticiones` GET repartidas en `concurrencia` hilos con conexión keep-alive"""
+    por_hilo = [peticiones // concurrencia + (1 if i < peticiones % concurrencia else 0) for i in range(concurrencia)]
+
+    def cliente(cantidad, semilla):
+        rnd = random.Random(semilla)
+        conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=60)
+        tiempos, total_bytes, estados = [], 0, {}
+        for _ in range(cantidad):
+            inicio = time.perf_counter()
+            conexion.request("GET", rnd.choice(rutas), headers=encabezados)
+            respuesta = conexion.getresponse()
+            total_bytes += len(respuesta.read())
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            estados[respuesta.status] = estados.get(respuesta.status, 0) + 1
+        conexion.close()
+        return tiempos, total_bytes, estados
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        resultados = list(pool.map(cliente, por_hilo, range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+
+    tiempos = [t for r in resultados for t in r[0]]
+    total_bytes = sum(r[1] for r in resultados)
+    estados = {}
+    for r in resultados:
+        for codigo, cantidad in r[2].items():
+            estados[codigo] = estados.get(codigo, 0) + cantidad
+    print(f"   {nombre:<32} {peticiones / duracion:8.1f} req/s | {total_bytes / MB / duracion:8.1f} MB/s | "
+          f"p50 {percentil(tiempos, 0.50):7.1f} ms | p99 {percentil(tiempos, 0.99):7.1f} ms | {estados}")
+    return peticiones / duracion
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark StaticFiles vs ArchivoResponse")
+    parser.add_argument("--archivos", type=int, default=20)
+    parser.add_argument("--tamano-mb", type=float, default=5)
+    parser.add_argument("--peticiones", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--puerto", type=int, default=8765)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="benchmark_descargas_")
+    proceso = None
+    try:
+        print(f"📄 Generando {args.archivos} archivos de {args.tamano_mb} MB...")
+        tamaño = int(args.tamano_mb * MB)
+        nombres = []
+        for i in range(args.archivos):
+            nombre = f"archivo_{i}.pdf"
+            with open(os.path.join(directorio, nombre), "wb") as archivo:
+                archivo.write(os.urandom(tamaño))
+            nombres.append(nombre)
+
+        proceso = multiprocessing.Process(target=servidor, args=(directorio, args.puerto), daemon=True)
+        proceso.start()
+        esperar_servidor(args.puerto)
+
+        antes_rutas = [f"/uploads/{n}" for n in nombres]
+        despues_rutas = [f"/descargas/{n}" for n in nombres]
+
+        # ETag de cada camino para las revalidaciones (StaticFiles usa su propio formato)
+        def etag(ruta):
+            conexion = http.client.HTTPConnection("127.0.0.1", args.puerto)
+            conexion.request("HEAD" if ruta.startswith("/uploads") else "GET", ruta)
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            conexion.close()
+            return respuesta.getheader("etag")
+
+        escenarios = [
+            ("Descarga completa", {}, antes_rutas, despues_rutas),
+            ("Rango de 1 MB", {"Range": f"bytes={MB}-{2 * MB - 1}"}, antes_rutas, despues_rutas),
+            ("Revalidación (If-None-Match)", None, antes_rutas[:1], despues_rutas[:1]),
+        ]
+        for nombre, encabezados, rutas_antes, rutas_despues in escenarios:
+            print(f"\n📊 {nombre}")
+            enc_antes = encabezados if encabezados is not None else {"If-None-Match": etag(rutas_antes[0])}
+            enc_despues = encabezados if encabezados is not None else {"If-None-Match": etag(rutas_despues[0])}
+            antes = medir("ANTES - StaticFiles /uploads", args.puerto, rutas_antes, enc_antes, args.peticiones, args.concurrency)
+            despues = medir("DESPUÉS - ArchivoResponse", args.puerto, rutas_despues, enc_despues, args.peticiones, args.concurrency)
+            if antes > 0:
+                print(f"   🚀 Relación: {despues / antes:.2f}x")
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.join()
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark: estadísticas detalladas con cuatro agregaciones separadas sobre el
+mismo $match (comportamiento anterior) vs una sola pasada con $facet
+(actual), con y sin ventana de fechas sobre fecha_creacion.
+
+Siembra 1M de solicitudes (configurable) repartidas en los últimos dos años.
+
+Uso:
+    python scripts/benchmark_estadisticas_facet.py --solicitudes 1000000 --repeticiones 5
+
+Requiere un mongod local (MONGODB_URL en .env). Usa su propia base de datos
+y la elimina al terminar (--conservar para reutilizar los datos sembrados).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import date, datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+
+from app.config.settings import settings
+from app.models.solicitud_db import SolicitudDB, rango_fechas
+
+BENCH_DB = "benchmark_estadisticas_facet"
+LOTE = 10_000
+ESTADOS = ["borrador", "enviada", "en_revision", "aprobada", "rechazada", "pagada"]
+TIPOS_PAGO = ["Proveedores", "Viáticos", "Reembolso", "Servicios", None]
+DEPARTAMENTOS = ["Finanzas", "Recursos Humanos", "Sistemas", "Rectoría", "Mantenimiento"]
+
+MONTO = {"$ifNull": ["$monto", 0]}
+GRUPOS = {
+    "by_state": [
+        {"$group": {"_id": "$estado", "count": {"$sum": 1}, "total_monto": {"$sum": MONTO}}},
+        {"$sort": {"count": -1}}
+    ],
+    "by_type": [
+        {"$group": {"_id": "$tipo_pago", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}}
+    ],
+    "by_month": [
+        {"$group": {"_id": {"year": {"$year": "$fecha_creacion"}, "month": {"$month": "$fecha_creacion"}}, "count": {"$sum": 1}}},
+        {"$sort": {"_id.year": 1, "_id.month": 1}}
+    ],
+    "summary": [
+        {"$group": {"_id": None, "total": {"$sum": 1}, "monto_total": {"$sum": MONTO}}}
+    ],
+}
+
+
+def sembrar_datos(db, total):
+    """Crear `total` solicitudes aleatorias (semilla fija)"""
+    print(f"🌱 Sembrando {total:,} solicitudes...")
+    rnd = random.Random(42)
+    ahora = datetime.utcnow()
+    db.solicitudes_estandar.drop()
+    for inicio in range(0, total, LOTE):
+        db.solicitudes_estandar.insert_many([
+            {
+                "solicitante_email": f"user{rnd.randrange(5000)}@bench.mx",
+                "estado": rnd.choice(ESTADOS),
+                "tipo_pago": rnd.choice(TIPOS_PAGO),
+                "departamento": rnd.choice(DEPARTAMENTOS),
+                "monto": round(rnd.uniform(100, 50_000), 2),
+                "fecha_creacion": ahora - timedelta(minutes=rnd.randrange(2 * 365 * 24 * 60)),
+            }
+            for _ in range(min(LOTE, total - inicio))
+        ], ordered=False)
+        print(f"   {min(inicio + LOTE, total):,}/{total:,}", end="\r")
+    print()
+
+
+async def separadas(solicitudes, query):
+    """Anterior: una agregación por agrupación, cada una recorre el $match"""
+    match = [{"$match": query}] if query else []
+    return {nombre: await solicitudes.aggregate(match + etapas) for nombre, etapas in GRUPOS.items()}
+
+
+async def con_facet(solicitudes, query):
+    """Actual: una sola pasada con $facet"""
+    return await solicitudes.facet(query, GRUPOS)
+
+
+async def medir(nombre, funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        await funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    mediana = statistics.median(tiempos)
+    print(f"   {nombre:<28} mediana: {mediana:9.1f} ms | mín: {min(tiempos):9.1f} ms")
+    return mediana
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark agregaciones separadas vs $facet")
+    parser.add_argument("--solicitudes", type=int, default=1_000_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--conservar", action="store_true", help="No sembrar de nuevo ni borrar la base al terminar")
+    args = parser.parse_args()
+
+    sync_client = MongoClient(settings.MONGODB_URL)
+    async_client = AsyncIOMotorClient(settings.MONGODB_URL)
+    try:
+        if not (args.conservar and sync_client[BENCH_DB].solicitudes_estandar.estimated_document_count()):
+            sembrar_datos(sync_client[BENCH_DB], args.solicitudes)
+        solicitudes = SolicitudDB(async_client[BENCH_DB])
+        await solicitudes.ensure_indexes()
+
+        hoy = date.today()
+        escenarios = [
+            ("Global (sin ventana)", {}),
+            ("Ventana de 30 días", {"fecha_creacion": rango_fechas(hoy - timedelta(days=30), hoy)}),
+            ("Solicitante + 1 año", {"solicitante_email": "user7@bench.mx",
+                                     "fecha_creacion": rango_fechas(hoy - timedelta(days=365), hoy)}),
+        ]
+        for nombre, query in escenarios:
+            print(f"\n📊 {nombre}")
+            antes = await medir("ANTES - 4 agregaciones", lambda: separadas(solicitudes, query), args.repeticiones)
+            despues = await medir("DESPUÉS - 1 $facet", lambda: con_facet(solicitudes, query), args.repeticiones)
+            if despues > 0:
+                print(f"   🚀 Mejora: {antes / despues:.1f}x")
+    finally:
+        if not args.conservar:
+            sync_client.drop_database(BENCH_DB)
+        sync_client.close()
+        async_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
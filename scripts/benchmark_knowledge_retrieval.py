@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark: recall y latencia de los recuperadores del chat.
+
+- ANTES: search_docs_scan (relee los archivos y cuenta tokens coincidentes)
+- BM25: índice invertido (KnowledgeIndex)
+- LSA float32 / LSA int8: vectores mapeados en memoria (VectorIndex)
+
+Las consultas se generan a partir de oraciones reales de README.md y docs/:
+se toma un subconjunto de sus palabras, sin acentos y con algunas palabras en
+plural/singular distinto, y se mide si la oración original aparece entre los
+primeros k resultados (recall@k). --escala N replica la documentación N
+veces en un directorio temporal para simular una base de conocimiento mayor.
+
+Uso:
+    python scripts/benchmark_knowledge_retrieval.py --consultas 200 --top 5 --escala 10
+
+No requiere MongoDB; LSA requiere NumPy.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROYECTO)
+
+from app.utils import knowledge
+from app.utils.knowledge import KnowledgeIndex, normalize_text, split_into_sentences, tokenize
+from app.utils.vector_index import VectorIndex, available
+
+
+def preparar_base(escala):
+    """Directorio temporal con README.md, docs/ (x escala) y templates/"""
+    base = tempfile.mkdtemp(prefix="benchmark_knowledge_")
+    if os.path.exists(os.path.join(PROYECTO, "README.md")):
+        shutil.copy(os.path.join(PROYECTO, "README.md"), base)
+    shutil.copytree(os.path.join(PROYECTO, "templates"), os.path.join(base, "templates"))
+    for i in range(escala):
+        shutil.copytree(os.path.join(PROYECTO, "docs"), os.path.join(base, "docs", f"copia_{i}"))
+    return base
+
+
+def variar(palabra, rnd):
+    """Cambiar singular/plural de vez en cuando, como escribiría un usuario"""
+    if rnd.random() < 0.3 and len(palabra) > 4:
+        return palabra[:-1] if palabra.endswith("s") else palabra + "s"
+    return palabra
+
+
+def generar_consultas(base, total, rnd):
+    oraciones = []
+    for ruta in [os.path.join(base, "README.md")] + [
+        os.path.join(raiz, f) for raiz, _, archivos in os.walk(os.path.join(base, "docs", "copia_0")) for f in archivos
+    ]:
+        if not os.path.exists(ruta):
+            continue
+        with open(ruta, encoding="utf-8", errors="ignore") as fh:
+            for oracion in split_into_sentences(fh.read()):
+                if len(tokenize(oracion)) >= 5:
+                    oraciones.append(oracion)
+    consultas = []
+    for oracion in rnd.sample(oraciones, min(total, len(oraciones))):
+        palabras = [p for p in normalize_text(oracion).split() if len(p) > 2]
+        elegidas = rnd.sample(palabras, max(2, len(palabras) // 2))
+        consultas.append((" ".join(variar(p, rnd) for p in elegidas), oracion))
+    return consultas
+
+
+def evaluar(nombre, buscar, consultas, top):
+    aciertos, tiempos = 0, []
+    for consulta, esperada in consultas:
+        inicio = time.perf_counter()
+        resultados = buscar(consulta, top)
+        tiempos.append((time.perf_counter() - inicio) * 1_000_000)
+        if any(r[1].strip() == esperada.strip() for r in resultados):
+            aciertos += 1
+    tiempos.sort()
+    p99 = tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.99))]
+    print(f"   {nombre:<22} recall@{top}: {aciertos / len(consultas):6.1%} | "
+          f"p50 {statistics.median(tiempos):10.0f} µs | p99 {p99:10.0f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall y latencia de los recuperadores del chat")
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--escala", type=int, default=1, help="Copias de docs/ en la base de conocimiento")
+    parser.add_argument("--dims", type=int, default=128)
+    parser.add_argument("--semilla", type=int, default=7)
+    args = parser.parse_args()
+
+    base = preparar_base(max(1, args.escala))
+    directorio_actual = os.getcwd()
+    try:
+        os.chdir(base)  # search_docs_scan lee desde el directorio actual
+        rnd = random.Random(args.semilla)
+        consultas = generar_consultas(base, args.consultas, rnd)
+
+        bm25 = KnowledgeIndex(base=base, check_interval=3600)
+        inicio = time.perf_counter()
+        bm25.build()
+        print(f"📚 Base: {bm25.stats()['files']} archivos, {bm25.stats()['sentences']:,} oraciones "
+              f"(BM25 en {(time.perf_counter() - inicio) * 1000:.0f} ms) | {len(consultas)} consultas")
+
+        recuperadores = [
+            ("ANTES - recorrido", lambda q, k: knowledge.search_docs_scan(q, k)),
+            ("BM25", bm25.search),
+        ]
+        if available():
+            for dtype in ("float32", "int8"):
+                indice = VectorIndex(os.path.join(base, f"vectores_{dtype}"), dims=args.dims, dtype=dtype, knowledge=bm25)
+                inicio = time.perf_counter()
+                stats = indice.build()
+                print(f"🧮 LSA {dtype}: {stats['rows']:,} x {stats['dims']} = {stats['matrix_bytes'] / 1024:,.0f} KB "
+                      f"(construido en {(time.perf_counter() - inicio) * 1000:.0f} ms)")
+                recuperadores.append((f"LSA {dtype}", indice.search))
+        else:
+            print("⚠️ NumPy no está instalado: se omite LSA")
+
+        print(f"\n📊 Resultados (top {args.top})")
+        for nombre, buscar in recuperadores:
+            evaluar(nombre, buscar, consultas, args.top)
+    finally:
+        os.chdir(directorio_actual)
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: throughput de login y latencia del event loop con bcrypt
+síncrono dentro de la ruta (comportamiento anterior) vs el pool acotado de
+PasswordHasher (actual).
+
+Cada "login" simula la consulta del usuario (I/O de 2 ms) y verifica la
+contraseña. En paralelo corre un latido que mide cuánto se retrasa el event
+loop: es el retraso que sufren todas las demás peticiones del worker.
+
+Uso:
+    python scripts/benchmark_login.py --logins 200 --concurrency 50 --rounds 12 --workers 4
+
+No requiere MongoDB.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt
+
+from app.utils.password_hasher import PasswordHasher, PasswordHasherBusy
+
+PASSWORD = "contraseña-de-prueba"
+
+
+async def latido(intervalo, retrasos, detener):
+    """Registrar el retraso del event loop respecto al intervalo esperado"""
+    while not detener.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(intervalo)
+        retrasos.append((time.perf_counter() - inicio - intervalo) * 1000)
+
+
+async def ejecutar(nombre, verificar, total, concurrencia):
+    semaforo = asyncio.Semaphore(concurrencia)
+    retrasos, detener = [], asyncio.Event()
+    rechazados = 0
+
+    async def un_login():
+        nonlocal rechazados
+        async with semaforo:
+            await asyncio.sleep(0.002)  # consulta del usuario en MongoDB
+            try:
+                assert await verificar()
+            except PasswordHasherBusy:
+                rechazados += 1
+
+    tarea_latido = asyncio.create_task(latido(0.01, retrasos, detener))
+    inicio = time.perf_counter()
+    await asyncio.gather(*(un_login() for _ in range(total)))
+    duracion = time.perf_counter() - inicio
+    detener.set()
+    await tarea_latido
+
+    retrasos.sort()
+    p99 = retrasos[int(len(retrasos) * 0.99) - 1] if retrasos else 0.0
+    print(f"\n📊 {nombre}")
+    print(f"   Logins: {total} | Concurrencia: {concurrencia} | Throughput: {(total - rechazados) / duracion:.1f} logins/s")
+    print(f"   Retraso del event loop p99: {p99:.1f} ms | máx: {max(retrasos, default=0):.1f} ms")
+    if rechazados:
+        print(f"   ⚠️ Rechazados (503): {rechazados}")
+    return (total - rechazados) / duracion
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark de login: bcrypt síncrono vs pool acotado")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--max-queue", type=int, default=1000)
+    args = parser.parse_args()
+
+    hashed = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds=args.rounds)).decode("utf-8")
+    hasher = PasswordHasher(workers=args.workers, max_queue=args.max_queue, rounds=args.rounds)
+
+    async def sincrono():
+        return bcrypt.checkpw(PASSWORD.encode("utf-8"), hashed.encode("utf-8"))
+
+    async def en_pool():
+        return await hasher.verify(PASSWORD, hashed)
+
+    try:
+        antes = await ejecutar("ANTES - bcrypt en el event loop", sincrono, args.logins, args.concurrency)
+        despues = await ejecutar(f"DESPUÉS - pool de {args.workers} hilos", en_pool, args.logins, args.concurrency)
+        if antes > 0:
+            print(f"\n🚀 Mejora de throughput: {despues / antes:.1f}x")
+    finally:
+        hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark: costo del middleware de métricas (/metrics) por petición.
+
+- ANTES: aplicación FastAPI sin MetricsMiddleware
+- DESPUÉS: la misma aplicación con MetricsMiddleware
+
+Las peticiones se envían directamente a la aplicación ASGI (sin red ni
+cliente HTTP) y a endpoints triviales, así que la diferencia es casi sólo el
+middleware: es el peor caso relativo. Las rondas se alternan para que el
+ruido del sistema afecte por igual a ambas versiones. También mide el costo
+del listener de comandos de MongoDB y de generar el texto de /metrics.
+
+Uso:
+    python scripts/benchmark_metricas.py --peticiones 5000 --rondas 7
+    python scripts/benchmark_metricas.py --max-costo-us 50   # exit 1 si se supera
+
+No requiere MongoDB.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import types
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import APIRouter, FastAPI
+
+from app.config.database import command_monitor, request_mongo_commands
+from app.middleware.metrics import HTTPMetrics, MetricsMiddleware
+
+RUTAS = ("/ping", "/api/items/17", "/api/items/42/detalle", "/no-existe")
+
+
+def crear_app(con_metricas: bool, registro: HTTPMetrics = None) -> FastAPI:
+    app = FastAPI()
+    router = APIRouter()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @router.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    @router.get("/items/{item_id}/detalle")
+    async def detalle(item_id: int):
+        return {"id": item_id, "detalle": "x" * 512}
+
+    app.include_router(router, prefix="/api")
+    if con_metricas:
+        app.add_middleware(MetricsMiddleware, registry=registro)
+    return app
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    pass
+
+
+def _scope(path: str) -> dict:
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+
+
+async def ronda(app, peticiones: int) -> float:
+    """Microsegundos promedio por petición en una ronda"""
+    inicio = time.perf_counter()
+    for i in range(peticiones):
+        await app(_scope(RUTAS[i % len(RUTAS)]), _receive, _send)
+    return (time.perf_counter() - inicio) * 1_000_000 / peticiones
+
+
+def medir_listener(llamadas: int) -> float:
+    """Microsegundos por comando registrado (con una petición en curso)"""
+    evento = types.SimpleNamespace(duration_micros=850, command_name="find")
+    token = request_mongo_commands.set([])
+    try:
+        inicio = time.perf_counter()
+        for _ in range(llamadas):
+            command_monitor.succeeded(evento)
+        return (time.perf_counter() - inicio) * 1_000_000 / llamadas
+    finally:
+        request_mongo_commands.reset(token)
+        command_monitor.reset()
+
+
+def medir_render(series: int) -> tuple:
+    """Milisegundos para generar /metrics con tantas series (método, ruta) y su tamaño"""
+    registro = HTTPMetrics()
+    for i in range(series):
+        for estado in (200, 404, 500):
+            registro.observe("GET", f"/api/ruta-{i}/{{id}}", estado, 0.012 * (i % 7), 2048, [0.001, 0.002])
+    inicio = time.perf_counter()
+    texto = registro.render()
+    return (time.perf_counter() - inicio) * 1000, len(texto)
+
+
+async def main_async(args):
+    registro = HTTPMetrics()
+    base = crear_app(False)
+    con_metricas = crear_app(True, registro)
+
+    # Calentamiento: construye las pilas de middleware y llena cachés
+    await ronda(base, 500)
+    await ronda(con_metricas, 500)
+
+    antes, despues = [], []
+    for _ in range(args.rondas):
+        antes.append(await ronda(base, args.peticiones))
+        despues.append(await ronda(con_metricas, args.peticiones))
+
+    p_antes = statistics.median(antes)
+    p_despues = statistics.median(despues)
+    costo = p_despues - p_antes
+    total = sum(serie.latency.count for serie in registro.series.values())
+    print(f"\n📊 Tiempo por petición ASGI ({args.rondas} rondas x {args.peticiones:,} peticiones, mediana)")
+    print(f"   ANTES   {p_antes:8.1f} µs")
+    print(f"   DESPUÉS {p_despues:8.1f} µs")
+    print(f"   ⏱️ Costo del middleware: {costo:.1f} µs por petición ({costo / p_antes:+.1%})")
+    print(f"   Series registradas: {len(registro.series)} | peticiones contadas: {total:,}")
+
+    listener = medir_listener(args.peticiones * 10)
+    render_ms, tamanio = medir_render(args.series)
+    print(f"\n🍃 Listener de comandos MongoDB: {listener:.2f} µs por comando")
+    print(f"📝 /metrics con {args.series} rutas: {render_ms:.1f} ms, {tamanio / 1024:.0f} KB")
+
+    if args.max_costo_us is not None and costo > args.max_costo_us:
+        print(f"\n❌ El costo ({costo:.1f} µs) supera --max-costo-us {args.max_costo_us}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo del middleware de métricas por petición")
+    parser.add_argument("--peticiones", type=int, default=5000, help="Peticiones por ronda")
+    parser.add_argument("--rondas", type=int, default=7)
+    parser.add_argument("--series", type=int, default=100, help="Rutas distintas al medir /metrics")
+    parser.add_argument("--max-costo-us", type=float, default=None,
+                        help="Falla (exit 1) si el costo por petición supera estos microsegundos")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Construir el índice BM25 del chat (README.md, docs/ y templates/) y mostrar
+sus estadísticas; opcionalmente construir el archivo de vectores LSA de la
+búsqueda semántica (--vectores), responder consultas y comparar la latencia
+contra el recorrido completo anterior (search_docs_scan).
+
+La aplicación construye el mismo índice al arrancar y lo reconstruye sola
+cuando cambia algún archivo; este comando sirve para revisar qué contiene y
+cómo responde después de editar la documentación.
+
+Uso:
+    python scripts/build_knowledge_index.py
+    python scripts/build_knowledge_index.py --consulta "¿cómo subo un comprobante?" --top 5
+    python scripts/build_knowledge_index.py --vectores --dtype int8 --consulta "roles"
+    python scripts/build_knowledge_index.py --comparar --repeticiones 200
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.settings import settings
+from app.utils.knowledge import knowledge_index, search_docs_scan
+from app.utils.vector_index import VectorIndex, available
+
+CONSULTAS = [
+    "¿cómo creo una solicitud?",
+    "subir comprobante de pago",
+    "qué roles existen",
+    "dashboard del aprobador",
+    "reportes por departamento con spark",
+    "olvidé mi contraseña",
+]
+
+
+def medir(funcion, consulta, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(consulta)
+        tiempos.append((time.perf_counter() - inicio) * 1_000_000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construir y consultar el índice BM25 del chat")
+    parser.add_argument("--consulta", action="append", help="Consulta a responder (se puede repetir)")
+    parser.add_argument("--top", type=int, default=3)
+    parser.add_argument("--vectores", action="store_true", help="Construir también los vectores LSA (requiere NumPy)")
+    parser.add_argument("--dtype", choices=["float32", "int8"], default=settings.KNOWLEDGE_VECTOR_DTYPE)
+    parser.add_argument("--dims", type=int, default=settings.KNOWLEDGE_VECTOR_DIMS)
+    parser.add_argument("--comparar", action="store_true", help="Comparar latencia contra el recorrido completo")
+    parser.add_argument("--repeticiones", type=int, default=100)
+    args = parser.parse_args()
+
+    print("📚 Construyendo índice de conocimiento...")
+    knowledge_index.build()
+    for clave, valor in knowledge_index.stats().items():
+        print(f"   {clave}: {valor}")
+
+    buscadores = [("BM25", knowledge_index.search)]
+    if args.vectores:
+        if not available():
+            print("❌ NumPy no está instalado: no se pueden construir los vectores")
+            sys.exit(1)
+        vectores = VectorIndex(settings.KNOWLEDGE_VECTOR_DIR, dims=args.dims, dtype=args.dtype)
+        print(f"\n🧮 Construyendo vectores LSA en {settings.KNOWLEDGE_VECTOR_DIR}...")
+        for clave, valor in vectores.build().items():
+            print(f"   {clave}: {valor}")
+        buscadores.append((f"LSA {args.dtype}", vectores.search))
+
+    for consulta in args.consulta or []:
+        for nombre, buscar in buscadores:
+            print(f"\n🔎 [{nombre}] {consulta}")
+            resultados = buscar(consulta, args.top)
+            if not resultados:
+                print("   (sin resultados)")
+            for ruta, oracion, puntaje in resultados:
+                print(f"   {puntaje:7.3f}  {os.path.relpath(ruta)}: {oracion[:100]}")
+
+    if args.comparar:
+        print(f"\n📊 Latencia mediana por consulta ({args.repeticiones} repeticiones)")
+        for consulta in CONSULTAS:
+            antes = medir(search_docs_scan, consulta, max(1, args.repeticiones // 20))
+            despues = medir(knowledge_index.search, consulta, args.repeticiones)
+            print(f"   {consulta:<40} ANTES {antes:10.0f} µs | DESPUÉS {despues:7.0f} µs | 🚀 {antes / despues:6.0f}x")
+
+
+if __name__ == "__main__":
+    main()
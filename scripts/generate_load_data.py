@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+"""
+Generador reproducible de datos de carga: usuarios, solicitudes y adjuntos
+
+Llena la base de la aplicación (settings.DATABASE_NAME) con:
+- users: mismo formato que crea la aplicación (hashed_password, status,
+  role, department) más los campos que usan los análisis de spark/
+  (user_id, is_active, login_count, profile)
+- solicitudes_estandar: recorrido completo de estados (borrador → enviada →
+  en_revision → aprobada/rechazada → pagada, y cancelada) con las fechas,
+  correos de aprobador/pagador y comprobantes que deja cada transición
+- archivos_blob + uploads/solicitudes/: un pool pequeño de archivos de
+  relleno que referencian los adjuntos y comprobantes (almacén por
+  contenido, ver app/utils/blob_store.py), para que las descargas funcionen
+
+Misma semilla, mismas cantidades y misma --fecha-fin = mismos documentos,
+incluido el _id (volver a ejecutar no duplica: los documentos ya cargados se
+cuentan como existentes). Los datos se generan por bloques fijos de
+BLOQUE documentos, cada uno con su propio generador aleatorio, repartidos
+entre varios procesos; cada proceso inserta con insert_many(ordered=False).
+bcrypt se calcula una sola vez para un pool de hashes (--hashes) que se
+reparte entre los usuarios: todos tienen la contraseña --password.
+
+Al terminar se crean los índices de la aplicación y se reconstruye
+solicitud_stats (scripts/rebuild_solicitud_stats.py), y se reportan
+documentos/segundo sostenidos por colección.
+
+Uso:
+    python scripts/generate_load_data.py --usuarios 100000 --solicitudes 500000
+    python scripts/generate_load_data.py --usuarios 1000000 --solicitudes 5000000 --workers 8 --si
+    python scripts/generate_load_data.py --usuarios 10000 --solicitudes 50000 --sin-insertar   # sólo generación
+
+Autor: Sistema EU-UTVT
+Fecha: Octubre 2025
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import date, datetime, time as dtime, timedelta, timezone
+
+PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROYECTO)
+
+import bcrypt
+from bson import ObjectId
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.config.settings import settings
+from app.utils.blob_store import BLOB_COLLECTION, BLOB_DIR, url_archivo
+
+BLOQUE = 10_000  # Unidad de generación: cada bloque tiene su propio generador aleatorio
+LOTE = 1_000     # Documentos por insert_many
+PASSWORD = "password123"
+
+# Prefijo del _id por colección (ver object_id)
+PREFIJO_USUARIO = 1
+PREFIJO_SOLICITUD = 2
+
+DEPARTAMENTOS_USUARIO = [
+    "Rectoría", "Dirección Académica", "Dirección Administrativa",
+    "Finanzas", "Recursos Humanos", "Sistemas y TI", "Mantenimiento",
+    "Biblioteca", "Servicios Escolares", "Vinculación", "Investigación",
+    "Desarrollo Académico", "Planeación", "Jurídico", "Comunicación",
+    "Calidad", "Seguridad", "Compras", "Almacén", "Transporte"
+]
+# Valores de los enums de app/models/solicitud.py, con pesos aproximados de producción
+DEPARTAMENTOS_SOLICITUD = [
+    ("Rectoría", 5), ("Dirección Académica", 14), ("Dirección Administrativa", 16),
+    ("Finanzas", 12), ("Recursos Humanos", 10), ("Sistemas y TI", 13), ("Mantenimiento", 12),
+    ("Biblioteca", 4), ("Servicios Escolares", 8), ("Vinculación", 6),
+]
+ESTADOS = [
+    ("borrador", 6), ("enviada", 10), ("en_revision", 8), ("aprobada", 12),
+    ("rechazada", 7), ("pagada", 52), ("cancelada", 5),
+]
+MONEDAS = [("Peso Mexicano (MXN)", 88), ("Dólar Estadounidense (USD)", 8), ("Euro (EUR)", 2),
+           ("Dólar Canadiense (CAD)", 1), ("Peso Colombiano (COP)", 0.5), ("Peso Argentino (ARS)", 0.5)]
+TIPOS_PAGO = [("Proveedores", 55), ("Operativos", 25), ("Fiscales y Legales", 10),
+              ("Póliza - Seguro", 6), ("Donativos", 4)]
+CONCEPTOS = [("Pagos a Terceros", 75), ("Otros", 20), ("Donativos", 5)]
+BANCOS = ["BBVA México", "Citibanamex", "Santander México", "Banorte", "HSBC México",
+          "Scotiabank", "Banco Inbursa", "Banco Azteca", "Banco del Bajío", "Banco Afirme"]
+# Rol según el cubo (0-99) del usuario: 70% solicitante, 20% aprobador, 8% pagador, 2% admin
+ROLES = [("solicitante", 70), ("aprobador", 90), ("pagador", 98), ("admin", 100)]
+STATUS = [("active", 90), ("inactive", 8), ("suspended", 2)]
+
+NOMBRES = ["Ana", "Luis", "María", "José", "Carmen", "Jorge", "Laura", "Pedro", "Sofía", "Miguel",
+           "Elena", "Carlos", "Lucía", "Diego", "Paula", "Andrés", "Fernanda", "Ricardo", "Valeria",
+           "Alejandro", "Daniela", "Roberto", "Gabriela", "Fernando"]
+APELLIDOS = ["García", "López", "Martínez", "Hernández", "González", "Pérez", "Sánchez", "Ramírez",
+             "Torres", "Flores", "Rivera", "Gómez", "Díaz", "Cruz", "Morales", "Reyes", "Jiménez",
+             "Ruiz", "Mendoza", "Vázquez"]
+EMPRESAS = ["Papelería del Valle", "Servicios Integrales Toluca", "Constructora Metepec",
+            "Tecnología Educativa", "Distribuidora Lerma", "Mantenimiento Industrial del Centro",
+            "Consultores Asociados", "Seguros del Estado", "Transportes Unidos", "Comercializadora Alfa"]
+SUFIJOS_EMPRESA = ["S.A. de C.V.", "S. de R.L.", "S.C.", "A.C."]
+PUESTOS = ["Coordinador", "Analista", "Jefe de Departamento", "Auxiliar Administrativo", "Docente",
+           "Técnico", "Director", "Asistente", "Supervisor", "Especialista"]
+UBICACIONES = ["Toluca", "Lerma", "Metepec", "Zinacantepec", "Tenango", "Ocoyoacac"]
+DOMINIOS = ["utvt.edu.mx", "utvt.edu.mx", "gmail.com", "hotmail.com", "outlook.com"]
+DESCRIPCIONES = [
+    "Pago de material de oficina para el periodo",
+    "Servicio de mantenimiento preventivo de equipo",
+    "Adquisición de licencias de software institucional",
+    "Pago de honorarios por servicios profesionales",
+    "Renovación de póliza de seguro de bienes",
+    "Compra de insumos para laboratorio",
+    "Servicio de transporte para evento académico",
+    "Pago de impuestos y derechos del trimestre",
+]
+COMENTARIOS_RECHAZO = [
+    "Falta la factura original del proveedor.",
+    "El monto no coincide con la cotización autorizada.",
+    "La cuenta CLABE no corresponde al beneficiario.",
+]
+# Archivos de relleno: (extensión, tipo MIME, peso)
+TIPOS_ARCHIVO = [(".pdf", "application/pdf", 70), (".jpg", "image/jpeg", 15),
+                 (".png", "image/png", 10), (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", 5)]
+ADJUNTOS_POR_SOLICITUD = [(0, 20), (1, 40), (2, 25), (3, 10), (4, 5)]
+
+# Estado de cada proceso de trabajo (initializer)
+_worker = {}
+
+
+def _pesos(opciones):
+    return [valor for valor, _ in opciones], [peso for _, peso in opciones]
+
+
+def object_id(fecha, prefijo, semilla, numero):
+    """_id determinista: segundos de `fecha` + prefijo de colección + semilla + número"""
+    return ObjectId(
+        int(fecha.replace(tzinfo=timezone.utc).timestamp()).to_bytes(4, "big")
+        + bytes([prefijo])
+        + (semilla % (1 << 24)).to_bytes(3, "big")
+        + numero.to_bytes(4, "big")
+    )
+
+
+def rol_de(user_id):
+    """Rol fijo por user_id (permuta cada centena: proporciones exactas)"""
+    cubo = (user_id * 61) % 100
+    for rol, limite in ROLES:
+        if cubo < limite:
+            return rol
+    return "solicitante"
+
+
+def email_de(user_id):
+    return f"user{user_id}@{DOMINIOS[user_id % len(DOMINIOS)]}"
+
+
+def usuario_con_rol(rng, rol, total_usuarios):
+    """user_id aleatorio con el rol pedido (None si la población no lo tiene)"""
+    user_id = rng.randint(1, total_usuarios)
+    for _ in range(100):
+        if rol_de(user_id) == rol:
+            return user_id
+        user_id = user_id % total_usuarios + 1
+    return None
+
+
+def sumar_dias_habiles(fecha, dias):
+    """Mismo cálculo que PagadorController._calcular_fecha_limite"""
+    while dias > 0:
+        fecha += timedelta(days=1)
+        if fecha.weekday() < 5:
+            dias -= 1
+    return fecha
+
+
+def crear_archivos_relleno(cantidad, semilla):
+    """
+    Pool de `cantidad` archivos de relleno deterministas:
+    [{"sha256", "nombre", "tamaño", "tipo", "ext", "contenido"}]
+    """
+    rng = random.Random(f"{semilla}:archivos")
+    tipos, pesos = [(ext, tipo) for ext, tipo, _ in TIPOS_ARCHIVO], [p for _, _, p in TIPOS_ARCHIVO]
+    archivos = []
+    for i in range(cantidad):
+        ext, tipo = rng.choices(tipos, pesos)[0]
+        cabecera = f"EU-UTVT archivo de carga {i} (semilla {semilla})\n".encode("utf-8")
+        contenido = cabecera + rng.randbytes(rng.randint(4, 64) * 1024)
+        sha256 = hashlib.sha256(contenido).hexdigest()
+        archivos.append({"sha256": sha256, "nombre": f"{sha256}{ext}", "tamaño": len(contenido),
+                         "tipo": tipo, "ext": ext, "contenido": contenido})
+    return archivos
+
+
+def generar_usuario(rng, user_id, params):
+    semilla, fin, dias = params["semilla"], params["fecha_fin"], params["dias"]
+    created_at = fin - timedelta(seconds=rng.randrange(dias * 86400))
+    status = rng.choices(*_pesos(STATUS))[0]
+    last_login = None
+    login_count = 0
+    if rng.random() < 0.7:
+        last_login = created_at + timedelta(seconds=rng.randrange(max(1, int((fin - created_at).total_seconds()))))
+        login_count = rng.randint(1, 100)
+    return {
+        "_id": object_id(created_at, PREFIJO_USUARIO, semilla, user_id),
+        "user_id": user_id,
+        "email": email_de(user_id),
+        "hashed_password": params["hashes"][user_id % len(params["hashes"])],
+        "first_name": rng.choice(NOMBRES),
+        "last_name": rng.choice(APELLIDOS),
+        "department": rng.choice(DEPARTAMENTOS_USUARIO),
+        "phone": f"+52 722 {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+        "role": rol_de(user_id),
+        "status": status,
+        "is_active": status == "active",
+        "created_at": created_at,
+        "updated_at": last_login or created_at,
+        "last_login": last_login,
+        "login_count": login_count,
+        "profile": {
+            "position": rng.choice(PUESTOS),
+            "employee_id": f"EMP{user_id:08d}",
+            "salary_range": rng.choice("ABCDE"),
+            "location": rng.choice(UBICACIONES),
+        },
+        "metadata": {"source": "load_generation", "semilla": semilla},
+    }
+
+
+def _archivo(rng, archivos, fecha):
+    archivo = archivos[rng.randrange(len(archivos))]
+    return archivo, fecha + timedelta(seconds=rng.randint(5, 3600))
+
+
+def generar_solicitud(rng, numero, params):
+    """Solicitud en un estado aleatorio con todo lo que dejan sus transiciones"""
+    semilla, fin, dias, archivos = params["semilla"], params["fecha_fin"], params["dias"], params["archivos"]
+    total_usuarios = params["usuarios"]
+    estado = rng.choices(*_pesos(ESTADOS))[0]
+    creacion = fin - timedelta(seconds=rng.randrange(dias * 86400))
+    solicitante = usuario_con_rol(rng, "solicitante", total_usuarios) or rng.randint(1, total_usuarios)
+    concepto = rng.choices(*_pesos(CONCEPTOS))[0]
+    es_clabe = rng.random() < 0.8
+    monto = round(min(rng.lognormvariate(9.2, 1.1), 5_000_000), 2)
+
+    doc = {
+        "_id": object_id(creacion, PREFIJO_SOLICITUD, semilla, numero),
+        "departamento": rng.choices(*_pesos(DEPARTAMENTOS_SOLICITUD))[0],
+        "monto": max(monto, 1.0),
+        "tipo_moneda": rng.choices(*_pesos(MONEDAS))[0],
+        "banco_destino": rng.choice(BANCOS),
+        "cuenta_destino": "".join(rng.choice("0123456789") for _ in range(18 if es_clabe else 10)),
+        "es_clabe": es_clabe,
+        "nombre_beneficiario": f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}",
+        "nombre_empresa": f"{rng.choice(EMPRESAS)} {rng.choice(SUFIJOS_EMPRESA)}",
+        "segundo_beneficiario": f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}" if rng.random() < 0.1 else None,
+        "tipo_pago": rng.choices(*_pesos(TIPOS_PAGO))[0],
+        "concepto_pago": concepto,
+        "concepto_otros": "Gastos de representación" if concepto == "Otros" else None,
+        "fecha_limite_pago": creacion + timedelta(days=rng.randint(7, 45)),
+        "descripcion_tipo_pago": f"{rng.choice(DESCRIPCIONES)} (folio interno {numero})",
+        "comentarios_solicitante": "Favor de dar prioridad." if rng.random() < 0.15 else None,
+        "archivos_adjuntos": [],
+        "solicitante_email": email_de(solicitante),
+        "estado": estado,
+        "fecha_creacion": creacion,
+        "fecha_actualizacion": creacion,
+    }
+    refs = []
+
+    for _ in range(rng.choices(*_pesos(ADJUNTOS_POR_SOLICITUD))[0]):
+        archivo, subida = _archivo(rng, archivos, creacion)
+        doc["archivos_adjuntos"].append({
+            "nombre_archivo": f"documento_{numero}_{len(doc['archivos_adjuntos']) + 1}{archivo['ext']}",
+            "tipo_archivo": archivo["tipo"],
+            "tamaño": archivo["tamaño"],
+            "sha256": archivo["sha256"],
+            "ruta_archivo": archivo["nombre"],
+            "fecha_subida": subida,
+        })
+        refs.append(archivo["sha256"])
+
+    if estado == "borrador":
+        return doc, refs
+
+    ultima = creacion + timedelta(minutes=rng.randint(1, 240))
+    doc["fecha_envio"] = ultima
+    if estado == "en_revision":
+        ultima += timedelta(hours=rng.randint(1, 48))
+    elif estado == "cancelada":
+        ultima += timedelta(hours=rng.randint(1, 96))
+    elif estado in ("aprobada", "rechazada", "pagada"):
+        aprobador = usuario_con_rol(rng, "aprobador", total_usuarios)
+        ultima += timedelta(hours=rng.randint(1, 72))
+        doc["aprobador_email"] = email_de(aprobador) if aprobador else None
+        doc["fecha_aprobacion"] = ultima
+        doc["comentarios_aprobador"] = rng.choice(COMENTARIOS_RECHAZO) if estado == "rechazada" else None
+
+    if estado == "pagada":
+        pagador = usuario_con_rol(rng, "pagador", total_usuarios)
+        pagador_email = email_de(pagador) if pagador else None
+        fecha_pago = ultima + timedelta(hours=rng.randint(1, 120))
+        doc.update({
+            "pagador_email": pagador_email,
+            "fecha_pago": fecha_pago,
+            "referencia_pago": f"TRX-{fecha_pago:%Y%m%d}-{numero:06d}",
+            "comentarios_pagador": None,
+            "fecha_limite_comprobante": sumar_dias_habiles(fecha_pago, 3),
+            "updated_at": fecha_pago,
+            "comprobantes_pago": [],
+        })
+        ultima = fecha_pago
+        if rng.random() < 0.8:
+            archivo, subida = _archivo(rng, archivos, fecha_pago)
+            doc["comprobantes_pago"].append({
+                "nombre": f"comprobante_{numero}{archivo['ext']}",
+                "nombre_guardado": archivo["nombre"],
+                "ruta": url_archivo(str(doc["_id"]), archivo["nombre"]),
+                "tamaño": archivo["tamaño"],
+                "sha256": archivo["sha256"],
+                "tipo": archivo["tipo"],
+                "fecha_subida": subida.isoformat(),
+                "subido_por": pagador_email,
+            })
+            refs.append(archivo["sha256"])
+            doc["updated_at"] = subida
+
+    doc["fecha_actualizacion"] = ultima
+    return doc, refs
+
+
+def _iniciar_worker(uri, db_name, params):
+    _worker["params"] = params
+    _worker["db"] = MongoClient(uri)[db_name] if uri else None
+
+
+def generar_bloque(coleccion, inicio, cantidad, lote):
+    """
+    Genera e inserta los documentos [inicio, inicio + cantidad) de una
+    colección. Devuelve (insertados, existentes, segundos generando,
+    segundos insertando, referencias a blobs de los documentos insertados).
+    """
+    params = _worker["params"]
+    rng = random.Random(f"{params['semilla']}:{coleccion}:{inicio}")
+    db = _worker["db"]
+    insertados = existentes = 0
+    tiempo_generacion = tiempo_insercion = 0.0
+    refs = Counter()
+
+    for desde in range(inicio, inicio + cantidad, lote):
+        t0 = time.perf_counter()
+        hasta = min(desde + lote, inicio + cantidad)
+        if coleccion == "users":
+            docs = [generar_usuario(rng, numero, params) for numero in range(desde, hasta)]
+            refs_docs = None
+        else:
+            generados = [generar_solicitud(rng, numero, params) for numero in range(desde, hasta)]
+            docs = [doc for doc, _ in generados]
+            refs_docs = [r for _, r in generados]
+        t1 = time.perf_counter()
+        tiempo_generacion += t1 - t0
+
+        fallidos = set()
+        if db is not None:
+            try:
+                db[coleccion].insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    if error.get("code") != 11000:  # Sólo se toleran los ya existentes
+                        raise
+                    fallidos.add(error["index"])
+            tiempo_insercion += time.perf_counter() - t1
+        existentes += len(fallidos)
+        insertados += len(docs) - len(fallidos)
+        for i, refs_doc in enumerate(refs_docs or []):
+            if i not in fallidos:
+                refs.update(refs_doc)
+
+    return insertados, existentes, tiempo_generacion, tiempo_insercion, refs
+
+
+def calcular_hashes(cantidad, password, rounds, workers):
+    """Pool de hashes bcrypt (bcrypt libera el GIL: basta con hilos)"""
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(
+            lambda _: bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8"),
+            range(cantidad)
+        ))
+
+
+class Progreso:
+    def __init__(self, coleccion, total):
+        self.coleccion = coleccion
+        self.total = total
+        self.insertados = 0
+        self.existentes = 0
+        self.generacion = 0.0
+        self.insercion = 0.0
+        self.inicio = time.perf_counter()
+        self.ultimo_reporte = (self.inicio, 0)
+
+    def sumar(self, insertados, existentes, generacion, insercion):
+        self.insertados += insertados
+        self.existentes += existentes
+        self.generacion += generacion
+        self.insercion += insercion
+
+    def reportar(self, intervalo=5.0):
+        ahora = time.perf_counter()
+        antes, hechos_antes = self.ultimo_reporte
+        hechos = self.insertados + self.existentes
+        if ahora - antes < intervalo and hechos < self.total:
+            return
+        reciente = (hechos - hechos_antes) / (ahora - antes) if ahora > antes else 0
+        sostenido = hechos / (ahora - self.inicio) if ahora > self.inicio else 0
+        print(f"📈 {self.coleccion}: {hechos:,}/{self.total:,} ({hechos / self.total * 100:.1f}%) | "
+              f"{reciente:,.0f} docs/s (último intervalo) | {sostenido:,.0f} docs/s sostenido")
+        self.ultimo_reporte = (ahora, hechos)
+
+    def resumen(self, workers):
+        total = time.perf_counter() - self.inicio
+        print(f"\n✅ {self.coleccion}: {self.insertados:,} insertados, {self.existentes:,} ya existían")
+        print(f"   ⏱️ {total:.1f} s | 🚀 {(self.insertados + self.existentes) / total:,.0f} docs/s sostenido")
+        # Tiempo de CPU sumado entre procesos
+        print(f"   🧮 generación {self.generacion:.1f} s | inserción {self.insercion:.1f} s "
+              f"(sumados en {workers} procesos)")
+
+
+def ejecutar_coleccion(coleccion, total, pool, args):
+    progreso = Progreso(coleccion, total)
+    refs = Counter()
+    pendientes = set()
+
+    def recoger(resultados):
+        for insertados, existentes, generacion, insercion, refs_bloque in resultados:
+            progreso.sumar(insertados, existentes, generacion, insercion)
+            refs.update(refs_bloque)
+        progreso.reportar()
+
+    for inicio in range(1, total + 1, BLOQUE):
+        cantidad = min(BLOQUE, total - inicio + 1)
+        if pool is None:
+            recoger([generar_bloque(coleccion, inicio, cantidad, args.lote)])
+            continue
+        # Como mucho dos bloques en cola por proceso: memoria acotada
+        while len(pendientes) >= 2 * args.workers:
+            hechos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            recoger(futuro.result() for futuro in hechos)
+        pendientes.add(pool.submit(generar_bloque, coleccion, inicio, cantidad, args.lote))
+    if pendientes:
+        recoger(futuro.result() for futuro in wait(pendientes).done)
+
+    progreso.resumen(max(1, args.workers))
+    return refs
+
+
+def registrar_archivos(db, archivos, refs):
+    """Escribe los archivos de relleno usados y suma sus referencias en archivos_blob"""
+    os.makedirs(os.path.join(PROYECTO, BLOB_DIR), exist_ok=True)
+    por_hash = {archivo["sha256"]: archivo for archivo in archivos}
+    operaciones = []
+    for sha256, cantidad in refs.items():
+        archivo = por_hash[sha256]
+        ruta = os.path.join(PROYECTO, BLOB_DIR, archivo["nombre"])
+        if not os.path.exists(ruta):
+            with open(ruta, "wb") as f:
+                f.write(archivo["contenido"])
+        operaciones.append(UpdateOne(
+            {"_id": sha256},
+            {"$inc": {"refs": cantidad},
+             "$setOnInsert": {"nombre": archivo["nombre"], "tamaño": archivo["tamaño"],
+                              "fecha_creacion": datetime.utcnow()}},
+            upsert=True
+        ))
+    if operaciones:
+        db[BLOB_COLLECTION].bulk_write(operaciones, ordered=False)
+    print(f"📎 {len(operaciones)} archivos de relleno, {sum(refs.values()):,} referencias")
+
+
+async def finalizar(uri, db_name, reconstruir_estadisticas):
+    """Índices de la aplicación y estadísticas materializadas"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from app.models.solicitud_db import SolicitudDB
+    from app.models.solicitud_stats_db import SolicitudStatsDB
+    from app.models.user_db import UserDB
+
+    client = AsyncIOMotorClient(uri)
+    try:
+        db = client[db_name]
+        inicio = time.perf_counter()
+        print("📊 Creando índices...")
+        await UserDB(db).ensure_indexes()
+        await SolicitudDB(db).ensure_indexes()
+        print(f"✅ Índices creados en {time.perf_counter() - inicio:.1f} s")
+        if reconstruir_estadisticas:
+            inicio = time.perf_counter()
+            print("🔄 Reconstruyendo solicitud_stats...")
+            total = await SolicitudStatsDB(db).reconstruir()
+            print(f"✅ {total:,} solicitudes procesadas en {time.perf_counter() - inicio:.1f} s")
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generar usuarios, solicitudes y adjuntos reproducibles para pruebas de carga")
+    parser.add_argument("--usuarios", type=int, default=100_000, help="Población de usuarios (user_id 1..N)")
+    parser.add_argument("--solicitudes", type=int, default=500_000)
+    parser.add_argument("--colecciones", default="users,solicitudes",
+                        help="Qué generar (solicitudes usa la población de --usuarios aunque no se genere)")
+    parser.add_argument("--semilla", type=int, default=20251001)
+    parser.add_argument("--fecha-fin", type=date.fromisoformat, default=date.today(),
+                        help="Fecha de referencia (AAAA-MM-DD); las fechas se reparten hacia atrás")
+    parser.add_argument("--dias", type=int, default=730, help="Antigüedad máxima de usuarios y solicitudes")
+    parser.add_argument("--workers", type=int, default=min(os.cpu_count() or 1, 8),
+                        help="Procesos de generación/inserción (0 = en este proceso)")
+    parser.add_argument("--lote", type=int, default=LOTE, help="Documentos por insert_many")
+    parser.add_argument("--hashes", type=int, default=16, help="Hashes bcrypt distintos repartidos entre usuarios")
+    parser.add_argument("--password", default=PASSWORD)
+    parser.add_argument("--archivos", type=int, default=64, help="Archivos de relleno distintos")
+    parser.add_argument("--uri", default=settings.MONGODB_URL)
+    parser.add_argument("--db", default=settings.DATABASE_NAME)
+    parser.add_argument("--sin-insertar", action="store_true", help="Sólo generar (mide la generación)")
+    parser.add_argument("--sin-estadisticas", action="store_true", help="No reconstruir solicitud_stats")
+    parser.add_argument("--si", action="store_true", help="No pedir confirmación")
+    args = parser.parse_args()
+    colecciones = {c.strip() for c in args.colecciones.split(",") if c.strip()}
+    if not colecciones <= {"users", "solicitudes"}:
+        parser.error(f"colecciones desconocidas: {', '.join(colecciones - {'users', 'solicitudes'})}")
+    if args.usuarios < 1:
+        parser.error("--usuarios debe ser al menos 1")
+    args.workers = max(0, args.workers)
+
+    print("🎯 GENERADOR DE DATOS DE CARGA - EU-UTVT")
+    print("=" * 70)
+    print(f"👥 Usuarios: {args.usuarios:,} | 📄 Solicitudes: {args.solicitudes:,} | "
+          f"🎲 Semilla: {args.semilla} | 📅 Hasta: {args.fecha_fin}")
+    print(f"👷 Procesos: {args.workers} | 📦 Lote: {args.lote:,} | 🗃️ {'(sin insertar)' if args.sin_insertar else args.db}")
+
+    db = None
+    if not args.sin_insertar:
+        cliente = MongoClient(args.uri, serverSelectionTimeoutMS=5000)
+        try:
+            cliente.admin.command("ping")
+        except Exception as e:
+            print(f"❌ Error conectando a MongoDB: {e}")
+            sys.exit(1)
+        db = cliente[args.db]
+        if not args.si:
+            existentes = {c: db[c].estimated_document_count() for c in ("users", "solicitudes_estandar")}
+            print(f"⚠️ Ya existen {existentes['users']:,} usuarios y {existentes['solicitudes_estandar']:,} solicitudes")
+            if input("¿Continuar? (y/N): ").lower() != "y":
+                print("❌ Operación cancelada")
+                return
+
+    inicio = time.perf_counter()
+    hashes = ["!"]
+    if "users" in colecciones:
+        print(f"\n🔐 Calculando {args.hashes} hashes bcrypt (costo {settings.BCRYPT_ROUNDS})...")
+        # Mismo costo que la aplicación: el login no los vuelve a hashear
+        hashes = calcular_hashes(args.hashes, args.password, settings.BCRYPT_ROUNDS, args.workers)
+    archivos = crear_archivos_relleno(args.archivos, args.semilla)
+    params = {
+        "semilla": args.semilla,
+        "fecha_fin": datetime.combine(args.fecha_fin, dtime.min),
+        "dias": args.dias,
+        "usuarios": args.usuarios,
+        "hashes": hashes,
+        # Los procesos sólo necesitan los metadatos, no el contenido
+        "archivos": [{k: v for k, v in a.items() if k != "contenido"} for a in archivos],
+    }
+    uri = None if args.sin_insertar else args.uri
+
+    pool = None
+    if args.workers:
+        pool = ProcessPoolExecutor(max_workers=args.workers, initializer=_iniciar_worker,
+                                   initargs=(uri, args.db, params))
+    else:
+        _iniciar_worker(uri, args.db, params)
+    try:
+        if "users" in colecciones:
+            print()
+            ejecutar_coleccion("users", args.usuarios, pool, args)
+        refs = Counter()
+        if "solicitudes" in colecciones and args.solicitudes:
+            print()
+            refs = ejecutar_coleccion("solicitudes_estandar", args.solicitudes, pool, args)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if db is not None:
+        print()
+        registrar_archivos(db, archivos, refs)
+        asyncio.run(finalizar(args.uri, args.db, "solicitudes" in colecciones and not args.sin_estadisticas))
+
+    print("\n" + "=" * 70)
+    print(f"🏁 Terminado en {(time.perf_counter() - inicio) / 60:.2f} minutos")
+    print(f"🔑 Contraseña de todos los usuarios: {args.password}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -94,6 +94,8 @@ class MassiveUserGenerator:
             await self.collection.create_index([("is_active", 1), ("role", 1)])
             await self.collection.create_index("created_at")
             await self.collection.create_index("last_login")
+            # Refresco incremental del snapshot Parquet (spark/users_snapshot.py)
+            await self.collection.create_index("updated_at")
             
             print("✅ Índices creados correctamente")
             
@@ -136,6 +138,7 @@ class MassiveUserGenerator:
             "created_at": created_at,
             "last_login": last_login,
             "login_count": random.randint(0, 100) if last_login else 0,
+            "updated_at": datetime.utcnow(),
             "profile": {
                 "position": fake.job(),
                 "employee_id": f"EMP{user_id:08d}",
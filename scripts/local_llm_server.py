@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Servidor de modelo local de prueba para CHAT_BACKEND=http.
+
+Implementa POST /v1/chat/completions con el formato de streaming compatible
+con OpenAI (el mismo que exponen llama.cpp server, vLLM u Ollama): responde
+al último mensaje del usuario con el respondedor de FAQ/documentación de la
+aplicación, palabra por palabra, con una latencia inicial y un retraso por
+token configurables. Sirve para probar el endpoint /api/chat/stream, los
+tiempos máximos y la cancelación sin un modelo real.
+
+Uso:
+    python scripts/local_llm_server.py --puerto 8081 --latencia-ms 300 --retraso-token-ms 30
+    # en .env: CHAT_BACKEND=http  CHAT_BACKEND_URL=http://127.0.0.1:8081/v1/chat/completions
+
+No requiere MongoDB.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.utils.chat_backends import split_tokens
+from app.utils.llm_client import generate_answer
+
+
+def crear_app(latencia_ms, retraso_token_ms):
+    app = FastAPI(title="Modelo local de prueba")
+    estado = {"peticiones": 0, "canceladas": 0}
+
+    @app.get("/health")
+    async def health():
+        return estado
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        cuerpo = await request.json()
+        mensajes = [m for m in cuerpo.get("messages", []) if m.get("role") == "user"]
+        pregunta = mensajes[-1]["content"] if mensajes else ""
+        respuesta = generate_answer(pregunta)["answer"]
+        modelo = cuerpo.get("model", "local")
+        id_respuesta = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        estado["peticiones"] += 1
+
+        if not cuerpo.get("stream"):
+            await asyncio.sleep(latencia_ms / 1000)
+            return JSONResponse({
+                "id": id_respuesta, "object": "chat.completion", "model": modelo,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": respuesta}, "finish_reason": "stop"}],
+            })
+
+        def fragmento(delta, fin=None):
+            datos = {
+                "id": id_respuesta, "object": "chat.completion.chunk", "created": int(time.time()), "model": modelo,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": fin}],
+            }
+            return f"data: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+        async def generar():
+            try:
+                await asyncio.sleep(latencia_ms / 1000)
+                yield fragmento({"role": "assistant"})
+                for token in split_tokens(respuesta):
+                    yield fragmento({"content": token})
+                    await asyncio.sleep(retraso_token_ms / 1000)
+                yield fragmento({}, "stop")
+                yield "data: [DONE]\n\n"
+            except asyncio.CancelledError:
+                estado["canceladas"] += 1
+                raise
+
+        return StreamingResponse(generar(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de modelo local de prueba (/v1/chat/completions)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8081)
+    parser.add_argument("--latencia-ms", type=float, default=300, help="Espera antes del primer token")
+    parser.add_argument("--retraso-token-ms", type=float, default=30, help="Espera entre tokens")
+    args = parser.parse_args()
+
+    print(f"🤖 Modelo local de prueba en http://{args.host}:{args.puerto}/v1/chat/completions "
+          f"(primer token {args.latencia_ms:.0f} ms, {args.retraso_token_ms:.0f} ms/token)")
+    uvicorn.run(crear_app(args.latencia_ms, args.retraso_token_ms), host=args.host, port=args.puerto, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
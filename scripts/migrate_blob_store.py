@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Migrar adjuntos y comprobantes existentes al almacén direccionado por
+contenido (app.utils.blob_store).
+
+Para cada archivo referenciado por una solicitud que todavía usa el nombre
+anterior (`<timestamp>_<nombre>` en uploads/solicitudes/ o
+static/uploads/comprobantes/<solicitud_id>/):
+
+  1. calcula su SHA-256 y lo publica como `<sha256><ext>` en BLOB_DIR
+     (si ese contenido ya existía, no se copia de nuevo);
+  2. actualiza la referencia en la solicitud (ruta_archivo / nombre_guardado,
+     ruta y sha256). La `ruta` de los comprobantes pasa a ser la URL de
+     descarga autorizada, también en los que ya estaban en el almacén.
+
+Después recalcula `archivos_blob` (conteo de referencias) a partir de todas
+las solicitudes, elimina los archivos anteriores ya migrados y reporta los
+huérfanos (archivos que ninguna solicitud referencia).
+
+Ejecutar con la aplicación detenida o en ventana de mantenimiento.
+
+Uso:
+    python scripts/migrate_blob_store.py --dry-run
+    python scripts/migrate_blob_store.py [--eliminar-huerfanos]
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import MongoClient, ReplaceOne
+
+from app.config.settings import settings
+from app.utils.blob_store import BLOB_COLLECTION, BLOB_DIR, COMPROBANTES_DIR, NOMBRE_BLOB, extension, url_archivo
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def calcular_sha256(ruta):
+    sha256 = hashlib.sha256()
+    with open(ruta, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(CHUNK_SIZE), b""):
+            sha256.update(bloque)
+    return sha256.hexdigest()
+
+
+class Migracion:
+    def __init__(self, db, dry_run):
+        self.db = db
+        self.dry_run = dry_run
+        self.hashes = {}        # ruta anterior -> (sha256, nombre del blob, tamaño)
+        self.migrados = set()   # rutas anteriores ya publicadas en el almacén
+        self.faltantes = 0
+        self.blobs_nuevos = 0
+        self.duplicados = 0
+
+    def publicar(self, ruta, nombre_original):
+        """Publicar un archivo anterior en el almacén; None si no existe en disco"""
+        if ruta in self.hashes:
+            return self.hashes[ruta]
+        if not os.path.isfile(ruta):
+            self.faltantes += 1
+            print(f"   ⚠️ No existe en disco: {ruta}")
+            return None
+
+        sha256 = calcular_sha256(ruta)
+        nombre = f"{sha256}{extension(nombre_original or ruta)}"
+        destino = os.path.join(BLOB_DIR, nombre)
+        if os.path.exists(destino) or any(h[1] == nombre for h in self.hashes.values()):
+            self.duplicados += 1
+        else:
+            self.blobs_nuevos += 1
+            if not self.dry_run:
+                # Copia a temporal + os.replace: nunca queda un blob a medio escribir
+                fd, temporal = tempfile.mkstemp(dir=BLOB_DIR, prefix=".upload-", suffix=".part")
+                os.close(fd)
+                shutil.copyfile(ruta, temporal)
+                os.replace(temporal, destino)
+
+        self.hashes[ruta] = (sha256, nombre, os.path.getsize(ruta))
+        self.migrados.add(ruta)
+        return self.hashes[ruta]
+
+    def migrar_solicitud(self, solicitud):
+        """Actualizar las referencias de una solicitud; True si cambió algo"""
+        solicitud_id = str(solicitud["_id"])
+        cambios = {}
+
+        adjuntos = solicitud.get("archivos_adjuntos") or []
+        for archivo in adjuntos:
+            nombre = archivo.get("ruta_archivo")
+            if not nombre or NOMBRE_BLOB.match(nombre):
+                continue
+            publicado = self.publicar(os.path.join(BLOB_DIR, os.path.basename(nombre)), archivo.get("nombre_archivo"))
+            if publicado:
+                archivo["sha256"], archivo["ruta_archivo"], archivo["tamaño"] = publicado
+                cambios["archivos_adjuntos"] = adjuntos
+
+        comprobantes = solicitud.get("comprobantes_pago") or []
+        for comprobante in comprobantes:
+            nombre = comprobante.get("nombre_guardado")
+            if not nombre:
+                continue
+            if NOMBRE_BLOB.match(nombre):
+                # Ya migrado: sólo actualizar la URL anterior (/uploads/...) a la ruta autorizada
+                if comprobante.get("ruta") != url_archivo(solicitud_id, nombre):
+                    comprobante["ruta"] = url_archivo(solicitud_id, nombre)
+                    cambios["comprobantes_pago"] = comprobantes
+                continue
+            ruta = os.path.join(COMPROBANTES_DIR, os.path.basename(solicitud_id), os.path.basename(nombre))
+            publicado = self.publicar(ruta, comprobante.get("nombre"))
+            if publicado:
+                comprobante["sha256"], comprobante["nombre_guardado"], comprobante["tamaño"] = publicado
+                comprobante["ruta"] = url_archivo(solicitud_id, publicado[1])
+                cambios["comprobantes_pago"] = comprobantes
+
+        if cambios and not self.dry_run:
+            self.db.solicitudes_estandar.update_one({"_id": solicitud["_id"]}, {"$set": cambios})
+        return bool(cambios)
+
+
+def referencias(db):
+    """Contar referencias por sha256 en todas las solicitudes"""
+    conteo = {}
+    proyeccion = {"archivos_adjuntos": 1, "comprobantes_pago": 1}
+    for solicitud in db.solicitudes_estandar.find({}, proyeccion):
+        for archivo in solicitud.get("archivos_adjuntos") or []:
+            if archivo.get("sha256") and NOMBRE_BLOB.match(archivo.get("ruta_archivo") or ""):
+                conteo.setdefault(archivo["sha256"], {"nombre": archivo["ruta_archivo"], "refs": 0})["refs"] += 1
+        for comprobante in solicitud.get("comprobantes_pago") or []:
+            if comprobante.get("sha256") and NOMBRE_BLOB.match(comprobante.get("nombre_guardado") or ""):
+                conteo.setdefault(comprobante["sha256"], {"nombre": comprobante["nombre_guardado"], "refs": 0})["refs"] += 1
+    return conteo
+
+
+def recalcular_refs(db, conteo, dry_run):
+    """Reescribir archivos_blob con el conteo real de referencias"""
+    ahora = datetime.utcnow()
+    operaciones = []
+    for sha256, info in conteo.items():
+        ruta = os.path.join(BLOB_DIR, info["nombre"])
+        operaciones.append(ReplaceOne(
+            {"_id": sha256},
+            {
+                "nombre": info["nombre"],
+                "tamaño": os.path.getsize(ruta) if os.path.exists(ruta) else 0,
+                "refs": info["refs"],
+                "fecha_creacion": ahora
+            },
+            upsert=True
+        ))
+    sobrantes = db[BLOB_COLLECTION].count_documents({"_id": {"$nin": list(conteo)}})
+    if not dry_run:
+        if operaciones:
+            db[BLOB_COLLECTION].bulk_write(operaciones, ordered=False)
+        db[BLOB_COLLECTION].delete_many({"_id": {"$nin": list(conteo)}})
+    return len(operaciones), sobrantes
+
+
+def buscar_huerfanos(conteo, referenciados_legado):
+    """Archivos en disco que ninguna solicitud referencia"""
+    vivos = {info["nombre"] for info in conteo.values()}
+    huerfanos = []
+    for raiz in (BLOB_DIR, COMPROBANTES_DIR):
+        for directorio, _, archivos in os.walk(raiz):
+            for nombre in archivos:
+                ruta = os.path.join(directorio, nombre)
+                if nombre.startswith(".upload-") or nombre == ".gitkeep":
+                    continue  # subidas en curso
+                if nombre in vivos and directorio == BLOB_DIR:
+                    continue
+                if ruta in referenciados_legado:
+                    continue
+                huerfanos.append(ruta)
+    return huerfanos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrar adjuntos y comprobantes al almacén direccionado por contenido")
+    parser.add_argument("--dry-run", action="store_true", help="Sólo reportar, sin escribir en disco ni en MongoDB")
+    parser.add_argument("--eliminar-huerfanos", action="store_true", help="Eliminar archivos que nadie referencia")
+    args = parser.parse_args()
+
+    client = MongoClient(settings.MONGODB_URL)
+    try:
+        db = client[settings.DATABASE_NAME]
+        os.makedirs(BLOB_DIR, exist_ok=True)
+        migracion = Migracion(db, args.dry_run)
+
+        print(f"📦 Migrando archivos de '{settings.DATABASE_NAME}'{' (dry-run)' if args.dry_run else ''}...")
+        filtro = {"$or": [{"archivos_adjuntos.0": {"$exists": True}}, {"comprobantes_pago.0": {"$exists": True}}]}
+        actualizadas = 0
+        for solicitud in db.solicitudes_estandar.find(filtro, {"archivos_adjuntos": 1, "comprobantes_pago": 1}):
+            if migracion.migrar_solicitud(solicitud):
+                actualizadas += 1
+
+        print(f"✅ Solicitudes {'por actualizar' if args.dry_run else 'actualizadas'}: {actualizadas}")
+        print(f"   Archivos anteriores procesados: {len(migracion.migrados)}")
+        print(f"   Blobs nuevos: {migracion.blobs_nuevos} | Duplicados evitados: {migracion.duplicados}")
+        if migracion.faltantes:
+            print(f"   ⚠️ Referencias sin archivo en disco: {migracion.faltantes}")
+
+        # En dry-run las solicitudes no cambian: se cuentan las referencias que tendrían
+        conteo = referencias(db)
+        if args.dry_run:
+            for sha256, nombre, _ in migracion.hashes.values():
+                conteo.setdefault(sha256, {"nombre": nombre, "refs": 0})["refs"] += 1
+        escritos, sobrantes = recalcular_refs(db, conteo, args.dry_run)
+        print(f"🔢 archivos_blob: {escritos} blobs con referencias | {sobrantes} registros sin referencias eliminados")
+
+        if not args.dry_run:
+            for ruta in migracion.migrados:
+                os.remove(ruta)
+                directorio = os.path.dirname(ruta)
+                if os.path.dirname(directorio) == COMPROBANTES_DIR and not os.listdir(directorio):
+                    os.rmdir(directorio)
+            print(f"🧹 Archivos anteriores eliminados: {len(migracion.migrados)}")
+
+        # Referencias anteriores que no se pudieron migrar siguen vivas
+        pendientes = set() if not args.dry_run else set(migracion.migrados)
+        huerfanos = buscar_huerfanos(conteo, pendientes)
+        if huerfanos:
+            bytes_huerfanos = sum(os.path.getsize(r) for r in huerfanos)
+            print(f"🗑️ Huérfanos: {len(huerfanos)} archivos ({bytes_huerfanos:,} bytes)")
+            for ruta in huerfanos[:20]:
+                print(f"   {ruta}")
+            if args.eliminar_huerfanos and not args.dry_run:
+                for ruta in huerfanos:
+                    os.remove(ruta)
+                print("   Eliminados")
+            elif not args.eliminar_huerfanos:
+                print("   Usa --eliminar-huerfanos para borrarlos")
+        else:
+            print("✅ Sin huérfanos")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
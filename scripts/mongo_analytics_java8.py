@@ -15,11 +15,20 @@ from pymongo import MongoClient
 import sys
 import os
 
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "spark"))
+
+from mongo_partitions import count_mismatch
+from users_frame import load_users_frame
+from users_snapshot import UsersSnapshot
+
 # Configuración
 MONGO_URI = "mongodb://localhost:27017"
 DATABASE_NAME = "eu_utvt_db"
 COLLECTION_NAME = "users"
 
+# Carga completa: rangos de _id (más los documentos fuera de ellos) leídos en paralelo
+LOAD_PARTITIONS = 8
+
 class MongoAnalyzer:
     def __init__(self):
         self.mongo_client = None
@@ -62,92 +71,56 @@ class MongoAnalyzer:
             else:
                 print(f"📦 Cargando todos los {load_limit:,} usuarios")
             
-            # Proyección optimizada
-            projection = {
-                "_id": 0,
-                "user_id": 1,
-                "email": 1,
-                "first_name": 1,
-                "last_name": 1,
-                "department": 1,
-                "role": 1,
-                "phone": 1,
-                "is_active": 1,
-                "created_at": 1,
-                "last_login": 1,
-                "login_count": 1,
-                "profile.position": 1,
-                "profile.employee_id": 1,
-                "profile.salary_range": 1,
-                "profile.location": 1
-            }
-            
-            # Obtener datos
-            cursor = self.collection.find({}, projection).limit(load_limit)
+            # Carga columnar tipada (categóricos, int32, datetime64) por lotes BSON
+            print("🔄 Creando Pandas DataFrame...")
+            self.df_users = load_users_frame(
+                self.collection,
+                limit=load_limit if load_limit < total_docs else None,
+                partitions=LOAD_PARTITIONS,
+                on_progress=lambda processed: print(f"   📦 Procesados: {processed:,}/{load_limit:,} usuarios")
+            )
             
-            # Convertir a lista
-            data = []
-            processed = 0
-            batch_size = 10000
+            load_time = time.time() - start_time
+            count = len(self.df_users)
+            print(f"✅ Datos cargados: {count:,} usuarios")
+            expected = count_mismatch(self.collection, count) if load_limit >= total_docs else None
+            if expected is not None:
+                print(f"⚠️ MongoDB tiene {expected:,} usuarios y se cargaron {count:,} "
+                      f"(¿cambió la colección durante la carga?)")
+            print(f"⏱️ Tiempo de carga: {load_time:.2f} segundos")
+            print(f"🚀 Velocidad: {count/load_time:.0f} registros/segundo")
             
-            for doc in cursor:
-                profile = doc.get('profile', {})
-                
-                # Aplanar estructura
-                flat_doc = {
-                    'user_id': doc.get('user_id'),
-                    'email': doc.get('email'),
-                    'first_name': doc.get('first_name'),
-                    'last_name': doc.get('last_name'),
-                    'department': doc.get('department'),
-                    'role': doc.get('role'),
-                    'phone': doc.get('phone'),
-                    'is_active': doc.get('is_active'),
-                    'created_at': doc.get('created_at'),
-                    'last_login': doc.get('last_login'),
-                    'login_count': doc.get('login_count', 0),
-                    'position': profile.get('position'),
-                    'employee_id': profile.get('employee_id'),
-                    'salary_range': profile.get('salary_range'),
-                    'location': profile.get('location')
-                }
-                
-                data.append(flat_doc)
-                processed += 1
-                
-                if processed % batch_size == 0:
-                    print(f"   📦 Procesados: {processed:,}/{load_limit:,} usuarios")
+            return self.df_users
             
-            # Crear DataFrame de Pandas
-            print("🔄 Creando Pandas DataFrame...")
-            self.df_users = pd.DataFrame(data)
+        except Exception as e:
+            print(f"❌ Error cargando datos: {e}")
+            return None
+    
+    def load_users_from_snapshot(self):
+        """Refrescar el snapshot Parquet local (sólo cambios) y cargarlo a Pandas"""
+        print("📁 Cargando usuarios desde el snapshot Parquet...")
+        start_time = time.time()
+        
+        try:
+            snapshot = UsersSnapshot()
+            stats = snapshot.refresh(
+                self.collection,
+                on_progress=lambda processed: print(f"   📦 Combinados: {processed:,} usuarios")
+            )
+            print(f"🔄 Refresco {stats['mode']}: {stats['changed']:,} usuarios de MongoDB, "
+                  f"{stats['partitions_written']} particiones reescritas")
             
-            # Convertir tipos de datos
-            if not self.df_users.empty:
-                # Convertir fechas
-                if 'created_at' in self.df_users.columns:
-                    self.df_users['created_at'] = pd.to_datetime(self.df_users['created_at'])
-                if 'last_login' in self.df_users.columns:
-                    self.df_users['last_login'] = pd.to_datetime(self.df_users['last_login'])
-                
-                # Convertir boolean
-                if 'is_active' in self.df_users.columns:
-                    self.df_users['is_active'] = self.df_users['is_active'].astype(bool)
-                
-                # Convertir numéricos
-                if 'login_count' in self.df_users.columns:
-                    self.df_users['login_count'] = pd.to_numeric(self.df_users['login_count'], errors='coerce').fillna(0)
+            self.df_users = snapshot.read_frame()
             
             load_time = time.time() - start_time
             count = len(self.df_users)
             print(f"✅ Datos cargados: {count:,} usuarios")
             print(f"⏱️ Tiempo de carga: {load_time:.2f} segundos")
-            print(f"🚀 Velocidad: {count/load_time:.0f} registros/segundo")
             
             return self.df_users
             
         except Exception as e:
-            print(f"❌ Error cargando datos: {e}")
+            print(f"❌ Error cargando el snapshot: {e}")
             return None
     
     def basic_analytics(self):
@@ -215,7 +188,7 @@ class MongoAnalyzer:
         
         # 1. Análisis cruzado departamento-rol
         print("📊 Análisis por departamento y rol:")
-        cross_analysis = self.df_users.groupby(['department', 'role']).agg({
+        cross_analysis = self.df_users.groupby(['department', 'role'], observed=True).agg({
             'user_id': 'count',
             'is_active': 'sum',
             'login_count': 'mean'
@@ -285,7 +258,7 @@ class MongoAnalyzer:
         # Test 2: Agregación compleja
         print("\n📊 Test 2: Agregación por múltiples dimensiones")
         start_time = time.time()
-        agg_result = self.df_users.groupby(['department', 'role', 'is_active']).agg({
+        agg_result = self.df_users.groupby(['department', 'role', 'is_active'], observed=True).agg({
             'user_id': 'count',
             'login_count': ['mean', 'max', 'min'],
             'created_at': ['min', 'max']
@@ -338,7 +311,7 @@ class MongoAnalyzer:
             dept_dist.to_csv(f'department_distribution_{timestamp}.csv')
             
             # Exportar estadísticas detalladas
-            detailed_stats = self.df_users.groupby(['department', 'role']).agg({
+            detailed_stats = self.df_users.groupby(['department', 'role'], observed=True).agg({
                 'user_id': 'count',
                 'is_active': 'sum',
                 'login_count': 'mean'
@@ -381,9 +354,11 @@ def main():
         print("1. 🚀 Muestra rápida (100K usuarios) - Recomendado")
         print("2. 📊 Muestra media (500K usuarios)")
         print("3. 💾 Todos los usuarios (puede ser lento)")
+        print("4. 📁 Todos los usuarios desde el snapshot Parquet (sólo trae los cambios)")
         
-        choice = input("\nSelecciona opción (1-3): ").strip()
+        choice = input("\nSelecciona opción (1-4): ").strip()
         
+        use_snapshot = choice == "4"
         if choice == "1":
             limit = 100000
         elif choice == "2":
@@ -391,8 +366,13 @@ def main():
         else:
             limit = None
         
+        def load():
+            if use_snapshot:
+                return analyzer.load_users_from_snapshot()
+            return analyzer.load_users_to_pandas(limit)
+        
         # Cargar datos
-        df = analyzer.load_users_to_pandas(limit)
+        df = load()
         if df is None or df.empty:
             print("❌ No se pudieron cargar los datos")
             return
@@ -422,7 +402,7 @@ def main():
                 analyzer.export_results()
             elif choice == "5":
                 print("\n🔄 Recargando datos...")
-                df = analyzer.load_users_to_pandas(limit)
+                df = load()
                 if df is None:
                     print("❌ Error recargando datos")
             elif choice == "6":
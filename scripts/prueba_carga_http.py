@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga HTTP de la aplicación con tráfico mixto por rol
+
+Abre sesiones de usuario con llegadas de Poisson (lazo abierto: la tasa de
+llegada no depende de lo que tarde la aplicación en responder) y cada
+sesión recorre el escenario de su rol, con pausas entre pasos:
+
+- solicitante: mis solicitudes + estadísticas, crea una solicitud, a veces
+  sube un adjunto y la consulta
+- aprobador: dashboard (estadísticas + pendientes, como aprobador.js), abre
+  una pendiente y la aprueba o rechaza, y vuelve a cargar el dashboard
+- pagador: dashboard (estadísticas + aprobadas, como pagador.js), marca una
+  como pagada, sube el comprobante y consulta historial/pendientes
+- admin: estadísticas de usuarios y solicitudes, listado de usuarios
+- login: sólo el login (bcrypt en el pool de PasswordHasher)
+
+Con --replay se reproduce un access log (formato de uvicorn o combined):
+con marcas de tiempo respeta los intervalos originales (--velocidad), sin
+ellas usa --tasa. Por defecto sólo se reproducen los GET (el log no trae
+los cuerpos); el token se elige por el prefijo de la ruta.
+
+El objetivo es un servidor (--url, p. ej. uvicorn main:app) o la aplicación
+en este mismo proceso (--asgi, transporte ASGI de httpx, con el MongoDB de
+.env). Las cuentas son las de scripts/generate_load_data.py (mismo
+--usuarios, contraseña password123) o las que se pasen con --cuenta.
+¡Crea, aprueba y paga solicitudes: usar sólo contra una base de pruebas!
+
+Se reporta por ruta (los ObjectId se agrupan como {id}): peticiones, p50,
+p95, p99, máximo, respuestas 4xx y errores (5xx o sin respuesta), además
+del retraso con el que el generador logró arrancar cada sesión.
+
+Uso:
+    python scripts/prueba_carga_http.py --url http://localhost:8000 --tasa 5 --duracion 60
+    python scripts/prueba_carga_http.py --asgi --mezcla aprobador=60,pagador=40 --tasa 2
+    python scripts/prueba_carga_http.py --url http://localhost:8000 --replay access.log --velocidad 4
+    python scripts/prueba_carga_http.py --asgi --salida carga.json --max-errores 0.01
+
+Requiere httpx (pip install httpx).
+"""
+
+import argparse
+import asyncio
+import http.cookiejar
+import json
+import os
+import random
+import re
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROYECTO)
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from generate_load_data import PASSWORD, email_de, rol_de
+
+ROLES = ["solicitante", "aprobador", "pagador", "admin"]
+MEZCLA = "solicitante=45,aprobador=25,pagador=15,admin=5,login=10"
+OBJECT_ID = re.compile(r"/[0-9a-f]{24}(?=/|$)")
+
+# uvicorn: INFO:     127.0.0.1:53422 - "GET /ruta HTTP/1.1" 200 OK
+# combined: 127.0.0.1 - - [10/Oct/2025:13:55:36 +0000] "GET /ruta HTTP/1.1" 200 512 ...
+LINEA_LOG = re.compile(r'^(?:[^"\[]*\[(?P<fecha>[^\]]+)\])?[^"]*"(?P<metodo>[A-Z]+) (?P<ruta>\S+) HTTP/[\d.]+"\s+(?P<status>\d{3})')
+FORMATO_FECHA_LOG = "%d/%b/%Y:%H:%M:%S %z"
+
+# Rol cuyo token usa cada prefijo al reproducir un log
+ROL_POR_PREFIJO = [("/aprobador", "aprobador"), ("/pagador", "pagador"), ("/api/users", "admin"),
+                   ("/internal", "admin"), ("/api/solicitudes/todas", "admin")]
+
+SOLICITUD = {
+    "departamento": "Finanzas",
+    "monto": 1500.0,
+    "tipo_moneda": "Peso Mexicano (MXN)",
+    "banco_destino": "BBVA México",
+    "cuenta_destino": "012345678901234567",
+    "es_clabe": True,
+    "nombre_beneficiario": "Beneficiario de Carga",
+    "nombre_empresa": "Proveedor de Carga S.A. de C.V.",
+    "tipo_pago": "Proveedores",
+    "concepto_pago": "Pagos a Terceros",
+    "descripcion_tipo_pago": "Solicitud generada por la prueba de carga",
+}
+DEPARTAMENTOS = ["Rectoría", "Dirección Académica", "Dirección Administrativa", "Finanzas", "Recursos Humanos",
+                 "Sistemas y TI", "Mantenimiento", "Biblioteca", "Servicios Escolares", "Vinculación"]
+ARCHIVO = b"%PDF-1.4\n% prueba de carga EU-UTVT\n" + b"0" * 16 * 1024
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano (valores ya ordenados)"""
+    if not valores:
+        return 0.0
+    k = max(0, min(len(valores) - 1, int(round(p / 100.0 * len(valores))) - 1))
+    return valores[k]
+
+
+def ruta_agrupada(metodo, url):
+    ruta = url.split("?", 1)[0]
+    return f"{metodo} {OBJECT_ID.sub('/{id}', ruta)}"
+
+
+class Metricas:
+    def __init__(self):
+        self.latencias = {}
+        self.respuestas_4xx = {}
+        self.errores = {}
+        self.retrasos = []
+        self.sesiones = 0
+        self.descartadas = 0
+        self.inicio = time.perf_counter()
+        self.fin = None
+
+    def registrar(self, ruta, segundos, status):
+        self.latencias.setdefault(ruta, []).append(segundos * 1000)
+        if status is None or status >= 500:
+            self.errores[ruta] = self.errores.get(ruta, 0) + 1
+        elif status >= 400:
+            self.respuestas_4xx[ruta] = self.respuestas_4xx.get(ruta, 0) + 1
+
+    def resumen(self):
+        duracion = (self.fin or time.perf_counter()) - self.inicio
+        rutas = {}
+        for ruta, latencias in self.latencias.items():
+            ordenadas = sorted(latencias)
+            rutas[ruta] = {
+                "peticiones": len(ordenadas),
+                "p50_ms": round(percentil(ordenadas, 50), 2),
+                "p95_ms": round(percentil(ordenadas, 95), 2),
+                "p99_ms": round(percentil(ordenadas, 99), 2),
+                "max_ms": round(ordenadas[-1], 2),
+                "4xx": self.respuestas_4xx.get(ruta, 0),
+                "errores": self.errores.get(ruta, 0),
+                "tasa_error": round(self.errores.get(ruta, 0) / len(ordenadas), 4),
+            }
+        total = sum(r["peticiones"] for r in rutas.values())
+        todas = sorted(l for latencias in self.latencias.values() for l in latencias)
+        retrasos = sorted(self.retrasos)
+        return {
+            "duracion_s": round(duracion, 2),
+            "peticiones": total,
+            "peticiones_por_s": round(total / duracion, 2) if duracion else 0.0,
+            "p50_ms": round(percentil(todas, 50), 2),
+            "p95_ms": round(percentil(todas, 95), 2),
+            "p99_ms": round(percentil(todas, 99), 2),
+            "errores": sum(self.errores.values()),
+            "tasa_error": round(sum(self.errores.values()) / total, 4) if total else 0.0,
+            "sesiones": self.sesiones,
+            "sesiones_descartadas": self.descartadas,
+            "retraso_arranque_p99_ms": round(percentil(retrasos, 99), 2),
+            "rutas": rutas,
+        }
+
+
+class Sesion:
+    """Peticiones de un usuario: añade su token y registra cada respuesta"""
+
+    def __init__(self, cliente, metricas, token=None, pausa=0.0, rng=None):
+        self.cliente = cliente
+        self.metricas = metricas
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.pausa = pausa
+        self.rng = rng or random
+
+    async def pedir(self, metodo, url, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            respuesta = await self.cliente.request(metodo, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.metricas.registrar(ruta_agrupada(metodo, url), time.perf_counter() - inicio, None)
+            return None
+        self.metricas.registrar(ruta_agrupada(metodo, url), time.perf_counter() - inicio, respuesta.status_code)
+        return respuesta
+
+    async def json(self, metodo, url, **kwargs):
+        respuesta = await self.pedir(metodo, url, **kwargs)
+        if respuesta is None or respuesta.status_code >= 400:
+            return None
+        try:
+            return respuesta.json()
+        except ValueError:
+            return None
+
+    async def pensar(self):
+        """Pausa entre pasos (exponencial, media --pausa)"""
+        if self.pausa > 0:
+            await asyncio.sleep(self.rng.expovariate(1 / self.pausa))
+
+
+# --------------------------------------------------------------------- escenarios
+
+async def escenario_solicitante(s):
+    await s.pedir("GET", "/api/solicitudes/mis-solicitudes")
+    await s.pedir("GET", "/api/solicitudes/estadisticas")
+    await s.pensar()
+    cuerpo = dict(SOLICITUD, departamento=s.rng.choice(DEPARTAMENTOS), monto=round(s.rng.uniform(100, 50_000), 2),
+                  fecha_limite_pago=(date.today() + timedelta(days=30)).isoformat() + "T00:00:00")
+    creada = await s.json("POST", "/api/solicitudes/estandar", json=cuerpo)
+    if not creada:
+        return
+    solicitud_id = creada["solicitud_id"]
+    await s.pensar()
+    if s.rng.random() < 0.5:
+        await s.pedir("POST", f"/api/solicitudes/upload-files/{solicitud_id}",
+                      files=[("files", ("factura.pdf", ARCHIVO, "application/pdf"))])
+    await s.pedir("GET", f"/api/solicitudes/estandar/{solicitud_id}")
+
+
+async def escenario_aprobador(s):
+    await s.pedir("GET", "/aprobador/api/estadisticas")
+    pendientes = await s.json("GET", "/aprobador/api/solicitudes-pendientes")
+    await s.pensar()
+    solicitudes = (pendientes or {}).get("solicitudes") or []
+    if solicitudes:
+        solicitud_id = s.rng.choice(solicitudes)["id"]
+        await s.pedir("GET", f"/aprobador/api/solicitud/{solicitud_id}")
+        await s.pensar()
+        if s.rng.random() < 0.75:
+            await s.pedir("POST", "/aprobador/api/aprobar",
+                          json={"solicitud_id": solicitud_id, "comentarios_aprobador": "Aprobada en prueba de carga"})
+        else:
+            await s.pedir("POST", "/aprobador/api/rechazar",
+                          json={"solicitud_id": solicitud_id, "comentarios_aprobador": "Rechazada en prueba de carga"})
+    # aprobador.js recarga el dashboard después de cada acción
+    await s.pedir("GET", "/aprobador/api/estadisticas")
+    await s.pedir("GET", "/aprobador/api/solicitudes-pendientes")
+
+
+async def escenario_pagador(s):
+    await s.pedir("GET", "/pagador/api/estadisticas")
+    aprobadas = await s.json("GET", "/pagador/api/solicitudes-aprobadas")
+    await s.pensar()
+    solicitudes = [sol for sol in (aprobadas or {}).get("solicitudes") or [] if sol.get("estado") == "aprobada"]
+    if solicitudes:
+        solicitud_id = s.rng.choice(solicitudes)["id"]
+        pagada = await s.json("POST", "/pagador/api/marcar-pagada",
+                              json={"solicitud_id": solicitud_id, "referencia_pago": f"CARGA-{s.rng.randrange(10**8):08d}"})
+        await s.pensar()
+        if pagada:
+            await s.pedir("POST", "/pagador/api/subir-comprobantes", data={"solicitud_id": solicitud_id},
+                          files=[("archivos", ("comprobante.pdf", ARCHIVO, "application/pdf"))])
+    await s.pensar()
+    await s.pedir("GET", s.rng.choice(["/pagador/api/historial", "/pagador/api/pendientes-comprobante",
+                                       "/pagador/api/con-comprobantes"]))
+
+
+async def escenario_admin(s):
+    await s.pedir("GET", "/api/users/stats")
+    await s.pedir("GET", "/api/users/stats/roles")
+    await s.pensar()
+    await s.pedir("GET", "/api/users/", params={"page": 1, "limit": 20, "include_total": "false"})
+    await s.pensar()
+    await s.pedir("GET", "/api/solicitudes/estadisticas/detalle")
+
+
+ESCENARIOS = {
+    "solicitante": escenario_solicitante,
+    "aprobador": escenario_aprobador,
+    "pagador": escenario_pagador,
+    "admin": escenario_admin,
+}
+
+
+# ------------------------------------------------------------------------ cuentas
+
+async def login(cliente, metricas, email, password):
+    """Token de la cuenta (None si el login falla); el login se mide como una petición más"""
+    respuesta = await Sesion(cliente, metricas).pedir("POST", "/api/users/login",
+                                                      json={"email": email, "password": password})
+    if respuesta is None or respuesta.status_code != 200:
+        return None
+    return respuesta.json()["access_token"]
+
+
+async def preparar_cuentas(cliente, metricas, args, rng):
+    """{rol: [tokens]}: --cuenta explícitas o usuarios de generate_load_data.py"""
+    cuentas = {rol: [] for rol in ROLES}
+    for cuenta in args.cuenta:
+        rol, credenciales = cuenta.split("=", 1)
+        email, _, password = credenciales.partition(":")
+        cuentas[rol].append((email, password or args.password))
+    for rol in ROLES:
+        if cuentas[rol]:
+            continue
+        candidatos = [user_id for user_id in range(1, min(args.usuarios, 100_000) + 1) if rol_de(user_id) == rol]
+        rng.shuffle(candidatos)
+        cuentas[rol] = [(email_de(user_id), args.password) for user_id in candidatos[:args.cuentas_por_rol * 3]]
+
+    tokens = {}
+    for rol, credenciales in cuentas.items():
+        tokens[rol] = []
+        for email, password in credenciales:
+            if len(tokens[rol]) >= args.cuentas_por_rol:
+                break
+            token = await login(cliente, metricas, email, password)
+            if token:
+                tokens[rol].append(token)
+        print(f"🔑 {rol}: {len(tokens[rol])} sesiones iniciadas")
+    return tokens
+
+
+# ------------------------------------------------------------------------ llegadas
+
+def leer_mezcla(texto):
+    mezcla = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition("=")
+        nombre = nombre.strip()
+        if nombre not in ESCENARIOS and nombre != "login":
+            raise ValueError(f"escenario desconocido: {nombre}")
+        mezcla[nombre] = float(peso or 1)
+    return mezcla
+
+
+def leer_log(ruta, metodos, incluir_estaticos):
+    """[(segundos desde la primera línea o None, método, ruta)] de un access log"""
+    entradas, primera = [], None
+    with open(ruta, encoding="utf-8", errors="replace") as f:
+        for linea in f:
+            m = LINEA_LOG.match(linea)
+            if not m or m.group("metodo") not in metodos:
+                continue
+            url = m.group("ruta")
+            if not incluir_estaticos and url.startswith(("/static/", "/uploads/")):
+                continue
+            offset = None
+            if m.group("fecha"):
+                try:
+                    momento = datetime.strptime(m.group("fecha"), FORMATO_FECHA_LOG)
+                except ValueError:
+                    momento = None
+                if momento is not None:
+                    primera = primera or momento
+                    offset = (momento - primera).total_seconds()
+            entradas.append((offset, m.group("metodo"), url))
+    return entradas
+
+
+def rol_de_ruta(url):
+    for prefijo, rol in ROL_POR_PREFIJO:
+        if url.startswith(prefijo):
+            return rol
+    return "solicitante"
+
+
+async def lanzar(programado, corrutina, activas, metricas, args):
+    """Arranca una sesión en su momento programado sin esperar a las anteriores (lazo abierto)"""
+    espera = programado - time.perf_counter()
+    if espera > 0:
+        await asyncio.sleep(espera)
+    if len(activas) >= args.max_sesiones:
+        metricas.descartadas += 1
+        corrutina.close()
+        return
+    metricas.retrasos.append(max(0.0, time.perf_counter() - programado) * 1000)
+    metricas.sesiones += 1
+    tarea = asyncio.create_task(corrutina)
+    activas.add(tarea)
+    tarea.add_done_callback(activas.discard)
+
+
+async def trafico_mixto(cliente, metricas, tokens, args, rng):
+    mezcla = leer_mezcla(args.mezcla)
+    mezcla = {nombre: peso for nombre, peso in mezcla.items() if nombre == "login" or tokens.get(nombre)}
+    nombres, pesos = list(mezcla), list(mezcla.values())
+    print(f"🚦 {args.tasa} sesiones/s durante {args.duracion} s | mezcla: "
+          + ", ".join(f"{n}={p:g}" for n, p in mezcla.items()))
+
+    async def sesion(nombre, semilla):
+        s_rng = random.Random(semilla)
+        if nombre == "login":
+            user_id = s_rng.randint(1, args.usuarios)
+            await login(cliente, metricas, email_de(user_id), args.password)
+            return
+        s = Sesion(cliente, metricas, s_rng.choice(tokens[nombre]), args.pausa, s_rng)
+        await ESCENARIOS[nombre](s)
+
+    activas = set()
+    programado = time.perf_counter()
+    fin = programado + args.duracion
+    while True:
+        programado += rng.expovariate(args.tasa)
+        if programado >= fin:
+            break
+        nombre = rng.choices(nombres, pesos)[0]
+        await lanzar(programado, sesion(nombre, rng.getrandbits(64)), activas, metricas, args)
+    if activas:
+        await asyncio.wait(activas)
+
+
+async def reproducir(cliente, metricas, tokens, args, rng):
+    entradas = leer_log(args.replay, set(args.replay_metodos.split(",")), args.incluir_estaticos)
+    if not entradas:
+        print("⚠️ El log no tiene peticiones reproducibles")
+        return
+    con_tiempo = all(offset is not None for offset, _, _ in entradas)
+    print(f"🔁 Reproduciendo {len(entradas):,} peticiones "
+          + (f"a {args.velocidad}x" if con_tiempo else f"a {args.tasa}/s (el log no trae hora)"))
+
+    async def peticion(metodo, url):
+        rol = rol_de_ruta(url)
+        token = rng.choice(tokens[rol]) if tokens.get(rol) else None
+        await Sesion(cliente, metricas, token).pedir(metodo, url)
+
+    activas = set()
+    inicio = programado = time.perf_counter()
+    for offset, metodo, url in entradas:
+        if con_tiempo:
+            programado = inicio + offset / args.velocidad
+        else:
+            programado += rng.expovariate(args.tasa)
+        await lanzar(programado, peticion(metodo, url), activas, metricas, args)
+    if activas:
+        await asyncio.wait(activas)
+
+
+# ------------------------------------------------------------------------- reporte
+
+def imprimir(resumen):
+    print("\n" + "=" * 110)
+    print(f"{'RUTA':<56} {'PET.':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'máx ms':>9} {'4xx':>5} {'ERR':>5}")
+    print("-" * 110)
+    for ruta, r in sorted(resumen["rutas"].items(), key=lambda item: -item[1]["peticiones"]):
+        print(f"{ruta[:56]:<56} {r['peticiones']:>7,} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} "
+              f"{r['max_ms']:>9.1f} {r['4xx']:>5} {r['errores']:>5}")
+    print("=" * 110)
+    print(f"📊 {resumen['peticiones']:,} peticiones en {resumen['duracion_s']:.1f} s "
+          f"({resumen['peticiones_por_s']:.1f}/s) | p50 {resumen['p50_ms']:.1f} ms | "
+          f"p95 {resumen['p95_ms']:.1f} ms | p99 {resumen['p99_ms']:.1f} ms")
+    print(f"❌ Errores: {resumen['errores']:,} ({resumen['tasa_error']:.2%}) | "
+          f"👥 Sesiones: {resumen['sesiones']:,} (descartadas por --max-sesiones: {resumen['sesiones_descartadas']:,})")
+    print(f"⏱️ Retraso de arranque p99: {resumen['retraso_arranque_p99_ms']:.1f} ms "
+          "(si es alto, el generador no alcanzó la tasa pedida)")
+
+
+async def ejecutar(args):
+    rng = random.Random(args.semilla)
+    limites = httpx.Limits(max_connections=args.max_sesiones, max_keepalive_connections=args.max_sesiones)
+    tiempo = httpx.Timeout(args.timeout)
+    # Sin cookies: el login deja access_token en la respuesta y todas las
+    # sesiones comparten el cliente; cada una se identifica sólo con su token
+    sin_cookies = http.cookiejar.CookieJar(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+
+    if args.asgi:
+        os.chdir(PROYECTO)  # main.py monta static/ con ruta relativa
+        from main import app
+        async with app.router.lifespan_context(app):
+            transporte = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transporte, base_url="http://asgi", timeout=tiempo,
+                                         cookies=sin_cookies) as cliente:
+                return await correr(cliente, args, rng)
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=tiempo,
+                                 cookies=sin_cookies) as cliente:
+        return await correr(cliente, args, rng)
+
+
+async def correr(cliente, args, rng):
+    # Los logins de preparación no cuentan en el resultado
+    tokens = await preparar_cuentas(cliente, Metricas(), args, rng)
+    metricas = Metricas()
+    if args.replay:
+        await reproducir(cliente, metricas, tokens, args, rng)
+    else:
+        await trafico_mixto(cliente, metricas, tokens, args, rng)
+    metricas.fin = time.perf_counter()
+    return metricas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga HTTP con tráfico mixto por rol o reproducción de logs")
+    destino = parser.add_mutually_exclusive_group()
+    destino.add_argument("--url", default="http://localhost:8000", help="Servidor a probar")
+    destino.add_argument("--asgi", action="store_true", help="Cargar main:app en este proceso (transporte ASGI)")
+    parser.add_argument("--tasa", type=float, default=2.0, help="Sesiones (o peticiones en --replay) nuevas por segundo")
+    parser.add_argument("--duracion", type=float, default=60.0, help="Segundos generando llegadas")
+    parser.add_argument("--mezcla", default=MEZCLA, help="Peso de cada escenario (rol=peso,...)")
+    parser.add_argument("--pausa", type=float, default=0.5, help="Pausa media entre pasos de una sesión (s)")
+    parser.add_argument("--max-sesiones", type=int, default=200, help="Sesiones simultáneas como máximo (las demás se descartan)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--usuarios", type=int, default=100_000, help="Población de generate_load_data.py")
+    parser.add_argument("--password", default=PASSWORD)
+    parser.add_argument("--cuenta", action="append", default=[], metavar="ROL=EMAIL[:PASSWORD]",
+                        help="Cuenta a usar para un rol (repetible); sustituye a las generadas")
+    parser.add_argument("--cuentas-por-rol", type=int, default=5)
+    parser.add_argument("--replay", help="Access log a reproducir en lugar de los escenarios")
+    parser.add_argument("--replay-metodos", default="GET", help="Métodos del log que se reproducen")
+    parser.add_argument("--velocidad", type=float, default=1.0, help="Factor de velocidad al reproducir con marcas de tiempo")
+    parser.add_argument("--incluir-estaticos", action="store_true", help="Reproducir también /static y /uploads")
+    parser.add_argument("--semilla", type=int, default=20251001)
+    parser.add_argument("--salida", help="Archivo JSON con el resumen")
+    parser.add_argument("--max-errores", type=float, help="Terminar con código 1 si la tasa de error la supera")
+    args = parser.parse_args()
+    if httpx is None:
+        print("❌ Instalar: pip install httpx")
+        sys.exit(1)
+    if args.tasa <= 0 or args.velocidad <= 0:
+        parser.error("--tasa y --velocidad deben ser positivas")
+    try:
+        leer_mezcla(args.mezcla)
+    except ValueError as e:
+        parser.error(str(e))
+    for cuenta in args.cuenta:
+        if cuenta.split("=", 1)[0] not in ROLES or "=" not in cuenta:
+            parser.error(f"--cuenta inválida: {cuenta}")
+
+    print("🎯 PRUEBA DE CARGA HTTP - EU-UTVT")
+    print(f"🌐 Destino: {'main:app (ASGI)' if args.asgi else args.url}")
+    metricas = asyncio.run(ejecutar(args))
+    resumen = metricas.resumen()
+    imprimir(resumen)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "destino": "asgi" if args.asgi else args.url,
+                "parametros": {k: v for k, v in vars(args).items() if k not in ("password", "cuenta")},
+                **resumen,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"💾 Resumen guardado: {args.salida}")
+
+    if args.max_errores is not None and resumen["tasa_error"] > args.max_errores:
+        print(f"🔴 Tasa de error {resumen['tasa_error']:.2%} > {args.max_errores:.2%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Reconstruir la colección `solicitud_stats` (estadísticas materializadas de
+los dashboards) recorriendo todas las solicitudes.
+
+Úsalo después de cargas masivas hechas fuera de la aplicación, restauraciones
+de respaldo o si se sospecha deriva en los contadores. Los contadores nuevos
+se calculan en una colección temporal y reemplazan a los actuales al final.
+La aplicación no reconstruye al arrancar (sólo avisa si falta la marca que
+deja este script; mientras tanto calcula las estadísticas en vivo): éste es
+el camino para el backfill inicial. Ejecútalo con la aplicación
+detenida o sin escrituras; los cambios hechos durante el recorrido pueden
+perderse. Sólo una reconstrucción puede correr a la vez.
+
+Uso:
+    python scripts/rebuild_solicitud_stats.py [--batch-size 1000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.config.settings import settings
+from app.models.solicitud_stats_db import ReconstruccionEnCurso, SolicitudStatsDB
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Reconstruir estadísticas materializadas de solicitudes")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    try:
+        print(f"🔄 Reconstruyendo solicitud_stats en '{settings.DATABASE_NAME}'...")
+        inicio = time.perf_counter()
+        try:
+            total = await SolicitudStatsDB(client[settings.DATABASE_NAME]).reconstruir(args.batch_size)
+        except ReconstruccionEnCurso as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"✅ {total} solicitudes procesadas en {time.perf_counter() - inicio:.1f} s")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
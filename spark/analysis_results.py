@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Resultados precalculados de los análisis de Spark en Parquet
+
+SparkMongoAnalyzer.export_analysis_results escribe cada resultado (roles,
+departamentos, estadísticas por departamento y rol, rangos salariales,
+altas por día) como un dataset Parquet en spark_analysis_results/<nombre>/,
+con la compresión elegida y un número de archivos calculado a partir de un
+tamaño objetivo por archivo (no coalesce(1)). Los datasets grandes se
+particionan por departamento.
+
+Al terminar se escribe spark_analysis_results/_SUCCESS con un manifiesto
+JSON (origen de los datos, filas, archivos y bytes de cada dataset). El
+origen (URI sin credenciales, base y colección) permite a la aplicación
+descartar una exportación hecha sobre otra base de datos. Mientras se exporta, el
+manifiesto no existe: los lectores sólo usan una exportación completa.
+El CSV es opcional y se genera a partir del Parquet ya escrito.
+
+AnalysisResults lee esos resultados con pandas (sin Spark); lo usan
+spark_reports_java8.py y, con su propio lector, los dashboards de la
+aplicación (app/utils/analytics_results.py).
+
+Autor: Sistema EU-UTVT
+Fecha: Octubre 2025
+"""
+
+import json
+import math
+import os
+import re
+from datetime import datetime, timezone
+
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "spark_analysis_results")
+MANIFEST_FILE = "_SUCCESS"
+COMPRESSIONS = ("snappy", "zstd", "gzip", "none")
+
+# Tamaño aproximado (sin comprimir) de cada tipo de Spark, como defaultSize
+TYPE_BYTES = {"string": 20, "integer": 4, "long": 8, "double": 8, "float": 4,
+              "boolean": 1, "timestamp": 8, "date": 4}
+
+
+def estimate_row_bytes(schema):
+    """Bytes aproximados por fila de un StructType de Spark"""
+    total = 0
+    for field in schema.fields:
+        total += TYPE_BYTES.get(field.dataType.typeName(), 8)
+    return total or 1
+
+
+def plan_files(rows, row_bytes, target_file_mb):
+    """(número de archivos, filas por archivo) para archivos de ~target_file_mb"""
+    target_bytes = target_file_mb * 1024 * 1024
+    files = math.ceil(rows * row_bytes / target_bytes) if rows else 1
+    files = files if files > 1 else 1
+    return files, math.ceil(rows / files) if rows else 1
+
+
+def data_files(path):
+    """Archivos Parquet de un dataset (sin _SUCCESS, .crc ni temporales)"""
+    found = []
+    for root, dirs, names in os.walk(path):
+        dirs[:] = [d for d in dirs if not d.startswith(("_", "."))]
+        found += [os.path.join(root, name) for name in names
+                  if name.endswith(".parquet") and not name.startswith(("_", "."))]
+    return found
+
+
+def write_dataset(df, path, compression="zstd", target_file_mb=128, partition_by=None):
+    """
+    Escribe un DataFrame de Spark como Parquet en `path`. El número de
+    archivos sale de las filas y el tamaño estimado por fila; con
+    `partition_by` cada valor queda en su directorio (col=valor) y
+    maxRecordsPerFile limita el tamaño de cada archivo. Devuelve la entrada
+    del manifiesto.
+    """
+    partition_by = list(partition_by or [])
+    df = df.cache()
+    try:
+        rows = df.count()
+        files, rows_per_file = plan_files(rows, estimate_row_bytes(df.schema), target_file_mb)
+        output = df.repartition(*partition_by) if partition_by else df.repartition(files)
+        writer = output.write.mode("overwrite") \
+            .option("compression", compression) \
+            .option("maxRecordsPerFile", rows_per_file)
+        if partition_by:
+            writer = writer.partitionBy(*partition_by)
+        writer.parquet(path)
+    finally:
+        df.unpersist()
+
+    written = data_files(path)
+    return {
+        "path": os.path.basename(path),
+        "rows": rows,
+        "files": len(written),
+        "bytes": sum(os.path.getsize(f) for f in written),
+        "partition_by": partition_by,
+    }
+
+
+def write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+def clear_manifest(directory):
+    """Marca la exportación como incompleta mientras se reescribe"""
+    try:
+        os.remove(os.path.join(directory, MANIFEST_FILE))
+    except FileNotFoundError:
+        pass
+
+
+def source_info(mongo_uri, database, collection):
+    """Origen de la exportación para el manifiesto (la URI sin usuario ni contraseña)"""
+    return {
+        "mongo_uri": re.sub(r"//[^/@]*@", "//", mongo_uri),
+        "database": database,
+        "collection": collection,
+    }
+
+
+def new_manifest(compression, target_file_mb, source_rows, source):
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "source": source,
+        "format": "parquet",
+        "compression": compression,
+        "target_file_mb": target_file_mb,
+        "source_rows": source_rows,
+        "datasets": {},
+        "csv": [],
+    }
+
+
+def read_manifest(directory=EXPORT_DIR):
+    """Manifiesto de la última exportación completa (None si no hay o está a medias)"""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        # Sin manifiesto, o el _SUCCESS vacío de Spark (exportación anterior a este formato)
+        return None
+    return manifest if isinstance(manifest, dict) and manifest.get("datasets") else None
+
+
+class AnalysisResults:
+    """Lectura con pandas de los resultados exportados por Spark"""
+
+    def __init__(self, directory=EXPORT_DIR):
+        self.directory = directory
+        self.manifest = read_manifest(directory)
+
+    def available(self, *names):
+        return self.manifest is not None and all(name in self.manifest["datasets"] for name in names)
+
+    def generated_at(self):
+        return datetime.fromisoformat(self.manifest["generated_at"]) if self.manifest else None
+
+    def read(self, name, columns=None, filters=None):
+        """
+        DataFrame del dataset `name`. `filters` (formato de
+        pyarrow.parquet.read_table) descarta particiones y row groups antes
+        de leerlos.
+        """
+        import pyarrow.parquet as pq
+        entry = self.manifest["datasets"][name]
+        table = pq.read_table(os.path.join(self.directory, entry["path"]), columns=columns, filters=filters)
+        return table.to_pandas()
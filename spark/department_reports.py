@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Reportes por departamento en una sola pasada
+
+department_metrics() calcula en un único groupby las métricas de todos los
+departamentos (mezcla de roles, usuarios activos, top de usuarios por
+logins) en lugar de filtrar el DataFrame completo una vez por departamento.
+El resultado son diccionarios pequeños con tipos de Python, así que el
+renderizado y la escritura de los archivos se pueden repartir entre varios
+procesos sin copiar el DataFrame.
+
+Lo usa MongoReportGenerator.generate_department_reports
+(spark_reports_java8.py).
+
+Autor: Sistema EU-UTVT
+Fecha: Octubre 2025
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+TOP_USERS = 10
+TOP_USER_COLUMNS = ["first_name", "last_name", "role", "login_count"]
+
+
+def department_metrics(df, top_n=TOP_USERS):
+    """
+    Métricas de todos los departamentos de `df`, ordenadas por nombre:
+    [{"department", "total", "active", "roles": [...], "top_users": [...]}]
+
+    Un groupby por departamento da los totales y otro por (departamento, rol)
+    el desglose por rol. Los totales no salen de sumar los roles: ese
+    groupby omite a los usuarios sin rol, que sí cuentan en el departamento.
+    El top de usuarios sale de un único ordenamiento estable por login_count
+    (los empates conservan el orden original, como nlargest).
+    """
+    departments = df[df["department"].notna()]
+
+    by_department = departments.groupby("department", observed=True, sort=True).agg(
+        total=("user_id", "size"),
+        active=("is_active", "sum"),
+    )
+    by_role = departments.groupby(["department", "role"], observed=True, sort=True).agg(
+        total=("user_id", "size"),
+        active=("is_active", "sum"),
+        avg_logins=("login_count", "mean"),
+        max_logins=("login_count", "max"),
+    )
+
+    ranked = departments.sort_values("login_count", ascending=False, kind="stable")
+    top = ranked.groupby("department", observed=True, sort=False).head(top_n)
+    top_by_department = {}
+    for row in zip(top["department"].tolist(), *(top[column].tolist() for column in TOP_USER_COLUMNS)):
+        top_by_department.setdefault(row[0], []).append(row[1:])
+
+    metrics = {
+        department: {
+            "department": department, "total": total, "active": int(active), "roles": [],
+            "top_users": top_by_department.get(department, []),
+        }
+        for department, total, active in zip(
+            by_department.index.tolist(),
+            by_department["total"].tolist(),
+            by_department["active"].tolist(),
+        )
+    }
+    for (department, role), total, active, avg_logins, max_logins in zip(
+        by_role.index.tolist(),
+        by_role["total"].tolist(),
+        by_role["active"].tolist(),
+        by_role["avg_logins"].tolist(),
+        by_role["max_logins"].tolist(),
+    ):
+        metrics[department]["roles"].append((role, total, int(active), avg_logins, int(max_logins)))
+    return [metrics[department] for department in sorted(metrics)]
+
+
+def render_department_report(metrics):
+    """Texto del reporte de un departamento"""
+    department, total, active = metrics["department"], metrics["total"], metrics["active"]
+    lines = [
+        "",
+        f"REPORTE DEPARTAMENTAL - {department.upper()}",
+        "=" * 60,
+        "",
+        "📊 RESUMEN",
+        f"• Total usuarios: {total:,}",
+        f"• Usuarios activos: {active:,} ({(active / total) * 100:.1f}%)",
+        f"• Usuarios inactivos: {total - active:,}",
+        "",
+        "📋 DISTRIBUCIÓN POR ROLES",
+    ]
+    for role, role_total, _, avg_logins, _ in metrics["roles"]:
+        lines.append(f"• {role.capitalize()}: {role_total} usuarios ({(role_total / total) * 100:.1f}%) "
+                     f"- {avg_logins:.1f} logins promedio")
+
+    lines += ["", f"🏆 TOP {TOP_USERS} USUARIOS MÁS ACTIVOS"]
+    for i, (first_name, last_name, role, login_count) in enumerate(metrics["top_users"], 1):
+        lines.append(f"{i:2d}. {first_name} {last_name} ({role}) - {login_count} logins")
+
+    lines += ["", "=" * 60, ""]
+    return "\n".join(lines)
+
+
+def report_filename(department):
+    safe_dept = department.replace(' ', '_').replace('/', '_').replace('\\', '_')
+    return f"reporte_{safe_dept}.txt"
+
+
+def write_department_report(metrics, reports_dir):
+    """Renderiza y guarda el reporte de un departamento; devuelve la ruta"""
+    path = os.path.join(reports_dir, report_filename(metrics["department"]))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(render_department_report(metrics))
+    return path
+
+
+def write_department_reports(metrics, reports_dir, workers=None):
+    """
+    Escribe los reportes de todos los departamentos, repartidos entre
+    `workers` procesos (por defecto uno por núcleo, sin pasar del número de
+    departamentos; 0 o 1 = en este proceso). Devuelve las rutas en el orden
+    de `metrics`.
+    """
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    workers = min(workers, len(metrics))
+    if workers <= 1:
+        return [write_department_report(entry, reports_dir) for entry in metrics]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(write_department_report, metrics, [reports_dir] * len(metrics)))
+
+
+def generate_department_reports(df, reports_dir, workers=None):
+    """
+    Métricas en una pasada + escritura en paralelo. Devuelve las rutas y el
+    desglose de tiempos: {"agrupacion", "renderizado", "total", "departamentos", "procesos"}.
+    """
+    start = time.perf_counter()
+    metrics = department_metrics(df)
+    grouped = time.perf_counter()
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    paths = write_department_reports(metrics, reports_dir, workers)
+    end = time.perf_counter()
+    return paths, {
+        "agrupacion": grouped - start,
+        "renderizado": end - grouped,
+        "total": end - start,
+        "departamentos": len(metrics),
+        "procesos": max(1, min(workers, len(metrics))),
+    }
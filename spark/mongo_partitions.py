@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Lectura particionada de la colección de usuarios para Spark
+
+Divide la colección en rangos de `_id` a partir de una muestra ($sample) y
+lee cada partición por separado con find_raw_batches, convirtiendo cada lote
+de BSON directamente en un pyarrow.RecordBatch. Cada tarea de Spark lee su
+propia partición con su propia conexión: el driver sólo conoce los filtros,
+nunca las filas.
+
+Los rangos $gte/$lt sólo comparan valores del mismo tipo BSON, así que además
+de los rangos hay una partición para los documentos en los que el campo
+falta, es null o es de otro tipo: ningún documento queda fuera.
+
+Autor: Sistema EU-UTVT
+Fecha: Octubre 2025
+"""
+
+import os
+import sys
+
+from datetime import datetime
+
+import bson
+from bson.codec_options import CodecOptions
+from bson.objectid import ObjectId
+
+# Proyección de los campos que usan los análisis
+USER_PROJECTION = {
+    "_id": 0, "user_id": 1, "email": 1, "first_name": 1, "last_name": 1,
+    "department": 1, "role": 1, "phone": 1, "is_active": 1,
+    "created_at": 1, "last_login": 1, "login_count": 1,
+    "profile.position": 1, "profile.employee_id": 1,
+    "profile.salary_range": 1, "profile.location": 1
+}
+
+PROFILE_FIELDS = ["position", "employee_id", "salary_range", "location"]
+
+# Fechas con zona UTC: Spark las recibe como TimestampType sin conversión
+CODEC_OPTIONS = CodecOptions(tz_aware=True)
+
+
+def _type_alias(value):
+    """Alias de $type del valor (None si no se puede partir por rangos de ese tipo)"""
+    if isinstance(value, ObjectId):
+        return "objectId"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, datetime):
+        return "date"
+    return None
+
+
+def partition_filters(collection, partitions, field="_id", samples_per_partition=20):
+    """
+    Filtros de MongoDB que cubren toda la colección sin huecos ni solapes.
+
+    Los puntos de corte salen de una muestra aleatoria de `field`, así que los
+    rangos quedan de tamaño parecido aunque los valores no sean consecutivos;
+    el primero no tiene límite inferior y el último no tiene superior. Como
+    $gte/$lt sólo comparan valores del mismo tipo, el último filtro toma los
+    documentos en los que `field` falta, es null o es de otro tipo. Si la
+    muestra mezcla tipos, se lee todo con un solo filtro.
+    """
+    if partitions <= 1:
+        return [{}]
+    sample = collection.aggregate([
+        {"$sample": {"size": partitions * samples_per_partition}},
+        {"$project": {"_id": 0, "v": f"${field}"}},
+    ])
+    values = [doc["v"] for doc in sample if doc.get("v") is not None]
+    kinds = {_type_alias(value) for value in values}
+    if len(kinds) != 1 or None in kinds:
+        return [{}]
+    kind = kinds.pop()
+    values = sorted(set(values))
+    step = len(values) / partitions
+    cuts = sorted({values[int(i * step)] for i in range(1, partitions)})
+    bounds = [None] + cuts + [None]
+    filters = [range_filter(field, lower, upper) for lower, upper in zip(bounds[:-1], bounds[1:])]
+    filters.append({field: {"$not": {"$type": kind}}})
+    return filters
+
+
+def count_mismatch(collection, loaded):
+    """Documentos de la colección si no coinciden con los `loaded` cargados (None si coinciden)"""
+    expected = collection.count_documents({})
+    return expected if expected != loaded else None
+
+
+def range_filter(field, lower, upper):
+    """Filtro de MongoDB para el rango [lower, upper)"""
+    condition = {}
+    if lower is not None:
+        condition["$gte"] = lower
+    if upper is not None:
+        condition["$lt"] = upper
+    return {field: condition} if condition else {}
+
+
+def arrow_schema():
+    """Esquema Arrow equivalente al StructType de SparkMongoAnalyzer"""
+    import pyarrow as pa
+    timestamp = pa.timestamp("us", tz="UTC")
+    return pa.schema([
+        ("user_id", pa.int32()),
+        ("email", pa.string()),
+        ("first_name", pa.string()),
+        ("last_name", pa.string()),
+        ("department", pa.string()),
+        ("role", pa.string()),
+        ("phone", pa.string()),
+        ("is_active", pa.bool_()),
+        ("created_at", timestamp),
+        ("last_login", timestamp),
+        ("login_count", pa.int32()),
+        ("profile", pa.struct([(name, pa.string()) for name in PROFILE_FIELDS])),
+    ])
+
+
+def documents_to_record_batch(docs, schema):
+    """
+    Un lote de documentos decodificados -> RecordBatch (columna por columna).
+
+    Es la única conversión BSON -> Arrow: la usan la ingesta de Spark (con
+    arrow_schema(), `profile` como struct) y la carga a pandas y el snapshot
+    Parquet (users_frame.users_schema(), campos de `profile` como columnas
+    planas y categóricos como diccionario). `_id` se convierte a cadena,
+    `login_count` ausente vale 0 e `is_active` ausente, False.
+    """
+    import pyarrow as pa
+    profiles = [doc.get("profile") or {} for doc in docs]
+    columns = []
+    for field in schema:
+        if field.name == "profile":
+            children = [_to_array([p.get(child.name) for p in profiles], child.type) for child in field.type]
+            columns.append(pa.StructArray.from_arrays(children, fields=list(field.type)))
+            continue
+        if field.name in PROFILE_FIELDS:
+            values = [p.get(field.name) for p in profiles]
+        elif field.name == "login_count":
+            values = [doc.get("login_count") or 0 for doc in docs]
+        elif field.name == "is_active":
+            values = [bool(doc.get("is_active")) for doc in docs]
+        elif field.name == "_id":
+            values = [str(doc["_id"]) for doc in docs]
+        else:
+            values = [doc.get(field.name) for doc in docs]
+        columns.append(_to_array(values, field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def raw_batch_to_record_batch(raw, schema, codec_options=None):
+    """Un lote crudo de BSON (find_raw_batches) -> RecordBatch con `schema`"""
+    docs = bson.decode_all(raw, codec_options) if codec_options else bson.decode_all(raw)
+    return documents_to_record_batch(docs, schema)
+
+
+def _to_array(values, arrow_type):
+    import pyarrow as pa
+    if pa.types.is_dictionary(arrow_type):
+        return pa.array(values, pa.string()).dictionary_encode()
+    return pa.array(values, arrow_type)
+
+
+def read_partition_batches(mongo_uri, database, collection, query, batch_size=50000, client=None):
+    """
+    RecordBatches de los documentos de una partición (un filtro de
+    partition_filters). Cada lote crudo de BSON se decodifica y se convierte
+    por separado, así que la memoria usada es la de un lote, no la de la
+    partición.
+    """
+    from pymongo import MongoClient
+    schema = arrow_schema()
+    own_client = client is None
+    client = client or MongoClient(mongo_uri)
+    try:
+        cursor = client[database][collection].find_raw_batches(
+            query, USER_PROJECTION, batch_size=batch_size
+        )
+        for raw in cursor:
+            batch = raw_batch_to_record_batch(raw, schema, CODEC_OPTIONS)
+            if batch.num_rows:
+                yield batch
+    finally:
+        if own_client:
+            client.close()
+
+
+def peak_rss_mb():
+    """RSS máximo de este proceso en MB (None si la plataforma no lo expone)"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reporta KB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process(os.getpid()).memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
@@ -18,12 +18,31 @@ import pymongo
 from pymongo import MongoClient
 import time
 
+import analysis_results
+import mongo_partitions
+from users_snapshot import UsersSnapshot
+
 # Configuración
 SPARK_HOME = "C:/spark"
-MONGO_URI = "mongodb://localhost:27017"
-DATABASE_NAME = "eu_utvt_db"
+# Mismas variables que la aplicación (MONGODB_URL, DATABASE_NAME): las gráficas
+# del admin sólo usan una exportación hecha sobre su propia base de datos
+MONGO_URI = os.environ.get("MONGODB_URL", "mongodb://localhost:27017")
+DATABASE_NAME = os.environ.get("DATABASE_NAME", "eu_utvt_db")
 COLLECTION_NAME = "users"
 
+# Ingesta particionada: rangos de _id leídos en paralelo por las tareas de Spark
+INGEST_PARTITIONS = 16
+# Campo de los rangos: los usuarios creados por la aplicación no tienen user_id;
+# los documentos sin el campo (o de otro tipo) se leen en una partición aparte
+INGEST_FIELD = "_id"
+INGEST_BATCH_SIZE = 50000
+
+# Exportación de resultados: Parquet con compresión (snappy, zstd, gzip, none),
+# archivos de ~EXPORT_TARGET_FILE_MB y vista CSV opcional
+EXPORT_COMPRESSION = "zstd"
+EXPORT_TARGET_FILE_MB = 128
+EXPORT_CSV = False
+
 class SparkMongoAnalyzer:
     def __init__(self):
         self.spark = None
@@ -80,8 +99,16 @@ class SparkMongoAnalyzer:
             print(f"❌ Error conectando a MongoDB: {e}")
             sys.exit(1)
     
-    def load_users_to_spark(self):
-        """Cargar usuarios de MongoDB a Spark DataFrame"""
+    def load_users_to_spark(self, partitions=INGEST_PARTITIONS, field=INGEST_FIELD):
+        """
+        Cargar usuarios de MongoDB a Spark DataFrame
+
+        La colección se divide en `partitions` rangos de `field`, más una
+        partición con los documentos sin el campo o de otro tipo, y cada tarea
+        de Spark lee la suya (mapInArrow) directamente de MongoDB en lotes
+        Arrow: el driver sólo calcula los filtros y nunca tiene las filas en
+        memoria. Al final se compara el total cargado con el de la colección.
+        """
         print("📊 Cargando usuarios de MongoDB a Spark...")
         start_time = time.time()
         
@@ -90,17 +117,14 @@ class SparkMongoAnalyzer:
             db = self.mongo_client[DATABASE_NAME]
             collection = db[COLLECTION_NAME]
             
-            # Contar documentos
-            total_docs = collection.count_documents({})
+            # Contar documentos (estimado: no recorre la colección)
+            total_docs = collection.estimated_document_count()
             print(f"📈 Total usuarios en MongoDB: {total_docs:,}")
             
             if total_docs == 0:
                 print("⚠️ No hay usuarios en la base de datos")
                 return None
             
-            # Obtener datos por lotes para evitar problemas de memoria
-            print("⚡ Cargando datos en lotes...")
-            
             # Definir esquema para optimizar carga
             schema = StructType([
                 StructField("user_id", IntegerType(), True),
@@ -122,72 +146,43 @@ class SparkMongoAnalyzer:
                 ]), True)
             ])
             
-            # Convertir documentos MongoDB a lista de filas
-            batch_size = 50000  # Procesar en lotes de 50K
-            all_rows = []
-            processed = 0
+            # Particiones de lectura (rangos de una muestra aleatoria de `field` + el resto)
+            filters = mongo_partitions.partition_filters(collection, partitions, field)
+            print(f"⚡ Leyendo {len(filters)} particiones de '{field}' en paralelo...")
             
-            cursor = collection.find({}, {
-                "_id": 0,  # Excluir _id de MongoDB
-                "user_id": 1,
-                "email": 1,
-                "first_name": 1,
-                "last_name": 1,
-                "department": 1,
-                "role": 1,
-                "phone": 1,
-                "is_active": 1,
-                "created_at": 1,
-                "last_login": 1,
-                "login_count": 1,
-                "profile.position": 1,
-                "profile.employee_id": 1,
-                "profile.salary_range": 1,
-                "profile.location": 1
-            }).batch_size(batch_size)
+            # Los workers de Python importan mongo_partitions desde aquí
+            self.spark.sparkContext.addPyFile(mongo_partitions.__file__)
+            mongo_uri, batch_size = MONGO_URI, INGEST_BATCH_SIZE
             
-            for doc in cursor:
-                # Convertir documento a fila de Spark
-                profile = doc.get('profile', {})
-                row_data = (
-                    doc.get('user_id'),
-                    doc.get('email'),
-                    doc.get('first_name'),
-                    doc.get('last_name'),
-                    doc.get('department'),
-                    doc.get('role'),
-                    doc.get('phone'),
-                    doc.get('is_active'),
-                    doc.get('created_at'),
-                    doc.get('last_login'),
-                    doc.get('login_count', 0),
-                    (
-                        profile.get('position'),
-                        profile.get('employee_id'),
-                        profile.get('salary_range'),
-                        profile.get('location')
-                    )
-                )
-                all_rows.append(row_data)
-                processed += 1
-                
-                if processed % batch_size == 0:
-                    print(f"   📦 Procesados: {processed:,}/{total_docs:,} usuarios")
+            def read_partitions(batches):
+                import mongo_partitions as mp
+                for batch in batches:
+                    for index in batch.column("id").to_pylist():
+                        yield from mp.read_partition_batches(
+                            mongo_uri, DATABASE_NAME, COLLECTION_NAME, filters[index], batch_size
+                        )
             
-            # Crear DataFrame de Spark
-            print("🔄 Creando Spark DataFrame...")
-            self.df_users = self.spark.createDataFrame(all_rows, schema)
+            # Un índice de filtro por partición de Spark
+            self.df_users = self.spark.range(0, len(filters), 1, len(filters)) \
+                .mapInArrow(read_partitions, schema)
             
             # Cachear DataFrame para consultas rápidas
             self.df_users.cache()
             
-            # Trigger acción para materializeor
+            # Trigger acción para materializar (lanza la lectura paralela)
             count = self.df_users.count()
             
             load_time = time.time() - start_time
             print(f"✅ Datos cargados en Spark: {count:,} usuarios")
+            expected = mongo_partitions.count_mismatch(collection, count)
+            if expected is not None:
+                print(f"⚠️ MongoDB tiene {expected:,} usuarios y se cargaron {count:,} "
+                      f"(¿cambió la colección durante la carga?)")
             print(f"⏱️ Tiempo de carga: {load_time:.2f} segundos")
             print(f"🚀 Velocidad: {count/load_time:.0f} registros/segundo")
+            peak_rss = mongo_partitions.peak_rss_mb()
+            if peak_rss is not None:
+                print(f"🧠 RSS máximo del driver (Python): {peak_rss:,.0f} MB")
             
             return self.df_users
             
@@ -195,6 +190,42 @@ class SparkMongoAnalyzer:
             print(f"❌ Error cargando datos: {e}")
             return None
     
+    def load_users_from_snapshot(self):
+        """
+        Cargar usuarios desde el snapshot Parquet local
+
+        Primero se traen de MongoDB sólo los cambios desde la última marca de
+        agua (users_snapshot.py). El DataFrame no se cachea: cada consulta lee
+        sólo las columnas que usa, y los filtros por departamento descartan
+        particiones completas (por ejemplo en las pruebas de rendimiento).
+        """
+        print("📁 Cargando usuarios desde el snapshot Parquet...")
+        start_time = time.time()
+        
+        try:
+            snapshot = UsersSnapshot()
+            collection = self.mongo_client[DATABASE_NAME][COLLECTION_NAME]
+            stats = snapshot.refresh(
+                collection,
+                on_progress=lambda processed: print(f"   📦 Combinados: {processed:,} usuarios")
+            )
+            print(f"🔄 Refresco {stats['mode']}: {stats['changed']:,} usuarios de MongoDB, "
+                  f"{stats['partitions_written']} particiones reescritas")
+            
+            self.df_users = self.spark.read.parquet(snapshot.directory) \
+                .drop("_id", "updated_at")
+            
+            count = self.df_users.count()
+            load_time = time.time() - start_time
+            print(f"✅ Snapshot listo en Spark: {count:,} usuarios")
+            print(f"⏱️ Tiempo de carga: {load_time:.2f} segundos")
+            
+            return self.df_users
+            
+        except Exception as e:
+            print(f"❌ Error cargando el snapshot: {e}")
+            return None
+    
     def basic_analytics(self):
         """Realizar análisis básico de los datos"""
         if self.df_users is None:
@@ -366,37 +397,83 @@ class SparkMongoAnalyzer:
         print(f"   📊 Agregación: {test2_time:.3f}s") 
         print(f"   🔄 Join: {test3_time:.3f}s")
         
-    def export_analysis_results(self):
-        """Exportar resultados de análisis"""
+    def export_analysis_results(self, compression=EXPORT_COMPRESSION, target_file_mb=EXPORT_TARGET_FILE_MB,
+                                csv=EXPORT_CSV):
+        """
+        Exportar resultados de análisis en Parquet
+
+        Cada resultado es un dataset Parquet con la compresión elegida y
+        archivos de ~target_file_mb (ver analysis_results.write_dataset); las
+        estadísticas por departamento y rol quedan particionadas por
+        departamento. Al final se escribe el manifiesto _SUCCESS con el origen
+        (URI, base y colección) y las filas y archivos de cada dataset. Con csv=True se agrega una vista CSV de
+        cada resultado, leída del Parquet ya escrito.
+        """
         if self.df_users is None:
             print("❌ No hay datos cargados")
             return
         
-        print("\n💾 Exportando resultados de análisis...")
+        print(f"\n💾 Exportando resultados de análisis (Parquet, {compression})...")
+        start_time = time.time()
         
         try:
-            # Crear directorio de resultados
-            results_dir = "spark_analysis_results"
+            # Crear directorio de resultados; sin manifiesto hasta terminar
+            results_dir = analysis_results.EXPORT_DIR
             os.makedirs(results_dir, exist_ok=True)
+            analysis_results.clear_manifest(results_dir)
             
-            # Exportar distribución por roles
-            role_dist = self.df_users.groupBy("role").count().orderBy(desc("count"))
-            role_dist.coalesce(1).write.mode("overwrite").option("header", "true").csv(f"{results_dir}/role_distribution")
+            active = sum(when(col("is_active"), 1).otherwise(0)).alias("active_users")
+            salary_column = "profile.salary_range" if "profile" in self.df_users.columns else "salary_range"
+            session_tz = self.spark.conf.get("spark.sql.session.timeZone")
             
-            # Exportar distribución por departamentos
-            dept_dist = self.df_users.groupBy("department").count().orderBy(desc("count"))
-            dept_dist.coalesce(1).write.mode("overwrite").option("header", "true").csv(f"{results_dir}/department_distribution")
-            
-            # Exportar estadísticas por departamento y rol
-            stats_df = self.df_users.groupBy("department", "role") \
-                .agg(
+            datasets = {
+                # Distribución por roles
+                "role_distribution": (self.df_users.groupBy("role").agg(count("*").alias("count"), active), None),
+                # Distribución por departamentos
+                "department_distribution": (self.df_users.groupBy("department").agg(
+                    count("*").alias("count"), active, avg("login_count").alias("avg_logins")
+                ), None),
+                # Estadísticas por departamento y rol (particionadas por departamento)
+                "detailed_statistics": (self.df_users.groupBy("department", "role").agg(
                     count("*").alias("total_users"),
-                    sum(when(col("is_active"), 1).otherwise(0)).alias("active_users"),
-                    avg("login_count").alias("avg_logins")
+                    active,
+                    avg("login_count").alias("avg_logins"),
+                    sum("login_count").alias("total_logins"),
+                    max("login_count").alias("max_logins")
+                ), ["department"]),
+                # Actividad por rango salarial
+                "salary_activity": (self.df_users.groupBy(col(salary_column).alias("salary_range")).agg(
+                    count("*").alias("users"), avg("login_count").alias("avg_logins")
+                ), None),
+                # Altas por día (fecha en UTC, como $dateToString de MongoDB)
+                "daily_registrations": (self.df_users.filter(col("created_at").isNotNull())
+                    .groupBy(to_date(to_utc_timestamp(col("created_at"), session_tz)).alias("date"))
+                    .count(), None),
+            }
+            
+            manifest = analysis_results.new_manifest(
+                compression, target_file_mb, self.df_users.count(),
+                analysis_results.source_info(MONGO_URI, DATABASE_NAME, COLLECTION_NAME),
+            )
+            for name, (result, partition_by) in datasets.items():
+                entry = analysis_results.write_dataset(
+                    result, os.path.join(results_dir, name), compression, target_file_mb, partition_by
                 )
-            stats_df.coalesce(1).write.mode("overwrite").option("header", "true").csv(f"{results_dir}/detailed_statistics")
+                manifest["datasets"][name] = entry
+                print(f"   📦 {name}: {entry['rows']:,} filas en {entry['files']} archivos "
+                      f"({entry['bytes'] / 1024:.1f} KB)")
+            
+            # Vista CSV opcional (a partir del Parquet, sin recalcular)
+            if csv:
+                for name, entry in manifest["datasets"].items():
+                    self.spark.read.parquet(os.path.join(results_dir, entry["path"])) \
+                        .coalesce(1).write.mode("overwrite").option("header", "true") \
+                        .csv(os.path.join(results_dir, "csv", name))
+                    manifest["csv"].append(name)
+            
+            analysis_results.write_manifest(results_dir, manifest)
             
-            print(f"✅ Resultados exportados a: {results_dir}/")
+            print(f"✅ Resultados exportados a: {results_dir}/ en {time.time() - start_time:.2f} segundos")
             
         except Exception as e:
             print(f"❌ Error exportando: {e}")
@@ -442,10 +519,11 @@ def main():
             print("3. 🚀 Pruebas de rendimiento")
             print("4. 💾 Exportar resultados")
             print("5. 🔄 Recargar datos")
-            print("6. ❌ Salir")
+            print("6. 📁 Usar snapshot Parquet (sólo trae los cambios)")
+            print("7. ❌ Salir")
             print("-"*50)
             
-            choice = input("Selecciona una opción (1-6): ").strip()
+            choice = input("Selecciona una opción (1-7): ").strip()
             
             if choice == "1":
                 analyzer.basic_analytics()
@@ -454,10 +532,13 @@ def main():
             elif choice == "3":
                 analyzer.performance_tests()
             elif choice == "4":
-                analyzer.export_analysis_results()
+                csv = input("¿Generar también vista CSV? (s/N): ").strip().lower() == "s"
+                analyzer.export_analysis_results(csv=csv or EXPORT_CSV)
             elif choice == "5":
                 analyzer.load_users_to_spark()
             elif choice == "6":
+                analyzer.load_users_from_snapshot()
+            elif choice == "7":
                 print("👋 Saliendo...")
                 break
             else:
@@ -18,6 +18,12 @@ import seaborn as sns
 from pymongo import MongoClient
 import time
 
+from mongo_partitions import count_mismatch
+from users_frame import load_users_frame
+from users_snapshot import UsersSnapshot
+from department_reports import department_metrics, generate_department_reports
+from analysis_results import AnalysisResults
+
 # Configurar codificación UTF-8 para Windows
 if sys.platform == "win32":
     sys.stdout.reconfigure(encoding='utf-8') if hasattr(sys.stdout, 'reconfigure') else None
@@ -27,6 +33,12 @@ MONGO_URI = "mongodb://localhost:27017"
 DATABASE_NAME = "eu_utvt_db"
 COLLECTION_NAME = "users"
 
+# Carga completa: rangos de _id (más los documentos fuera de ellos) leídos en paralelo
+LOAD_PARTITIONS = 8
+
+# Resultados de spark_mongo_analytics.py que usa el reporte ejecutivo precalculado
+EXECUTIVE_DATASETS = ["detailed_statistics", "department_distribution", "salary_activity", "daily_registrations"]
+
 def safe_print(text):
     """Imprimir texto de forma segura en Windows"""
     try:
@@ -42,6 +54,7 @@ class MongoReportGenerator:
         self.db = None
         self.collection = None
         self.df_users = None
+        self.department_timings = None
         
     def connect_mongo(self):
         """Conectar a MongoDB"""
@@ -76,58 +89,21 @@ class MongoReportGenerator:
             else:
                 safe_print(f"📦 Cargando todos los {load_limit:,} usuarios")
             
-            # Proyección optimizada
-            projection = {
-                "_id": 0, "user_id": 1, "email": 1, "first_name": 1, "last_name": 1,
-                "department": 1, "role": 1, "phone": 1, "is_active": 1,
-                "created_at": 1, "last_login": 1, "login_count": 1,
-                "profile.position": 1, "profile.employee_id": 1,
-                "profile.salary_range": 1, "profile.location": 1
-            }
-            
-            # Obtener datos
-            cursor = self.collection.find({}, projection).limit(load_limit)
-            data = []
-            processed = 0
-            
-            for doc in cursor:
-                profile = doc.get('profile', {})
-                flat_doc = {
-                    'user_id': doc.get('user_id'),
-                    'email': doc.get('email'),
-                    'first_name': doc.get('first_name'),
-                    'last_name': doc.get('last_name'),
-                    'department': doc.get('department'),
-                    'role': doc.get('role'),
-                    'phone': doc.get('phone'),
-                    'is_active': doc.get('is_active'),
-                    'created_at': doc.get('created_at'),
-                    'last_login': doc.get('last_login'),
-                    'login_count': doc.get('login_count', 0),
-                    'position': profile.get('position'),
-                    'employee_id': profile.get('employee_id'),
-                    'salary_range': profile.get('salary_range'),
-                    'location': profile.get('location')
-                }
-                data.append(flat_doc)
-                processed += 1
-                
-                if processed % 50000 == 0:
-                    safe_print(f"   📦 Procesados: {processed:,}/{load_limit:,}")
-            
-            # Crear DataFrame
-            self.df_users = pd.DataFrame(data)
-            
-            # Convertir tipos
-            if not self.df_users.empty:
-                self.df_users['created_at'] = pd.to_datetime(self.df_users['created_at'])
-                self.df_users['last_login'] = pd.to_datetime(self.df_users['last_login'])
-                self.df_users['is_active'] = self.df_users['is_active'].astype(bool)
-                self.df_users['login_count'] = pd.to_numeric(self.df_users['login_count'], errors='coerce').fillna(0)
+            # Carga columnar tipada (categóricos, int32, datetime64) por lotes BSON
+            self.df_users = load_users_frame(
+                self.collection,
+                limit=load_limit if load_limit < total_docs else None,
+                partitions=LOAD_PARTITIONS,
+                on_progress=lambda processed: safe_print(f"   📦 Procesados: {processed:,}/{load_limit:,}")
+            )
             
             load_time = time.time() - start_time
             count = len(self.df_users)
             safe_print(f"✅ Datos cargados: {count:,} usuarios en {load_time:.2f}s")
+            expected = count_mismatch(self.collection, count) if load_limit >= total_docs else None
+            if expected is not None:
+                safe_print(f"⚠️ MongoDB tiene {expected:,} usuarios y se cargaron {count:,} "
+                           f"(¿cambió la colección durante la carga?)")
             
             return self.df_users
             
@@ -135,35 +111,122 @@ class MongoReportGenerator:
             safe_print(f"❌ Error cargando datos: {e}")
             return None
     
-    def generate_executive_summary(self):
-        """Generar reporte ejecutivo profesional"""
-        safe_print("📊 Generando Reporte Ejecutivo...")
-        
-        if self.df_users is None or self.df_users.empty:
-            safe_print("❌ No hay datos cargados")
-            return
+    def load_users_from_snapshot(self):
+        """Refrescar el snapshot Parquet local (sólo cambios) y cargarlo"""
+        safe_print("📁 Cargando usuarios desde el snapshot Parquet...")
+        start_time = time.time()
         
-        # Métricas principales
+        try:
+            snapshot = UsersSnapshot()
+            stats = snapshot.refresh(
+                self.collection,
+                on_progress=lambda processed: safe_print(f"   📦 Combinados: {processed:,}")
+            )
+            safe_print(f"🔄 Refresco {stats['mode']}: {stats['changed']:,} usuarios de MongoDB, "
+                       f"{stats['partitions_written']} particiones reescritas")
+            
+            self.df_users = snapshot.read_frame()
+            
+            load_time = time.time() - start_time
+            safe_print(f"✅ Datos cargados: {len(self.df_users):,} usuarios en {load_time:.2f}s")
+            
+            return self.df_users
+            
+        except Exception as e:
+            safe_print(f"❌ Error cargando el snapshot: {e}")
+            return None
+    
+    def _executive_stats_from_frame(self):
+        """Métricas del reporte ejecutivo calculadas sobre los usuarios cargados"""
         total_users = len(self.df_users)
-        active_users = self.df_users['is_active'].sum()
-        activity_rate = (active_users / total_users) * 100
+        active_users = int(self.df_users['is_active'].sum())
         
         # Distribución por roles
-        role_stats = self.df_users.groupby('role').agg({
+        role_stats = self.df_users.groupby('role', observed=True).agg({
             'user_id': 'count',
             'is_active': 'sum',
             'login_count': 'mean'
         }).round(2)
         role_stats.columns = ['total', 'active', 'avg_logins']
-        role_stats = role_stats.sort_values('total', ascending=False)
         
         # Distribución por departamentos
-        dept_stats = self.df_users.groupby('department').agg({
+        dept_stats = self.df_users.groupby('department', observed=True).agg({
             'user_id': 'count',
             'is_active': 'sum',
             'login_count': 'mean'
         }).round(2)
         dept_stats.columns = ['total_users', 'active_users', 'avg_logins']
+        
+        # Actividad por rangos salariales
+        salary_activity = None
+        if 'salary_range' in self.df_users.columns:
+            salary_activity = self.df_users.groupby('salary_range', observed=True).agg({
+                'user_id': 'count',
+                'login_count': 'mean'
+            }).round(2)
+            salary_activity.columns = ['users', 'avg_activity']
+        
+        # Análisis temporal
+        recent_users = None
+        if 'created_at' in self.df_users.columns and self.df_users['created_at'].notna().any():
+            recent_users = int((self.df_users['created_at'] >= (datetime.now() - timedelta(days=30))).sum())
+        
+        return total_users, active_users, role_stats, dept_stats, salary_activity, recent_users
+    
+    def _executive_stats_from_results(self, results):
+        """Las mismas métricas, leídas de los resultados exportados por Spark (sin recalcular)"""
+        detailed = results.read('detailed_statistics', columns=['role', 'total_users', 'active_users', 'total_logins'])
+        total_users = int(detailed['total_users'].sum())
+        active_users = int(detailed['active_users'].sum())
+        role_stats = detailed.groupby('role').agg(
+            total=('total_users', 'sum'), active=('active_users', 'sum'), total_logins=('total_logins', 'sum')
+        )
+        role_stats['avg_logins'] = (role_stats['total_logins'] / role_stats['total']).round(2)
+        role_stats = role_stats[['total', 'active', 'avg_logins']]
+        
+        dept_stats = results.read('department_distribution').dropna(subset=['department'])
+        dept_stats = dept_stats.set_index('department')[['count', 'active_users', 'avg_logins']].round(2)
+        dept_stats.columns = ['total_users', 'active_users', 'avg_logins']
+        
+        salary_activity = results.read('salary_activity').set_index('salary_range').round(2)
+        salary_activity.columns = ['users', 'avg_activity']
+        
+        # Altas por día: basta sumar los últimos 30 días
+        daily = results.read('daily_registrations')
+        since = (datetime.now() - timedelta(days=30)).date()
+        recent_users = int(daily.loc[daily['date'] >= since, 'count'].sum())
+        
+        return total_users, active_users, role_stats, dept_stats, salary_activity, recent_users
+    
+    def generate_executive_summary(self, precomputed=False):
+        """
+        Generar reporte ejecutivo profesional
+
+        Con precomputed=True las métricas salen de los resultados Parquet que
+        exporta spark_mongo_analytics.py (ver analysis_results.py) en lugar de
+        recalcularse sobre los usuarios cargados.
+        """
+        safe_print("📊 Generando Reporte Ejecutivo...")
+        
+        source = "MongoDB + Pandas"
+        if precomputed:
+            results = AnalysisResults()
+            if not results.available(*EXECUTIVE_DATASETS):
+                safe_print("❌ No hay resultados exportados por Spark (exportar desde spark_mongo_analytics.py)")
+                return
+            stats = self._executive_stats_from_results(results)
+            source = f"resultados de Spark del {results.generated_at():%Y-%m-%d %H:%M} UTC"
+        else:
+            if self.df_users is None or self.df_users.empty:
+                safe_print("❌ No hay datos cargados")
+                return
+            stats = self._executive_stats_from_frame()
+        total_users, active_users, role_stats, dept_stats, salary_activity, recent_users = stats
+        
+        # Métricas principales
+        activity_rate = (active_users / total_users) * 100
+        
+        role_stats = role_stats.sort_values('total', ascending=False)
         dept_stats = dept_stats.sort_values('total_users', ascending=False)
         
         # Generar reporte ejecutivo
@@ -201,18 +264,11 @@ class MongoReportGenerator:
         report += f"• Departamento con más usuarios: {most_users_dept.name} ({most_users_dept['total_users']:,} usuarios)\n"
         
         # Análisis temporal
-        if 'created_at' in self.df_users.columns and self.df_users['created_at'].notna().any():
-            recent_users = self.df_users[self.df_users['created_at'] >= (datetime.now() - timedelta(days=30))]
-            report += f"• Nuevos usuarios últimos 30 días: {len(recent_users):,}\n"
+        if recent_users is not None:
+            report += f"• Nuevos usuarios últimos 30 días: {recent_users:,}\n"
         
         # Actividad por rangos salariales
-        if 'salary_range' in self.df_users.columns:
-            salary_activity = self.df_users.groupby('salary_range').agg({
-                'user_id': 'count',
-                'login_count': 'mean'
-            }).round(2)
-            salary_activity.columns = ['users', 'avg_activity']
-            
+        if salary_activity is not None:
             report += f"\n💰 ACTIVIDAD POR RANGO SALARIAL\n"
             for salary, row in salary_activity.iterrows():
                 if pd.notna(salary):
@@ -220,7 +276,7 @@ class MongoReportGenerator:
         
         report += f"\n═══════════════════════════════════════════════════════\n"
         report += f"Generado: {timestamp}\n"
-        report += f"Sistema: EU-UTVT Analytics con MongoDB + Pandas\n"
+        report += f"Sistema: EU-UTVT Analytics con {source}\n"
         report += f"Datos analizados: {total_users:,} usuarios\n"
         report += f"═══════════════════════════════════════════════════════\n"
         
@@ -243,62 +299,19 @@ class MongoReportGenerator:
             safe_print("❌ No hay datos cargados")
             return
         
-        departments = self.df_users['department'].unique()
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         reports_dir = f"reportes_departamentos_{timestamp}"
         os.makedirs(reports_dir, exist_ok=True)
         
-        for dept in departments:
-            if pd.notna(dept):
-                safe_print(f"   📋 Procesando: {dept}")
-                
-                # Filtrar usuarios del departamento
-                dept_users = self.df_users[self.df_users['department'] == dept]
-                total_dept = len(dept_users)
-                active_dept = dept_users['is_active'].sum()
-                
-                # Análisis por roles en el departamento
-                role_analysis = dept_users.groupby('role').agg({
-                    'user_id': 'count',
-                    'is_active': 'sum',
-                    'login_count': ['mean', 'max']
-                }).round(2)
-                role_analysis.columns = ['total', 'active', 'avg_logins', 'max_logins']
-                
-                # Top usuarios más activos
-                top_users = dept_users.nlargest(10, 'login_count')[
-                    ['first_name', 'last_name', 'role', 'login_count', 'last_login']
-                ]
-                
-                # Generar reporte del departamento
-                dept_report = f"""
-REPORTE DEPARTAMENTAL - {dept.upper()}
-{"="*60}
-
-📊 RESUMEN
-• Total usuarios: {total_dept:,}
-• Usuarios activos: {active_dept:,} ({(active_dept/total_dept)*100:.1f}%)
-• Usuarios inactivos: {total_dept - active_dept:,}
-
-📋 DISTRIBUCIÓN POR ROLES
-"""
-                
-                for role, row in role_analysis.iterrows():
-                    pct = (row['total'] / total_dept) * 100
-                    dept_report += f"• {role.capitalize()}: {row['total']} usuarios ({pct:.1f}%) - {row['avg_logins']:.1f} logins promedio\n"
-                
-                dept_report += f"\n🏆 TOP 10 USUARIOS MÁS ACTIVOS\n"
-                for i, (_, user) in enumerate(top_users.iterrows(), 1):
-                    dept_report += f"{i:2d}. {user['first_name']} {user['last_name']} ({user['role']}) - {user['login_count']} logins\n"
-                
-                dept_report += f"\n{'='*60}\n"
-                
-                # Guardar reporte del departamento
-                safe_dept = dept.replace(' ', '_').replace('/', '_').replace('\\', '_')
-                filename = f"{reports_dir}/reporte_{safe_dept}.txt"
-                with open(filename, "w", encoding="utf-8") as f:
-                    f.write(dept_report)
+        # Una sola pasada de groupby para todos los departamentos; los archivos
+        # se renderizan y escriben en un pool de procesos
+        paths, self.department_timings = generate_department_reports(self.df_users, reports_dir)
+        for path in paths:
+            safe_print(f"   📋 {os.path.basename(path)}")
         
+        timings = self.department_timings
+        safe_print(f"⏱️ {timings['departamentos']} departamentos: agrupación {timings['agrupacion']:.3f}s, "
+                   f"renderizado {timings['renderizado']:.3f}s en {timings['procesos']} procesos")
         safe_print(f"✅ Reportes departamentales guardados en: {reports_dir}/")
     
     def generate_activity_trends(self):
@@ -416,7 +429,7 @@ ANÁLISIS DE TENDENCIAS DE ACTIVIDAD
         
         # Test 2: Agregación
         start_time = time.time()
-        agg_data = self.df_users.groupby(['department', 'role']).agg({
+        agg_data = self.df_users.groupby(['department', 'role'], observed=True).agg({
             'user_id': 'count',
             'login_count': ['mean', 'max', 'min']
         })
@@ -432,6 +445,11 @@ ANÁLISIS DE TENDENCIAS DE ACTIVIDAD
         search_results = self.df_users[self.df_users['email'].str.contains('utvt.edu.mx', na=False)]
         test4_time = time.time() - start_time
         
+        # Test 5: Métricas por departamento (un solo groupby)
+        start_time = time.time()
+        dept_metrics = department_metrics(self.df_users)
+        test5_time = time.time() - start_time
+        
         # Información del sistema
         system_info = {
             "total_records": total_records,
@@ -456,6 +474,7 @@ REPORTE DE RENDIMIENTO DEL SISTEMA
 • Test 2 - Agregación compleja: {test2_time:.3f}s ({len(agg_data)} grupos)
 • Test 3 - Ordenamiento masivo: {test3_time:.3f}s ({len(sorted_data):,} registros)
 • Test 4 - Búsqueda de patrones: {test4_time:.3f}s ({len(search_results):,} matches)
+• Test 5 - Métricas por departamento: {test5_time:.3f}s ({len(dept_metrics)} departamentos)
 
 📊 MÉTRICAS DE RENDIMIENTO
 • Velocidad de filtrado: {len(filtered_data)/test1_time:.0f} registros/s
@@ -483,6 +502,14 @@ REPORTE DE RENDIMIENTO DEL SISTEMA
         perf_report += f"• 📈 Sistema optimizado para datasets de {total_records:,} registros\n"
         perf_report += f"• 🚀 Escalable hasta 10M+ registros con configuración actual\n"
         
+        # Desglose de la última generación de reportes por departamento
+        timings = self.department_timings
+        if timings:
+            perf_report += f"\n🏢 REPORTES POR DEPARTAMENTO (última generación)\n"
+            perf_report += f"• Agrupación (una pasada): {timings['agrupacion']:.3f}s\n"
+            perf_report += f"• Renderizado y escritura: {timings['renderizado']:.3f}s ({timings['procesos']} procesos)\n"
+            perf_report += f"• Total: {timings['total']:.3f}s para {timings['departamentos']} departamentos\n"
+        
         perf_report += f"\n{'='*60}\n"
         
         safe_print(perf_report)
@@ -517,9 +544,11 @@ def main():
         safe_print("1. Analisis rapido (500K usuarios)")
         safe_print("2. Analisis completo (todos los usuarios)")
         safe_print("3. Analisis personalizado")
+        safe_print("4. Analisis completo desde el snapshot Parquet (solo trae los cambios)")
         
-        choice = input("\nSelecciona opcion (1-3): ").strip()
+        choice = input("\nSelecciona opcion (1-4): ").strip()
         
+        use_snapshot = choice == "4"
         if choice == "1":
             limit = 500000
         elif choice == "2":
@@ -529,11 +558,18 @@ def main():
                 limit = int(input("Numero de usuarios a analizar: "))
             except:
                 limit = 500000
+        elif choice == "4":
+            limit = None
         else:
             limit = 500000
         
+        def load():
+            if use_snapshot:
+                return generator.load_users_from_snapshot()
+            return generator.load_users_data(limit)
+        
         # Cargar datos
-        df = generator.load_users_data(limit)
+        df = load()
         if df is None or df.empty:
             safe_print("No se pudieron cargar los datos")
             return
@@ -549,10 +585,11 @@ def main():
             safe_print("4. Reporte de rendimiento")
             safe_print("5. Generar todos los reportes")
             safe_print("6. Recargar datos")
-            safe_print("7. Salir")
+            safe_print("7. Reporte ejecutivo precalculado (resultados Parquet de Spark)")
+            safe_print("8. Salir")
             safe_print("-"*50)
             
-            choice = input("Selecciona una opcion (1-7): ").strip()
+            choice = input("Selecciona una opcion (1-8): ").strip()
             
             if choice == "1":
                 generator.generate_executive_summary()
@@ -570,10 +607,12 @@ def main():
                 generator.generate_performance_report()
                 safe_print("Todos los reportes generados")
             elif choice == "6":
-                df = generator.load_users_data(limit)
+                df = load()
                 if df is None:
                     safe_print("Error recargando datos")
             elif choice == "7":
+                generator.generate_executive_summary(precomputed=True)
+            elif choice == "8":
                 safe_print("Saliendo...")
                 break
             else:
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Carga columnar y tipada de usuarios de MongoDB a pandas
+
+Cada lote crudo de BSON (find_raw_batches) se convierte directamente en un
+pyarrow.RecordBatch: nunca se arma la lista de diccionarios por usuario. Los
+campos de baja cardinalidad (departamento, rol, ubicación, nombres...) quedan
+como categóricos, los identificadores como cadenas Arrow, y el resto como
+int32 / bool / datetime64. Con varias particiones, los rangos de `_id` se leen
+en paralelo (un cursor por rango), y la conversión de los lotes se reparte
+entre varios procesos.
+
+Lo usan MongoReportGenerator (spark_reports_java8.py) y MongoAnalyzer
+(scripts/mongo_analytics_java8.py), directamente o a través del snapshot
+Parquet de users_snapshot.py.
+
+Autor: Sistema EU-UTVT
+Fecha: Octubre 2025
+"""
+
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+
+from mongo_partitions import USER_PROJECTION, partition_filters, raw_batch_to_record_batch
+
+# Pocos valores distintos: categóricos (índices int8/int16 + un diccionario)
+CATEGORICAL_COLUMNS = ["first_name", "last_name", "department", "role", "position", "salary_range", "location"]
+
+
+def users_schema():
+    """Columnas planas del DataFrame de usuarios (profile.* sin prefijo)"""
+    category = pa.dictionary(pa.int32(), pa.string())
+    types = {
+        "user_id": pa.int32(),
+        "email": pa.string(),
+        "first_name": category,
+        "last_name": category,
+        "department": category,
+        "role": category,
+        "phone": pa.string(),
+        "is_active": pa.bool_(),
+        "created_at": pa.timestamp("ms"),
+        "last_login": pa.timestamp("ms"),
+        "login_count": pa.int32(),
+        "position": category,
+        "employee_id": pa.string(),
+        "salary_range": category,
+        "location": category,
+    }
+    return pa.schema(list(types.items()))
+
+
+def _convert_raw_batch(raw):
+    """En un proceso del pool: lote crudo -> RecordBatch serializado (Arrow IPC)"""
+    batch = raw_batch_to_record_batch(raw, users_schema())
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def _read_ipc(payload):
+    return pa.ipc.open_stream(payload).read_next_batch()
+
+
+def _raw_batches(collection, filters, batch_size, limit, max_pending):
+    """Lotes crudos de todas las particiones; con varias, un hilo (cursor) por partición"""
+    def cursor(query):
+        return collection.find_raw_batches(
+            query, dict(USER_PROJECTION), batch_size=batch_size, limit=limit or 0
+        )
+
+    if len(filters) == 1:
+        yield from cursor(filters[0])
+        return
+
+    done = object()
+    pending = queue.Queue(maxsize=max_pending)
+    errors = []
+
+    def read(query):
+        try:
+            for raw in cursor(query):
+                pending.put(raw)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            pending.put(done)
+
+    threads = [threading.Thread(target=read, args=(query,), daemon=True) for query in filters]
+    for thread in threads:
+        thread.start()
+    remaining = len(threads)
+    while remaining:
+        raw = pending.get()
+        if raw is done:
+            remaining -= 1
+        else:
+            yield raw
+    if errors:
+        raise errors[0]
+
+
+def load_users_frame(collection, limit=None, partitions=1, field="_id", batch_size=50000,
+                     workers=None, on_progress=None):
+    """
+    DataFrame tipado con los usuarios de `collection`.
+
+    partitions > 1 divide la colección en rangos de `field` más una
+    partición para los documentos sin el campo o de otro tipo (ver
+    mongo_partitions.partition_filters) y abre un cursor por partición en
+    paralelo; con `limit` se usa un solo cursor. La decodificación de BSON y la
+    conversión a Arrow (la parte que usa CPU) se reparte entre `workers`
+    procesos (por defecto uno por núcleo; 0 o 1 = en este proceso), con un
+    número acotado de lotes en vuelo. on_progress(procesados) se llama
+    después de cada lote.
+    """
+    schema = users_schema()
+    filters = [{}] if limit or partitions <= 1 else partition_filters(collection, partitions, field)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    max_pending = max(2, 2 * workers)
+    raw_batches = _raw_batches(collection, filters, batch_size, limit, max_pending)
+
+    batches = []
+    processed = 0
+
+    def collect(batch):
+        nonlocal processed
+        batches.append(batch)
+        processed += batch.num_rows
+        if on_progress:
+            on_progress(processed)
+
+    if workers <= 1:
+        for raw in raw_batches:
+            collect(raw_batch_to_record_batch(raw, schema))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = deque()
+            for raw in raw_batches:
+                in_flight.append(pool.submit(_convert_raw_batch, raw))
+                if len(in_flight) >= max_pending:
+                    collect(_read_ipc(in_flight.popleft().result()))
+            while in_flight:
+                collect(_read_ipc(in_flight.popleft().result()))
+
+    table = pa.Table.from_batches(batches, schema=schema)
+    del batches
+    return table_to_frame(table)
+
+
+def table_to_frame(table):
+    """
+    pyarrow.Table de usuarios -> DataFrame con los tipos de load_users_frame.
+    Las columnas de CATEGORICAL_COLUMNS que lleguen como cadenas (por ejemplo
+    leídas de Parquet) se codifican como diccionario; las fechas con zona se
+    dejan en UTC sin zona, como las devuelve MongoDB.
+    """
+    for i, field in enumerate(table.schema):
+        column = table.column(i)
+        if field.name in CATEGORICAL_COLUMNS and not pa.types.is_dictionary(field.type):
+            column = column.cast(pa.string()).dictionary_encode()
+        elif pa.types.is_timestamp(field.type) and field.type.tz is not None:
+            column = column.cast(pa.timestamp("ms"))
+        else:
+            continue
+        table = table.set_column(i, field.name, column)
+
+    table = table.unify_dictionaries()
+    df = table.to_pandas(
+        types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get,
+        split_blocks=True,
+        self_destruct=True,
+    )
+    del table
+
+    # Categorías en orden alfabético: sort_values/sort_index se comportan como con cadenas
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].cat.reorder_categories(sorted(df[column].cat.categories))
+    return df
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Snapshot local de usuarios en Parquet, particionado por departamento
+
+La colección `users` se copia una vez a data/users_snapshot/ con la
+estructura de particiones de Hive (department=<valor>/part-*.parquet). Cada
+refresco trae de MongoDB sólo los documentos cambiados desde la última marca
+de agua (`updated_at` >= marca, o `_id` mayor que el último leído para los
+documentos nuevos sin `updated_at`) y los combina por `_id`: sólo se
+reescriben las particiones de los departamentos afectados. La marca de agua
+se guarda en _watermark.json dentro del mismo directorio.
+
+Los análisis leen el snapshot con pyarrow.dataset (o spark.read.parquet):
+sólo las columnas pedidas, y los filtros por departamento descartan
+particiones completas sin abrirlas.
+
+Limitaciones: los borrados y los cambios que no actualizan `updated_at`
+(p. ej. sólo last_login) no se ven en un refresco incremental; `--completo`
+reconstruye el snapshot desde cero.
+
+Uso:
+    python spark/users_snapshot.py              # refresco incremental
+    python spark/users_snapshot.py --completo   # reconstrucción completa
+    python spark/users_snapshot.py --info
+
+Autor: Sistema EU-UTVT
+Fecha: Octubre 2025
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from bson import ObjectId
+
+from mongo_partitions import USER_PROJECTION, raw_batch_to_record_batch
+from users_frame import table_to_frame, users_schema
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "users_snapshot")
+WATERMARK_FILE = "_watermark.json"
+PARTITION_COLUMN = "department"
+# Nombre de la partición para usuarios sin departamento (el que usan Hive, Spark y Arrow)
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+# Caracteres que no pueden ir tal cual en un nombre de directorio de partición
+_UNSAFE = set('"#%\'*/:=?\\{}[]^|<>') | {chr(c) for c in range(32)} | {"\x7f"}
+
+SNAPSHOT_PROJECTION = {**USER_PROJECTION, "_id": 1, "updated_at": 1}
+
+
+def snapshot_schema():
+    """
+    Esquema de los archivos Parquet: las columnas de users_schema() como
+    tipos planos (Parquet ya codifica por diccionario), más `_id` y
+    `updated_at`. Las fechas van en UTC para que Spark las lea como
+    TimestampType.
+    """
+    fields = [("_id", pa.string()), ("updated_at", pa.timestamp("us", tz="UTC"))]
+    for field in users_schema():
+        if pa.types.is_dictionary(field.type):
+            fields.append((field.name, pa.string()))
+        elif pa.types.is_timestamp(field.type):
+            fields.append((field.name, pa.timestamp("us", tz="UTC")))
+        else:
+            fields.append((field.name, field.type))
+    return pa.schema(fields)
+
+
+def file_schema():
+    """snapshot_schema() sin la columna de partición (va en el nombre del directorio)"""
+    schema = snapshot_schema()
+    return schema.remove(schema.get_field_index(PARTITION_COLUMN))
+
+
+def partition_name(department):
+    """department=<valor> con los caracteres problemáticos escapados como %XX"""
+    if department is None:
+        return f"{PARTITION_COLUMN}={NULL_PARTITION}"
+    escaped = "".join(f"%{ord(ch):02X}" if ch in _UNSAFE else ch for ch in department)
+    return f"{PARTITION_COLUMN}={escaped}"
+
+
+class UsersSnapshot:
+    """Snapshot Parquet de la colección de usuarios con refresco incremental"""
+
+    def __init__(self, directory=SNAPSHOT_DIR):
+        self.directory = directory
+
+    # ------------------------------------------------------------------ lectura
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.directory, WATERMARK_FILE))
+
+    def watermark(self):
+        """Marca de agua del último refresco (None si no hay snapshot)"""
+        try:
+            with open(os.path.join(self.directory, WATERMARK_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def dataset(self):
+        return ds.dataset(
+            self.directory,
+            format="parquet",
+            partitioning=ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive"),
+        )
+
+    def _filter(self, departments=None, active_only=False, expression=None):
+        conditions = []
+        if departments is not None:
+            conditions.append(ds.field(PARTITION_COLUMN).isin(list(departments)))
+        if active_only:
+            conditions.append(ds.field("is_active") == True)  # noqa: E712 (expresión de Arrow)
+        if expression is not None:
+            conditions.append(expression)
+        combined = None
+        for condition in conditions:
+            combined = condition if combined is None else combined & condition
+        return combined
+
+    def read_table(self, columns=None, departments=None, active_only=False, expression=None):
+        """
+        pyarrow.Table con las columnas pedidas. `departments` descarta
+        particiones completas; `active_only` y `expression` (una expresión de
+        pyarrow.dataset) se evalúan con las estadísticas de cada row group.
+        """
+        return self.dataset().to_table(
+            columns=columns, filter=self._filter(departments, active_only, expression)
+        )
+
+    def read_frame(self, columns=None, departments=None, active_only=False, expression=None):
+        """
+        DataFrame con los mismos tipos que users_frame.load_users_frame. Sin
+        `columns` se leen las columnas de los análisis (sin `_id` ni
+        `updated_at`).
+        """
+        columns = columns or users_schema().names
+        return table_to_frame(self.read_table(columns, departments, active_only, expression))
+
+    def info(self):
+        """Filas, particiones, archivos y tamaño en disco del snapshot"""
+        files = []
+        partitions = set()
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".parquet"):
+                    files.append(os.path.join(root, name))
+                    partitions.add(os.path.basename(root))
+        rows = sum(pq.ParquetFile(path).metadata.num_rows for path in files)
+        return {
+            "rows": rows,
+            "partitions": len(partitions),
+            "files": len(files),
+            "size_mb": sum(os.path.getsize(path) for path in files) / (1024 * 1024),
+            "watermark": self.watermark(),
+        }
+
+    # --------------------------------------------------------------- escritura
+
+    def _write_watermark(self, directory, watermark):
+        path = os.path.join(directory, WATERMARK_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(watermark, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def _advance(watermark, table):
+        """Marca de agua con los máximos de `_id` y `updated_at` de `table`"""
+        watermark = dict(watermark)
+        max_id = pc.max(table.column("_id")).as_py()
+        if max_id and ObjectId.is_valid(max_id) and max_id > (watermark.get("_id") or ""):
+            watermark["_id"] = max_id
+        max_updated = pc.max(table.column("updated_at")).as_py()
+        if max_updated is not None:
+            max_updated = max_updated.isoformat()
+            if max_updated > (watermark.get("updated_at") or ""):
+                watermark["updated_at"] = max_updated
+        return watermark
+
+    def _batches(self, collection, query, batch_size):
+        schema = snapshot_schema()
+        for raw in collection.find_raw_batches(query, dict(SNAPSHOT_PROJECTION), batch_size=batch_size):
+            batch = raw_batch_to_record_batch(raw, schema)
+            if batch.num_rows:
+                yield pa.Table.from_batches([batch], schema=schema)
+
+    @staticmethod
+    def _split(table):
+        """(departamento, tabla sin la columna de partición) por cada departamento de `table`"""
+        departments = table.column(PARTITION_COLUMN)
+        data = table.drop_columns([PARTITION_COLUMN])
+        for department in pc.unique(departments).to_pylist():
+            mask = pc.is_null(departments) if department is None else pc.equal(departments, department)
+            yield department, data.filter(mask)
+
+    def build(self, collection, batch_size=50000, on_progress=None):
+        """
+        Reconstrucción completa: un archivo por departamento, escrito lote a
+        lote (la colección nunca está completa en memoria). Se escribe en un
+        directorio temporal que reemplaza al snapshot anterior al terminar.
+        """
+        start = time.time()
+        refreshed_at = datetime.now(timezone.utc).isoformat()
+        staging = f"{self.directory}.tmp-{uuid.uuid4().hex[:8]}"
+        os.makedirs(staging)
+        writers = {}
+        watermark = {}
+        rows = 0
+        try:
+            for table in self._batches(collection, {}, batch_size):
+                for department, part in self._split(table):
+                    if department not in writers:
+                        folder = os.path.join(staging, partition_name(department))
+                        os.makedirs(folder)
+                        writers[department] = pq.ParquetWriter(
+                            os.path.join(folder, f"part-{uuid.uuid4().hex}.parquet"), file_schema()
+                        )
+                    writers[department].write_table(part)
+                watermark = self._advance(watermark, table)
+                rows += table.num_rows
+                if on_progress:
+                    on_progress(rows)
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        watermark["refreshed_at"] = refreshed_at
+        self._write_watermark(staging, watermark)
+
+        previous = f"{self.directory}.old-{uuid.uuid4().hex[:8]}"
+        if os.path.exists(self.directory):
+            os.replace(self.directory, previous)
+        os.replace(staging, self.directory)
+        shutil.rmtree(previous, ignore_errors=True)
+        return {"mode": "full", "rows": rows, "changed": rows, "partitions_written": len(writers),
+                "seconds": time.time() - start}
+
+    def changes_query(self, watermark):
+        """Documentos modificados o insertados después de la marca de agua"""
+        conditions = []
+        # Sin ningún updated_at leído todavía, cuenta desde el inicio del último refresco
+        since = watermark.get("updated_at") or watermark.get("refreshed_at")
+        if since:
+            # >= : un documento con la misma fecha que la marca se vuelve a combinar (idempotente)
+            conditions.append({"updated_at": {"$gte": datetime.fromisoformat(since)}})
+        if watermark.get("_id"):
+            conditions.append({"_id": {"$gt": ObjectId(watermark["_id"])}})
+        if not conditions:
+            return {}
+        return conditions[0] if len(conditions) == 1 else {"$or": conditions}
+
+    def refresh(self, collection, batch_size=50000, on_progress=None):
+        """
+        Refresco incremental: trae los cambios desde la marca de agua y
+        reescribe sólo las particiones donde estaban o adonde van esos
+        usuarios (un usuario que cambia de departamento sale de la partición
+        anterior). Sin snapshot previo hace build().
+        """
+        watermark = self.watermark()
+        if watermark is None:
+            return self.build(collection, batch_size, on_progress)
+
+        start = time.time()
+        refreshed_at = datetime.now(timezone.utc).isoformat()
+        tables = list(self._batches(collection, self.changes_query(watermark), batch_size))
+        changed_rows = 0
+        written = 0
+        if tables:
+            changed = pa.concat_tables(tables)
+            del tables
+            # Si un documento llegó dos veces (p. ej. por $gte), gana la última versión leída
+            changed = changed.take(self._last_occurrence(changed.column("_id")))
+            changed_rows = changed.num_rows
+            if on_progress:
+                on_progress(changed.num_rows)
+            changed_ids = changed.column("_id").combine_chunks()
+
+            previous = self.dataset().to_table(
+                columns=[PARTITION_COLUMN], filter=ds.field("_id").isin(changed_ids)
+            ).column(PARTITION_COLUMN)
+            incoming = dict(self._split(changed))
+            affected = set(pc.unique(previous).to_pylist()) | set(incoming)
+            for department in affected:
+                self._rewrite_partition(department, changed_ids, incoming.get(department))
+                written += 1
+            watermark = self._advance(watermark, changed)
+
+        watermark["refreshed_at"] = refreshed_at
+        self._write_watermark(self.directory, watermark)
+        return {"mode": "incremental", "rows": self.info()["rows"],
+                "changed": changed_rows,
+                "partitions_written": written, "seconds": time.time() - start}
+
+    @staticmethod
+    def _last_occurrence(ids):
+        last = {}
+        for index, value in enumerate(ids.to_pylist()):
+            last[value] = index
+        return sorted(last.values())
+
+    def _rewrite_partition(self, department, changed_ids, incoming):
+        """Partición sin las versiones anteriores de `changed_ids`, más `incoming`"""
+        folder = os.path.join(self.directory, partition_name(department))
+        old_files = [os.path.join(folder, name) for name in os.listdir(folder)
+                     if name.endswith(".parquet")] if os.path.isdir(folder) else []
+        parts = []
+        if old_files:
+            kept = ds.dataset(old_files, schema=file_schema(), format="parquet").to_table(
+                filter=~ds.field("_id").isin(changed_ids)
+            )
+            parts.append(kept)
+        if incoming is not None:
+            parts.append(incoming.cast(file_schema()))
+        merged = pa.concat_tables(parts) if parts else None
+
+        if merged is not None and merged.num_rows:
+            os.makedirs(folder, exist_ok=True)
+            pq.write_table(merged, os.path.join(folder, f"part-{uuid.uuid4().hex}.parquet"))
+        for path in old_files:
+            os.remove(path)
+        if os.path.isdir(folder) and not os.listdir(folder):
+            os.rmdir(folder)
+
+
+def main():
+    from pymongo import MongoClient
+
+    parser = argparse.ArgumentParser(description="Snapshot Parquet de usuarios con refresco incremental")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="eu_utvt_db")
+    parser.add_argument("--coleccion", default="users")
+    parser.add_argument("--directorio", default=SNAPSHOT_DIR)
+    parser.add_argument("--completo", action="store_true", help="Reconstruir el snapshot desde cero")
+    parser.add_argument("--info", action="store_true", help="Sólo mostrar el estado del snapshot")
+    args = parser.parse_args()
+
+    snapshot = UsersSnapshot(args.directorio)
+    if not args.info:
+        client = MongoClient(args.uri)
+        try:
+            collection = client[args.db][args.coleccion]
+            if args.completo or not snapshot.exists():
+                print(f"📦 Reconstruyendo snapshot en {args.directorio}...")
+                stats = snapshot.build(collection, on_progress=lambda n: print(f"   📦 Escritos: {n:,} usuarios"))
+            else:
+                print(f"🔄 Refrescando snapshot desde {snapshot.watermark()}...")
+                stats = snapshot.refresh(collection)
+        finally:
+            client.close()
+        print(f"✅ {stats['changed']:,} usuarios combinados, {stats['partitions_written']} particiones "
+              f"reescritas en {stats['seconds']:.2f} s")
+
+    if not snapshot.exists():
+        print("⚠️ No hay snapshot todavía")
+        return
+    info = snapshot.info()
+    print(f"📁 {info['rows']:,} usuarios | {info['partitions']} departamentos | {info['files']} archivos | "
+          f"{info['size_mb']:.1f} MB")
+    print(f"🕒 Marca de agua: {info['watermark']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -421,11 +421,9 @@ async function verDetalles(solicitudId) {
                             ${solicitud.archivos_adjuntos.map(archivo => {
                                 // Construir la ruta completa del archivo
                                 let rutaCompleta = '';
-                                if (archivo.ruta) {
-                                    rutaCompleta = archivo.ruta;
-                                } else if (archivo.ruta_archivo) {
-                                    // Si solo tiene el nombre del archivo, construir la ruta
-                                    rutaCompleta = `/uploads/solicitudes/${archivo.ruta_archivo}`;
+                                if (archivo.ruta_archivo) {
+                                    // Ruta autorizada de descarga (no hay montaje público de uploads)
+                                    rutaCompleta = `/api/solicitudes/estandar/${solicitudId}/archivos/${encodeURIComponent(archivo.ruta_archivo)}`;
                                 } else {
                                     rutaCompleta = '#';
                                 }
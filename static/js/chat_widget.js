@@ -96,100 +96,178 @@ document.addEventListener('DOMContentLoaded', function () {
     appendMessage('bot', answer || 'Sin respuesta');
   }
 
-  async function sendMessage() {
-    if (busy) return;
-    const text = input.value.trim();
-    if (!text) return;
+  // Offer "adapt" / "escalate" when the bot could not resolve the question
+  function showActions(data, text) {
+    if (data.resolved) return;
 
-    appendMessage('user', text);
-    input.value = '';
+    const actions = document.createElement('div');
+    actions.className = 'chat-actions';
 
-    setBusy(true);
+    const adaptBtn = document.createElement('button');
+    adaptBtn.className = 'btn btn-secondary';
+    adaptBtn.textContent = 'Adaptar a mi caso';
+
+    const escBtn = document.createElement('button');
+    escBtn.className = 'btn btn-danger';
+    escBtn.textContent = 'Escalar al admin';
+
+    const originalMessage = text;
+    const snippet = (data.answer && data.answer.substring(0, 200)) || originalMessage;
+
+    adaptBtn.addEventListener('click', async function () {
+      if (busy) return;
+      adaptBtn.disabled = true;
+      adaptBtn.textContent = 'Adaptando...';
+      try {
+        const r = await fetch('/api/chat/adapt', {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ snippet })
+        });
+        if (r.ok) {
+          const jr = await r.json();
+          appendMessage('bot', jr.adapted_answer || 'No se pudo adaptar.');
+        } else {
+          appendMessage('bot', 'Error al adaptar. Intenta más tarde.');
+        }
+      } catch (e) {
+        console.error(e);
+        appendMessage('bot', 'Error al adaptar. Intenta más tarde.');
+      } finally {
+        adaptBtn.disabled = false;
+        adaptBtn.textContent = 'Adaptar a mi caso';
+      }
+    });
+
+    escBtn.addEventListener('click', async function () {
+      if (busy) return;
+      escBtn.disabled = true;
+      escBtn.textContent = 'Escalando...';
+      try {
+        const r = await fetch('/api/chat/escalate', {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ original_message: originalMessage })
+        });
+        if (r.ok) {
+          const jr = await r.json();
+          appendMessage('bot', 'He creado un ticket (#' + jr.ticket_id + '). El administrador recibirá un aviso: ' + jr.admin_email);
+        } else {
+          appendMessage('bot', 'Error al escalar. Intenta más tarde.');
+        }
+      } catch (e) {
+        console.error(e);
+        appendMessage('bot', 'Error al escalar. Intenta más tarde.');
+      } finally {
+        escBtn.disabled = false;
+        escBtn.textContent = 'Escalar al admin';
+      }
+    });
+
+    actions.appendChild(adaptBtn);
+    actions.appendChild(escBtn);
+    messages.appendChild(actions);
+  }
+
+  // Stream the answer over SSE (/api/chat/stream) into a bubble as it arrives.
+  // Returns the final data ({answer, resolved, source, admin_email}) or null if
+  // streaming is not available, so the caller can fall back to /api/chat/message.
+  async function streamMessage(text) {
+    let res;
     try {
-      const res = await fetch('/api/chat/message', {
+      res = await fetch('/api/chat/stream', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
         body: JSON.stringify({ message: text })
       });
+    } catch (e) {
+      return null;
+    }
+    if (!res.ok || !res.body || !res.body.getReader) return null;
+
+    const data = { answer: '', resolved: false };
+    let bubble = null;
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
 
-      if (!res.ok) {
-        appendMessage('bot', 'Error del servidor al procesar la petición.');
-        return;
+    function handleEvent(raw) {
+      let event = 'message';
+      const dataLines = [];
+      raw.split('\n').forEach(function (line) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+      });
+      if (!dataLines.length) return;
+      const payload = JSON.parse(dataLines.join('\n'));
+      if (event === 'meta') {
+        Object.assign(data, payload);
+      } else if (event === 'token') {
+        data.answer += payload.text;
+        if (!bubble) {
+          appendMessage('bot', '');
+          bubble = messages.lastChild.firstChild;
+        }
+        bubble.textContent = data.answer;
+        messages.scrollTop = messages.scrollHeight;
+      } else if (event === 'error') {
+        data.resolved = false;
+        data.error = payload.detail || 'Error del servidor al procesar la petición.';
       }
+    }
 
-  const data = await res.json().catch(() => ({ answer: 'Respuesta inválida del servidor.' }));
-  // Render the bot response in a friendly way
-  renderBotResponse(data);
+    while (true) {
+      const chunk = await reader.read();
+      if (chunk.done) break;
+      buffer += decoder.decode(chunk.value, { stream: true });
+      let sep;
+      while ((sep = buffer.indexOf('\n\n')) !== -1) {
+        handleEvent(buffer.slice(0, sep));
+        buffer = buffer.slice(sep + 2);
+      }
+    }
 
-      if (!data.resolved) {
-        const actions = document.createElement('div');
-        actions.className = 'chat-actions';
+    if (data.error && !data.answer) {
+      appendMessage('bot', data.error);
+    } else if (bubble && /<[^>]+>/.test(data.answer)) {
+      // answers with HTML snippets get the friendly rendering once complete
+      messages.removeChild(bubble.parentNode);
+      renderBotResponse(data);
+    } else if (!bubble) {
+      appendMessage('bot', data.answer || 'Sin respuesta');
+    }
+    return data;
+  }
 
-        const adaptBtn = document.createElement('button');
-        adaptBtn.className = 'btn btn-secondary';
-        adaptBtn.textContent = 'Adaptar a mi caso';
+  async function sendMessage() {
+    if (busy) return;
+    const text = input.value.trim();
+    if (!text) return;
 
-        const escBtn = document.createElement('button');
-        escBtn.className = 'btn btn-danger';
-        escBtn.textContent = 'Escalar al admin';
+    appendMessage('user', text);
+    input.value = '';
 
-        const originalMessage = text;
-        const snippet = (data.answer && data.answer.substring(0, 200)) || originalMessage;
-
-        adaptBtn.addEventListener('click', async function () {
-          if (busy) return;
-          adaptBtn.disabled = true;
-          adaptBtn.textContent = 'Adaptando...';
-          try {
-            const r = await fetch('/api/chat/adapt', {
-              method: 'POST',
-              headers: { 'Content-Type': 'application/json' },
-              body: JSON.stringify({ snippet })
-            });
-            if (r.ok) {
-              const jr = await r.json();
-              appendMessage('bot', jr.adapted_answer || 'No se pudo adaptar.');
-            } else {
-              appendMessage('bot', 'Error al adaptar. Intenta más tarde.');
-            }
-          } catch (e) {
-            console.error(e);
-            appendMessage('bot', 'Error al adaptar. Intenta más tarde.');
-          } finally {
-            adaptBtn.disabled = false;
-            adaptBtn.textContent = 'Adaptar a mi caso';
-          }
+    setBusy(true);
+    try {
+      let data = await streamMessage(text);
+      if (!data) {
+        const res = await fetch('/api/chat/message', {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ message: text })
         });
 
-        escBtn.addEventListener('click', async function () {
-          if (busy) return;
-          escBtn.disabled = true;
-          escBtn.textContent = 'Escalando...';
-          try {
-            const r = await fetch('/api/chat/escalate', {
-              method: 'POST',
-              headers: { 'Content-Type': 'application/json' },
-              body: JSON.stringify({ original_message: originalMessage })
-            });
-            if (r.ok) {
-              const jr = await r.json();
-              appendMessage('bot', 'He creado un ticket (#' + jr.ticket_id + '). El administrador recibirá un aviso: ' + jr.admin_email);
-            } else {
-              appendMessage('bot', 'Error al escalar. Intenta más tarde.');
-            }
-          } catch (e) {
-            console.error(e);
-            appendMessage('bot', 'Error al escalar. Intenta más tarde.');
-          } finally {
-            escBtn.disabled = false;
-            escBtn.textContent = 'Escalar al admin';
-          }
-        });
+        if (!res.ok) {
+          appendMessage('bot', 'Error del servidor al procesar la petición.');
+          return;
+        }
 
-        actions.appendChild(adaptBtn);
-        actions.appendChild(escBtn);
-        messages.appendChild(actions);
+        data = await res.json().catch(() => ({ answer: 'Respuesta inválida del servidor.' }));
+        // Render the bot response in a friendly way
+        renderBotResponse(data);
       }
+
+      showActions(data, text);
     } catch (e) {
       console.error(e);
       appendMessage('bot', 'Error de red. Intenta de nuevo.');
@@ -348,10 +348,10 @@ function abrirModalComprobantes(solicitudId) {
                     <div class="comprobante-card-nombre" title="${comp.nombre}">${comp.nombre}</div>
                     <div class="comprobante-card-info">${formatearTamaño(comp.tamaño)}</div>
                     <div class="comprobante-card-actions">
-                        <button class="btn btn-sm btn-info" onclick="window.open('${comp.ruta}', '_blank')">
+                        <button class="btn btn-sm btn-info" onclick="window.open('${urlArchivoSolicitud(solicitudId, comp.nombre_guardado)}', '_blank')">
                             <i class="fas fa-eye"></i>
                         </button>
-                        <button class="btn btn-sm btn-primary" onclick="descargarArchivo('${comp.ruta}', '${comp.nombre}')">
+                        <button class="btn btn-sm btn-primary" onclick="descargarArchivo('${urlArchivoSolicitud(solicitudId, comp.nombre_guardado)}', '${comp.nombre}')">
                             <i class="fas fa-download"></i>
                         </button>
                     </div>
@@ -470,13 +470,10 @@ async function verDetalles(solicitudId) {
                             ${sol.archivos_adjuntos.map(archivo => {
                                 // Construir la ruta completa del archivo
                                 let rutaCompleta = '';
-                                if (archivo.ruta) {
-                                    rutaCompleta = archivo.ruta;
-                                } else if (archivo.ruta_archivo) {
-                                    // Si solo tiene el nombre del archivo, construir la ruta
-                                    rutaCompleta = `/uploads/solicitudes/${archivo.ruta_archivo}`;
+                                if (archivo.ruta_archivo) {
+                                    rutaCompleta = urlArchivoSolicitud(solicitudId, archivo.ruta_archivo);
                                 } else if (archivo.nombre_guardado) {
-                                    rutaCompleta = `/uploads/solicitudes/${archivo.nombre_guardado}`;
+                                    rutaCompleta = urlArchivoSolicitud(solicitudId, archivo.nombre_guardado);
                                 } else {
                                     rutaCompleta = '#';
                                 }
@@ -923,6 +920,11 @@ function cerrarPreview() {
     }
 }
 
+// Ruta autorizada de descarga: `ruta_archivo` (adjuntos) o `nombre_guardado` (comprobantes)
+function urlArchivoSolicitud(solicitudId, nombre) {
+    return `/api/solicitudes/estandar/${solicitudId}/archivos/${encodeURIComponent(nombre)}`;
+}
+
 function descargarArchivo(ruta, nombre) {
     const link = document.createElement('a');
     link.href = ruta;
@@ -1470,7 +1472,8 @@ function verArchivosComprobantes(solicitudId) {
                     ${comprobantes.map(archivo => {
                         const nombreArchivo = archivo.nombre || archivo.nombre_archivo || 'Archivo sin nombre';
                         const extension = nombreArchivo.split('.').pop().toLowerCase();
-                        const rutaArchivo = archivo.ruta || (archivo.ruta_archivo ? `/uploads/comprobantes/${archivo.ruta_archivo}` : '#');
+                        const guardado = archivo.nombre_guardado || archivo.ruta_archivo;
+                        const rutaArchivo = guardado ? urlArchivoSolicitud(solicitudId, guardado) : '#';
                         
                         let icono = 'fa-file';
                         let colorIcono = '#64748b';